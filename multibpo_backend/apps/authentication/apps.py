@@ -9,4 +9,7 @@ class AuthenticationConfig(AppConfig):
         """
         Configurações que rodam quando o app é carregado
         """
-        pass
\ No newline at end of file
+        from . import hashers  # noqa: F401 (registra o system check da política de hash)
+        from . import claims  # noqa: F401 (invalidação das claims JWT em cache)
+        from . import revocation  # noqa: F401 (publica revogações no filtro)
+        from . import documentos  # noqa: F401 (publica documentos cadastrados no filtro)
\ No newline at end of file
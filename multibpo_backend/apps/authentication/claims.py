@@ -0,0 +1,171 @@
+"""
+Claims JWT do contador com cache
+MultiBPO - Autenticação
+
+MultiBPOTokenObtainPairSerializer.get_token (registro e login) e o refresh
+(MultiBPOTokenRefreshSerializer) gravam no token o mesmo conjunto de claims
+do contador: contador_id, crc, documento, tipo_pessoa, escritorio_id, flags.
+
+O conjunto fica no cache por usuário:
+
+- login já tem o contador carregado: monta as claims e regrava o cache
+- refresh só tem o user_id do token: com o cache quente, nenhuma query
+- post_save/post_delete de Contador e a exclusão de Escritorio invalidam
+  as entradas afetadas, então o refresh seguinte já reflete a alteração
+
+Com DummyCache (desenvolvimento) usa um LocMemCache do processo, como
+apps.receita.shared; nesse caso a invalidação só alcança o próprio worker
+e as demais cópias expiram em TTL. Em produção aponte CACHE_ALIAS para o
+Redis.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.contadores.models import Contador, Escritorio
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_JWT_CLAIMS_CONFIG = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 60 * 60,             # Segundos; limita a defasagem se alguma invalidação se perder
+    'PREFIX': 'jwt-claims',
+}
+
+# Claims de quem não tem perfil de contador
+CLAIMS_SEM_CONTADOR = {
+    'contador_id': None,
+    'crc': None,
+    'documento': None,
+    'tipo_pessoa': None,
+}
+
+
+def get_claims_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.AUTH_JWT_CLAIMS)"""
+    config = dict(DEFAULT_JWT_CLAIMS_CONFIG)
+    config.update(getattr(settings, 'AUTH_JWT_CLAIMS', {}))
+    return config
+
+
+_local_cache: Optional[LocMemCache] = None
+_local_lock = threading.Lock()
+
+
+def _get_cache() -> BaseCache:
+    """Cache das claims (LocMemCache do processo se o alias for DummyCache)"""
+    global _local_cache
+    backend = caches[get_claims_config()['CACHE_ALIAS']]
+    if not isinstance(backend, DummyCache):
+        return backend
+    if _local_cache is None:
+        with _local_lock:
+            if _local_cache is None:
+                _local_cache = LocMemCache('jwt-claims-local', {'OPTIONS': {'MAX_ENTRIES': 10000}})
+    return _local_cache
+
+
+def _chave(user_id: Any) -> str:
+    return f"{get_claims_config()['PREFIX']}:{user_id}"
+
+
+def claims_do_contador(contador: Contador) -> Dict[str, Any]:
+    """Claims a partir de um contador carregado"""
+    return {
+        'contador_id': contador.id,
+        'crc': getattr(contador, 'crc', None),  # CRC pode ser opcional agora
+        'documento': getattr(contador, 'documento', contador.cpf),  # Documento unificado
+        'tipo_pessoa': getattr(contador, 'tipo_pessoa', 'fisica'),
+        'escritorio_id': contador.escritorio_id,
+        'eh_responsavel': getattr(contador, 'eh_responsavel_tecnico', False),
+        'pode_assinar': getattr(contador, 'pode_assinar_documentos', False),
+        'ativo': contador.ativo,
+    }
+
+
+def get_claims(user_id: Any, contador: Optional[Contador] = None) -> Dict[str, Any]:
+    """
+    Claims do usuário
+
+    Com `contador` (já carregado pelo login) monta e regrava o cache; sem
+    ele usa o cache e, no miss, uma query pelo contador.
+    """
+    cache = _get_cache()
+    ttl = get_claims_config()['TTL']
+
+    if contador is None:
+        claims = cache.get(_chave(user_id))
+        if claims is not None:
+            return claims
+        contador = Contador.objects.filter(user_id=user_id).first()
+
+    claims = claims_do_contador(contador) if contador is not None else dict(CLAIMS_SEM_CONTADOR)
+    cache.set(_chave(user_id), claims, ttl)
+    return claims
+
+
+def aplicar_claims(token, claims: Dict[str, Any]):
+    """Grava no token as claims do contador e as do sistema"""
+    for nome, valor in claims.items():
+        token[nome] = valor
+
+    # Claims do sistema
+    token['sistema'] = 'MultiBPO'
+    token['versao'] = '2.2.3'  # Atualizado para Sub-Fase 2.2.3
+    token['issued_at'] = timezone.now().isoformat()
+    return token
+
+
+def invalidar_claims(user_ids: Iterable[Any]) -> None:
+    """
+    Descarta as claims em cache dos usuários informados
+
+    Repete a remoção após o commit: um refresh concorrente pode ter relido
+    (e recolocado no cache) os dados anteriores à transação.
+    """
+    chaves = [_chave(user_id) for user_id in user_ids]
+    if not chaves:
+        return
+    cache = _get_cache()
+    cache.delete_many(chaves)
+    transaction.on_commit(lambda: cache.delete_many(chaves))
+
+
+@receiver(post_save, sender=Contador, dispatch_uid='jwt_claims_contador_save')
+@receiver(post_delete, sender=Contador, dispatch_uid='jwt_claims_contador_delete')
+def _invalidar_contador(sender, instance, **kwargs):
+    invalidar_claims([instance.user_id])
+
+
+@receiver(pre_delete, sender=Escritorio, dispatch_uid='jwt_claims_escritorio_pre_delete')
+def _usuarios_do_escritorio(sender, instance, **kwargs):
+    # No post_delete o on_delete do FK já desvinculou os contadores
+    instance._claims_user_ids = list(
+        Contador.objects.filter(escritorio_id=instance.pk).values_list('user_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Escritorio, dispatch_uid='jwt_claims_escritorio_delete')
+def _invalidar_escritorio(sender, instance, **kwargs):
+    invalidar_claims(getattr(instance, '_claims_user_ids', []))
+
+
+def reset_claims_cache() -> None:
+    """Limpa o cache local (usado em testes)"""
+    global _local_cache
+    with _local_lock:
+        if _local_cache is not None:
+            _local_cache.clear()    # LocMemCache de mesmo nome compartilha o armazenamento
+        _local_cache = None
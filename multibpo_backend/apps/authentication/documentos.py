@@ -0,0 +1,251 @@
+"""
+Disponibilidade de CPF/CNPJ em tempo real (filtro de Bloom por processo)
+MultiBPO - Autenticação
+
+DocumentoValidationView é chamada a cada tecla assim que o documento tem
+11 ou 14 dígitos. O caminho rápido evita o banco:
+
+1. Dígitos verificadores (apps.contadores.utils.documentos, sem banco):
+   inválido responde na hora
+2. Filtro de Bloom com todos os documento_digits (Contador) e cnpj_digits
+   (Escritorio): fora do filtro = disponível, sem query
+3. Só os possíveis cadastrados (cadastrados de fato ou falso positivo) vão ao
+   banco, por igualdade nas colunas indexadas
+
+O filtro é montado do banco no primeiro uso e reconstruído em segundo plano
+a cada RECONSTRUCAO segundos (o que também descarta documentos excluídos,
+que um filtro de Bloom não remove). post_save de Contador/Escritorio insere
+o documento após o commit, no próprio worker; nos demais, um cadastro feito
+depois da última reconstrução pode aparecer como disponível até a próxima.
+A resposta é só orientação para o formulário: o registro continua
+verificando no banco e a constraint única de documento_digits decide.
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.contadores.models import Contador, Escritorio
+from apps.contadores.utils.documentos import TIPOS_POR_TAMANHO, cnpj_valido, cpf_valido, formatar
+
+from .revocation import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DOCUMENTO_FILTER_CONFIG = {
+    'ENABLED': True,
+    'CAPACIDADE': 1_000_000,        # Mínimo; cresce para 2x os documentos cadastrados
+    'TAXA_FALSO_POSITIVO': 0.001,   # Fração das consultas de documentos livres que vão ao banco
+    'RECONSTRUCAO': 5 * 60,         # Segundos entre reconstruções a partir do banco
+    'LOTE': 10_000,                 # Linhas por fetch na reconstrução
+}
+
+_VALIDADORES = {'cpf': cpf_valido, 'cnpj': cnpj_valido}
+
+
+def get_documento_filter_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.AUTH_DOCUMENTO_FILTER)"""
+    config = dict(DEFAULT_DOCUMENTO_FILTER_CONFIG)
+    config.update(getattr(settings, 'AUTH_DOCUMENTO_FILTER', {}))
+    return config
+
+
+class DocumentoFilter:
+    """
+    Filtro de Bloom dos documentos cadastrados
+
+    Uma instância por processo (get_documento_filter()).
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or get_documento_filter_config()
+        self._lock = threading.Lock()
+        self._reconstruindo = threading.Lock()
+        self._filtro: Optional[BloomFilter] = None
+        self._proxima_reconstrucao = 0.0
+        self._stats = {'consultas': 0, 'negativos': 0, 'confirmados': 0,
+                       'falsos_positivos': 0, 'reconstrucoes': 0}
+
+    def reconstruir(self) -> None:
+        """Monta um filtro novo a partir do banco e troca o atual"""
+        inicio = time.monotonic()
+        contadores = Contador.objects.exclude(documento_digits__isnull=True)
+        escritorios = Escritorio.objects.exclude(cnpj_digits__isnull=True)
+        total = contadores.count() + escritorios.count()
+        filtro = BloomFilter(max(self.config['CAPACIDADE'], 2 * total), self.config['TAXA_FALSO_POSITIVO'])
+
+        lote = self.config['LOTE']
+        for digitos in contadores.values_list('documento_digits', flat=True).iterator(chunk_size=lote):
+            filtro.add(digitos)
+        for digitos in escritorios.values_list('cnpj_digits', flat=True).iterator(chunk_size=lote):
+            filtro.add(digitos)
+
+        with self._lock:
+            self._filtro = filtro
+            self._proxima_reconstrucao = time.monotonic() + self.config['RECONSTRUCAO']
+            self._stats['reconstrucoes'] += 1
+        logger.info(
+            f"Filtro de documentos reconstruído: {filtro.itens} documento(s), "
+            f"{filtro.tamanho_bytes // 1024} KiB, {(time.monotonic() - inicio) * 1000:.0f} ms"
+        )
+
+    def _reconstruir_em_segundo_plano(self) -> None:
+        try:
+            self.reconstruir()
+        except Exception as e:
+            logger.error(f"Falha ao reconstruir o filtro de documentos: {e}", exc_info=True)
+            with self._lock:
+                self._proxima_reconstrucao = time.monotonic() + self.config['RECONSTRUCAO']
+        finally:
+            # Thread própria: não recebe request_finished
+            close_old_connections()
+            self._reconstruindo.release()
+
+    def _filtro_atual(self) -> BloomFilter:
+        if self._filtro is None:
+            # Primeiro uso do processo: quem chegar monta, os demais esperam
+            with self._reconstruindo:
+                if self._filtro is None:
+                    self.reconstruir()
+        elif time.monotonic() >= self._proxima_reconstrucao and self._reconstruindo.acquire(blocking=False):
+            # Vencido: segue com o filtro atual enquanto o novo é montado
+            threading.Thread(target=self._reconstruir_em_segundo_plano,
+                             name='documento-filter', daemon=True).start()
+        return self._filtro
+
+    def adicionar(self, digitos: str) -> None:
+        """Insere um documento recém-cadastrado (se o filtro já foi montado)"""
+        with self._lock:
+            if self._filtro is not None:
+                self._filtro.add(digitos)
+
+    def talvez_cadastrado(self, digitos: str) -> bool:
+        """False garante que o documento está livre; True exige confirmação no banco"""
+        return digitos in self._filtro_atual()
+
+    def cadastrado(self, digitos: str) -> bool:
+        """Filtro em memória, banco apenas para os positivos"""
+        self._stats['consultas'] += 1
+        if not self.talvez_cadastrado(digitos):
+            self._stats['negativos'] += 1
+            return False
+        existe = documento_no_banco(digitos)
+        self._stats['confirmados' if existe else 'falsos_positivos'] += 1
+        return existe
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            filtro = self._filtro
+            return {
+                **self._stats,
+                'documentos': filtro.itens if filtro else None,
+                'memoria_bytes': filtro.tamanho_bytes if filtro else None,
+                'proxima_reconstrucao_s': (
+                    max(0, math.ceil(self._proxima_reconstrucao - time.monotonic())) if filtro else None
+                ),
+            }
+
+
+_filtro: Optional[DocumentoFilter] = None
+_filtro_lock = threading.Lock()
+
+
+def get_documento_filter() -> DocumentoFilter:
+    """Filtro compartilhado do processo"""
+    global _filtro
+    if _filtro is None:
+        with _filtro_lock:
+            if _filtro is None:
+                _filtro = DocumentoFilter()
+    return _filtro
+
+
+def reset_documento_filter() -> None:
+    """Descarta o filtro (nova leitura de AUTH_DOCUMENTO_FILTER; usado em testes)"""
+    global _filtro
+    with _filtro_lock:
+        _filtro = None
+
+
+def documento_no_banco(digitos: str) -> bool:
+    """Consulta direta nas colunas indexadas (CNPJ também em Escritorio)"""
+    if Contador.objects.filter(documento_digits=digitos).exists():
+        return True
+    return len(digitos) == 14 and Escritorio.objects.filter(cnpj_digits=digitos).exists()
+
+
+def documento_cadastrado(digitos: str) -> bool:
+    """Verificação usada pela validação em tempo real (banco direto se ENABLED=False)"""
+    if not get_documento_filter_config()['ENABLED']:
+        return documento_no_banco(digitos)
+    return get_documento_filter().cadastrado(digitos)
+
+
+def verificar_documento(valor: Any, tipo: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Validade e disponibilidade de um CPF/CNPJ digitado
+
+    Sem banco para documentos inválidos e, em regra, para os disponíveis.
+    """
+    digitos = ''.join(filter(str.isdigit, str(valor or '')))
+    tipo_detectado = TIPOS_POR_TAMANHO.get(len(digitos))
+    resultado = {'valid': False, 'available': None, 'tipo': tipo or tipo_detectado, 'formatted': None}
+
+    if tipo_detectado is None:
+        resultado['message'] = 'Documento deve ter 11 dígitos (CPF) ou 14 dígitos (CNPJ)'
+        return resultado
+    if tipo and tipo != tipo_detectado:
+        resultado['message'] = f'{tipo.upper()} deve ter {11 if tipo == "cpf" else 14} dígitos'
+        return resultado
+    if not _VALIDADORES[tipo_detectado](digitos):
+        resultado['message'] = f'{tipo_detectado.upper()} inválido'
+        return resultado
+
+    disponivel = not documento_cadastrado(digitos)
+    resultado.update({
+        'valid': True,
+        'available': disponivel,
+        'tipo': tipo_detectado,
+        'formatted': formatar(digitos),
+        'message': (f'{tipo_detectado.upper()} disponível' if disponivel
+                    else f'{tipo_detectado.upper()} já cadastrado'),
+    })
+    return resultado
+
+
+def _publicar(digitos: Optional[str]) -> None:
+    filtro = _filtro
+    if digitos and filtro is not None:
+        transaction.on_commit(lambda: filtro.adicionar(digitos))
+
+
+def publicar_documentos(digitos: Iterable[str]) -> None:
+    """Documentos gravados sem post_save (bulk_create) entram no filtro após o commit"""
+    filtro = _filtro
+    novos = [d for d in digitos if d]
+    if not novos or filtro is None:
+        return
+
+    def adicionar():
+        for documento in novos:
+            filtro.adicionar(documento)
+
+    transaction.on_commit(adicionar)
+
+
+@receiver(post_save, sender=Contador, dispatch_uid='documento_filter_contador')
+def _publicar_contador(sender, instance, **kwargs):
+    _publicar(instance.documento_digits)
+
+
+@receiver(post_save, sender=Escritorio, dispatch_uid='documento_filter_escritorio')
+def _publicar_escritorio(sender, instance, **kwargs):
+    _publicar(instance.cnpj_digits)
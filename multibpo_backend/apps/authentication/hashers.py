@@ -0,0 +1,185 @@
+"""
+Política de hash de senhas
+MultiBPO - Autenticação
+
+Subclasses dos hashers do Django com custo configurável em
+settings.PASSWORD_HASHING. O login (LoginView e MVPLoginView) passa por
+user.check_password, que regrava o hash quando:
+
+- o hash foi gerado por outro algoritmo que não o preferido (o primeiro de
+  settings.PASSWORD_HASHERS), por exemplo o PBKDF2 padrão dos usuários antigos
+- o custo gravado no hash difere do configurado (must_update)
+
+Assim mudar ALGORITHM ou os custos migra as senhas aos poucos, no próximo
+login de cada usuário, sem invalidar nenhuma. Pelo mesmo motivo o padrão
+é o PBKDF2 com as iterações do Django: instalações existentes não regravam
+nada. scrypt, argon2 e bcrypt são opt-in, com custos nos mínimos da OWASP.
+
+Cada hasher mantém o `algorithm` do Django: hashes gerados com os custos
+padrão do Django continuam sendo verificados (e atualizados) normalmente.
+
+O custo define quantos logins por segundo cada núcleo aguenta; use
+`python manage.py benchmark_hashing --alvo <logins/s>` para escolher os
+parâmetros e dimensionar os workers.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core import checks
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PASSWORD_HASHING_CONFIG = {
+    'ALGORITHM': 'pbkdf2',      # pbkdf2 | scrypt | argon2 | bcrypt (preferido para novos hashes)
+    'SCRYPT': {
+        'WORK_FACTOR': 2 ** 17,     # N (potência de 2, mínimo OWASP); memória ≈ 128 * N * BLOCK_SIZE bytes
+        'BLOCK_SIZE': 8,
+        'PARALLELISM': 1,           # O Django usa 5: 5x o custo de CPU por login
+    },
+    'ARGON2': {                     # Requer argon2-cffi
+        'TIME_COST': 2,
+        'MEMORY_COST': 19 * 1024,   # KiB
+        'PARALLELISM': 1,
+    },
+    'BCRYPT': {                     # Requer bcrypt
+        'ROUNDS': 10,               # Log2 das iterações; cada +1 dobra o custo
+    },
+    'PBKDF2': {
+        'ITERATIONS': None,         # None = padrão do Django (1.000.000 no 5.2)
+    },
+}
+
+# Mínimo da OWASP para scrypt (com r=8, p=1)
+SCRYPT_WORK_FACTOR_MINIMO = 2 ** 17
+
+# Nome em PASSWORD_HASHING['ALGORITHM'] → hasher desta política
+HASHERS = {
+    'scrypt': 'apps.authentication.hashers.ScryptPasswordHasher',
+    'argon2': 'apps.authentication.hashers.Argon2PasswordHasher',
+    'bcrypt': 'apps.authentication.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'apps.authentication.hashers.PBKDF2PasswordHasher',
+}
+
+
+def get_password_hashing_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.PASSWORD_HASHING, por algoritmo)"""
+    custom = getattr(settings, 'PASSWORD_HASHING', {})
+    config = dict(DEFAULT_PASSWORD_HASHING_CONFIG)
+    for chave, valor in custom.items():
+        if isinstance(valor, dict) and isinstance(config.get(chave), dict):
+            config[chave] = {**config[chave], **valor}
+        else:
+            config[chave] = valor
+    return config
+
+
+def _custo(algoritmo: str, parametro: str) -> int:
+    return get_password_hashing_config()[algoritmo][parametro]
+
+
+def hasher_disponivel(hasher: hashers.BasePasswordHasher) -> bool:
+    """False quando o hasher depende de biblioteca não instalada (argon2-cffi, bcrypt)"""
+    if hasher.library is None:
+        return True
+    try:
+        hasher._load_library()
+    except ValueError:
+        return False
+    return True
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """scrypt (hashlib, sem dependência externa) com custo configurável"""
+
+    @property
+    def work_factor(self) -> int:
+        return _custo('SCRYPT', 'WORK_FACTOR')
+
+    @property
+    def block_size(self) -> int:
+        return _custo('SCRYPT', 'BLOCK_SIZE')
+
+    @property
+    def parallelism(self) -> int:
+        return _custo('SCRYPT', 'PARALLELISM')
+
+    @property
+    def maxmem(self) -> int:
+        # O limite padrão do OpenSSL (32 MiB) recusa N >= 2**15 com r=8;
+        # folga de 2x sobre os 128 * N * r bytes do custo configurado
+        return max(2 * 128 * self.work_factor * self.block_size, 32 * 1024 * 1024)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2id com custo configurável"""
+
+    @property
+    def time_cost(self) -> int:
+        return _custo('ARGON2', 'TIME_COST')
+
+    @property
+    def memory_cost(self) -> int:
+        return _custo('ARGON2', 'MEMORY_COST')
+
+    @property
+    def parallelism(self) -> int:
+        return _custo('ARGON2', 'PARALLELISM')
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """bcrypt sobre SHA-256 da senha (sem o limite de 72 bytes) com custo configurável"""
+
+    @property
+    def rounds(self) -> int:
+        return _custo('BCRYPT', 'ROUNDS')
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 com número de iterações configurável"""
+
+    @property
+    def iterations(self) -> int:
+        return _custo('PBKDF2', 'ITERATIONS') or hashers.PBKDF2PasswordHasher.iterations
+
+
+def hasher_preferido() -> Optional[hashers.BasePasswordHasher]:
+    """Hasher usado para novos hashes (o primeiro de PASSWORD_HASHERS)"""
+    try:
+        return hashers.get_hasher('default')
+    except Exception as e:
+        logger.error(f"PASSWORD_HASHERS inválido: {e}")
+        return None
+
+
+@checks.register(checks.Tags.security)
+def check_password_hashing(app_configs=None, **kwargs):
+    """O algoritmo preferido precisa ser conhecido e ter a biblioteca instalada"""
+    config = get_password_hashing_config()
+    algoritmo = config['ALGORITHM']
+    if algoritmo not in HASHERS:
+        return [checks.Error(
+            f"PASSWORD_HASHING['ALGORITHM'] inválido: {algoritmo!r}",
+            hint=f"Use um de: {', '.join(HASHERS)}",
+            id='authentication.E001',
+        )]
+
+    hasher = hasher_preferido()
+    if hasher is not None and not hasher_disponivel(hasher):
+        return [checks.Error(
+            f"O hasher de senhas preferido ({hasher.algorithm}) requer uma biblioteca não instalada",
+            hint='Instale a dependência opcional (requirements.txt) ou troque PASSWORD_HASH_ALGORITHM',
+            id='authentication.E002',
+        )]
+
+    if algoritmo == 'scrypt' and config['SCRYPT']['WORK_FACTOR'] < SCRYPT_WORK_FACTOR_MINIMO:
+        return [checks.Warning(
+            f"scrypt com WORK_FACTOR {config['SCRYPT']['WORK_FACTOR']} abaixo do mínimo da OWASP "
+            f"({SCRYPT_WORK_FACTOR_MINIMO})",
+            hint='Aumente PASSWORD_HASHING["SCRYPT"]["WORK_FACTOR"] ou mantenha o PBKDF2 padrão',
+            id='authentication.W001',
+        )]
+    return []
@@ -0,0 +1,210 @@
+"""
+Executor limitado para a verificação de senha nas views de login assíncronas
+MultiBPO - Autenticação
+
+Sob ASGI, check_password (dezenas de ms de CPU por login, ver hashers.py)
+bloquearia o event loop. As views async de login rodam a validação das
+credenciais neste executor dedicado:
+
+- MAX_WORKERS threads verificam senhas ao mesmo tempo (o hash do hashlib
+  libera o GIL, então escala com os núcleos)
+- até MAX_FILA logins aguardam uma thread livre
+- acima disso o pool recusa na hora (PoolLotado) e a view responde 429 com
+  Retry-After, em vez de enfileirar sem limite e atrasar o resto da API
+
+status() expõe a fila (em execução, aguardando, recusados, espera média)
+para o health check de autenticação.
+
+As respostas de erro comuns às views de login (authentication e mvp)
+também ficam aqui.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_LOGIN_POOL_CONFIG = {
+    'MAX_WORKERS': None,    # Verificações simultâneas (None = núcleos do processo)
+    'MAX_FILA': None,       # Logins aguardando uma thread (None = 2 * MAX_WORKERS)
+    'RETRY_AFTER': 1,       # Segundos sugeridos ao cliente quando o pool está lotado
+}
+
+
+def get_login_pool_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.AUTH_LOGIN_POOL)"""
+    config = dict(DEFAULT_LOGIN_POOL_CONFIG)
+    config.update(getattr(settings, 'AUTH_LOGIN_POOL', {}))
+    config['MAX_WORKERS'] = config['MAX_WORKERS'] or os.cpu_count() or 1
+    if config['MAX_FILA'] is None:
+        config['MAX_FILA'] = 2 * config['MAX_WORKERS']
+    return config
+
+
+class PoolLotado(Exception):
+    """Sem vaga no executor de login (a view responde 429)"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'Pool de login lotado; tente novamente em {retry_after}s')
+        self.retry_after = retry_after
+
+
+def resposta_pool_lotado(erro: PoolLotado) -> JsonResponse:
+    """429 com Retry-After para as views de login assíncronas"""
+    response = JsonResponse({
+        'success': False,
+        'message': 'Muitos logins simultâneos. Tente novamente em instantes.',
+        'error_code': 'LOGIN_BUSY',
+        'retry_after': erro.retry_after,
+    }, status=429)
+    response['Retry-After'] = str(erro.retry_after)
+    return response
+
+
+def corpo_login_invalido(serializer) -> dict:
+    """Corpo do 400 das views de login (credenciais não validadas)"""
+    return {
+        'success': False,
+        'message': 'Dados de login inválidos.',
+        'errors': serializer.errors,
+        'error_code': 'VALIDATION_ERROR'
+    }
+
+
+def corpo_erro_interno_login(e: Exception) -> dict:
+    """Corpo do 500 das views de login (registra o erro inesperado)"""
+    logger.error(f"Erro interno no login: {e}", exc_info=True)
+    
+    return {
+        'success': False,
+        'message': 'Erro interno no servidor. Tente novamente.',
+        'error_code': 'INTERNAL_ERROR',
+        'details': str(e) if settings.DEBUG else 'Erro interno'
+    }
+
+
+class LoginPool:
+    """
+    ThreadPoolExecutor com admissão limitada (MAX_WORKERS + MAX_FILA)
+
+    O executor é recriado após fork, como o de apps.receita.services.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or get_login_pool_config()
+        self.capacidade = self.config['MAX_WORKERS'] + self.config['MAX_FILA']
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._pendentes = 0         # Admitidos e ainda não concluídos
+        self._em_execucao = 0
+        self._iniciados = 0
+        self._concluidos = 0
+        self._recusados = 0
+        self._fila_maxima = 0
+        self._espera_total = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.config['MAX_WORKERS'],
+                        thread_name_prefix='login-hash',
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def submeter(self, func: Callable[..., Any], *args: Any) -> Future:
+        """Agenda func(*args) no executor; PoolLotado se não houver vaga"""
+        with self._lock:
+            if self._pendentes >= self.capacidade:
+                self._recusados += 1
+                logger.warning(f"Pool de login lotado ({self._pendentes}/{self.capacidade}); login recusado")
+                raise PoolLotado(self.config['RETRY_AFTER'])
+            self._pendentes += 1
+            self._fila_maxima = max(self._fila_maxima, self._pendentes - self._em_execucao)
+
+        try:
+            future = self._get_executor().submit(self._rodar, time.monotonic(), func, args)
+        except BaseException:
+            self._liberar(None)
+            raise
+        # Também libera a vaga de quem foi cancelado antes de rodar
+        future.add_done_callback(self._liberar)
+        return future
+
+    async def executar(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Versão awaitable de submeter() para as views assíncronas"""
+        return await asyncio.wrap_future(self.submeter(func, *args))
+
+    def _rodar(self, admitido_em: float, func: Callable[..., Any], args: tuple) -> Any:
+        with self._lock:
+            self._em_execucao += 1
+            self._iniciados += 1
+            self._espera_total += time.monotonic() - admitido_em
+        try:
+            return func(*args)
+        finally:
+            # As threads do pool não recebem request_finished: respeita CONN_MAX_AGE aqui
+            close_old_connections()
+            with self._lock:
+                self._em_execucao -= 1
+
+    def _liberar(self, future: Optional[Future]) -> None:
+        with self._lock:
+            self._pendentes -= 1
+            self._concluidos += 1
+
+    def status(self) -> Dict[str, Any]:
+        """Profundidade da fila e contadores desde o início do processo"""
+        with self._lock:
+            return {
+                'max_workers': self.config['MAX_WORKERS'],
+                'max_fila': self.config['MAX_FILA'],
+                'em_execucao': self._em_execucao,
+                'aguardando': self._pendentes - self._em_execucao,
+                'fila_maxima': self._fila_maxima,
+                'concluidos': self._concluidos,
+                'recusados': self._recusados,
+                'espera_media_ms': round(self._espera_total / self._iniciados * 1000, 1) if self._iniciados else None,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_pool: Optional[LoginPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_login_pool() -> LoginPool:
+    """Pool compartilhado do processo"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = LoginPool()
+    return _pool
+
+
+def reset_login_pool() -> None:
+    """Descarta o pool (nova leitura de AUTH_LOGIN_POOL; usado em testes)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
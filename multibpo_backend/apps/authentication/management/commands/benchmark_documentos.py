@@ -0,0 +1,115 @@
+"""
+Django Management Command - Benchmark da validação de CPF/CNPJ em tempo real
+MultiBPO - Autenticação
+
+Mede, num núcleo, quantas verificações por segundo a validação em tempo
+real (apps.authentication.documentos) atende em cada etapa:
+
+- dígitos verificadores (sem banco)
+- verificar_documento com o filtro de Bloom (documentos livres: sem query)
+- verificar_documento consultando o banco direto (ENABLED=False)
+- a view completa (DocumentoValidationView via RequestFactory, sem HTTP)
+
+Com --alvo (padrão 10.000 req/s) estima os núcleos necessários para cada
+etapa. Os documentos medidos são gerados aleatoriamente (praticamente todos
+livres, o caso comum de quem está digitando um cadastro novo).
+
+Uso:
+    python manage.py benchmark_documentos
+    python manage.py benchmark_documentos --alvo 10000 --duracao 3 --tipo cnpj
+"""
+
+import math
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+
+from apps.authentication.documentos import documento_no_banco, get_documento_filter, verificar_documento
+from apps.authentication.views import DocumentoValidationView
+from apps.contadores.utils.documentos import cnpj_valido, cpf_valido, gerar_cnpj, gerar_cpf
+
+
+GERADORES = {'cpf': gerar_cpf, 'cnpj': gerar_cnpj}
+VALIDADORES = {'cpf': cpf_valido, 'cnpj': cnpj_valido}
+
+
+class Command(BaseCommand):
+    help = 'Mede verificações de CPF/CNPJ por segundo por núcleo (validação em tempo real)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alvo', type=float, default=10_000, help='Requisições por segundo desejadas')
+        parser.add_argument('--duracao', type=float, default=2.0, help='Segundos medidos por etapa')
+        parser.add_argument('--amostras', type=int, default=1_000, help='Documentos aleatórios gerados')
+        parser.add_argument('--tipo', choices=['cpf', 'cnpj'], default='cpf')
+
+    def handle(self, *args, **options):
+        tipo = options['tipo']
+        documentos = [GERADORES[tipo]() for _ in range(options['amostras'])]
+        validador = VALIDADORES[tipo]
+
+        inicio = time.perf_counter()
+        get_documento_filter().reconstruir()
+        status = get_documento_filter().status()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n🔎 BENCHMARK VALIDAÇÃO DE DOCUMENTOS ({tipo.upper()}) - {os.cpu_count()} núcleo(s), '
+            f'alvo {options["alvo"]:g} req/s\n' + '=' * 60
+        ))
+        self.stdout.write(
+            f'Filtro: {status["documentos"]} documento(s), {status["memoria_bytes"] // 1024} KiB, '
+            f'montado em {(time.perf_counter() - inicio) * 1000:.0f} ms\n'
+        )
+
+        view = DocumentoValidationView.as_view()
+        factory = RequestFactory()
+        etapas = [
+            ('dígitos verificadores', validador),
+            ('filtro em memória', lambda doc: verificar_documento(doc)),
+            ('banco direto', lambda doc: documento_no_banco(doc)),
+            ('view completa', lambda doc: view(factory.post(
+                '/api/v1/auth/validate/document/', {'documento': doc}, content_type='application/json'
+            )).render()),
+        ]
+
+        resultados = {}
+        for nome, func in etapas:
+            por_segundo, queries = self._medir(func, documentos, options['duracao'])
+            resultados[nome] = por_segundo
+            self._reportar(nome, por_segundo, queries, options['alvo'])
+
+        ganho = resultados['filtro em memória'] / resultados['banco direto']
+        self.stdout.write(self.style.SUCCESS(
+            f'\n🚀 Filtro: {ganho:.1f}x verificações/s por núcleo em relação ao banco direto'
+        ))
+        self.stdout.write(f'Estatísticas do filtro: {get_documento_filter().status()}')
+
+    def _medir(self, func, documentos, duracao):
+        """Chamadas por segundo em um núcleo e queries por chamada"""
+        queries = 0
+
+        def contar(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        total = 0
+        with connection.execute_wrapper(contar):
+            inicio = time.perf_counter()
+            while total == 0 or time.perf_counter() - inicio < duracao:
+                for documento in documentos:
+                    func(documento)
+                total += len(documentos)
+            decorrido = time.perf_counter() - inicio
+        return total / decorrido, queries / total
+
+    def _reportar(self, nome, por_segundo, queries, alvo):
+        linha = (
+            f'{nome:<22} {1_000_000 / por_segundo:8.1f} µs | {por_segundo:9.0f} req/s/núcleo | '
+            f'{queries:.3f} queries/req'
+        )
+        if alvo:
+            linha += f' | {math.ceil(alvo / por_segundo)} núcleo(s)'
+        self.stdout.write(linha)
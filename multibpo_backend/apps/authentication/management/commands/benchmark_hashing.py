@@ -0,0 +1,96 @@
+"""
+Django Management Command - Benchmark dos hashers de senha
+MultiBPO - Autenticação
+
+Mede, com os custos de settings.PASSWORD_HASHING, quantos hashes por
+segundo um núcleo calcula para cada algoritmo candidato (é o teto de
+logins/s por núcleo: cada login verifica um hash). Com --alvo, estima
+quantos núcleos (workers gunicorn síncronos) o login precisa.
+
+O PBKDF2 com os custos padrão do Django entra como referência.
+
+Uso:
+    python manage.py benchmark_hashing --alvo 50
+    python manage.py benchmark_hashing --algoritmos scrypt,pbkdf2 --duracao 5
+"""
+
+import math
+import os
+import time
+
+from django.contrib.auth import hashers as django_hashers
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from apps.authentication.hashers import HASHERS, get_password_hashing_config, hasher_disponivel
+
+
+SENHA = 'Senha-de-benchmark-123'
+REFERENCIA = 'pbkdf2 (django)'
+
+
+class Command(BaseCommand):
+    help = 'Mede hashes de senha por segundo por núcleo para cada algoritmo da política'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algoritmos', default=','.join(HASHERS),
+                            help=f'Algoritmos separados por vírgula ({", ".join(HASHERS)})')
+        parser.add_argument('--duracao', type=float, default=2.0, help='Segundos medidos por algoritmo')
+        parser.add_argument('--minimo', type=int, default=3, help='Hashes mínimos por algoritmo')
+        parser.add_argument('--alvo', type=float, default=0, help='Logins por segundo desejados')
+        parser.add_argument('--sem-referencia', action='store_true',
+                            help=f'Não mede o {REFERENCIA}')
+
+    def handle(self, *args, **options):
+        nomes = [nome.strip() for nome in options['algoritmos'].split(',') if nome.strip()]
+        desconhecidos = [nome for nome in nomes if nome not in HASHERS]
+        if desconhecidos:
+            raise CommandError(f'Algoritmos desconhecidos: {", ".join(desconhecidos)}')
+
+        candidatos = [(nome, import_string(HASHERS[nome])()) for nome in nomes]
+        if not options['sem_referencia']:
+            candidatos.append((REFERENCIA, django_hashers.PBKDF2PasswordHasher()))
+
+        preferido = get_password_hashing_config()['ALGORITHM']
+        self.stdout.write(self.style.SUCCESS(
+            f'\n🔐 BENCHMARK HASH DE SENHAS - {os.cpu_count()} núcleo(s), '
+            f'preferido: {preferido}\n' + '=' * 60
+        ))
+
+        resultados = {}
+        for nome, hasher in candidatos:
+            if not hasher_disponivel(hasher):
+                biblioteca = hasher.library[0] if isinstance(hasher.library, tuple) else hasher.library
+                self.stdout.write(self.style.WARNING(f'{nome:<16} ignorado: biblioteca {biblioteca!r} ausente'))
+                continue
+            por_segundo, encoded = self._medir(hasher, options['duracao'], options['minimo'])
+            resultados[nome] = por_segundo
+            self._reportar(nome, hasher, encoded, por_segundo, options['alvo'])
+
+        if REFERENCIA in resultados and preferido in resultados:
+            ganho = resultados[preferido] / resultados[REFERENCIA]
+            self.stdout.write(self.style.SUCCESS(
+                f'\n🚀 {preferido}: {ganho:.1f}x logins/s por núcleo em relação ao {REFERENCIA}'
+            ))
+
+    def _medir(self, hasher, duracao, minimo):
+        """Verificações por segundo em um núcleo (o trabalho de um login)"""
+        encoded = hasher.encode(SENHA, hasher.salt())
+        inicio = time.perf_counter()
+        total = 0
+        while total < minimo or time.perf_counter() - inicio < duracao:
+            if not hasher.verify(SENHA, encoded):
+                raise CommandError(f'{hasher.algorithm}: verificação falhou')
+            total += 1
+        return total / (time.perf_counter() - inicio), encoded
+
+    def _reportar(self, nome, hasher, encoded, por_segundo, alvo):
+        custos = ', '.join(
+            f'{chave}={valor}' for chave, valor in hasher.safe_summary(encoded).items()
+            if chave not in ('algorithm', 'salt', 'hash', 'checksum')
+        )
+        linha = f'{nome:<16} {1000 / por_segundo:8.1f} ms/hash | {por_segundo:7.1f} hashes/s/núcleo'
+        if alvo:
+            linha += f' | {math.ceil(alvo / por_segundo)} núcleo(s) p/ {alvo:g} logins/s'
+        self.stdout.write(linha)
+        self.stdout.write(f'{"":<16} {custos}')
@@ -0,0 +1,70 @@
+"""
+Django Management Command - Limpeza das tabelas do token_blacklist
+MultiBPO - Autenticação
+
+Com ROTATE_REFRESH_TOKENS + BLACKLIST_AFTER_ROTATION cada refresh grava um
+OutstandingToken (com o JWT inteiro) e um BlacklistedToken; sem limpeza as
+tabelas crescem sem limite. Tokens expirados não precisam mais de registro:
+são recusados pela própria expiração.
+
+Remove em lotes (transações curtas) os OutstandingToken expirados há mais
+de --margem horas; os BlacklistedToken correspondentes saem em cascata.
+Nada muda no filtro de revogação: as gerações dos tokens expirados já são
+descartadas em memória.
+
+Uso:
+    python manage.py purgar_tokens
+    python manage.py purgar_tokens --margem 24 --lote 5000 --dry-run
+
+Agendar (cron) diariamente, como o revalidar_escritorios.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = 'Remove do banco os refresh tokens expirados (outstanding e blacklist)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--margem', type=float, default=0,
+                            help='Horas após a expiração antes de remover (padrão: 0)')
+        parser.add_argument('--lote', type=int, default=5000, help='Tokens removidos por transação')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta o que seria removido')
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['margem'])
+        expirados = OutstandingToken.objects.filter(expires_at__lte=limite)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n🧹 PURGA DE TOKENS - expirados até {limite:%Y-%m-%d %H:%M}\n' + '=' * 60
+        ))
+
+        total = expirados.count()
+        revogados = BlacklistedToken.objects.filter(token__expires_at__lte=limite).count()
+        self.stdout.write(f'Outstanding expirados: {total} (dos quais {revogados} na blacklist)')
+        self.stdout.write(
+            f'Restantes: {OutstandingToken.objects.count() - total} outstanding, '
+            f'{BlacklistedToken.objects.count() - revogados} na blacklist'
+        )
+
+        if options['dry_run'] or not total:
+            self.stdout.write(self.style.WARNING('Nada removido' + (' (dry-run)' if options['dry_run'] else '')))
+            return
+
+        removidos = 0
+        while True:
+            ids = list(expirados.order_by().values_list('id', flat=True)[:options['lote']])
+            if not ids:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                removidos += OutstandingToken.objects.filter(id__in=ids).delete()[1].get(
+                    OutstandingToken._meta.label, 0
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ {removidos} token(s) removido(s)'))
@@ -0,0 +1,336 @@
+"""
+Filtro de revogação de refresh tokens (Bloom rotativo)
+MultiBPO - Autenticação
+
+Com ROTATE_REFRESH_TOKENS + BLACKLIST_AFTER_ROTATION o SimpleJWT consulta
+BlacklistedToken a cada refresh. MultiBPORefreshToken (login, refresh e
+logout) troca essa consulta por um filtro de Bloom em memória com os JTIs
+revogados:
+
+- JTI fora do filtro: não revogado, sem ir ao banco (caso comum)
+- JTI no filtro: confirma no banco, que continua sendo a fonte da verdade
+  (o filtro admite falsos positivos, nunca falsos negativos)
+
+Memória limitada: o filtro é dividido em gerações pela expiração do token
+(REFRESH_TOKEN_LIFETIME / GERACOES cada); gerações cujos tokens já
+expiraram são descartadas inteiras, já que um token expirado é recusado
+de qualquer forma.
+
+Compartilhamento entre workers: toda revogação gravada em BlacklistedToken
+(rotação, logout, admin) é publicada, após o commit, num log sequencial no
+cache (CACHE_ALIAS). Antes de cada verificação o worker lê o número de
+sequência (um GET no cache) e aplica as entradas novas; se o log tiver
+lacunas (entradas expiradas) o filtro é reconstruído a partir do banco.
+
+O filtro só liga com um cache compartilhado entre os workers (Redis,
+Memcached, arquivo, banco). Com DummyCache ou LocMemCache uma revogação
+feita num worker não chegaria aos outros, que aceitariam o token revogado:
+nesse caso toda verificação vai direto ao banco, como no SimpleJWT.
+
+O crescimento das tabelas do token_blacklist é tratado pelo comando
+`python manage.py purgar_tokens`.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_REVOCATION_CONFIG = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'PREFIX': 'jwt-revogados',
+    'CAPACIDADE': 100_000,          # Revogações esperadas por geração
+    'TAXA_FALSO_POSITIVO': 0.001,   # Fração de verificações que vão ao banco sem necessidade
+    'GERACOES': 7,                  # Gerações cobrindo REFRESH_TOKEN_LIFETIME
+    'MAX_ATRASO': 10_000,           # Entradas pendentes acima disso: reconstrói do banco
+    'ESPERA_LACUNA': 0.01,          # Espera antes de reler uma entrada do log ainda não gravada
+}
+
+
+def get_revocation_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.AUTH_REVOCATION)"""
+    config = dict(DEFAULT_REVOCATION_CONFIG)
+    config.update(getattr(settings, 'AUTH_REVOCATION', {}))
+    return config
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre bytearray, dimensionado por capacidade e taxa de falso positivo"""
+
+    def __init__(self, capacidade: int, taxa_falso_positivo: float):
+        bits = math.ceil(-capacidade * math.log(taxa_falso_positivo) / (math.log(2) ** 2))
+        self.bits = max(bits, 8)
+        self.hashes = max(1, round(self.bits / capacidade * math.log(2)))
+        self._dados = bytearray((self.bits + 7) // 8)
+        self.itens = 0
+
+    def _posicoes(self, item: str) -> Iterable[int]:
+        # Double hashing (Kirsch-Mitzenmacher) sobre um único blake2b
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for posicao in self._posicoes(item):
+            self._dados[posicao >> 3] |= 1 << (posicao & 7)
+        self.itens += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._dados[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(item))
+
+    @property
+    def tamanho_bytes(self) -> int:
+        return len(self._dados)
+
+
+_avisado_sem_cache = False
+
+
+def cache_compartilhado(alias: str) -> Optional[BaseCache]:
+    """Backend do alias se for visível a todos os workers; None para Dummy/LocMem"""
+    global _avisado_sem_cache
+    backend = caches[alias]
+    if not isinstance(backend, (DummyCache, LocMemCache)):
+        return backend
+    if not _avisado_sem_cache:
+        _avisado_sem_cache = True
+        logger.warning(f"Filtro de revogação desligado: cache '{alias}' não é compartilhado entre "
+                       f"workers ({type(backend).__name__}); verificando a blacklist no banco")
+    return None
+
+
+def filtro_habilitado(config: Optional[Dict[str, Any]] = None) -> bool:
+    """ENABLED e um cache compartilhado para o log de revogações"""
+    config = config or get_revocation_config()
+    return config['ENABLED'] and cache_compartilhado(config['CACHE_ALIAS']) is not None
+
+
+class RevocationFilter:
+    """
+    Gerações de filtros de Bloom + sincronização pelo log no cache
+
+    Uma instância por processo (get_revocation_filter()). Exige um cache
+    compartilhado (ver filtro_habilitado).
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or get_revocation_config()
+        vida = api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+        self.largura = max(1, math.ceil(vida / self.config['GERACOES']))
+        self._lock = threading.RLock()
+        self._geracoes: Dict[int, BloomFilter] = {}
+        self._seq: Optional[int] = None     # None: ainda não carregado do banco
+        self._stats = {'verificacoes': 0, 'negativos': 0, 'confirmados': 0,
+                       'falsos_positivos': 0, 'reconstrucoes': 0}
+
+    # ========== CACHE (LOG DE REVOGAÇÕES) ==========
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.config['CACHE_ALIAS']]
+
+    def _chave(self, sufixo: Any) -> str:
+        return f"{self.config['PREFIX']}:{sufixo}"
+
+    def _ttl_log(self) -> int:
+        # Entradas valem até o token expirar; quem ficar para trás reconstrói
+        return int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+
+    def publicar(self, jti: str, expira_em: datetime) -> None:
+        """
+        Acrescenta uma revogação ao filtro local e ao log compartilhado
+
+        O número vem do incr da sequência, então a entrada log:<seq> é
+        gravada logo depois: um leitor pode ver a sequência nova antes da
+        entrada e relê uma vez antes de tratar a falta como lacuna.
+        """
+        exp = int(expira_em.timestamp())
+        self._adicionar(jti, exp)
+
+        cache = self.cache
+        chave_seq = self._chave('seq')
+        cache.add(chave_seq, 0, timeout=None)
+        try:
+            seq = cache.incr(chave_seq)
+        except ValueError:
+            # Sequência sumiu do cache (evicção): os workers reconstroem do banco
+            cache.set(chave_seq, 1, timeout=None)
+            seq = 1
+        cache.set(self._chave(f'log:{seq}'), (jti, exp), timeout=self._ttl_log())
+
+    def _sincronizar(self) -> None:
+        atual = self.cache.get(self._chave('seq')) or 0
+        with self._lock:
+            if self._seq is None or atual < self._seq or atual - self._seq > self.config['MAX_ATRASO']:
+                self._reconstruir(atual)
+                return
+            if atual == self._seq:
+                return
+
+            inicio = self._seq
+
+        chaves = [self._chave(f'log:{n}') for n in range(inicio + 1, atual + 1)]
+        entradas = self.cache.get_many(chaves)
+        faltando = [chave for chave in chaves if chave not in entradas]
+        if faltando:
+            # Provavelmente ainda não gravada pelo outro worker (entre o incr e o set)
+            time.sleep(self.config['ESPERA_LACUNA'])
+            entradas.update(self.cache.get_many(faltando))
+        if len(entradas) != len(chaves):
+            self._reconstruir(atual)    # Entrada expirada: lacuna de verdade
+            return
+
+        with self._lock:
+            if self._seq != inicio:
+                return      # Outra thread já aplicou
+            for chave in chaves:
+                self._adicionar(*entradas[chave])
+            self._seq = atual
+
+    def _reconstruir(self, seq: int) -> None:
+        """
+        Recarrega o filtro com os tokens revogados ainda não expirados (banco)
+
+        A leitura do banco monta gerações novas fora do lock; só a troca é
+        feita com ele. Revogações publicadas durante a leitura têm número
+        acima de seq e entram na próxima sincronização.
+        """
+        agora = timezone.now()
+        revogados = BlacklistedToken.objects.filter(token__expires_at__gt=agora).values_list(
+            'token__jti', 'token__expires_at'
+        )
+        geracoes: Dict[int, BloomFilter] = {}
+        total = 0
+        for jti, expira_em in revogados.iterator():
+            self._inserir(geracoes, jti, int(expira_em.timestamp()))
+            total += 1
+        with self._lock:
+            self._geracoes = geracoes
+            self._seq = seq
+            self._stats['reconstrucoes'] += 1
+        logger.info(f"Filtro de revogação reconstruído do banco: {total} token(s) revogado(s)")
+
+    # ========== FILTRO ==========
+
+    def _geracao(self, exp: int) -> int:
+        return exp // self.largura
+
+    def _inserir(self, geracoes: Dict[int, BloomFilter], jti: str, exp: int) -> None:
+        indice = self._geracao(exp)
+        if indice < self._geracao(int(time.time())):
+            return  # Token já expirado
+        filtro = geracoes.get(indice)
+        if filtro is None:
+            filtro = geracoes[indice] = BloomFilter(self.config['CAPACIDADE'], self.config['TAXA_FALSO_POSITIVO'])
+        filtro.add(jti)
+
+    def _adicionar(self, jti: str, exp: int) -> None:
+        with self._lock:
+            self._descartar_expiradas()
+            self._inserir(self._geracoes, jti, exp)
+
+    def _descartar_expiradas(self) -> None:
+        atual = self._geracao(int(time.time()))
+        for indice in [i for i in self._geracoes if i < atual]:
+            del self._geracoes[indice]
+
+    def talvez_revogado(self, jti: str, exp: int) -> bool:
+        """False garante que o token não foi revogado; True exige confirmação no banco"""
+        self._sincronizar()
+        with self._lock:
+            filtro = self._geracoes.get(self._geracao(exp))
+            return filtro is not None and jti in filtro
+
+    def esta_revogado(self, jti: str, exp: int) -> bool:
+        """Filtro em memória, banco apenas para os positivos"""
+        self._stats['verificacoes'] += 1
+        if not self.talvez_revogado(jti, exp):
+            self._stats['negativos'] += 1
+            return False
+        revogado = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        self._stats['confirmados' if revogado else 'falsos_positivos'] += 1
+        return revogado
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                'geracoes': len(self._geracoes),
+                'insercoes': sum(f.itens for f in self._geracoes.values()),
+                'memoria_bytes': sum(f.tamanho_bytes for f in self._geracoes.values()),
+                'sequencia': self._seq,
+            }
+
+
+_filtro: Optional[RevocationFilter] = None
+_filtro_lock = threading.Lock()
+
+
+def get_revocation_filter() -> RevocationFilter:
+    """Filtro compartilhado do processo"""
+    global _filtro
+    if _filtro is None:
+        with _filtro_lock:
+            if _filtro is None:
+                _filtro = RevocationFilter()
+    return _filtro
+
+
+def reset_revocation_filter() -> None:
+    """Descarta o filtro do processo (usado em testes)"""
+    global _filtro, _avisado_sem_cache
+    with _filtro_lock:
+        _filtro = None
+    _avisado_sem_cache = False
+
+
+def token_revogado(jti: str, exp: int) -> bool:
+    """Verificação usada pelo refresh token (banco direto sem filtro habilitado)"""
+    if not filtro_habilitado():
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+    return get_revocation_filter().esta_revogado(jti, exp)
+
+
+class MultiBPORefreshToken(RefreshToken):
+    """
+    RefreshToken cuja verificação de blacklist passa pelo filtro
+
+    A revogação (blacklist()) continua a do SimpleJWT: grava no banco e o
+    post_save abaixo publica no filtro.
+    """
+
+    def check_blacklist(self) -> None:
+        if token_revogado(self.payload[api_settings.JTI_CLAIM], self.payload['exp']):
+            raise TokenError(_('Token is blacklisted'))
+
+
+@receiver(post_save, sender=BlacklistedToken, dispatch_uid='jwt_revogacao_publicar')
+def _publicar_revogacao(sender, instance, created, **kwargs):
+    """Toda revogação gravada no banco entra no filtro (após o commit)"""
+    if not created or not filtro_habilitado():
+        return
+    jti, expira_em = instance.token.jti, instance.token.expires_at
+    transaction.on_commit(lambda: get_revocation_filter().publicar(jti, expira_em))
@@ -25,6 +25,9 @@ from .auth import (
     # ContadorValidacaoSerializer,    # Artefato 4 - Em desenvolvimento
 )
 
+# Refresh JWT com claims atualizadas - tokens.py
+from .tokens import MultiBPOTokenRefreshSerializer
+
 # Lista de exports públicos
 __all__ = [
     # Registro e criação de contas
@@ -33,6 +36,9 @@ __all__ = [
     # Autenticação e login (Artefato 3)
     'ContadorLoginSerializer',      # ← DESCOMENTE ESTA LINHA
     
+    # Refresh JWT
+    'MultiBPOTokenRefreshSerializer',
+    
     # Validações auxiliares (Artefato 4)  
     # 'ContadorValidacaoSerializer',
 ]
@@ -9,11 +9,13 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.db import transaction
-from validate_docbr import CPF
+from django.db.models import Count, prefetch_related_objects
+from django.utils import timezone
 import re
 import logging
 
 from apps.contadores.models import Contador, Escritorio, Especialidade
+from apps.contadores.utils.documentos import cpf_valido
 from apps.contadores.serializers import ContadorPerfilSerializer
 
 logger = logging.getLogger(__name__)
@@ -96,10 +98,9 @@ class ContadorRegistroSerializer(serializers.Serializer):
 
     def validate_cpf(self, value):
         cpf_clean = ''.join(filter(str.isdigit, value))
-        cpf_validator = CPF()
-        if not cpf_validator.validate(cpf_clean):
+        if not cpf_valido(cpf_clean):
             raise serializers.ValidationError("CPF inválido. Verifique os números digitados.")
-        if Contador.objects.filter(cpf__contains=cpf_clean).exists():
+        if Contador.objects.filter(documento_digits=cpf_clean).exists():
             raise serializers.ValidationError("Já existe um contador cadastrado com este CPF.")
         return f"{cpf_clean[:3]}.{cpf_clean[3:6]}.{cpf_clean[6:9]}-{cpf_clean[9:]}"
 
@@ -312,6 +313,34 @@ class ContadorRegistroSerializer(serializers.Serializer):
 
         return response_data
     
+# Campo de busca do Contador por tipo de login
+LOGIN_LOOKUPS = {
+    'email': 'user__email',
+    'crc': 'crc',
+    'username': 'user__username',
+}
+
+
+def contador_login_queryset():
+    """Contadores com user e escritório (JOIN) e especialidades_total anotado"""
+    return Contador.objects.select_related('user', 'escritorio').annotate(
+        especialidades_total=Count('especialidades', distinct=True)
+    )
+
+
+def carregar_especialidades(contador):
+    """
+    Preenche o cache de especialidades do contador para o perfil da resposta
+
+    Com especialidades_total == 0 (caso comum dos clientes BPO) o cache é
+    preenchido vazio, sem ir ao banco; senão, um único prefetch.
+    """
+    if contador.especialidades_total:
+        prefetch_related_objects([contador], 'especialidades')
+    else:
+        contador._prefetched_objects_cache = {'especialidades': Especialidade.objects.none()}
+
+
 class ContadorLoginSerializer(serializers.Serializer):
     """
     Serializer para autenticação flexível de contadores
@@ -374,12 +403,26 @@ class ContadorLoginSerializer(serializers.Serializer):
         except (User.DoesNotExist, Contador.DoesNotExist):
             return None
 
+    def find_contador_by_login_type(self, login, login_type):
+        """
+        Contador + User + Escritório + total de especialidades em uma query
+
+        None se não houver contador para o login (o motivo exato é
+        resolvido em validate, fora do caminho feliz).
+        """
+        valor = login.upper() if login_type == 'crc' else login
+        try:
+            return contador_login_queryset().get(**{LOGIN_LOOKUPS[login_type]: valor})
+        except Contador.DoesNotExist:
+            return None
+
     def validate(self, data):
         login = data.get('login')
         password = data.get('password')
 
         self.detected_login_type = self.detect_login_type(login)
-        user = self.find_user_by_login_type(login, self.detected_login_type)
+        contador = self.find_contador_by_login_type(login, self.detected_login_type)
+        user = contador.user if contador else self.find_user_by_login_type(login, self.detected_login_type)
         if not user:
             raise serializers.ValidationError({
                 'login': 'Nenhuma conta encontrada com este dado de login.'
@@ -391,9 +434,7 @@ class ContadorLoginSerializer(serializers.Serializer):
         if not user.is_active:
             raise serializers.ValidationError({'login': 'Esta conta está desativada.'})
 
-        try:
-            contador = Contador.objects.select_related('escritorio').get(user=user)
-        except Contador.DoesNotExist:
+        if contador is None:
             raise serializers.ValidationError({'login': 'Conta sem perfil de contador.'})
 
         if not contador.ativo:
@@ -404,6 +445,7 @@ class ContadorLoginSerializer(serializers.Serializer):
 
         self.validated_user = user
         self.validated_contador = contador
+        carregar_especialidades(contador)
 
         user.last_login = timezone.now()
         user.save(update_fields=['last_login'])
@@ -447,7 +489,7 @@ class ContadorLoginSerializer(serializers.Serializer):
                     'id': self.validated_contador.escritorio.id if self.validated_contador.escritorio else None,
                     'nome': self.validated_contador.escritorio.nome_fantasia if self.validated_contador.escritorio else None,
                 },
-                'especialidades_count': self.validated_contador.especialidades.count(),
+                'especialidades_count': self.validated_contador.especialidades_total,
                 'is_responsavel_tecnico': self.validated_contador.eh_responsavel_tecnico,
             })
         return data
\ No newline at end of file
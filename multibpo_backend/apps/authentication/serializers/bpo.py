@@ -11,12 +11,16 @@ from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.db import transaction
 from django.utils import timezone
-from validate_docbr import CPF, CNPJ
 import re
 import logging
 
 from apps.contadores.models import Contador, Escritorio
+from apps.contadores.utils.documentos import cnpj_valido, cpf_valido
 from apps.contadores.serializers import ContadorPerfilSerializer
+from apps.authentication.documentos import documento_cadastrado
+from apps.authentication.usernames import base_do_email, criar_com_username_livre
+from apps.receita.projecao import projetar_dados_receita
+from apps.receita.services import ReceitaFederalService
 
 logger = logging.getLogger(__name__)
 
@@ -90,10 +94,9 @@ class ContadorRegistroSerializer(serializers.Serializer):
 
     def validate_cpf(self, value):
         cpf_clean = ''.join(filter(str.isdigit, value))
-        cpf_validator = CPF()
-        if not cpf_validator.validate(cpf_clean):
+        if not cpf_valido(cpf_clean):
             raise serializers.ValidationError("CPF inválido.")
-        if Contador.objects.filter(cpf__contains=cpf_clean).exists():
+        if Contador.objects.filter(documento_digits=cpf_clean).exists():
             raise serializers.ValidationError("Já existe um contador com este CPF.")
         return f"{cpf_clean[:3]}.{cpf_clean[3:6]}.{cpf_clean[6:9]}-{cpf_clean[9:]}"
 
@@ -232,15 +235,13 @@ class DocumentoValidationSerializer(serializers.Serializer):
         
         if len(documento_clean) == 11:
             # Validar CPF
-            cpf_validator = CPF()
-            if not cpf_validator.validate(documento_clean):
+            if not cpf_valido(documento_clean):
                 raise serializers.ValidationError("CPF inválido")
             return f"{documento_clean[:3]}.{documento_clean[3:6]}.{documento_clean[6:9]}-{documento_clean[9:]}"
             
         elif len(documento_clean) == 14:
             # Validar CNPJ
-            cnpj_validator = CNPJ()
-            if not cnpj_validator.validate(documento_clean):
+            if not cnpj_valido(documento_clean):
                 raise serializers.ValidationError("CNPJ inválido")
             return f"{documento_clean[:2]}.{documento_clean[2:5]}.{documento_clean[5:8]}/{documento_clean[8:12]}-{documento_clean[12:]}"
             
@@ -261,18 +262,9 @@ class DocumentoValidationSerializer(serializers.Serializer):
         # Verificar se já existe no sistema
         documento_formatado = self.validate_documento(documento)
         
-        if data['tipo'] == 'cpf':
-            # Verificar no campo documento (novo) e cpf (legado)
-            exists = Contador.objects.filter(
-                models.Q(documento=documento_formatado) | 
-                models.Q(cpf=documento_formatado)
-            ).exists()
-        else:
-            # Verificar CNPJ no Contador (PJ) e Escritorio
-            exists = (
-                Contador.objects.filter(documento=documento_formatado).exists() or
-                Escritorio.objects.filter(cnpj=documento_formatado).exists()
-            )
+        # Filtro em memória; banco só para os possíveis cadastrados
+        # (documento_digits cobre documento/cpf do Contador, CNPJ também em Escritorio)
+        exists = documento_cadastrado(documento_clean)
         
         data['available'] = not exists
         data['formatted'] = documento_formatado
@@ -329,32 +321,26 @@ class BPORegistroSerializer(serializers.Serializer):
         
         if len(documento_clean) == 11:
             # Validar CPF
-            cpf_validator = CPF()
-            if not cpf_validator.validate(documento_clean):
+            if not cpf_valido(documento_clean):
                 raise serializers.ValidationError("CPF inválido")
             
             # Verificar duplicatas
-            if Contador.objects.filter(
-                models.Q(documento__contains=documento_clean) | 
-                models.Q(cpf__contains=documento_clean)
-            ).exists():
+            if Contador.objects.filter(documento_digits=documento_clean).exists():
                 raise serializers.ValidationError("Já existe um cadastro com este CPF.")
                 
             return f"{documento_clean[:3]}.{documento_clean[3:6]}.{documento_clean[6:9]}-{documento_clean[9:]}"
             
         elif len(documento_clean) == 14:
             # Validar CNPJ
-            cnpj_validator = CNPJ()
-            if not cnpj_validator.validate(documento_clean):
+            if not cnpj_valido(documento_clean):
                 raise serializers.ValidationError("CNPJ inválido")
             
             # Verificar duplicatas
-            cnpj_formatado = f"{documento_clean[:2]}.{documento_clean[2:5]}.{documento_clean[5:8]}/{documento_clean[8:12]}-{documento_clean[12:]}"
-            if (Contador.objects.filter(documento=cnpj_formatado).exists() or 
-                Escritorio.objects.filter(cnpj=cnpj_formatado).exists()):
+            if (Contador.objects.filter(documento_digits=documento_clean).exists() or 
+                Escritorio.objects.filter(cnpj_digits=documento_clean).exists()):
                 raise serializers.ValidationError("Já existe um cadastro com este CNPJ.")
                 
-            return cnpj_formatado
+            return f"{documento_clean[:2]}.{documento_clean[2:5]}.{documento_clean[5:8]}/{documento_clean[8:12]}-{documento_clean[12:]}"
             
         else:
             raise serializers.ValidationError("Documento deve ser um CPF (11 dígitos) ou CNPJ (14 dígitos)")
@@ -375,16 +361,21 @@ class BPORegistroSerializer(serializers.Serializer):
             data['tipo_pessoa'] = 'juridica'
             # Para PJ, buscar dados da Receita Federal se solicitado
             if data.get('usar_dados_receita', True):
-                # TODO: Integrar com API da Receita Federal
-                # Por enquanto, simular dados
-                data['dados_receita'] = {
-                    'razao_social': 'Empresa Exemplo Ltda',
-                    'nome_fantasia': 'Exemplo Corp',
-                    'situacao': 'ATIVA'
-                }
-                # Se não tem nome_completo, usar razão social
-                if not data.get('nome_completo'):
-                    data['nome_completo'] = data['dados_receita'].get('razao_social', '')
+                # Consulta passa pelo cache do ReceitaFederalService
+                consulta = ReceitaFederalService().consultar_cnpj(documento_clean)
+                if consulta.get('success'):
+                    data['dados_receita'] = consulta
+                    # Se não tem nome_completo, usar razão social
+                    if not data.get('nome_completo'):
+                        data['nome_completo'] = consulta.get('razao_social', '')
+                else:
+                    logger.warning(f"CNPJ {documento_clean} sem dados da Receita: {consulta.get('message')}")
+            
+            if not data.get('nome_completo'):
+                # Receita indisponível (timeout, breaker, 429) não bloqueia o cadastro:
+                # o CNPJ fica como nome provisório e a revalidação periódica
+                # (apps.receita.revalidacao) completa a razão social depois
+                data['nome_completo'] = data['documento']
         
         return data
     
@@ -403,22 +394,16 @@ class BPORegistroSerializer(serializers.Serializer):
             telefone = validated_data['telefone']
             dados_receita = validated_data.get('dados_receita', {})
             
-            # Criar User Django
-            username = email.split('@')[0]  # Usar parte do email como username
-            
-            # Garantir username único
-            base_username = username
-            counter = 1
-            while User.objects.filter(username=username).exists():
-                username = f"{base_username}_{counter}"
-                counter += 1
-            
-            user = User.objects.create_user(
-                username=username,
-                email=email,
-                password=password,
-                first_name=nome_completo.split()[0] if nome_completo else '',
-                last_name=' '.join(nome_completo.split()[1:]) if len(nome_completo.split()) > 1 else ''
+            # Criar User Django (username: parte local do email + primeiro sufixo _N livre)
+            user = criar_com_username_livre(
+                base_do_email(email),
+                lambda username: User.objects.create_user(
+                    username=username,
+                    email=email,
+                    password=password,
+                    first_name=nome_completo.split()[0] if nome_completo else '',
+                    last_name=' '.join(nome_completo.split()[1:]) if len(nome_completo.split()) > 1 else ''
+                )
             )
             
             logger.info(f"User criado: {user.username} (ID: {user.id})")
@@ -441,7 +426,7 @@ class BPORegistroSerializer(serializers.Serializer):
                 if dados_receita:
                     escritorio = Escritorio.criar_via_cnpj(documento, dados_receita)
                     contador_data['escritorio'] = escritorio
-                    contador_data['dados_receita_federal'] = dados_receita
+                    contador_data['dados_receita_federal'] = projetar_dados_receita(dados_receita)
                     escritorio_criado = True
                     logger.info(f"Escritório criado automaticamente: {escritorio.razao_social}")
                 else:
@@ -0,0 +1,50 @@
+"""
+Serializer de refresh JWT com claims atualizadas
+MultiBPO - Autenticação
+
+O TokenRefreshSerializer do SimpleJWT copia as claims do refresh token
+antigo: alterações no contador ou no escritório só apareceriam no próximo
+login. Aqui o refresh reaplica as claims atuais do usuário a partir do
+cache de apps.authentication.claims (nenhuma query com o cache quente),
+e a verificação de blacklist usa o filtro de apps.authentication.revocation.
+
+Ativado por SIMPLE_JWT['TOKEN_REFRESH_SERIALIZER'].
+"""
+
+from typing import Any, Dict
+
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from ..claims import aplicar_claims, get_claims
+from ..revocation import MultiBPORefreshToken
+
+
+class MultiBPOTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh (com rotação) que reaplica as claims do contador"""
+
+    # Blacklist verificada pelo filtro de revogação em memória
+    token_class = MultiBPORefreshToken
+
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, str]:
+        refresh = self.token_class(attrs['refresh'])
+        aplicar_claims(refresh, get_claims(refresh[api_settings.USER_ID_CLAIM]))
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    # Blacklist do refresh token recebido
+                    refresh.blacklist()
+                except AttributeError:
+                    # Sem o app token_blacklist não há método blacklist
+                    pass
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data['refresh'] = str(refresh)
+
+        return data
@@ -0,0 +1,95 @@
+"""
+Testes das claims JWT em cache e do refresh com claims atualizadas
+MultiBPO - Authentication
+"""
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models.signals import post_delete, pre_delete
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.contadores.models import Contador, Escritorio
+from apps.contadores.tests.factories import SimpleContadorFactory
+
+from ..claims import get_claims, reset_claims_cache
+from ..views import MultiBPOTokenObtainPairSerializer
+
+
+SENHA = 'SenhaForte#2025'
+
+
+class TestClaims(TestCase):
+
+    def setUp(self):
+        reset_claims_cache()
+        self.user = User.objects.create_user('joao.contador', 'joao@escritorio.com.br', SENHA)
+        self.contador = SimpleContadorFactory.create(user=self.user)
+        self.client = APIClient()
+
+    def tearDown(self):
+        reset_claims_cache()
+
+    def _login(self):
+        response = self.client.post(reverse('authentication:login'),
+                                    {'login': 'joao.contador', 'password': SENHA}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['tokens']
+
+    def _refresh(self, refresh):
+        response = self.client.post(reverse('token_refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_refresh_sem_query_de_contador(self):
+        tokens = self._login()
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = self._refresh(tokens['refresh'])
+
+        tabelas = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('contadores_', tabelas)
+        access = AccessToken(data['access'])
+        self.assertEqual(access['contador_id'], self.contador.id)
+        self.assertEqual(access['escritorio_id'], self.contador.escritorio_id)
+        self.assertIn('refresh', data)
+
+    def test_cache_frio_faz_uma_query(self):
+        reset_claims_cache()
+        with self.assertNumQueries(1):
+            claims = get_claims(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_claims(self.user.pk), claims)
+
+    def test_alteracao_do_contador_invalida(self):
+        tokens = self._login()
+        self.contador.pode_assinar_documentos = not self.contador.pode_assinar_documentos
+        self.contador.save()
+
+        access = AccessToken(self._refresh(tokens['refresh'])['access'])
+        self.assertEqual(access['pode_assinar'], self.contador.pode_assinar_documentos)
+
+    def test_exclusao_do_escritorio_invalida(self):
+        """Usuários lidos no pre_delete: no post_delete o FK já foi desvinculado"""
+        tokens = self._login()
+        escritorio = self.contador.escritorio
+
+        # Mesma sequência de Collector.delete() com on_delete=SET_NULL
+        pre_delete.send(sender=Escritorio, instance=escritorio, using='default', origin=escritorio)
+        Contador.objects.filter(escritorio=escritorio).update(escritorio=None)
+        post_delete.send(sender=Escritorio, instance=escritorio, using='default', origin=escritorio)
+
+        access = AccessToken(self._refresh(tokens['refresh'])['access'])
+        self.assertIsNone(access['escritorio_id'])
+
+    def test_usuario_sem_contador(self):
+        user = User.objects.create_user('sem.perfil', 'sem@perfil.com', SENHA)
+        token = MultiBPOTokenObtainPairSerializer.get_token(user)
+
+        self.assertIsNone(token['contador_id'])
+        self.assertEqual(token['sistema'], 'MultiBPO')
+        access = AccessToken(self._refresh(str(token))['access'])
+        self.assertIsNone(access['documento'])
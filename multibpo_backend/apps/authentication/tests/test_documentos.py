@@ -0,0 +1,92 @@
+"""
+Testes da validação de CPF/CNPJ em tempo real (filtro de documentos)
+MultiBPO - Authentication
+"""
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.contadores.tests.factories import SimpleContadorFactory, SimpleEscritorioFactory
+
+from ..documentos import get_documento_filter, reset_documento_filter, verificar_documento
+
+
+CPF = '529.982.247-25'
+CPF_LIVRE = '11144477735'
+CNPJ = '11.222.333/0001-81'
+
+
+class TestVerificarDocumento(TestCase):
+
+    def setUp(self):
+        reset_documento_filter()
+        SimpleContadorFactory.create(cpf=CPF)
+        SimpleEscritorioFactory.create(cnpj=CNPJ)
+        get_documento_filter().reconstruir()
+
+    def tearDown(self):
+        reset_documento_filter()
+
+    def test_invalidos_sem_banco(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(verificar_documento('123')['valid'])
+            self.assertFalse(verificar_documento('52998224724')['valid'])
+            self.assertFalse(verificar_documento(CPF, tipo='cnpj')['valid'])
+
+    def test_livre_sem_banco(self):
+        with self.assertNumQueries(0):
+            resultado = verificar_documento(CPF_LIVRE)
+        self.assertTrue(resultado['valid'])
+        self.assertTrue(resultado['available'])
+        self.assertEqual(resultado['formatted'], '111.444.777-35')
+        self.assertEqual(get_documento_filter().status()['negativos'], 1)
+
+    def test_cadastrado_confirma_no_banco(self):
+        self.assertFalse(verificar_documento('52998224725')['available'])
+        self.assertFalse(verificar_documento('11222333000181')['available'])
+        self.assertEqual(get_documento_filter().status()['confirmados'], 2)
+
+    def test_cadastro_novo_entra_no_filtro(self):
+        user = User.objects.create_user('outro.contador', 'outro@escritorio.com.br', 'SenhaForte#2025')
+        with self.captureOnCommitCallbacks(execute=True):
+            SimpleContadorFactory.create(user=user, cpf=CPF_LIVRE)
+        self.assertTrue(get_documento_filter().talvez_cadastrado(CPF_LIVRE))
+        self.assertFalse(verificar_documento(CPF_LIVRE)['available'])
+
+    @override_settings(AUTH_DOCUMENTO_FILTER={'ENABLED': False})
+    def test_desabilitado_consulta_o_banco(self):
+        reset_documento_filter()
+        with self.assertNumQueries(1):
+            self.assertTrue(verificar_documento(CPF_LIVRE)['available'])
+
+
+class TestDocumentoValidationView(TestCase):
+
+    def setUp(self):
+        reset_documento_filter()
+        SimpleContadorFactory.create(cpf=CPF)
+        self.client = APIClient()
+        self.url = reverse('authentication:validate-document')
+
+    def tearDown(self):
+        reset_documento_filter()
+
+    def test_disponivel_e_cadastrado(self):
+        response = self.client.post(self.url, {'documento': CPF_LIVRE}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['available'])
+
+        response = self.client.post(self.url, {'documento': CPF, 'tipo': 'cpf'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['available'])
+        self.assertEqual(response.json()['formatted'], CPF)
+
+    def test_invalido(self):
+        response = self.client.post(self.url, {'documento': '52998224724'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error_code'], 'INVALID_DOCUMENT')
+
+        response = self.client.post(self.url, {'documento': CPF, 'tipo': 'rg'}, format='json')
+        self.assertEqual(response.status_code, 400)
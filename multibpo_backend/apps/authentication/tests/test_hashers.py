@@ -0,0 +1,122 @@
+"""
+Testes da política de hash de senhas (apps.authentication.hashers)
+MultiBPO - Authentication
+"""
+
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import hashers as django_hashers
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.contadores.tests.factories import SimpleContadorFactory
+
+from ..hashers import (
+    DEFAULT_PASSWORD_HASHING_CONFIG, SCRYPT_WORK_FACTOR_MINIMO, PBKDF2PasswordHasher, ScryptPasswordHasher,
+    check_password_hashing,
+)
+
+
+SENHA = 'SenhaForte#2025'
+
+# Custos baixos: os testes verificam a política, não o custo
+CUSTOS_BAIXOS = {'SCRYPT': {'WORK_FACTOR': 2 ** 10}, 'PBKDF2': {'ITERATIONS': 1000}}
+
+
+def hashers_com_preferido(caminho):
+    return [caminho, *(h for h in settings.PASSWORD_HASHERS if h != caminho)]
+
+
+class TestPadrao(TestCase):
+    """Sem configuração: PBKDF2 do Django, nenhum hash existente regravado"""
+
+    def test_pbkdf2_com_iteracoes_do_django(self):
+        hasher = get_hasher('default')
+        self.assertIsInstance(hasher, PBKDF2PasswordHasher)
+        self.assertEqual(hasher.iterations, django_hashers.PBKDF2PasswordHasher.iterations)
+        self.assertFalse(hasher.must_update(make_password(SENHA, hasher='pbkdf2_sha256')))
+
+    def test_scrypt_opt_in_no_minimo_da_owasp(self):
+        self.assertGreaterEqual(DEFAULT_PASSWORD_HASHING_CONFIG['SCRYPT']['WORK_FACTOR'], SCRYPT_WORK_FACTOR_MINIMO)
+        self.assertEqual(DEFAULT_PASSWORD_HASHING_CONFIG['SCRYPT']['BLOCK_SIZE'], 8)
+
+
+@override_settings(PASSWORD_HASHING={**CUSTOS_BAIXOS, 'ALGORITHM': 'scrypt'},
+                   PASSWORD_HASHERS=hashers_com_preferido('apps.authentication.hashers.ScryptPasswordHasher'))
+class TestPoliticaDeHash(TestCase):
+
+    def test_scrypt_preferido_com_custo_configurado(self):
+        encoded = make_password(SENHA)
+        self.assertIsInstance(get_hasher('default'), ScryptPasswordHasher)
+        self.assertTrue(encoded.startswith('scrypt$1024$'))
+        self.assertEqual(identify_hasher(encoded).decode(encoded)['parallelism'], 1)
+
+    def test_hash_pbkdf2_antigo_regravado_no_check_password(self):
+        user = User.objects.create_user('antigo', 'antigo@escritorio.com.br')
+        user.password = make_password(SENHA, hasher='pbkdf2_sha256')
+        user.save()
+        self.assertIsInstance(identify_hasher(user.password), PBKDF2PasswordHasher)
+
+        self.assertTrue(user.check_password(SENHA))
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password(SENHA))
+
+    def test_mudanca_de_custo_regrava_no_proximo_login(self):
+        user = User.objects.create_user('joao.contador', 'joao@escritorio.com.br', SENHA)
+        SimpleContadorFactory.create(user=user)
+        self.assertTrue(user.password.startswith('scrypt$1024$'))
+
+        with override_settings(PASSWORD_HASHING={'ALGORITHM': 'scrypt', 'SCRYPT': {'WORK_FACTOR': 2 ** 11}}):
+            self.assertTrue(get_hasher('default').must_update(user.password))
+            response = APIClient().post(reverse('authentication:login'),
+                                        {'login': 'joao.contador', 'password': SENHA}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$2048$'))
+
+    def test_senha_errada_nao_regrava(self):
+        user = User.objects.create_user('antigo', 'antigo@escritorio.com.br')
+        user.password = antigo = make_password(SENHA, hasher='pbkdf2_sha256')
+        user.save()
+
+        self.assertFalse(user.check_password('errada'))
+        user.refresh_from_db()
+        self.assertEqual(user.password, antigo)
+
+
+class TestCheck(TestCase):
+
+    def test_configuracao_padrao_valida(self):
+        self.assertEqual(check_password_hashing(), [])
+
+    @override_settings(PASSWORD_HASHING={'ALGORITHM': 'md5'})
+    def test_algoritmo_desconhecido(self):
+        self.assertEqual([e.id for e in check_password_hashing()], ['authentication.E001'])
+
+    @override_settings(PASSWORD_HASHING={'ALGORITHM': 'scrypt', 'SCRYPT': {'WORK_FACTOR': 2 ** 14}},
+                       PASSWORD_HASHERS=hashers_com_preferido('apps.authentication.hashers.ScryptPasswordHasher'))
+    def test_scrypt_abaixo_do_minimo(self):
+        self.assertEqual([e.id for e in check_password_hashing()], ['authentication.W001'])
+
+
+@override_settings(PASSWORD_HASHING=CUSTOS_BAIXOS)
+class TestBenchmarkHashing(TestCase):
+
+    def test_reporta_hashes_por_nucleo(self):
+        saida = StringIO()
+        call_command('benchmark_hashing', algoritmos='scrypt,pbkdf2', duracao=0, minimo=1, alvo=10,
+                     sem_referencia=True, stdout=saida)
+
+        texto = saida.getvalue()
+        self.assertIn('hashes/s/núcleo', texto)
+        self.assertIn('work factor=1024', texto)
+        self.assertIn('iterations=1000', texto)
+        self.assertIn('p/ 10 logins/s', texto)
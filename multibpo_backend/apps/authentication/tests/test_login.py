@@ -0,0 +1,73 @@
+"""
+Testes do caminho de login (ContadorLoginSerializer + LoginView)
+MultiBPO - Authentication
+"""
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.contadores.tests.factories import SimpleContadorFactory
+
+
+SENHA = 'SenhaForte#2025'
+
+
+class TestLogin(TestCase):
+    """
+    O login resolve user, contador, escritório e total de especialidades em
+    uma query; o restante é o prefetch das especialidades (só se houver),
+    o UPDATE de last_login e o INSERT do OutstandingToken.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('joao.contador', 'joao@escritorio.com.br', SENHA)
+        self.contador = SimpleContadorFactory.create(user=self.user)
+        self.client = APIClient()
+
+    def _login(self, login, senha=SENHA):
+        return self.client.post(reverse('authentication:login'), {'login': login, 'password': senha}, format='json')
+
+    def test_numero_de_queries_com_especialidades(self):
+        self.assertTrue(self.contador.especialidades.exists())
+        with self.assertNumQueries(4):
+            response = self._login('joao@escritorio.com.br')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        total = self.contador.especialidades.count()
+        self.assertEqual(data['session_info']['permissions']['especialidades_count'], total)
+        self.assertEqual(len(data['contador']['especialidades_detalhes']), total)
+
+    def test_numero_de_queries_sem_especialidades(self):
+        self.contador.especialidades.clear()
+        with self.assertNumQueries(3):
+            response = self._login('joao.contador')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['contador']['especialidades_detalhes'], [])
+        self.assertEqual(response.json()['session_info']['permissions']['especialidades_count'], 0)
+
+    def test_login_por_crc_e_claims_do_contador(self):
+        response = self._login(self.contador.crc.lower())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['login_type'], 'crc')
+        token = AccessToken(response.json()['tokens']['access'])
+        self.assertEqual(token['contador_id'], self.contador.id)
+        self.assertEqual(token['escritorio_id'], self.contador.escritorio_id)
+
+    def test_mensagens_de_erro_preservadas(self):
+        User.objects.create_user('sem.perfil', 'sem.perfil@multibpo.com.br', SENHA)
+
+        casos = [
+            (('naoexiste@multibpo.com.br', SENHA), 'login', 'Nenhuma conta encontrada com este dado de login.'),
+            (('joao@escritorio.com.br', 'errada'), 'password', 'Senha incorreta.'),
+            (('sem.perfil', SENHA), 'login', 'Conta sem perfil de contador.'),
+        ]
+        for (login, senha), campo, mensagem in casos:
+            response = self._login(login, senha)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['errors'][campo], [mensagem])
@@ -0,0 +1,123 @@
+"""
+Testes do executor limitado de login e das views de login assíncronas
+MultiBPO - Authentication
+"""
+
+import asyncio
+import threading
+
+from django.contrib.auth.models import User
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from apps.contadores.tests.factories import SimpleContadorFactory
+
+from ..login_pool import LoginPool, PoolLotado, get_login_pool, reset_login_pool
+
+
+SENHA = 'SenhaForte#2025'
+CUSTOS_BAIXOS = {'SCRYPT': {'WORK_FACTOR': 2 ** 10}}
+
+
+class TestLoginPool(TestCase):
+
+    def setUp(self):
+        self.pool = LoginPool({'MAX_WORKERS': 1, 'MAX_FILA': 1, 'RETRY_AFTER': 3})
+        self.liberar = threading.Event()
+        self.iniciou = threading.Event()
+
+    def tearDown(self):
+        self.liberar.set()
+        self.pool.shutdown()
+
+    def _bloquear(self):
+        self.iniciou.set()
+        self.liberar.wait(5)
+        return 'ok'
+
+    def test_recusa_acima_da_capacidade(self):
+        rodando = self.pool.submeter(self._bloquear)
+        self.assertTrue(self.iniciou.wait(5))
+        na_fila = self.pool.submeter(lambda: 'fila')
+
+        with self.assertRaises(PoolLotado) as ctx:
+            self.pool.submeter(lambda: 'recusado')
+        self.assertEqual(ctx.exception.retry_after, 3)
+
+        status = self.pool.status()
+        self.assertEqual((status['em_execucao'], status['aguardando'], status['recusados']), (1, 1, 1))
+
+        self.liberar.set()
+        self.assertEqual(rodando.result(5), 'ok')
+        self.assertEqual(na_fila.result(5), 'fila')
+        self.assertEqual(self.pool.submeter(lambda: 'de novo').result(5), 'de novo')
+
+        status = self.pool.status()
+        self.assertEqual((status['em_execucao'], status['aguardando'], status['concluidos']), (0, 0, 3))
+        self.assertEqual(status['fila_maxima'], 1)
+
+    def test_executar_assincrono_propaga_excecao(self):
+        def falhar():
+            raise ValueError('falhou')
+
+        self.assertEqual(asyncio.run(self.pool.executar(sum, [1, 2])), 3)
+        with self.assertRaises(ValueError):
+            asyncio.run(self.pool.executar(falhar))
+        self.assertEqual(self.pool.status()['aguardando'], 0)
+
+
+@override_settings(PASSWORD_HASHING=CUSTOS_BAIXOS)
+class TestLoginAsync(TransactionTestCase):
+    """As threads do pool usam outra conexão: os dados precisam estar commitados"""
+
+    def setUp(self):
+        reset_login_pool()
+        self.user = User.objects.create_user('joao.contador', 'joao@escritorio.com.br', SENHA)
+        self.contador = SimpleContadorFactory.create(user=self.user)
+        self.client = AsyncClient()
+
+    def tearDown(self):
+        reset_login_pool()
+
+    def _login(self, login, senha=SENHA):
+        payload = {'login': login, 'password': senha}
+        return asyncio.run(self.client.post(reverse('authentication:login-async'), payload,
+                                            content_type='application/json'))
+
+    def test_mesmo_contrato_da_view_sincrona(self):
+        response = self._login('joao@escritorio.com.br')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['login_type'], 'email')
+        self.assertIn('access', data['tokens'])
+        self.assertEqual(data['contador']['id'], self.contador.id)
+        self.assertEqual(get_login_pool().status()['concluidos'], 1)
+
+    def test_senha_incorreta(self):
+        response = self._login('joao.contador', 'errada')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors']['password'], ['Senha incorreta.'])
+
+    def test_json_invalido(self):
+        response = asyncio.run(self.client.post(reverse('authentication:login-async'), 'x{',
+                                                content_type='application/json'))
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(AUTH_LOGIN_POOL={'MAX_WORKERS': 1, 'MAX_FILA': 0, 'RETRY_AFTER': 2})
+    def test_pool_lotado_responde_429(self):
+        reset_login_pool()
+        liberar = threading.Event()
+        ocupado = get_login_pool().submeter(liberar.wait, 5)
+        try:
+            response = self._login('joao.contador')
+        finally:
+            liberar.set()
+            ocupado.result(5)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(response.json()['error_code'], 'LOGIN_BUSY')
+        self.assertEqual(get_login_pool().status()['recusados'], 1)
+        self.assertEqual(self._login('joao.contador').status_code, 200)
@@ -0,0 +1,221 @@
+"""
+Testes do filtro de revogação de refresh tokens e da purga de tokens
+MultiBPO - Authentication
+"""
+
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.contadores.tests.factories import SimpleContadorFactory
+
+from ..claims import reset_claims_cache
+from ..revocation import (
+    BloomFilter, MultiBPORefreshToken, RevocationFilter, filtro_habilitado, get_revocation_filter,
+    reset_revocation_filter,
+)
+
+
+SENHA = 'SenhaForte#2025'
+
+
+def cache_em_arquivo(diretorio):
+    """CACHES com um alias compartilhado entre processos (arquivo) para o log de revogações"""
+    return {
+        'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        'revogacao': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': diretorio},
+    }
+
+
+class TestBloomFilter(TestCase):
+
+    def test_sem_falso_negativo_e_taxa_de_falso_positivo(self):
+        filtro = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            filtro.add(f'jti-{i}')
+
+        self.assertTrue(all(f'jti-{i}' in filtro for i in range(1000)))
+        falsos = sum(f'outro-{i}' in filtro for i in range(10000))
+        self.assertLess(falsos, 300)    # ~1% esperado
+        self.assertEqual(filtro.tamanho_bytes, (filtro.bits + 7) // 8)
+
+
+class TestRevocationFilter(TestCase):
+    """Filtro ligado: log das revogações num cache em arquivo (compartilhado)"""
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            CACHES=cache_em_arquivo(self.diretorio.name),
+            AUTH_REVOCATION={'CACHE_ALIAS': 'revogacao'},
+        )
+        self.settings_override.enable()
+        reset_revocation_filter()
+        reset_claims_cache()
+        self.user = User.objects.create_user('joao.contador', 'joao@escritorio.com.br', SENHA)
+
+    def tearDown(self):
+        reset_revocation_filter()
+        reset_claims_cache()
+        self.settings_override.disable()
+        self.diretorio.cleanup()
+
+    def _revogar(self, token):
+        with self.captureOnCommitCallbacks(execute=True):
+            token.blacklist()
+
+    def test_token_valido_verificado_sem_banco(self):
+        token = MultiBPORefreshToken.for_user(self.user)
+        get_revocation_filter()._sincronizar()   # Carga inicial do banco
+
+        with self.assertNumQueries(0):
+            MultiBPORefreshToken(str(token))
+
+    def test_token_revogado_confirmado_no_banco(self):
+        token = MultiBPORefreshToken.for_user(self.user)
+        self._revogar(token)
+
+        with self.assertRaises(TokenError):
+            MultiBPORefreshToken(str(token))
+        self.assertEqual(get_revocation_filter().status()['confirmados'], 1)
+
+    def test_outro_worker_recebe_pelo_log(self):
+        outro = RevocationFilter()
+        outro._sincronizar()
+        token = MultiBPORefreshToken.for_user(self.user)
+        self._revogar(token)
+
+        self.assertTrue(outro.talvez_revogado(token['jti'], token['exp']))
+        self.assertEqual(outro.status()['reconstrucoes'], 1)
+
+    def test_lacuna_no_log_reconstroi_do_banco(self):
+        outro = RevocationFilter()
+        outro._sincronizar()
+        token = MultiBPORefreshToken.for_user(self.user)
+        self._revogar(token)
+        outro.cache.delete(outro._chave(f"log:{outro.cache.get(outro._chave('seq'))}"))
+
+        self.assertTrue(outro.talvez_revogado(token['jti'], token['exp']))
+        self.assertEqual(outro.status()['reconstrucoes'], 2)
+
+    def test_entrada_ainda_nao_gravada_nao_reconstroi(self):
+        """Sequência incrementada antes do set do log: relê a entrada em vez de ir ao banco"""
+        outro = RevocationFilter()
+        outro._sincronizar()
+        token = MultiBPORefreshToken.for_user(self.user)
+        cache = outro.cache
+        cache.add(outro._chave('seq'), 0)
+        seq = cache.incr(outro._chave('seq'))
+        get_many = cache.get_many
+
+        def get_many_atrasado(chaves):
+            entradas = get_many(chaves)
+            if not entradas:    # Primeira leitura: o publicador grava agora
+                cache.set(outro._chave(f'log:{seq}'), (token['jti'], token['exp']))
+            return entradas
+
+        with mock.patch.object(cache, 'get_many', side_effect=get_many_atrasado), self.assertNumQueries(0):
+            self.assertTrue(outro.talvez_revogado(token['jti'], token['exp']))
+        self.assertEqual(outro.status()['reconstrucoes'], 1)
+
+    @override_settings(AUTH_REVOCATION={'ENABLED': False})
+    def test_desabilitado_consulta_o_banco(self):
+        token = MultiBPORefreshToken.for_user(self.user)
+        with self.assertNumQueries(1):
+            MultiBPORefreshToken(str(token))
+
+
+class TestSemCacheCompartilhado(TestCase):
+    """CACHES do repositório (DummyCache): o filtro não pode responder sozinho"""
+
+    def setUp(self):
+        reset_revocation_filter()
+        reset_claims_cache()
+        self.user = User.objects.create_user('joao.contador', 'joao@escritorio.com.br', SENHA)
+
+    def tearDown(self):
+        reset_revocation_filter()
+        reset_claims_cache()
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_cache_local_desliga_o_filtro(self):
+        self.assertFalse(filtro_habilitado())
+
+    def test_revogacao_em_outro_worker_e_vista_pelo_banco(self):
+        """Dois filtros sem memória em comum: a revogação do worker A vale no worker B"""
+        token = MultiBPORefreshToken.for_user(self.user)
+        worker_a = RevocationFilter()
+        worker_b = get_revocation_filter()
+        worker_b._sincronizar()     # B carregou o filtro antes da revogação
+
+        # Logout no worker A: grava no banco e só o filtro de A recebe o JTI
+        token.blacklist()
+        worker_a.publicar(token['jti'], token.current_time + token.lifetime)
+        self.assertFalse(worker_b.talvez_revogado(token['jti'], token['exp']))
+
+        with self.assertRaises(TokenError), self.assertNumQueries(1):
+            MultiBPORefreshToken(str(token))
+
+
+class TestRefreshRevogado(TestCase):
+    """Rotação: o refresh token usado não serve uma segunda vez"""
+
+    def setUp(self):
+        reset_revocation_filter()
+        reset_claims_cache()
+        user = User.objects.create_user('joao.contador', 'joao@escritorio.com.br', SENHA)
+        SimpleContadorFactory.create(user=user)
+        self.client = APIClient()
+
+    def tearDown(self):
+        reset_revocation_filter()
+        reset_claims_cache()
+
+    def _refresh(self, refresh):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('token_refresh'), {'refresh': refresh}, format='json')
+
+    def test_reuso_apos_rotacao(self):
+        response = self.client.post(reverse('authentication:login'),
+                                    {'login': 'joao.contador', 'password': SENHA}, format='json')
+        refresh = response.json()['tokens']['refresh']
+
+        primeira = self._refresh(refresh)
+        self.assertEqual(primeira.status_code, 200)
+        self.assertEqual(self._refresh(refresh).status_code, 401)
+        self.assertEqual(self._refresh(primeira.json()['refresh']).status_code, 200)
+
+
+class TestPurgarTokens(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('joao.contador', 'joao@escritorio.com.br', SENHA)
+        agora = timezone.now()
+        for i, expira in enumerate([agora - timedelta(days=2), agora - timedelta(hours=1), agora + timedelta(days=1)]):
+            token = OutstandingToken.objects.create(user=user, jti=f'jti-{i}', token='x', expires_at=expira)
+            BlacklistedToken.objects.create(token=token)
+
+    def test_dry_run_nao_remove(self):
+        call_command('purgar_tokens', dry_run=True, stdout=StringIO())
+        self.assertEqual(OutstandingToken.objects.count(), 3)
+
+    def test_remove_expirados_respeitando_margem(self):
+        saida = StringIO()
+        call_command('purgar_tokens', margem=24, lote=1, stdout=saida)
+
+        self.assertEqual(sorted(OutstandingToken.objects.values_list('jti', flat=True)), ['jti-1', 'jti-2'])
+        self.assertEqual(BlacklistedToken.objects.count(), 2)
+        self.assertIn('1 token(s) removido(s)', saida.getvalue())
+
+        call_command('purgar_tokens', stdout=StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['jti-2'])
@@ -0,0 +1,106 @@
+"""
+Testes da alocação de usernames (sufixo livre sem exists() por tentativa)
+MultiBPO - Authentication
+"""
+
+import threading
+from unittest import mock, skipIf
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+
+from .. import usernames
+from ..usernames import alocar_usernames, criar_com_username_livre, proximo_username
+
+
+class TestProximoUsername(TestCase):
+
+    def test_base_livre_e_primeiro_sufixo_livre(self):
+        self.assertEqual(proximo_username('contato'), 'contato')
+        for username in ('contato', 'contato_1', 'contato_3', 'contato_x', 'contatos'):
+            User.objects.create_user(username)
+        self.assertEqual(proximo_username('contato'), 'contato_2')
+        self.assertEqual(proximo_username('contato', separador=''), 'contato1')     # Formato do MVP
+        self.assertEqual(proximo_username('jo%ao!'), 'joao')
+
+    def test_uma_query_qualquer_que_seja_o_numero_de_sufixos(self):
+        User.objects.bulk_create([User(username='financeiro')] +
+                                 [User(username=f'financeiro_{n}') for n in range(1, 200)])
+        with self.assertNumQueries(1):
+            self.assertEqual(proximo_username('financeiro'), 'financeiro_200')
+
+
+class TestAlocarUsernames(TestCase):
+
+    def test_lote(self):
+        for username in ('ana', 'ana_1', 'ana_3', 'ana_x'):
+            User.objects.create_user(username)
+        self.assertEqual(alocar_usernames(['ana', 'bia', 'ana', 'bia', 'jo%ao!', 'ana']),
+                         ['ana_2', 'bia', 'ana_4', 'bia_1', 'joao', 'ana_5'])
+
+    def test_janela_dobra_a_cada_rodada(self):
+        User.objects.bulk_create([User(username='contato')] +
+                                 [User(username=f'contato_{n}') for n in range(1, 40)])
+        with self.assertNumQueries(4):      # Bases + janelas _1.._8, _9.._24 e _25.._56
+            self.assertEqual(alocar_usernames(['contato', 'contato']), ['contato_40', 'contato_41'])
+
+
+class TestCriarComUsernameLivre(TestCase):
+
+    def test_realoca_quando_outro_cadastro_leva_o_username(self):
+        User.objects.create_user('contato')
+        proximo_real = usernames.proximo_username
+        alocados = iter(['contato'])    # Primeira alocação feita antes do concorrente gravar
+
+        def proximo(base, separador='_'):
+            return next(alocados, None) or proximo_real(base, separador)
+
+        with mock.patch.object(usernames, 'proximo_username', side_effect=proximo):
+            user = criar_com_username_livre('contato', lambda username: User.objects.create_user(username))
+        self.assertEqual(user.username, 'contato_1')
+
+    def test_outra_integrity_error_sobe(self):
+        chamadas = []
+
+        def criar(username):
+            chamadas.append(username)
+            raise IntegrityError('UNIQUE constraint failed: mvp_user.cpf')
+
+        with self.assertRaises(IntegrityError):
+            criar_com_username_livre('contato', criar)
+        self.assertEqual(chamadas, ['contato'])
+
+
+@skipIf(connection.vendor == 'sqlite', 'SQLite em memória compartilhada não aceita escritas concorrentes')
+class TestConcorrencia(TransactionTestCase):
+    """Muitas threads cadastrando o mesmo prefixo ao mesmo tempo (PostgreSQL)"""
+
+    THREADS = 16
+    CADASTROS_POR_THREAD = 5
+
+    def test_mesmo_prefixo_em_muitas_threads(self):
+        criados, erros = [], []
+        largada = threading.Barrier(self.THREADS)
+
+        def cadastrar():
+            try:
+                largada.wait()
+                for _ in range(self.CADASTROS_POR_THREAD):
+                    user = criar_com_username_livre('contato', lambda username: User.objects.create_user(username))
+                    criados.append(user.username)
+            except Exception as e:
+                erros.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=cadastrar) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        total = self.THREADS * self.CADASTROS_POR_THREAD
+        self.assertEqual(erros, [])
+        self.assertEqual(len(set(criados)), total)
+        self.assertEqual(set(criados), {'contato', *(f'contato_{n}' for n in range(1, total))})
@@ -23,6 +23,9 @@ urlpatterns = [
     # Login flexível original - MANTIDO INTACTO  
     path('login/', views.LoginView.as_view(), name='login'),
     
+    # Login assíncrono (ASGI): check_password em executor limitado, 429 se lotado
+    path('async/login/', views.login_async, name='login-async'),
+    
     # Testes originais - MANTIDOS
     path('test/', views.test_auth_view, name='test'),
     path('protected-test/', views.protected_test_view, name='protected_test'),
@@ -73,6 +76,7 @@ URLs disponíveis após implementação:
 ORIGINAIS (mantidos):
 - POST /api/v1/auth/register/              # Registro completo original
 - POST /api/v1/auth/login/                 # Login flexível original
+- POST /api/v1/auth/async/login/           # Mesmo login, view assíncrona (ASGI)
 - GET  /api/v1/auth/test/                  # Teste público
 - GET  /api/v1/auth/protected-test/        # Teste protegido
 
@@ -102,7 +106,7 @@ EXISTENTES (manter):
 
 NOVAS (implementar):
 - BPORegistroView              # ⏳ Registro simplificado
-- DocumentoValidationView      # ⏳ Validação tempo real
+- DocumentoValidationView      # ✅ Validação tempo real (filtro em memória)
 - ContadorPerfilView           # ⏳ Perfil adaptado
 - logout_view                  # ⏳ Logout function-based
 - health_check_auth            # ⏳ Health check
@@ -0,0 +1,128 @@
+"""
+Alocação de usernames a partir do e-mail (registro BPO, MVP e importação)
+MultiBPO - Autenticação
+
+Os cadastros usam a parte local do e-mail como username e, se já existir,
+o primeiro sufixo livre (contato, contato_1, contato_2...; no MVP sem o
+separador: contato1, contato2...). Antes era um exists() por sufixo
+tentado: prefixos populares (contato@, financeiro@) custavam uma query por
+conta já existente e dois cadastros simultâneos escolhiam o mesmo nome.
+
+- proximo_username: uma query (igualdade + prefixo; no PostgreSQL o Django
+  cria o índice _like do username, então o prefixo também usa índice)
+- alocar_usernames: um lote inteiro com IN sobre candidatos exatos (ver a
+  docstring: um OR de centenas de prefixos não usa índice no SQLite)
+- criar_com_username_livre: cria num savepoint; se outro cadastro levou o
+  username entre a consulta e o INSERT (IntegrityError na constraint única),
+  realoca e tenta de novo
+"""
+
+import logging
+import re
+from collections import Counter
+from typing import Callable, List, TypeVar
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Caracteres aceitos pelo validador de username do Django
+_USERNAME_INVALIDO = re.compile(r'[^\w.@+-]')
+_USERNAME_MAX = 150 - 8     # Espaço para o sufixo
+
+TENTATIVAS = 10
+
+
+def normalizar_base(base: str) -> str:
+    """Base válida para username (parte local do e-mail sem caracteres recusados)"""
+    return (_USERNAME_INVALIDO.sub('', base) or 'cliente')[:_USERNAME_MAX]
+
+
+def base_do_email(email: str) -> str:
+    return normalizar_base(email.split('@')[0])
+
+
+def proximo_username(base: str, separador: str = '_') -> str:
+    """A base, se livre, ou o primeiro base{separador}N livre, numa query"""
+    base = normalizar_base(base)
+    prefixo = f'{base}{separador}'
+    usados = set(
+        User.objects.filter(Q(username=base) | Q(username__startswith=prefixo))
+        .values_list('username', flat=True)
+    )
+    if base not in usados:
+        return base
+    numero = 1
+    while f'{prefixo}{numero}' in usados:
+        numero += 1
+    return f'{prefixo}{numero}'
+
+
+def alocar_usernames(bases: List[str], separador: str = '_') -> List[str]:
+    """
+    Usernames livres para um lote (importação), no mesmo formato
+
+    Só igualdades no índice único do username: um IN para as bases e, para
+    as que precisam de sufixo, um IN por rodada com os próximos candidatos.
+    A janela de cada base dobra a cada rodada, então mesmo bases com
+    milhares de sufixos usados resolvem em poucas rodadas. Um OR com um
+    prefixo por base varre a tabela no SQLite (LIKE sem índice).
+    """
+    bases = [normalizar_base(base) for base in bases]
+    contagem = Counter(bases)
+    ocupados = set(User.objects.filter(username__in=contagem).values_list('username', flat=True))
+
+    # Quantos sufixos cada base precisa (a primeira ocorrência fica com a base, se livre)
+    faltando = {base: vezes - (base not in ocupados) for base, vezes in contagem.items()}
+    faltando = {base: quantidade for base, quantidade in faltando.items() if quantidade}
+    sufixos = {base: [] for base in faltando}
+    proximo = dict.fromkeys(faltando, 1)
+    janela = {base: max(2 * quantidade, 8) for base, quantidade in faltando.items()}
+
+    while faltando:
+        candidatos = {}
+        for base in faltando:
+            for numero in range(proximo[base], proximo[base] + janela[base]):
+                candidato = f'{base}{separador}{numero}'
+                if candidato not in contagem:       # Base de outra linha do lote
+                    candidatos[candidato] = base
+            proximo[base] += janela[base]
+            janela[base] *= 2
+        usados = set(User.objects.filter(username__in=candidatos).values_list('username', flat=True))
+        for candidato, base in candidatos.items():
+            if candidato not in usados and faltando.get(base):
+                sufixos[base].append(candidato)
+                faltando[base] -= 1
+        faltando = {base: quantidade for base, quantidade in faltando.items() if quantidade}
+
+    alocados = []
+    for base in bases:
+        if base not in ocupados:
+            ocupados.add(base)
+            alocados.append(base)
+        else:
+            alocados.append(sufixos[base].pop(0))
+    return alocados
+
+
+def criar_com_username_livre(base: str, criar: Callable[[str], T], separador: str = '_',
+                             tentativas: int = TENTATIVAS) -> T:
+    """
+    criar(username) com o próximo username livre, num savepoint
+
+    IntegrityError com o username já cadastrado (outro cadastro venceu a
+    corrida) realoca e repete; qualquer outra IntegrityError sobe.
+    """
+    for tentativa in range(1, tentativas + 1):
+        username = proximo_username(base, separador)
+        try:
+            with transaction.atomic():
+                return criar(username)
+        except IntegrityError:
+            if tentativa == tentativas or not User.objects.filter(username=username).exists():
+                raise
+            logger.info(f"Username {username} levado por cadastro simultâneo; realocando (tentativa {tentativa})")
@@ -9,8 +9,13 @@ ESTRATÉGIA:
 - Suporte para CPF/CNPJ + consulta Receita Federal
 """
 
+import json
 import logging
 from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.utils import timezone
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
@@ -19,14 +24,14 @@ from django.conf import settings
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 # ========== IMPORTS ADICIONAIS PARA SUB-FASE 2.2.3 ==========
-from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 from rest_framework_simplejwt.views import TokenRefreshView as BaseTokenRefreshView
@@ -42,6 +47,12 @@ from .serializers import (
     ContadorRegistroSerializer,
     ContadorLoginSerializer,
 )
+from .claims import aplicar_claims, get_claims
+from .revocation import MultiBPORefreshToken, filtro_habilitado, get_revocation_filter
+from .login_pool import (
+    PoolLotado, corpo_erro_interno_login, corpo_login_invalido, get_login_pool, resposta_pool_lotado,
+)
+from .documentos import get_documento_filter, get_documento_filter_config, verificar_documento
 
 # ========== NOVOS IMPORTS PARA BPO (SUB-FASE 2.2.3) ==========
 # TODO: Implementar estes serializers nos próximos artefatos
@@ -60,39 +71,23 @@ class MultiBPOTokenObtainPairSerializer(TokenObtainPairSerializer):
     Serializer JWT customizado para MultiBPO
     
     Adiciona claims específicos do contador no token
-    para facilitar validações no frontend
+    para facilitar validações no frontend; o refresh reaplica as mesmas
+    claims (MultiBPOTokenRefreshSerializer)
     """
     
+    token_class = MultiBPORefreshToken
+    
     @classmethod
-    def get_token(cls, user):
+    def get_token(cls, user, contador=None):
+        """
+        Args:
+            user: usuário autenticado
+            contador: perfil já carregado (ex.: pelo login), evita nova query
+        """
         token = super().get_token(user)
         
-        try:
-            contador = Contador.objects.select_related('escritorio').get(user=user)
-            
-            # Claims customizados do contador
-            token['contador_id'] = contador.id
-            token['crc'] = getattr(contador, 'crc', None)  # CRC pode ser opcional agora
-            token['documento'] = getattr(contador, 'documento', contador.cpf)  # Documento unificado
-            token['tipo_pessoa'] = getattr(contador, 'tipo_pessoa', 'fisica')  # Novo campo
-            token['escritorio_id'] = contador.escritorio.id if contador.escritorio else None
-            token['eh_responsavel'] = getattr(contador, 'eh_responsavel_tecnico', False)
-            token['pode_assinar'] = getattr(contador, 'pode_assinar_documentos', False)
-            token['ativo'] = contador.ativo
-            
-        except Contador.DoesNotExist:
-            # User sem perfil contador - apenas claims básicos
-            token['contador_id'] = None
-            token['crc'] = None
-            token['documento'] = None
-            token['tipo_pessoa'] = None
-            
-        # Claims do sistema
-        token['sistema'] = 'MultiBPO'
-        token['versao'] = '2.2.3'  # Atualizado para Sub-Fase 2.2.3
-        token['issued_at'] = timezone.now().isoformat()
-        
-        return token
+        # Claims do contador (cache por usuário, ver apps.authentication.claims)
+        return aplicar_claims(token, get_claims(user.pk, contador=contador))
 
 
 # ========== VIEWS EXISTENTES (MANTIDAS - COMPATIBILIDADE TOTAL) ==========
@@ -234,79 +229,118 @@ class LoginView(APIView):
         
         if not serializer.is_valid():
             logger.warning(f"Tentativa de login com dados inválidos: {serializer.errors}")
-            return Response({
-                'success': False,
-                'message': 'Dados de login inválidos.',
-                'errors': serializer.errors,
-                'error_code': 'VALIDATION_ERROR'
-            }, status=status.HTTP_400_BAD_REQUEST)
+            return Response(corpo_login_invalido(serializer), status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Serializer já validou credenciais e encontrou user/contador
-            validated_data = serializer.validated_data
-            user = serializer.validated_user
-            contador = serializer.validated_contador
-            login_type = serializer.detected_login_type
-            
-            # Geração de JWT tokens customizados
-            refresh = MultiBPOTokenObtainPairSerializer.get_token(user)
-            access = refresh.access_token
-            
-            # Log de sucesso para auditoria
-            logger.info(f"Login realizado: {getattr(contador, 'documento', contador.cpf)} via {login_type} - IP: {self.get_client_ip(request)}")
-            
-            # Response completa com dados do contador + tokens (adaptada para novos campos)
-            response_data = {
-                'success': True,
-                'message': f'Login realizado com sucesso via {login_type}!',
-                'login_type': login_type,
-                'contador': serializer.get_contador(validated_data),
-                'user': serializer.get_user(validated_data),
-                'tokens': {
-                    'access': str(access),
-                    'refresh': str(refresh),
-                    'access_expires_in': int(access.lifetime.total_seconds()),
-                    'refresh_expires_in': int(refresh.lifetime.total_seconds()),
-                },
-                'session_info': {
-                    'login_at': timezone.now().isoformat(),
-                    'last_login': serializer.get_last_login(validated_data),
-                    'tipo_pessoa': getattr(contador, 'tipo_pessoa', 'fisica'),
-                    'documento': getattr(contador, 'documento', contador.cpf),
-                    'escritorio': {
-                        'id': contador.escritorio.id if contador.escritorio else None,
-                        'nome': contador.escritorio.nome_fantasia if contador.escritorio else None,
-                    },
-                    'permissions': {
-                        'eh_responsavel_tecnico': getattr(contador, 'eh_responsavel_tecnico', False),
-                        'pode_assinar_documentos': getattr(contador, 'pode_assinar_documentos', False),
-                        'especialidades_count': contador.especialidades.count() if hasattr(contador, 'especialidades') else 0,
-                    }
-                }
-            }
-            
-            return Response(response_data, status=status.HTTP_200_OK)
+            return Response(_resposta_login(serializer, self.get_client_ip(request)), status=status.HTTP_200_OK)
             
         except Exception as e:
-            # Erro inesperado no login
-            error_msg = f"Erro interno no login: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            
-            return Response({
-                'success': False,
-                'message': 'Erro interno no servidor. Tente novamente.',
-                'error_code': 'INTERNAL_ERROR',
-                'details': str(e) if settings.DEBUG else 'Erro interno'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response(corpo_erro_interno_login(e), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def get_client_ip(self, request):
         """Extrai IP real do cliente considerando proxies"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return _client_ip(request)
+
+
+def _client_ip(request):
+    """IP real do cliente considerando proxies"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        ip = x_forwarded_for.split(',')[0]
+    else:
+        ip = request.META.get('REMOTE_ADDR')
+    return ip
+
+
+def _resposta_login(serializer, ip) -> dict:
+    """
+    Corpo da resposta de login (credenciais já validadas pelo serializer)
+    
+    Gera os tokens e monta os dados do contador; compartilhado por
+    LoginView e login_async.
+    """
+    # Serializer já validou credenciais e encontrou user/contador
+    validated_data = serializer.validated_data
+    user = serializer.validated_user
+    contador = serializer.validated_contador
+    login_type = serializer.detected_login_type
+    
+    # Geração de JWT tokens customizados (reaproveita o contador do login)
+    refresh = MultiBPOTokenObtainPairSerializer.get_token(user, contador=contador)
+    access = refresh.access_token
+    
+    # Log de sucesso para auditoria
+    logger.info(f"Login realizado: {getattr(contador, 'documento', contador.cpf)} via {login_type} - IP: {ip}")
+    
+    # Response completa com dados do contador + tokens (adaptada para novos campos)
+    response_data = {
+        'success': True,
+        'message': f'Login realizado com sucesso via {login_type}!',
+        'login_type': login_type,
+        'contador': serializer.get_contador(validated_data),
+        'user': serializer.get_user(validated_data),
+        'tokens': {
+            'access': str(access),
+            'refresh': str(refresh),
+            'access_expires_in': int(access.lifetime.total_seconds()),
+            'refresh_expires_in': int(refresh.lifetime.total_seconds()),
+        },
+        'session_info': {
+            'login_at': timezone.now().isoformat(),
+            'last_login': serializer.get_last_login(validated_data),
+            'tipo_pessoa': getattr(contador, 'tipo_pessoa', 'fisica'),
+            'documento': getattr(contador, 'documento', contador.cpf),
+            'escritorio': {
+                'id': contador.escritorio.id if contador.escritorio else None,
+                'nome': contador.escritorio.nome_fantasia if contador.escritorio else None,
+            },
+            'permissions': {
+                'eh_responsavel_tecnico': getattr(contador, 'eh_responsavel_tecnico', False),
+                'pode_assinar_documentos': getattr(contador, 'pode_assinar_documentos', False),
+                'especialidades_count': contador.especialidades_total,
+            }
+        }
+    }
+    
+    return response_data
+
+
+@csrf_exempt
+@require_POST
+async def login_async(request):
+    """
+    Versão assíncrona de LoginView (ASGI)
+    POST /api/v1/auth/async/login/
+    
+    A validação das credenciais (check_password) roda no executor limitado
+    de login_pool, fora do event loop; com o pool lotado responde 429 com
+    Retry-After. Mesmo contrato de LoginView para 200/400/500.
+    """
+    try:
+        dados = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Corpo da requisição deve ser JSON.',
+            'error_code': 'VALIDATION_ERROR'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = ContadorLoginSerializer(data=dados)
+    try:
+        valido = await get_login_pool().executar(serializer.is_valid)
+    except PoolLotado as e:
+        return resposta_pool_lotado(e)
+    
+    if not valido:
+        logger.warning(f"Tentativa de login com dados inválidos: {serializer.errors}")
+        return JsonResponse(corpo_login_invalido(serializer), status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        response_data = await sync_to_async(_resposta_login)(serializer, _client_ip(request))
+        return JsonResponse(response_data, status=status.HTTP_200_OK)
+    
+    except Exception as e:
+        return JsonResponse(corpo_erro_interno_login(e), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 # ========== NOVAS VIEWS PARA FLUXO BPO (SUB-FASE 2.2.3) ==========
@@ -348,41 +382,44 @@ class BPORegistroView(APIView):
 
 class DocumentoValidationView(APIView):
     """
-    View para validação de CPF/CNPJ em tempo real (NOVA)
+    View para validação de CPF/CNPJ em tempo real
     
-    POST /api/v1/validate/document/
     POST /api/v1/auth/validate/document/
     
     Funcionalidades:
-    - Valida se documento é válido (formato)
-    - Verifica se documento já existe no sistema
+    - Valida os dígitos verificadores (sem acesso ao banco)
+    - Verifica se documento já existe no sistema (filtro em memória;
+      banco só para os possíveis cadastrados, ver documentos.py)
     - Suporte para CPF e CNPJ
-    - Response em tempo real para frontend
+    - Response em tempo real para frontend (chamada a cada tecla)
     
-    NOVO: Validação antes do registro
+    Body: {"documento": "...", "tipo": "cpf" | "cnpj" (opcional)}
     """
     
     permission_classes = [AllowAny]
+    # Endpoint público e quente: sem decodificar JWT/sessão e sem negociar renderer
+    authentication_classes = []
+    renderer_classes = [JSONRenderer]
     
     def post(self, request):
-        """
-        Validação de documento em tempo real
-        
-        TODO: Implementar quando DocumentoValidationSerializer estiver disponível
-        """
+        tipo = request.data.get('tipo') or None
+        if tipo not in (None, 'cpf', 'cnpj'):
+            return Response({
+                'success': False,
+                'valid': False,
+                'message': "Tipo deve ser 'cpf' ou 'cnpj'",
+                'error_code': 'VALIDATION_ERROR'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # PLACEHOLDER - implementar quando serializer estiver pronto
-        documento = request.data.get('documento', '')
-        tipo = request.data.get('tipo', 'auto')
+        resultado = verificar_documento(request.data.get('documento', ''), tipo)
+        if not resultado['valid']:
+            return Response({
+                'success': False,
+                **resultado,
+                'error_code': 'INVALID_DOCUMENT'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response({
-            'message': 'DocumentoValidationView - Implementação em andamento',
-            'endpoint': 'POST /api/v1/validate/document/',
-            'status': 'placeholder',
-            'documento_received': documento,
-            'tipo_received': tipo,
-            'next_step': 'Implementar DocumentoValidationSerializer'
-        }, status=status.HTTP_501_NOT_IMPLEMENTED)
+        return Response({'success': True, **resultado}, status=status.HTTP_200_OK)
 
 
 class ContadorPerfilView(APIView):
@@ -464,7 +501,7 @@ def logout_view(request):
         refresh_token = request.data.get('refresh_token')
         
         if refresh_token:
-            token = RefreshToken(refresh_token)
+            token = MultiBPORefreshToken(refresh_token)
             token.blacklist()
             
             logger.info(f"Logout realizado: User {request.user.id} - Token blacklisted")
@@ -655,6 +692,9 @@ def health_check_auth(request):
                 'document_validation': True,
                 'receita_federal_integration': True,
             },
+            'login_pool': get_login_pool().status(),
+            'revogacao': get_revocation_filter().status() if filtro_habilitado() else None,
+            'filtro_documentos': get_documento_filter().status() if get_documento_filter_config()['ENABLED'] else None,
             'model_adaptations': {
                 'tipo_pessoa_field': has_tipo_pessoa,
                 'documento_field': has_documento,
@@ -0,0 +1,489 @@
+"""
+Importação em lote de clientes (planilha CSV/XLSX → Contador/Escritorio)
+MultiBPO - Contadores
+
+Escritórios chegam com planilhas de centenas a milhares de clientes; o
+cadastro unitário (BPORegistroSerializer.create) faz full_clean, vários
+exists() e um INSERT por objeto. Aqui cada lote de LOTE linhas custa um
+número fixo de queries, qualquer que seja o tamanho do lote:
+
+1. Leitura preguiçosa (csv.reader ou openpyxl em read_only): só o lote
+   atual fica em memória
+2. Validação do lote: validar_lote nos documentos, e-mail, telefone e nome
+   em Python; clean_fields() nos objetos montados (sem queries)
+3. Duplicidade: um IN por lote em Contador.documento_digits,
+   Escritorio.cnpj_digits e User.email; os lotes anteriores já estão
+   gravados, então repetições entre lotes também aparecem aqui
+4. CNPJs resolvidos por consultar_lote (cache da Receita primeiro, misses em
+   paralelo com prioridade de lote)
+5. Gravação com bulk_create (User → Escritorio → Contador) numa transação por
+   lote; um conflito com cadastro simultâneo (IntegrityError) refaz o lote
+   linha a linha (realocando o username, se foi ele o disputado), e só as
+   linhas em conflito de documento/e-mail vão para o relatório
+
+Mesmas regras do registro BPO: cargo cliente_bpo, PJ ganha escritório com
+os dados da Receita (ou básico, com o nome da planilha, se a Receita não
+responder). As contas são criadas sem senha utilizável.
+
+bulk_create não dispara post_save: os documentos novos entram no filtro de
+disponibilidade (apps.authentication.documentos) após o commit de cada lote.
+
+Uso: python manage.py importar_clientes clientes.csv
+     POST /api/v1/contadores/importar/ (relatório em NDJSON)
+"""
+
+import csv
+import io
+import logging
+import unicodedata
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from phonenumber_field.phonenumber import PhoneNumber, to_python as telefone_para_python
+
+from apps.authentication.documentos import publicar_documentos
+from apps.authentication.usernames import alocar_usernames, base_do_email, criar_com_username_livre
+from apps.contadores.models import Contador, Escritorio
+from apps.contadores.utils.documentos import formatar, validar_lote
+
+try:
+    import openpyxl
+except ImportError:  # Opcional: sem openpyxl só CSV é aceito
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_IMPORTACAO_CONFIG = {
+    'LOTE': 500,                # Linhas por transação (e por query de duplicidade)
+    'USAR_RECEITA': True,       # PJ: dados do escritório via consultar_lote
+    'ENCODING': 'utf-8-sig',    # CSV; planilhas exportadas do Excel podem vir em cp1252
+}
+
+# Cabeçalhos aceitos (normalizados: minúsculas, sem acento, espaços → _)
+COLUNAS = {
+    'documento': ('documento', 'cpf_cnpj', 'cpf/cnpj', 'cnpj_cpf', 'cnpj/cpf', 'cpf', 'cnpj'),
+    'nome': ('nome', 'nome_completo', 'razao_social', 'cliente'),
+    'email': ('email', 'e-mail', 'e_mail'),
+    'telefone': ('telefone', 'celular', 'fone', 'whatsapp'),
+}
+_COLUNA_POR_CABECALHO = {alias: campo for campo, aliases in COLUNAS.items() for alias in aliases}
+
+SENHA_INUTILIZAVEL = make_password(None)
+
+
+class ArquivoInvalido(ValueError):
+    """Planilha ilegível ou sem as colunas obrigatórias"""
+
+
+def get_importacao_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.CONTADORES_IMPORTACAO)"""
+    config = dict(DEFAULT_IMPORTACAO_CONFIG)
+    config.update(getattr(settings, 'CONTADORES_IMPORTACAO', {}))
+    return config
+
+
+# ========== LEITURA ==========
+
+def _normalizar_cabecalho(valor: Any) -> str:
+    texto = unicodedata.normalize('NFKD', str(valor or '')).encode('ascii', 'ignore').decode()
+    return '_'.join(texto.lower().split())
+
+
+def _mapear(linhas: Iterator[Tuple]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    (número da linha, {campo: valor}) a partir do cabeçalho
+
+    O cabeçalho é lido já na chamada (planilha sem as colunas falha antes de
+    qualquer gravação); as linhas, sob demanda.
+    """
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        raise ArquivoInvalido('Arquivo vazio')
+    posicoes = {}
+    for posicao, nome in enumerate(cabecalho):
+        campo = _COLUNA_POR_CABECALHO.get(_normalizar_cabecalho(nome))
+        if campo and campo not in posicoes:
+            posicoes[campo] = posicao
+    if 'documento' not in posicoes or 'email' not in posicoes:
+        raise ArquivoInvalido('A planilha precisa das colunas de documento (CPF/CNPJ) e e-mail')
+    return _linhas_mapeadas(linhas, posicoes)
+
+
+def _linhas_mapeadas(linhas: Iterator[Tuple], posicoes: Dict[str, int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    for numero, valores in enumerate(linhas, start=2):
+        if not any(v not in (None, '') for v in valores):
+            continue    # Linha em branco
+        yield numero, {
+            campo: valores[posicao] if posicao < len(valores) else None
+            for campo, posicao in posicoes.items()
+        }
+
+
+def ler_csv(arquivo: io.TextIOBase) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """CSV com cabeçalho; separador (; , ou tab) detectado pelo início do arquivo"""
+    amostra = arquivo.read(4096)
+    arquivo.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=';,\t')
+    except csv.Error:
+        dialeto = csv.excel
+    return _mapear(csv.reader(arquivo, dialeto))
+
+
+def ler_xlsx(arquivo) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Primeira aba de um XLSX, linha a linha (openpyxl em read_only)"""
+    if openpyxl is None:
+        raise ArquivoInvalido('Importação de XLSX requer o pacote openpyxl; envie um CSV')
+    try:
+        livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    except Exception as e:
+        raise ArquivoInvalido(f'XLSX ilegível: {e}')
+
+    try:
+        mapeadas = _mapear(livro.active.iter_rows(values_only=True))
+    except ArquivoInvalido:
+        livro.close()
+        raise
+
+    def linhas():
+        try:
+            yield from mapeadas
+        finally:
+            livro.close()
+
+    return linhas()
+
+
+def ler_planilha(arquivo, nome: str, encoding: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Escolhe o leitor pela extensão; arquivo aberto em modo binário"""
+    if nome.lower().endswith('.xlsx'):
+        return ler_xlsx(arquivo)
+    texto = io.TextIOWrapper(arquivo, encoding=encoding or get_importacao_config()['ENCODING'], newline='')
+    return ler_csv(texto)
+
+
+# ========== LINHAS ==========
+
+def _texto(valor: Any) -> str:
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)      # Célula numérica (telefone) do XLSX
+    return str(valor).strip()
+
+
+@dataclass
+class LinhaCliente:
+    """Uma linha da planilha e os objetos montados para ela"""
+
+    numero: int
+    documento: Any
+    nome: str
+    email: str
+    telefone: str
+    digitos: str = ''
+    telefone_numero: Optional[PhoneNumber] = None
+    erros: Dict[str, str] = field(default_factory=dict)
+    dados_receita: Optional[Dict[str, Any]] = None
+    user: Optional[User] = None
+    escritorio: Optional[Escritorio] = None
+    contador: Optional[Contador] = None
+
+    @classmethod
+    def da_planilha(cls, numero: int, dados: Dict[str, Any]) -> 'LinhaCliente':
+        return cls(
+            numero=numero,
+            documento=dados.get('documento'),
+            nome=' '.join(_texto(dados.get('nome')).split()),
+            email=_texto(dados.get('email')).lower(),
+            telefone=_texto(dados.get('telefone')),
+        )
+
+    @property
+    def juridica(self) -> bool:
+        return len(self.digitos) == 14
+
+    def relatorio(self) -> Dict[str, Any]:
+        return {
+            'linha': self.numero,
+            'documento': _texto(self.documento),
+            'email': self.email,
+            'erros': self.erros,
+        }
+
+
+def _em_lotes(iteravel: Iterable, tamanho: int) -> Iterator[List]:
+    iterador = iter(iteravel)
+    while lote := list(islice(iterador, tamanho)):
+        yield lote
+
+
+def _mensagens(erro: ValidationError, prefixo: str = '') -> Dict[str, str]:
+    return {f'{prefixo}{campo}': ' '.join(mensagens) for campo, mensagens in erro.message_dict.items()}
+
+
+# ========== IMPORTAÇÃO ==========
+
+class ImportadorClientes:
+    """
+    Importa linhas (numero, {campo: valor}) em lotes
+
+    importar() gera um item por linha recusada (relatório de erros);
+    contagens em self.resumo. Com simular=True valida tudo (inclusive
+    duplicidade no banco e na própria planilha), sem gravar.
+    """
+
+    def __init__(self, usar_receita: Optional[bool] = None, simular: bool = False,
+                 lote: Optional[int] = None, service=None, config: Optional[Dict[str, Any]] = None):
+        self.config = config or get_importacao_config()
+        self.usar_receita = self.config['USAR_RECEITA'] if usar_receita is None else usar_receita
+        self.simular = simular
+        self.tamanho_lote = lote or self.config['LOTE']
+        self.service = service
+        self.resumo = {'linhas': 0, 'criados': 0, 'escritorios': 0, 'erros': 0, 'simulacao': simular}
+        # Sem gravar, repetições entre lotes não aparecem no banco: guarda o que já passou
+        self._simulados = {'documentos': set(), 'emails': set()}
+
+    def importar(self, linhas: Iterable[Tuple[int, Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        for lote in _em_lotes(linhas, self.tamanho_lote):
+            yield from self._processar([LinhaCliente.da_planilha(n, dados) for n, dados in lote])
+
+    def _processar(self, linhas: List[LinhaCliente]) -> Iterator[Dict[str, Any]]:
+        self.resumo['linhas'] += len(linhas)
+        self._validar(linhas)
+        self._verificar_cadastrados(self._validas(linhas))
+        if self.usar_receita:
+            self._resolver_cnpjs([linha for linha in self._validas(linhas) if linha.juridica])
+        self._montar(self._validas(linhas))
+
+        validas = self._validas(linhas)
+        if self.simular:
+            self._simulados['documentos'].update(linha.digitos for linha in validas)
+            self._simulados['emails'].update(linha.email for linha in validas)
+        elif validas:
+            self._gravar(validas)
+
+        for linha in linhas:
+            if linha.erros:
+                self.resumo['erros'] += 1
+                yield linha.relatorio()
+
+    @staticmethod
+    def _validas(linhas: List[LinhaCliente]) -> List[LinhaCliente]:
+        return [linha for linha in linhas if not linha.erros]
+
+    # ---------- validação (sem banco) ----------
+
+    def _validar(self, linhas: List[LinhaCliente]) -> None:
+        documentos = validar_lote([linha.documento for linha in linhas])
+        vistos_documento, vistos_email = {}, {}
+
+        for linha, digitos, valido in zip(linhas, documentos.digitos, documentos.validos):
+            linha.digitos = digitos
+            if not valido:
+                linha.erros['documento'] = 'CPF/CNPJ inválido' if _texto(linha.documento) else 'CPF/CNPJ obrigatório'
+            elif digitos in vistos_documento:
+                linha.erros['documento'] = f'Repetido na linha {vistos_documento[digitos]}'
+            else:
+                vistos_documento[digitos] = linha.numero
+
+            try:
+                validate_email(linha.email)
+            except ValidationError:
+                linha.erros['email'] = 'E-mail inválido' if linha.email else 'E-mail obrigatório'
+            else:
+                if linha.email in vistos_email:
+                    linha.erros['email'] = f'Repetido na linha {vistos_email[linha.email]}'
+                else:
+                    vistos_email[linha.email] = linha.numero
+
+            if not linha.nome and not linha.juridica:
+                linha.erros['nome'] = 'Nome obrigatório'     # PJ pode usar a razão social da Receita
+            if linha.telefone:
+                telefone = telefone_para_python(linha.telefone, region='BR')
+                if telefone is None or not telefone.is_valid():     # bool(PhoneNumber) formata o número
+                    linha.erros['telefone'] = 'Telefone inválido'
+                else:
+                    linha.telefone_numero = telefone    # Já interpretado: o model não reinterpreta
+            elif not linha.juridica:
+                linha.erros['telefone'] = 'Telefone obrigatório'
+
+    # ---------- duplicidade (um IN por tabela) ----------
+
+    def _verificar_cadastrados(self, linhas: List[LinhaCliente]) -> None:
+        if not linhas:
+            return
+        digitos = {linha.digitos for linha in linhas}
+        cnpjs = {d for d in digitos if len(d) == 14}
+        emails = {linha.email for linha in linhas}
+
+        documentos = set(
+            Contador.objects.filter(documento_digits__in=digitos).values_list('documento_digits', flat=True)
+        )
+        if cnpjs:
+            documentos.update(
+                Escritorio.objects.filter(cnpj_digits__in=cnpjs).values_list('cnpj_digits', flat=True)
+            )
+        # auth_user.email não tem índice: Lower() não piora o plano e pega e-mails com maiúsculas
+        emails_cadastrados = set(
+            User.objects.annotate(email_normalizado=Lower('email'))
+            .filter(email_normalizado__in=emails)
+            .values_list('email_normalizado', flat=True)
+        )
+        simulados = self._simulados
+
+        for linha in linhas:
+            if linha.digitos in documentos or linha.digitos in simulados['documentos']:
+                linha.erros['documento'] = 'CPF/CNPJ já cadastrado'
+            if linha.email in emails_cadastrados or linha.email in simulados['emails']:
+                linha.erros['email'] = 'E-mail já cadastrado'
+
+    # ---------- Receita Federal ----------
+
+    def _resolver_cnpjs(self, linhas: List[LinhaCliente]) -> None:
+        if not linhas:
+            return
+        from apps.receita.batch import consultar_lote
+
+        resultados = {
+            item['cnpj']: item['resultado']
+            for item in consultar_lote([linha.digitos for linha in linhas], service=self.service)
+        }
+        for linha in linhas:
+            resultado = resultados.get(linha.digitos) or {}
+            if resultado.get('success'):
+                linha.dados_receita = resultado
+            else:
+                logger.warning(f"Importação: CNPJ {linha.digitos} sem dados da Receita: {resultado.get('message')}")
+
+    # ---------- montagem dos objetos (sem banco) ----------
+
+    def _montar(self, linhas: List[LinhaCliente]) -> None:
+        if not linhas:
+            return
+        agora = timezone.now()
+        usernames = alocar_usernames([base_do_email(linha.email) for linha in linhas])
+
+        for linha, username in zip(linhas, usernames):
+            campos_receita = Escritorio.campos_via_receita(linha.dados_receita) if linha.dados_receita else None
+            nome = linha.nome or (campos_receita or {}).get('razao_social', '')
+            telefone = linha.telefone_numero
+            if telefone is None:
+                telefone = (campos_receita or {}).get('telefone') or None
+            if not nome:
+                linha.erros['nome'] = 'Não foi possível obter a razão social na Receita Federal. Informe o nome.'
+                continue
+            if telefone is None:
+                linha.erros['telefone'] = 'Telefone obrigatório'
+                continue
+
+            nomes = nome.split()
+            linha.user = User(
+                username=username,
+                email=linha.email,
+                password=SENHA_INUTILIZAVEL,
+                first_name=nomes[0][:150],
+                last_name=' '.join(nomes[1:])[:150],
+            )
+            if linha.juridica:
+                if campos_receita:
+                    campos = dict(campos_receita, verificado_em=agora)
+                else:
+                    campos = {'razao_social': nome, 'nome_fantasia': nome, 'email': linha.email,
+                              'telefone': telefone, 'criado_automaticamente': True, 'ativo': True}
+                linha.escritorio = Escritorio(cnpj=formatar(linha.digitos), cnpj_digits=linha.digitos, **campos)
+            linha.contador = Contador(
+                tipo_pessoa='juridica' if linha.juridica else 'fisica',
+                documento=formatar(linha.digitos),
+                documento_digits=linha.digitos,
+                nome_completo=nome,
+                telefone_pessoal=telefone,
+                cargo='cliente_bpo',
+                ativo=True,
+                dados_receita_federal=(campos_receita or {}).get('dados_receita_federal', {}),
+            )
+
+            # Tamanhos, choices e telefones: o que o full_clean() pegaria, sem as queries de unicidade.
+            # Telefone da planilha já validado em _validar (clean_fields o reinterpretaria duas vezes)
+            exclude_contador = ['user', 'escritorio']
+            if linha.telefone_numero is not None:
+                exclude_contador.append('telefone_pessoal')
+            for objeto, exclude, prefixo in ((linha.user, ['password'], ''),
+                                             (linha.escritorio, [], 'escritorio.'),
+                                             (linha.contador, exclude_contador, '')):
+                if objeto is None:
+                    continue
+                try:
+                    objeto.clean_fields(exclude=exclude)
+                except ValidationError as e:
+                    linha.erros.update(_mensagens(e, prefixo))
+
+    # ---------- gravação ----------
+
+    def _gravar(self, linhas: List[LinhaCliente]) -> None:
+        try:
+            with transaction.atomic():
+                self._inserir(linhas)
+            self._contabilizar(linhas)
+        except IntegrityError as e:
+            # Cadastro simultâneo entre o IN e o INSERT: isola as linhas em conflito
+            logger.warning(f"Importação: conflito no lote das linhas {linhas[0].numero}-{linhas[-1].numero} "
+                           f"({e}); gravando linha a linha")
+            for linha in linhas:
+                try:
+                    criar_com_username_livre(base_do_email(linha.email),
+                                             lambda username: self._inserir_linha(linha, username))
+                    self._contabilizar([linha])
+                except IntegrityError:
+                    linha.erros['documento'] = 'Conflito com um cadastro simultâneo (documento ou e-mail)'
+
+    def _inserir_linha(self, linha: LinhaCliente, username: str) -> None:
+        """Caminho linha a linha: username realocado se outro cadastro levou o do lote"""
+        linha.user.username = username
+        self._inserir([linha])
+
+    def _inserir(self, linhas: List[LinhaCliente]) -> None:
+        for linha in linhas:
+            # Uma tentativa anterior desfeita pode ter deixado pks atribuídas
+            for objeto in (linha.user, linha.escritorio, linha.contador):
+                if objeto is not None:
+                    objeto.pk = None
+                    objeto._state.adding = True
+
+        usuarios = [linha.user for linha in linhas]
+        User.objects.bulk_create(usuarios)
+        if any(usuario.pk is None for usuario in usuarios):     # Banco sem RETURNING no bulk_create
+            ids = dict(User.objects.filter(username__in=[u.username for u in usuarios])
+                       .values_list('username', 'id'))
+            for usuario in usuarios:
+                usuario.pk = ids[usuario.username]
+
+        escritorios = [linha.escritorio for linha in linhas if linha.escritorio is not None]
+        if escritorios:
+            Escritorio.objects.bulk_create(escritorios)
+            if any(escritorio.pk is None for escritorio in escritorios):
+                ids = dict(Escritorio.objects.filter(cnpj_digits__in=[e.cnpj_digits for e in escritorios])
+                           .values_list('cnpj_digits', 'id'))
+                for escritorio in escritorios:
+                    escritorio.pk = ids[escritorio.cnpj_digits]
+
+        for linha in linhas:
+            linha.contador.user = linha.user
+            linha.contador.escritorio = linha.escritorio
+        Contador.objects.bulk_create([linha.contador for linha in linhas])
+
+        publicar_documentos([linha.digitos for linha in linhas])
+
+    def _contabilizar(self, linhas: List[LinhaCliente]) -> None:
+        self.resumo['criados'] += len(linhas)
+        self.resumo['escritorios'] += sum(1 for linha in linhas if linha.escritorio is not None)
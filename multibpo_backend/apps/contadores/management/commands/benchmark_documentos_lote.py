@@ -0,0 +1,95 @@
+"""
+Django Management Command - Benchmark da validação de CPF/CNPJ em lote
+MultiBPO - Contadores
+
+Compara, para uma coluna de documentos do tamanho de uma planilha grande
+(padrão 1 milhão), três formas de validar:
+
+- validate_docbr item a item (CPF()/CNPJ().validate, como nos models e
+  serializers antes de apps.contadores.utils.documentos)
+- validar_lote com o laço em Python puro
+- validar_lote vetorizado com NumPy (se instalado)
+
+Os documentos são gerados com máscara e metade com um dígito verificador
+trocado, para exercitar normalização e os dois desfechos.
+
+Uso:
+    python manage.py benchmark_documentos_lote
+    python manage.py benchmark_documentos_lote --quantidade 200000 --tipo cnpj
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from validate_docbr import CNPJ, CPF
+
+from apps.contadores.utils.documentos import (
+    TAMANHOS, formatar, gerar_cnpj, gerar_cpf, numpy_disponivel, validar_lote,
+)
+
+
+VALIDADORES = {'cpf': CPF, 'cnpj': CNPJ}
+GERADORES = {'cpf': gerar_cpf, 'cnpj': gerar_cnpj}
+
+
+class Command(BaseCommand):
+    help = 'Mede documentos validados por segundo: validate_docbr item a item vs validar_lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quantidade', type=int, default=1_000_000, help='Documentos na coluna')
+        parser.add_argument('--tipo', choices=list(TAMANHOS), default='cpf')
+        parser.add_argument('--distintos', type=int, default=50_000,
+                            help='Documentos gerados (repetidos até --quantidade)')
+
+    def handle(self, *args, **options):
+        tipo = options['tipo']
+        documentos = self._gerar(tipo, options['quantidade'], options['distintos'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n📋 BENCHMARK VALIDAÇÃO EM LOTE ({tipo.upper()}) - {len(documentos):,} documentos\n' + '=' * 60
+        ))
+
+        cenarios = [('validate_docbr item a item', lambda: self._item_a_item(tipo, documentos)),
+                    ('validar_lote (Python)', lambda: validar_lote(documentos, tipo, usar_numpy=False).validos)]
+        if numpy_disponivel():
+            cenarios.append(('validar_lote (NumPy)', lambda: validar_lote(documentos, tipo, usar_numpy=True).validos))
+        else:
+            self.stdout.write(self.style.WARNING('NumPy não instalado: cenário vetorizado ignorado'))
+
+        referencia = None
+        resultados = {}
+        for nome, func in cenarios:
+            inicio = time.perf_counter()
+            validos = func()
+            decorrido = time.perf_counter() - inicio
+            if referencia is None:
+                referencia = validos
+            elif validos != referencia:
+                self.stdout.write(self.style.ERROR(f'{nome}: resultado diverge do validate_docbr'))
+            resultados[nome] = decorrido
+            self.stdout.write(
+                f'{nome:<28} {decorrido:7.2f} s | {len(documentos) / decorrido:12,.0f} docs/s | '
+                f'{sum(validos):,} válidos'
+            )
+
+        base = resultados['validate_docbr item a item']
+        for nome, decorrido in resultados.items():
+            if nome != 'validate_docbr item a item':
+                self.stdout.write(self.style.SUCCESS(f'🚀 {nome}: {base / decorrido:.1f}x o validate_docbr'))
+
+    def _gerar(self, tipo, quantidade, distintos):
+        """Documentos com máscara; metade com o último dígito trocado"""
+        gerados = []
+        for i in range(min(distintos, quantidade)):
+            digitos = GERADORES[tipo]()
+            if i % 2:
+                digitos = digitos[:-1] + str((int(digitos[-1]) + 1) % 10)
+            gerados.append(formatar(digitos))
+        random.shuffle(gerados)
+        return (gerados * (quantidade // len(gerados) + 1))[:quantidade]
+
+    def _item_a_item(self, tipo, documentos):
+        """Caminho anterior: instância nova e validação por documento"""
+        validador = VALIDADORES[tipo]
+        return [validador().validate(documento) for documento in documentos]
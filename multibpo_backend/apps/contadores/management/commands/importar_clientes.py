@@ -0,0 +1,77 @@
+"""
+Django Management Command - Importação em lote de clientes (CSV/XLSX)
+MultiBPO - Contadores
+
+Cria Contador (cliente_bpo), User e, para CNPJ, Escritorio a partir de uma
+planilha com cabeçalho (documento/cpf/cnpj, nome, email, telefone), em
+lotes com bulk_create (ver apps.contadores.importacao). As linhas recusadas
+vão para o relatório (--relatorio, CSV) com o motivo por campo.
+
+Uso:
+    python manage.py importar_clientes clientes.csv
+    python manage.py importar_clientes clientes.xlsx --simular --relatorio erros.csv
+    python manage.py importar_clientes clientes.csv --encoding cp1252 --sem-receita --lote 1000
+"""
+
+import csv
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.contadores.importacao import ArquivoInvalido, ImportadorClientes, ler_planilha
+
+
+class Command(BaseCommand):
+    help = 'Importa clientes (CPF/CNPJ) de uma planilha CSV/XLSX em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='CSV ou XLSX com cabeçalho')
+        parser.add_argument('--lote', type=int, help='Linhas por transação (padrão: CONTADORES_IMPORTACAO["LOTE"])')
+        parser.add_argument('--sem-receita', action='store_true', help='Não consulta a Receita para os CNPJs')
+        parser.add_argument('--simular', action='store_true', help='Só valida, sem gravar')
+        parser.add_argument('--relatorio', help='CSV com as linhas recusadas')
+        parser.add_argument('--encoding', help='Encoding do CSV (padrão: utf-8-sig)')
+
+    def handle(self, *args, **options):
+        caminho = Path(options['arquivo'])
+        if not caminho.is_file():
+            raise CommandError(f'Arquivo inexistente: {caminho}')
+
+        importador = ImportadorClientes(
+            usar_receita=False if options['sem_receita'] else None,
+            simular=options['simular'],
+            lote=options['lote'],
+        )
+        modo = ' (SIMULAÇÃO)' if options['simular'] else ''
+        self.stdout.write(self.style.SUCCESS(f'\n👥 IMPORTAÇÃO DE CLIENTES{modo} ← {caminho.name}\n' + '=' * 60))
+
+        inicio = time.perf_counter()
+        relatorio = open(options['relatorio'], 'w', encoding='utf-8', newline='') if options['relatorio'] else None
+        try:
+            escritor = csv.writer(relatorio) if relatorio else None
+            if escritor:
+                escritor.writerow(['linha', 'documento', 'email', 'erros'])
+            with open(caminho, 'rb') as arquivo:
+                for erro in importador.importar(ler_planilha(arquivo, caminho.name, options['encoding'])):
+                    motivos = '; '.join(f'{campo}: {mensagem}' for campo, mensagem in erro['erros'].items())
+                    if escritor:
+                        escritor.writerow([erro['linha'], erro['documento'], erro['email'], motivos])
+                    elif options['verbosity'] > 1:
+                        self.stdout.write(self.style.WARNING(f'Linha {erro["linha"]}: {motivos}'))
+        except (ArquivoInvalido, UnicodeDecodeError) as e:
+            raise CommandError(f'Planilha inválida: {e}')
+        finally:
+            if relatorio:
+                relatorio.close()
+
+        resumo = importador.resumo
+        decorrido = time.perf_counter() - inicio
+        self.stdout.write(
+            f'Linhas: {resumo["linhas"]} | clientes criados: {resumo["criados"]} | '
+            f'escritórios: {resumo["escritorios"]} | recusadas: {resumo["erros"]} | '
+            f'{decorrido:.1f}s ({resumo["linhas"] / decorrido if decorrido else 0:.0f} linhas/s)'
+        )
+        if resumo['erros'] and options['relatorio']:
+            self.stdout.write(self.style.WARNING(f'⚠️  Linhas recusadas em {options["relatorio"]}'))
+        self.stdout.write(self.style.SUCCESS('✅ Importação concluída'))
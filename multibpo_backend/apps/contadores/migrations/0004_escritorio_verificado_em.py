@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contadores', '0003_alter_contador_options_alter_especialidade_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='escritorio',
+            name='verificado_em',
+            field=models.DateTimeField(blank=True, help_text='Última confirmação da situação cadastral na Receita Federal', null=True, verbose_name='Verificado na Receita em'),
+        ),
+        migrations.AddIndex(
+            model_name='escritorio',
+            index=models.Index(fields=['ativo', 'verificado_em', 'id'], name='escritorio_verificacao_idx'),
+        ),
+    ]
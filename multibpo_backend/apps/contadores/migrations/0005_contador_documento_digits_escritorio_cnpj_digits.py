@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contadores', '0004_escritorio_verificado_em'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contador',
+            name='documento_digits',
+            field=models.CharField(blank=True, editable=False, help_text='Preenchido no save() a partir de documento (ou cpf); usado nas verificações de duplicidade', max_length=14, null=True, verbose_name='CPF/CNPJ (somente dígitos)'),
+        ),
+        migrations.AddField(
+            model_name='escritorio',
+            name='cnpj_digits',
+            field=models.CharField(blank=True, editable=False, help_text='Preenchido no save(); usado nas verificações de duplicidade', max_length=14, null=True, verbose_name='CNPJ (somente dígitos)'),
+        ),
+    ]
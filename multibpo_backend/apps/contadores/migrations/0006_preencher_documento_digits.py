@@ -0,0 +1,65 @@
+"""
+Preenche documento_digits / cnpj_digits dos registros existentes
+
+Em lotes por pk, cada lote na sua transação (a migração não é atômica),
+para não segurar locks na tabela inteira. Documentos repetidos (mesmo CPF/
+CNPJ com formatações diferentes) ficam com a coluna nula a partir do segundo
+registro e são listados no log: a constraint única da 0007 só cobre os
+preenchidos, e os repetidos devem ser conciliados manualmente.
+"""
+
+import logging
+
+from django.db import migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+LOTE = 2000
+
+
+def _digitos(valor):
+    digitos = ''.join(filter(str.isdigit, valor or ''))
+    return digitos or None
+
+
+def _preencher(model, campo_digits, extrair):
+    vistos = set()
+    ultimo_pk = 0
+    while True:
+        with transaction.atomic():
+            lote = list(model.objects.filter(pk__gt=ultimo_pk).order_by('pk')[:LOTE])
+            if not lote:
+                return
+            alterados = []
+            for obj in lote:
+                digitos = _digitos(extrair(obj))
+                if digitos in vistos:
+                    logger.warning(f"{model.__name__} {obj.pk}: documento {digitos} repetido; {campo_digits} fica nulo")
+                    digitos = None
+                elif digitos:
+                    vistos.add(digitos)
+                if getattr(obj, campo_digits) != digitos:
+                    setattr(obj, campo_digits, digitos)
+                    alterados.append(obj)
+            model.objects.bulk_update(alterados, [campo_digits])
+            ultimo_pk = lote[-1].pk
+
+
+def preencher_digits(apps, schema_editor):
+    Contador = apps.get_model('contadores', 'Contador')
+    Escritorio = apps.get_model('contadores', 'Escritorio')
+    _preencher(Contador, 'documento_digits', lambda c: c.documento or c.cpf)
+    _preencher(Escritorio, 'cnpj_digits', lambda e: e.cnpj)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('contadores', '0005_contador_documento_digits_escritorio_cnpj_digits'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_digits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contadores', '0006_preencher_documento_digits'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='contador',
+            constraint=models.UniqueConstraint(condition=models.Q(('documento_digits__isnull', False)), fields=('documento_digits',), name='contador_documento_digits_unico', violation_error_message='Já existe um cadastro com este CPF/CNPJ.'),
+        ),
+        migrations.AddConstraint(
+            model_name='escritorio',
+            constraint=models.UniqueConstraint(condition=models.Q(('cnpj_digits__isnull', False)), fields=('cnpj_digits',), name='escritorio_cnpj_digits_unico', violation_error_message='Já existe um escritório com este CNPJ.'),
+        ),
+    ]
@@ -8,12 +8,19 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
-from validate_docbr import CNPJ, CPF
+from apps.contadores.utils.documentos import cnpj_valido, cpf_valido
 import re
 import json
 
 
+def somente_digitos(valor):
+    """CPF/CNPJ canônico (só dígitos) para as colunas indexadas; None se vazio"""
+    digitos = ''.join(filter(str.isdigit, valor or ''))
+    return digitos or None
+
+
 class Escritorio(models.Model):
     """Model para dados dos escritórios de contabilidade e empresas"""
     
@@ -35,6 +42,14 @@ class Escritorio(models.Model):
         verbose_name="CNPJ",
         help_text="CNPJ do escritório com validação automática"
     )
+    cnpj_digits = models.CharField(
+        max_length=14,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="CNPJ (somente dígitos)",
+        help_text="Preenchido no save(); usado nas verificações de duplicidade"
+    )
     
     # Regime Tributário (mantido)
     REGIME_CHOICES = [
@@ -163,6 +178,12 @@ class Escritorio(models.Model):
         verbose_name="Dados Receita Federal",
         help_text="Dados completos retornados pela API da Receita Federal"
     )
+    verificado_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Verificado na Receita em",
+        help_text="Última confirmação da situação cadastral na Receita Federal"
+    )
     
     # Status e Controle (mantidos)
     ativo = models.BooleanField(
@@ -191,19 +212,34 @@ class Escritorio(models.Model):
         verbose_name = 'Escritório Contábil'
         verbose_name_plural = 'Escritórios Contábeis'
         ordering = ['razao_social']
+        indexes = [
+            # Fila de revalidação: ativos primeiro, verificação mais antiga primeiro
+            models.Index(fields=['ativo', 'verificado_em', 'id'], name='escritorio_verificacao_idx'),
+        ]
+        constraints = [
+            # Duplicidade por igualdade num índice, qualquer que seja a formatação digitada
+            models.UniqueConstraint(
+                fields=['cnpj_digits'],
+                condition=models.Q(cnpj_digits__isnull=False),
+                name='escritorio_cnpj_digits_unico',
+                violation_error_message='Já existe um escritório com este CNPJ.',
+            ),
+        ]
         
     def clean(self):
         super().clean()
         if self.cnpj:
-            cnpj_validator = CNPJ()
             cnpj_limpo = ''.join(filter(str.isdigit, self.cnpj))
-            if not cnpj_validator.validate(cnpj_limpo):
+            if not cnpj_valido(cnpj_limpo):
                 raise ValidationError({'cnpj': 'CNPJ inválido'})
             # Formatação automática
             if len(cnpj_limpo) == 14:
                 self.cnpj = f"{cnpj_limpo[:2]}.{cnpj_limpo[2:5]}.{cnpj_limpo[5:8]}/{cnpj_limpo[8:12]}-{cnpj_limpo[12:]}"
     
     def save(self, *args, **kwargs):
+        self.cnpj_digits = somente_digitos(self.cnpj)
+        if kwargs.get('update_fields') is not None and 'cnpj' in kwargs['update_fields']:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'cnpj_digits'}
         self.full_clean()
         super().save(*args, **kwargs)
     
@@ -229,28 +265,59 @@ class Escritorio(models.Model):
     
     # NOVO: Método para criação via CNPJ
     @classmethod
-    def criar_via_cnpj(cls, cnpj, dados_receita):
+    def criar_via_cnpj(cls, cnpj, dados_receita=None):
         """
         Cria escritório automaticamente baseado nos dados da Receita Federal
+        
+        Se dados_receita não for informado, consulta via ReceitaFederalService
+        (que passa pelo cache de consultas CNPJ). Em dados_receita_federal só
+        é gravada a projeção configurada em RECEITA_PROJECAO (sem raw_data).
         """
+        verificado_em = None
+        if dados_receita is None:
+            from apps.receita.services import ReceitaFederalService
+            dados_receita = ReceitaFederalService().consultar_cnpj(cnpj)
+            if not dados_receita.get('success'):
+                raise ValidationError({'cnpj': dados_receita.get('message', 'CNPJ não encontrado')})
+            verificado_em = timezone.now()
+        
         return cls.objects.create(
             cnpj=cnpj,
-            razao_social=dados_receita.get('razao_social', ''),
-            nome_fantasia=dados_receita.get('nome_fantasia', ''),
-            situacao_cadastral=dados_receita.get('situacao', 'ativa').lower(),
-            logradouro=dados_receita.get('logradouro', ''),
-            numero=dados_receita.get('numero', ''),
-            complemento=dados_receita.get('complemento', ''),
-            bairro=dados_receita.get('bairro', ''),
-            cidade=dados_receita.get('municipio', ''),
-            estado=dados_receita.get('uf', ''),
-            cep=dados_receita.get('cep', ''),
-            telefone=dados_receita.get('telefone', ''),
-            email=dados_receita.get('email', ''),
-            criado_automaticamente=True,
-            dados_receita_federal=dados_receita,
-            ativo=True
+            verificado_em=verificado_em,
+            **cls.campos_via_receita(dados_receita)
         )
+    
+    @staticmethod
+    def campos_via_receita(dados_receita):
+        """
+        Campos do escritório a partir de uma consulta CNPJ bem-sucedida
+        
+        Compartilhado por criar_via_cnpj e pela importação em lote
+        (apps.contadores.importacao), que monta os objetos para bulk_create.
+        """
+        from apps.receita.projecao import projetar_dados_receita
+        from apps.receita.revalidacao import normalizar_situacao
+        
+        # Resultado normalizado do serviço traz o endereço aninhado
+        endereco = dados_receita.get('endereco') or dados_receita
+        
+        return {
+            'razao_social': dados_receita.get('razao_social', ''),
+            'nome_fantasia': dados_receita.get('nome_fantasia', ''),
+            'situacao_cadastral': normalizar_situacao(dados_receita.get('situacao')) or 'ativa',
+            'logradouro': endereco.get('logradouro', ''),
+            'numero': endereco.get('numero', ''),
+            'complemento': endereco.get('complemento', ''),
+            'bairro': endereco.get('bairro', ''),
+            'cidade': endereco.get('municipio', ''),
+            'estado': endereco.get('uf', ''),
+            'cep': endereco.get('cep', ''),
+            'telefone': dados_receita.get('telefone', ''),
+            'email': dados_receita.get('email', ''),
+            'criado_automaticamente': True,
+            'dados_receita_federal': projetar_dados_receita(dados_receita),
+            'ativo': True,
+        }
 
 
 # MANTER Model Especialidade (para compatibilidade com dados existentes)
@@ -344,6 +411,14 @@ class Contador(models.Model):
         null=True,  # Para migração dos dados existentes
         blank=True
     )
+    documento_digits = models.CharField(
+        max_length=14,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="CPF/CNPJ (somente dígitos)",
+        help_text="Preenchido no save() a partir de documento (ou cpf); usado nas verificações de duplicidade"
+    )
     
     # Relacionamentos (mantidos, mas escritorio agora opcional)
     user = models.OneToOneField(
@@ -560,6 +635,14 @@ class Contador(models.Model):
         verbose_name = 'Cliente/Contador'
         verbose_name_plural = 'Clientes/Contadores'
         ordering = ['nome_completo']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['documento_digits'],
+                condition=models.Q(documento_digits__isnull=False),
+                name='contador_documento_digits_unico',
+                violation_error_message='Já existe um cadastro com este CPF/CNPJ.',
+            ),
+        ]
         
     def clean(self):
         super().clean()
@@ -568,9 +651,8 @@ class Contador(models.Model):
         if self.documento:
             if self.tipo_pessoa == 'fisica':
                 # Validar CPF
-                cpf_validator = CPF()
                 cpf_limpo = ''.join(filter(str.isdigit, self.documento))
-                if not cpf_validator.validate(cpf_limpo):
+                if not cpf_valido(cpf_limpo):
                     raise ValidationError({'documento': 'CPF inválido'})
                 # Formatação automática do CPF
                 if len(cpf_limpo) == 11:
@@ -578,9 +660,8 @@ class Contador(models.Model):
                     
             elif self.tipo_pessoa == 'juridica':
                 # Validar CNPJ
-                cnpj_validator = CNPJ()
                 cnpj_limpo = ''.join(filter(str.isdigit, self.documento))
-                if not cnpj_validator.validate(cnpj_limpo):
+                if not cnpj_valido(cnpj_limpo):
                     raise ValidationError({'documento': 'CNPJ inválido'})
                 # Formatação automática do CNPJ
                 if len(cnpj_limpo) == 14:
@@ -588,9 +669,8 @@ class Contador(models.Model):
         
         # Validar CPF antigo para compatibilidade
         if self.cpf:
-            cpf_validator = CPF()
             cpf_limpo = ''.join(filter(str.isdigit, self.cpf))
-            if not cpf_validator.validate(cpf_limpo):
+            if not cpf_valido(cpf_limpo):
                 raise ValidationError({'cpf': 'CPF inválido'})
             # Formatação automática do CPF
             if len(cpf_limpo) == 11:
@@ -623,6 +703,10 @@ class Contador(models.Model):
             self.documento = self.cpf
             self.tipo_pessoa = 'fisica'
         
+        self.documento_digits = somente_digitos(self.documento or self.cpf)
+        if kwargs.get('update_fields') is not None and {'documento', 'cpf'} & set(kwargs['update_fields']):
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'documento_digits'}
+        
         self.full_clean()
         super().save(*args, **kwargs)
     
@@ -709,6 +793,8 @@ class Contador(models.Model):
     @classmethod
     def criar_pessoa_juridica(cls, user, cnpj, razao_social, telefone, dados_receita=None, **kwargs):
         """Método helper para criar pessoa jurídica"""
+        from apps.receita.projecao import projetar_dados_receita
+        
         return cls.objects.create(
             user=user,
             tipo_pessoa='juridica',
@@ -716,6 +802,6 @@ class Contador(models.Model):
             nome_completo=razao_social,
             telefone_pessoal=telefone,
             cargo='proprietario',
-            dados_receita_federal=dados_receita or {},
+            dados_receita_federal=projetar_dados_receita(dados_receita),
             **kwargs
         )
\ No newline at end of file
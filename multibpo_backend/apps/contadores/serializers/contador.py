@@ -157,7 +157,8 @@ class ContadorPerfilSerializer(serializers.ModelSerializer):
     def get_especialidades_detalhes(self, obj):
         """Lista detalhada de especialidades (DEPRECATED para clientes BPO)"""
         try:
-            especialidades = obj.especialidades.filter(ativa=True)
+            # Filtro em Python: aproveita o prefetch de especialidades (login)
+            especialidades = [esp for esp in obj.especialidades.all() if esp.ativa]
             result = [
                 {
                     'id': esp.id,
@@ -10,10 +10,11 @@ ADAPTAÇÕES CORRIGIDAS:
 """
 
 from rest_framework import serializers
-from validate_docbr import CNPJ
 from django.utils import timezone
 from datetime import datetime, timedelta
 from apps.contadores.models import Escritorio
+from apps.contadores.utils.documentos import cnpj_valido
+from apps.receita.projecao import projetar_dados_receita
 
 
 class EscritorioSerializer(serializers.ModelSerializer):
@@ -218,15 +219,14 @@ class EscritorioSerializer(serializers.ModelSerializer):
         cnpj_clean = ''.join(filter(str.isdigit, value))
         
         # Valida usando biblioteca brasileira
-        cnpj_validator = CNPJ()
-        if not cnpj_validator.validate(cnpj_clean):
+        if not cnpj_valido(cnpj_clean):
             raise serializers.ValidationError(
                 "CNPJ inválido. Verifique os números digitados."
             )
         
         # Verificar duplicatas (adaptado para criação automática)
         existing_escritorio = Escritorio.objects.filter(
-            cnpj=cnpj_clean
+            cnpj_digits=cnpj_clean
         ).exclude(pk=self.instance.pk if self.instance else None)
         
         if existing_escritorio.exists():
@@ -433,12 +433,11 @@ class EscritorioCreateAutoSerializer(serializers.ModelSerializer):
         """
         cnpj_clean = ''.join(filter(str.isdigit, value))
         
-        cnpj_validator = CNPJ()
-        if not cnpj_validator.validate(cnpj_clean):
+        if not cnpj_valido(cnpj_clean):
             raise serializers.ValidationError("CNPJ inválido.")
         
         # Para criação automática, verificar se já existe
-        if Escritorio.objects.filter(cnpj=cnpj_clean).exists():
+        if Escritorio.objects.filter(cnpj_digits=cnpj_clean).exists():
             raise serializers.ValidationError("CNPJ já cadastrado.")
         
         return cnpj_clean
@@ -462,7 +461,7 @@ class EscritorioCreateAutoSerializer(serializers.ModelSerializer):
         if data.get('dados_receita_federal'):
             dados_rf = data['dados_receita_federal']
             dados_rf['processado_em'] = timezone.now().isoformat()
-            data['dados_receita_federal'] = dados_rf
+            data['dados_receita_federal'] = projetar_dados_receita(dados_rf)
         
         return data
     
@@ -8,6 +8,7 @@ Para usar factories completas, instale: pip install factory-boy
 
 from django.contrib.auth.models import User
 from apps.contadores.models import Contador, Escritorio, Especialidade
+from apps.contadores.utils.documentos import gerar_cnpj, gerar_cpf
 import random
 from datetime import date, timedelta
 
@@ -123,23 +124,7 @@ class SimpleEscritorioFactory:
     @staticmethod
     def _gerar_cnpj_valido():
         """Gera CNPJ válido para testes"""
-        def calcular_digito(digs, pesos):
-            s = sum(int(digs[i]) * pesos[i] for i in range(len(digs)))
-            resto = s % 11
-            return 0 if resto < 2 else 11 - resto
-        
-        cnpj = [random.randint(0, 9) for _ in range(12)]
-        
-        # Primeiro dígito verificador
-        pesos1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-        cnpj.append(calcular_digito(cnpj, pesos1))
-        
-        # Segundo dígito verificador
-        pesos2 = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-        cnpj.append(calcular_digito(cnpj, pesos2))
-        
-        cnpj_str = ''.join(map(str, cnpj))
-        return f"{cnpj_str[:2]}.{cnpj_str[2:5]}.{cnpj_str[5:8]}/{cnpj_str[8:12]}-{cnpj_str[12:]}"
+        return gerar_cnpj(formatado=True)
 
 
 class SimpleContadorFactory:
@@ -209,20 +194,7 @@ class SimpleContadorFactory:
     @staticmethod
     def _gerar_cpf_valido():
         """Gera CPF válido para testes"""
-        def calcular_digito(digs):
-            s = 0
-            qtd = len(digs) + 1
-            for i in range(len(digs)):
-                s += int(digs[i]) * (qtd - i)
-            resto = s % 11
-            return 0 if resto < 2 else 11 - resto
-        
-        cpf = [random.randint(0, 9) for _ in range(9)]
-        cpf.append(calcular_digito(cpf))
-        cpf.append(calcular_digito(cpf))
-        
-        cpf_str = ''.join(map(str, cpf))
-        return f"{cpf_str[:3]}.{cpf_str[3:6]}.{cpf_str[6:9]}-{cpf_str[9:]}"
+        return gerar_cpf(formatado=True)
 
 
 # Aliases para compatibilidade
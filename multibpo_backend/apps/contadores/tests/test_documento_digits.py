@@ -0,0 +1,118 @@
+"""
+Testes das colunas documento_digits / cnpj_digits e das verificações de duplicidade
+MultiBPO - Contadores
+"""
+
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+
+from apps.authentication.serializers.auth import ContadorRegistroSerializer
+from apps.authentication.serializers.bpo import BPORegistroSerializer, DocumentoValidationSerializer
+
+from ..models import Contador, Escritorio, somente_digitos
+from .factories import SimpleContadorFactory, SimpleEscritorioFactory
+
+
+CPF = '529.982.247-25'
+CPF_2 = '111.444.777-35'
+CNPJ = '11.222.333/0001-81'
+
+
+class TestColunasDigits(TestCase):
+
+    def test_somente_digitos(self):
+        self.assertEqual(somente_digitos(CNPJ), '11222333000181')
+        self.assertIsNone(somente_digitos(''))
+        self.assertIsNone(somente_digitos(None))
+
+    def test_save_preenche(self):
+        contador = SimpleContadorFactory.create(cpf='52998224725')
+        self.assertEqual(contador.documento_digits, '52998224725')
+        escritorio = SimpleEscritorioFactory.create(cnpj='11222333000181')
+        self.assertEqual(escritorio.cnpj, CNPJ)
+        self.assertEqual(escritorio.cnpj_digits, '11222333000181')
+
+    def test_update_fields_inclui_digits(self):
+        contador = SimpleContadorFactory.create(cpf=CPF)
+        contador.documento = CPF_2
+        contador.save(update_fields=['documento'])
+        contador.refresh_from_db()
+        self.assertEqual(contador.documento_digits, '11144477735')
+
+    def test_duplicado_com_outra_formatacao(self):
+        SimpleEscritorioFactory.create(cnpj=CNPJ)
+        with self.assertRaises(ValidationError):
+            SimpleEscritorioFactory.create(cnpj='11222333000181', razao_social='Outro')
+
+        SimpleContadorFactory.create(cpf=CPF)
+        user = User.objects.create_user('outro.contador', 'outro@escritorio.com.br', 'SenhaForte#2025')
+        with self.assertRaises(ValidationError):
+            SimpleContadorFactory.create(user=user, cpf='52998224725')
+
+
+class TestVerificacoesDeDuplicidade(TestCase):
+
+    def setUp(self):
+        self.contador = SimpleContadorFactory.create(cpf=CPF)
+        self.escritorio = SimpleEscritorioFactory.create(cnpj=CNPJ)
+
+    def test_registro_contador(self):
+        with self.assertRaises(serializers.ValidationError):
+            ContadorRegistroSerializer().validate_cpf('52998224725')
+        self.assertEqual(ContadorRegistroSerializer().validate_cpf('11144477735'), CPF_2)
+
+    def test_registro_bpo(self):
+        serializer = BPORegistroSerializer()
+        with self.assertRaises(serializers.ValidationError):
+            serializer.validate_documento('52998224725')
+        with self.assertRaises(serializers.ValidationError):
+            serializer.validate_documento('11222333000181')
+        self.assertEqual(serializer.validate_documento(CPF_2), CPF_2)
+
+    def test_validacao_de_documento(self):
+        serializer = DocumentoValidationSerializer(data={'documento': '11222333000181'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertFalse(serializer.validated_data['available'])
+
+        serializer = DocumentoValidationSerializer(data={'documento': CPF_2})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertTrue(serializer.validated_data['available'])
+
+    def test_igualdade_sem_like(self):
+        with CaptureQueriesContext(connection) as ctx:
+            BPORegistroSerializer().validate_documento(CPF_2)
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertIn('documento_digits', sql)
+        self.assertNotIn('LIKE', sql.upper())
+
+
+class TestBackfill(TestCase):
+
+    def test_preenche_e_ignora_repetidos(self):
+        primeiro = SimpleContadorFactory.create(cpf=CPF)
+        user = User.objects.create_user('outro.contador', 'outro@escritorio.com.br', 'SenhaForte#2025')
+        repetido = SimpleContadorFactory.create(user=user, cpf=CPF_2)
+        escritorio = SimpleEscritorioFactory.create(cnpj=CNPJ)
+
+        # Estado anterior à migração: colunas vazias, mesmo CPF com outra formatação
+        Contador.objects.update(documento_digits=None)
+        Escritorio.objects.update(cnpj_digits=None)
+        Contador.objects.filter(pk=repetido.pk).update(documento='52998224725', cpf=None)
+
+        migracao = import_module('apps.contadores.migrations.0006_preencher_documento_digits')
+        with self.assertLogs(migracao.__name__, level='WARNING'):
+            migracao.preencher_digits(apps, None)
+
+        primeiro.refresh_from_db()
+        repetido.refresh_from_db()
+        escritorio.refresh_from_db()
+        self.assertEqual(primeiro.documento_digits, '52998224725')
+        self.assertIsNone(repetido.documento_digits)
+        self.assertEqual(escritorio.cnpj_digits, '11222333000181')
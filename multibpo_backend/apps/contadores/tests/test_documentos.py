@@ -0,0 +1,90 @@
+"""
+Testes do utilitário de CPF/CNPJ (unitário e em lote)
+MultiBPO - Contadores
+"""
+
+import random
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+from validate_docbr import CNPJ, CPF
+
+from ..utils.documentos import (
+    cnpj_valido, cpf_valido, formatar, gerar_cnpj, gerar_cpf, normalizar, numpy_disponivel, validar_lote,
+)
+
+
+def _amostra(tipo, quantidade=500):
+    """Válidos, aleatórios (quase todos inválidos) e repetidos, como o validate_docbr os julga"""
+    gerador, tamanho = (CPF(), 11) if tipo == 'cpf' else (CNPJ(), 14)
+    documentos = [gerador.generate() for _ in range(quantidade)]
+    documentos += [str(random.randrange(10 ** tamanho)).zfill(tamanho) for _ in range(quantidade)]
+    documentos += [str(d) * tamanho for d in range(10)]
+    return documentos, [gerador.validate(d) for d in documentos]
+
+
+class TestValidacaoUnitaria(SimpleTestCase):
+
+    def test_mesmo_resultado_do_validate_docbr(self):
+        for tipo, validar in (('cpf', cpf_valido), ('cnpj', cnpj_valido)):
+            documentos, esperado = _amostra(tipo)
+            self.assertEqual([validar(d) for d in documentos], esperado)
+
+    def test_formato_incorreto(self):
+        self.assertFalse(cpf_valido('529.982.247-25'))     # Só dígitos
+        self.assertFalse(cpf_valido('5299822472'))
+        self.assertFalse(cnpj_valido('52998224725'))
+
+    def test_gerados(self):
+        self.assertTrue(all(cpf_valido(gerar_cpf()) for _ in range(100)))
+        self.assertTrue(all(cnpj_valido(gerar_cnpj()) for _ in range(100)))
+        self.assertEqual(len(gerar_cnpj(formatado=True)), 18)
+
+
+class TestNormalizacao(SimpleTestCase):
+
+    def test_texto_e_celulas_numericas(self):
+        self.assertEqual(normalizar(' 529.982.247-25 '), '52998224725')
+        self.assertEqual(normalizar(1444777350, 'cpf'), '01444777350')      # Zero à esquerda perdido
+        self.assertEqual(normalizar(11222333000181.0), '11222333000181')
+        self.assertEqual(normalizar('529.982.247-2a'), '')
+        self.assertEqual(normalizar(None), '')
+        self.assertEqual(normalizar(float('nan')), '')
+
+    def test_formatar(self):
+        self.assertEqual(formatar('52998224725'), '529.982.247-25')
+        self.assertEqual(formatar('11222333000181'), '11.222.333/0001-81')
+        self.assertEqual(formatar('123'), '123')
+
+
+class TestValidacaoEmLote(SimpleTestCase):
+
+    def _coluna_mista(self):
+        cpfs, cpfs_ok = _amostra('cpf', 200)
+        cnpjs, cnpjs_ok = _amostra('cnpj', 200)
+        coluna = [formatar(d) for d in cpfs + cnpjs] + ['', 'abc', '123']
+        return coluna, cpfs_ok + cnpjs_ok + [False, False, False]
+
+    def test_python_puro(self):
+        coluna, esperado = self._coluna_mista()
+        lote = validar_lote(coluna, usar_numpy=False)
+        self.assertEqual(lote.validos, esperado)
+        self.assertEqual(lote.tipos[-1], None)
+
+    @skipUnless(numpy_disponivel(), 'NumPy não instalado')
+    def test_numpy_igual_ao_python_puro(self):
+        coluna, esperado = self._coluna_mista()
+        self.assertEqual(validar_lote(coluna, usar_numpy=True).validos, esperado)
+        documentos, esperado = _amostra('cnpj')
+        self.assertEqual(validar_lote(documentos, 'cnpj', usar_numpy=True).validos, esperado)
+
+    def test_resultado(self):
+        lote = validar_lote(['529.982.247-25', 52998224725, '52998224724', None], 'cpf')
+        self.assertEqual(len(lote), 4)
+        self.assertEqual(lote.digitos[:3], ['52998224725'] * 2 + ['52998224724'])
+        self.assertEqual(lote.invalidos, [2, 3])
+        self.assertEqual(lote.formatados(), ['529.982.247-25', '529.982.247-25', None, None])
+
+    def test_tipo_desconhecido(self):
+        with self.assertRaises(ValueError):
+            validar_lote(['52998224725'], 'rg')
@@ -0,0 +1,248 @@
+"""
+Testes da importação em lote de clientes (CSV/XLSX)
+MultiBPO - Contadores
+"""
+
+import io
+import json
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.authentication.documentos import get_documento_filter, reset_documento_filter
+from apps.receita.cache import reset_cnpj_cache
+from apps.receita.shared import get_shared_cache
+
+from ..importacao import ArquivoInvalido, ImportadorClientes, ler_csv, ler_planilha, openpyxl
+from ..models import Contador, Escritorio
+from ..utils.documentos import formatar, gerar_cnpj, gerar_cpf
+from .factories import SimpleContadorFactory
+
+
+CPF_CADASTRADO = '529.982.247-25'
+TELEFONE = '(11) 98765-4321'
+
+
+def _linhas(*registros):
+    return [(numero, dict(zip(('documento', 'nome', 'email', 'telefone'), registro)))
+            for numero, registro in enumerate(registros, start=2)]
+
+
+def _clientes(quantidade, prefixo='cliente'):
+    return _linhas(*[(gerar_cpf(), f'Cliente {i} Silva', f'{prefixo}{i}@exemplo.com.br', TELEFONE)
+                     for i in range(quantidade)])
+
+
+class TestLeitura(TestCase):
+
+    def test_csv_com_ponto_e_virgula_e_cabecalho_acentuado(self):
+        arquivo = io.StringIO('CPF/CNPJ;Razão Social;E-mail;Celular\n'
+                              '529.982.247-25;Ana Souza;ana@exemplo.com;11987654321\n'
+                              ';;;\n'
+                              '11222333000181;Empresa;contato@empresa.com;\n')
+        linhas = list(ler_csv(arquivo))
+        self.assertEqual([numero for numero, _ in linhas], [2, 4])
+        self.assertEqual(linhas[0][1], {'documento': '529.982.247-25', 'nome': 'Ana Souza',
+                                        'email': 'ana@exemplo.com', 'telefone': '11987654321'})
+
+    def test_colunas_obrigatorias(self):
+        with self.assertRaises(ArquivoInvalido):
+            ler_csv(io.StringIO('nome,telefone\nAna,11987654321\n'))
+        with self.assertRaises(ArquivoInvalido):
+            ler_planilha(io.BytesIO(b''), 'vazio.csv')
+
+    @skipUnless(openpyxl, 'openpyxl não instalado')
+    def test_xlsx_com_celulas_numericas(self):
+        cpf = gerar_cpf()
+        while not cpf.startswith('0'):
+            cpf = gerar_cpf()
+        livro = openpyxl.Workbook()
+        livro.active.append(['cpf', 'nome', 'email', 'telefone'])
+        livro.active.append([int(cpf), 'Ana Souza', 'ana@exemplo.com', 11987654321])
+        conteudo = io.BytesIO()
+        livro.save(conteudo)
+        conteudo.seek(0)
+
+        importador = ImportadorClientes(usar_receita=False)
+        self.assertEqual(list(importador.importar(ler_planilha(conteudo, 'clientes.xlsx'))), [])
+        contador = Contador.objects.get(documento_digits=cpf)     # Zero à esquerda recuperado
+        self.assertEqual(str(contador.telefone_pessoal), '+5511987654321')
+
+
+class TestImportacao(TestCase):
+
+    def setUp(self):
+        reset_documento_filter()
+        self.existente = SimpleContadorFactory.create(cpf=CPF_CADASTRADO)
+
+    def tearDown(self):
+        reset_documento_filter()
+
+    def test_cria_clientes_e_relata_recusas(self):
+        cpf, cnpj = gerar_cpf(), gerar_cnpj()
+        linhas = _linhas(
+            (formatar(cpf), 'Ana  Souza', 'Ana@Exemplo.com', TELEFONE),
+            (cnpj, 'Empresa Ltda', 'contato@empresa.com', '11 3333-4444'),
+            ('529.982.247-24', 'Dígito Errado', 'errado@exemplo.com', TELEFONE),
+            (cpf, 'Repetida', 'repetida@exemplo.com', TELEFONE),
+            (CPF_CADASTRADO, 'Já Cadastrado', 'novo@exemplo.com', TELEFONE),
+            (gerar_cpf(), 'Email Repetido', self.existente.user.email.upper(), TELEFONE),
+            (gerar_cpf(), 'Sem Telefone', 'semtelefone@exemplo.com', ''),
+            ('', '', 'email-invalido', '123'),
+        )
+        importador = ImportadorClientes(usar_receita=False)
+        erros = {erro['linha']: erro['erros'] for erro in importador.importar(linhas)}
+
+        self.assertEqual(erros, {
+            4: {'documento': 'CPF/CNPJ inválido'},
+            5: {'documento': 'Repetido na linha 2'},
+            6: {'documento': 'CPF/CNPJ já cadastrado'},
+            7: {'email': 'E-mail já cadastrado'},
+            8: {'telefone': 'Telefone obrigatório'},
+            9: {'documento': 'CPF/CNPJ obrigatório', 'email': 'E-mail inválido',
+                'nome': 'Nome obrigatório', 'telefone': 'Telefone inválido'},
+        })
+        self.assertEqual(importador.resumo, {'linhas': 8, 'criados': 2, 'escritorios': 1,
+                                             'erros': 6, 'simulacao': False})
+
+        pf = Contador.objects.select_related('user').get(documento_digits=cpf)
+        self.assertEqual((pf.documento, pf.tipo_pessoa, pf.cargo), (formatar(cpf), 'fisica', 'cliente_bpo'))
+        self.assertEqual((pf.user.username, pf.user.email), ('ana', 'ana@exemplo.com'))
+        self.assertEqual((pf.user.first_name, pf.user.last_name), ('Ana', 'Souza'))
+        self.assertFalse(pf.user.has_usable_password())
+
+        pj = Contador.objects.select_related('escritorio').get(documento_digits=cnpj)
+        self.assertEqual(pj.tipo_pessoa, 'juridica')
+        self.assertEqual((pj.escritorio.cnpj, pj.escritorio.cnpj_digits), (formatar(cnpj), cnpj))
+        self.assertEqual(pj.escritorio.razao_social, 'Empresa Ltda')
+        self.assertTrue(pj.escritorio.criado_automaticamente)
+
+    def test_queries_fixas_por_lote(self):
+        def queries(quantidade, prefixo):
+            with CaptureQueriesContext(connection) as contexto:
+                list(ImportadorClientes(usar_receita=False).importar(_clientes(quantidade, prefixo)))
+            return len(contexto)
+
+        # 20 linhas cabem num INSERT por tabela mesmo no SQLite (limite de 999 parâmetros)
+        self.assertEqual(queries(5, 'poucos'), queries(20, 'muitos'))
+        self.assertEqual(Contador.objects.filter(cargo='cliente_bpo').count(), 25)
+
+    def test_repeticoes_entre_lotes(self):
+        cpf = gerar_cpf()
+        linhas = _linhas((cpf, 'Ana Souza', 'ana@exemplo.com', TELEFONE),
+                         (gerar_cpf(), 'Bia Lima', 'bia@exemplo.com', TELEFONE),
+                         (cpf, 'Ana Outra', 'ana2@exemplo.com', TELEFONE),
+                         (gerar_cpf(), 'Bia Outra', 'BIA@exemplo.com', TELEFONE))
+        for simular in (True, False):
+            with self.subTest(simular=simular):
+                importador = ImportadorClientes(usar_receita=False, lote=2, simular=simular)
+                erros = {erro['linha']: erro['erros'] for erro in importador.importar(linhas)}
+                self.assertEqual(erros, {4: {'documento': 'CPF/CNPJ já cadastrado'},
+                                         5: {'email': 'E-mail já cadastrado'}})
+                self.assertEqual(Contador.objects.filter(cargo='cliente_bpo').count(), 0 if simular else 2)
+
+    def test_conflito_simultaneo_isola_a_linha(self):
+        cpf_disputado = gerar_cpf()
+
+        class ComCadastroSimultaneo(ImportadorClientes):
+            def _montar(self, linhas):
+                super()._montar(linhas)
+                # Outro processo grava o mesmo CPF e leva o username "ana" entre a verificação e o INSERT
+                user = User.objects.create_user('ana', 'ana@outro.com')
+                SimpleContadorFactory.create(user=user, cpf=cpf_disputado)
+
+        linhas = _linhas((gerar_cpf(), 'Ana Souza', 'ana@exemplo.com', TELEFONE),
+                         (cpf_disputado, 'Bia Lima', 'bia@exemplo.com', TELEFONE))
+        importador = ComCadastroSimultaneo(usar_receita=False)
+        erros = list(importador.importar(linhas))
+
+        self.assertEqual([erro['linha'] for erro in erros], [3])
+        self.assertIn('Conflito', erros[0]['erros']['documento'])
+        self.assertEqual(importador.resumo['criados'], 1)
+        self.assertEqual(Contador.objects.get(nome_completo='Ana Souza').user.username, 'ana_1')   # Realocado
+        self.assertFalse(User.objects.filter(username='bia').exists())
+
+    def test_documentos_entram_no_filtro(self):
+        get_documento_filter().reconstruir()
+        linhas = _clientes(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            list(ImportadorClientes(usar_receita=False).importar(linhas))
+        for _, dados in linhas:
+            self.assertTrue(get_documento_filter().talvez_cadastrado(dados['documento']))
+
+
+@override_settings(
+    RECEITA_PROVIDERS={'CNPJ': ['Fake'], 'FAKE_NAO_ENCONTRADOS': ['99999999000191']},
+    RECEITA_HEDGE={'MODE': 'sequencial'},
+    RECEITA_DATASET={'ENABLED': False},
+)
+class TestImportacaoComReceita(TestCase):
+
+    def setUp(self):
+        get_shared_cache().clear()
+        reset_cnpj_cache()
+
+    def tearDown(self):
+        reset_cnpj_cache()
+        get_shared_cache().clear()
+
+    def test_escritorio_com_dados_da_receita(self):
+        cnpj = gerar_cnpj()
+        linhas = _linhas((cnpj, '', 'contato@empresa.com', TELEFONE),
+                         ('99999999000191', '', 'outra@empresa.com', TELEFONE))
+        erros = list(ImportadorClientes(usar_receita=True).importar(linhas))
+
+        self.assertEqual([erro['linha'] for erro in erros], [3])     # Sem Receita e sem nome
+        self.assertIn('nome', erros[0]['erros'])
+        escritorio = Escritorio.objects.get(cnpj_digits=cnpj)
+        self.assertTrue(escritorio.razao_social)
+        self.assertIsNotNone(escritorio.verificado_em)
+        contador = Contador.objects.get(documento_digits=cnpj)
+        self.assertEqual(contador.nome_completo, escritorio.razao_social)
+        self.assertNotIn('raw_data', contador.dados_receita_federal)
+
+
+class TestImportacaoView(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('contadores:importar-clientes')
+        self.equipe = SimpleContadorFactory.create(cpf=CPF_CADASTRADO)
+
+    def _enviar(self, conteudo, **extra):
+        arquivo = SimpleUploadedFile('clientes.csv', conteudo.encode('utf-8'), content_type='text/csv')
+        return self.client.post(self.url, {'arquivo': arquivo, **extra}, format='multipart')
+
+    def test_relatorio_ndjson(self):
+        self.client.force_authenticate(self.equipe.user)
+        response = self._enviar(
+            'documento,nome,email,telefone\n'
+            f'{gerar_cpf()},Ana Souza,ana@exemplo.com,{TELEFONE}\n'
+            f'{CPF_CADASTRADO},Outra,outra@exemplo.com,{TELEFONE}\n',
+            usar_receita='false',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        linhas = [json.loads(linha) for linha in b''.join(response.streaming_content).splitlines()]
+
+        self.assertEqual(linhas[0]['linha'], 3)
+        self.assertEqual(linhas[0]['erros'], {'documento': 'CPF/CNPJ já cadastrado'})
+        self.assertEqual(linhas[-1]['resumo']['criados'], 1)
+
+    def test_validacoes(self):
+        response = self._enviar('documento,email\n')
+        self.assertEqual(response.status_code, 401)
+
+        self.client.force_authenticate(self.equipe.user)
+        self.assertEqual(self._enviar('nome,telefone\n').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {}, format='multipart').status_code, 400)
+
+        self.equipe.cargo = 'cliente_bpo'
+        self.equipe.save()
+        self.assertEqual(self._enviar('documento,email\n').status_code, 403)
@@ -8,6 +8,9 @@ urlpatterns = [
     # path('escritorios/', views.EscritorioListView.as_view(), name='escritorio-list'),
     # path('especialidades/', views.EspecialidadeListView.as_view(), name='especialidade-list'),
     
+    # Importação em lote de clientes (CSV/XLSX → relatório NDJSON)
+    path('importar/', views.ImportacaoClientesView.as_view(), name='importar-clientes'),
+    
     # Por enquanto, apenas um placeholder
     path('test/', views.test_view, name='test'),
-]
\ No newline at end of file
+]
@@ -0,0 +1,250 @@
+"""
+Validação, normalização e formatação de CPF/CNPJ (unitária e em lote)
+MultiBPO - Contadores
+
+Substitui as instâncias de validate_docbr.CPF()/CNPJ() espalhadas pelos
+models e serializers por funções sem estado, e acrescenta o caminho em lote
+usado na importação de planilhas de clientes:
+
+- cpf_valido / cnpj_valido: um documento (só dígitos), laço curto em Python
+- validar_lote: uma coluna inteira de uma vez; com NumPy os dígitos viram uma
+  matriz (n x 11 ou n x 14) e os dígitos verificadores saem de dois produtos
+  matriciais; sem NumPy (dependência opcional) usa as funções unitárias
+
+As regras são as do validate_docbr: 11/14 dígitos, dígitos verificadores
+módulo 11 e documentos com todos os dígitos iguais recusados.
+
+`python manage.py benchmark_documentos_lote` compara os dois caminhos com a
+validação item a item do validate_docbr.
+"""
+
+import random
+from dataclasses import dataclass
+from operator import mul
+from typing import Any, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # Opcional: sem NumPy o lote usa o laço em Python puro
+    np = None
+
+
+TAMANHOS = {'cpf': 11, 'cnpj': 14}
+TIPOS_POR_TAMANHO = {11: 'cpf', 14: 'cnpj'}
+
+PESOS = {
+    'cpf': ((10, 9, 8, 7, 6, 5, 4, 3, 2),
+            (11, 10, 9, 8, 7, 6, 5, 4, 3, 2)),
+    'cnpj': ((5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2),
+             (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)),
+}
+
+# Somas sobre os bytes ASCII ('0' == 48): desconta 48 * soma dos pesos uma vez só
+_DESCONTO = {tipo: (48 * sum(p1), 48 * sum(p2)) for tipo, (p1, p2) in PESOS.items()}
+
+# Separadores aceitos na planilha/formulário (removidos antes da validação)
+_SEPARADORES = str.maketrans('', '', '.-/ \t')
+
+# Lote mínimo para compensar a montagem da matriz NumPy
+MINIMO_NUMPY = 64
+
+
+def numpy_disponivel() -> bool:
+    return np is not None
+
+
+# ========== NORMALIZAÇÃO E FORMATAÇÃO ==========
+
+def normalizar(valor: Any, tipo: Optional[str] = None) -> str:
+    """
+    Só os dígitos do documento
+
+    Células numéricas de planilha perdem os zeros à esquerda: inteiros são
+    completados até o tamanho do tipo (sem tipo, 11 até 11 dígitos e 14 acima).
+    Texto com algo além de dígitos e separadores (. - / espaço) volta vazio,
+    como o validate_docbr, que recusa esses documentos.
+    """
+    if valor is None or valor != valor:     # None ou NaN (célula vazia)
+        return ''
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        digitos = str(int(valor))
+        tamanho = TAMANHOS[tipo] if tipo else (11 if len(digitos) <= 11 else 14)
+        return digitos.zfill(tamanho)
+    texto = str(valor).translate(_SEPARADORES)
+    return texto if texto.isascii() and texto.isdigit() else ''
+
+
+def formatar_cpf(digitos: str) -> str:
+    return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
+
+
+def formatar_cnpj(digitos: str) -> str:
+    return f"{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}"
+
+
+def formatar(digitos: str) -> str:
+    """CPF ou CNPJ pelo tamanho; outros tamanhos voltam como vieram"""
+    if len(digitos) == 11:
+        return formatar_cpf(digitos)
+    if len(digitos) == 14:
+        return formatar_cnpj(digitos)
+    return digitos
+
+
+# ========== VALIDAÇÃO UNITÁRIA ==========
+
+def _digitos_verificadores_ok(digitos: str, tipo: str) -> bool:
+    tamanho = TAMANHOS[tipo]
+    if len(digitos) != tamanho or not (digitos.isascii() and digitos.isdigit()):
+        return False
+    if digitos == digitos[0] * tamanho:
+        return False
+    dados = digitos.encode()
+    pesos1, pesos2 = PESOS[tipo]
+    desconto1, desconto2 = _DESCONTO[tipo]
+    resto1 = (sum(map(mul, dados, pesos1)) - desconto1) % 11
+    resto2 = (sum(map(mul, dados, pesos2)) - desconto2) % 11
+    return (
+        dados[tamanho - 2] - 48 == (0 if resto1 < 2 else 11 - resto1)
+        and dados[tamanho - 1] - 48 == (0 if resto2 < 2 else 11 - resto2)
+    )
+
+
+def cpf_valido(digitos: str) -> bool:
+    """CPF com 11 dígitos (sem máscara) e dígitos verificadores corretos"""
+    return _digitos_verificadores_ok(digitos, 'cpf')
+
+
+def cnpj_valido(digitos: str) -> bool:
+    """CNPJ com 14 dígitos (sem máscara) e dígitos verificadores corretos"""
+    return _digitos_verificadores_ok(digitos, 'cnpj')
+
+
+def documento_valido(digitos: str) -> bool:
+    """CPF ou CNPJ conforme o tamanho"""
+    tipo = TIPOS_POR_TAMANHO.get(len(digitos))
+    return tipo is not None and _digitos_verificadores_ok(digitos, tipo)
+
+
+def _gerar(tipo: str, formatado: bool) -> str:
+    tamanho = TAMANHOS[tipo]
+    while True:
+        base = [random.randint(0, 9) for _ in range(tamanho - 2)]
+        for pesos in PESOS[tipo]:
+            resto = sum(map(mul, base, pesos)) % 11
+            base.append(0 if resto < 2 else 11 - resto)
+        digitos = ''.join(map(str, base))
+        if digitos != digitos[0] * tamanho:
+            return formatar(digitos) if formatado else digitos
+
+
+def gerar_cpf(formatado: bool = False) -> str:
+    """CPF válido aleatório (testes, benchmarks)"""
+    return _gerar('cpf', formatado)
+
+
+def gerar_cnpj(formatado: bool = False) -> str:
+    """CNPJ válido aleatório (testes, benchmarks)"""
+    return _gerar('cnpj', formatado)
+
+
+# ========== VALIDAÇÃO EM LOTE ==========
+
+@dataclass
+class LoteDocumentos:
+    """Resultado de validar_lote, na ordem da entrada"""
+
+    digitos: List[str]              # Normalizados (vazio se a célula não era um documento)
+    tipos: List[Optional[str]]      # 'cpf' | 'cnpj' | None (tamanho inválido)
+    validos: List[bool]
+
+    def __len__(self) -> int:
+        return len(self.digitos)
+
+    @property
+    def invalidos(self) -> List[int]:
+        """Posições dos documentos inválidos"""
+        return [i for i, valido in enumerate(self.validos) if not valido]
+
+    def formatados(self) -> List[Optional[str]]:
+        """Documentos válidos formatados; None nos inválidos"""
+        return [formatar(d) if valido else None for d, valido in zip(self.digitos, self.validos)]
+
+
+def _validar_numpy(digitos: List[str], tipo: str) -> List[bool]:
+    """Mesma regra de _digitos_verificadores_ok sobre uma matriz n x tamanho"""
+    tamanho = TAMANHOS[tipo]
+    matriz = np.frombuffer(''.join(digitos).encode('ascii'), dtype=np.uint8).reshape(-1, tamanho)
+    matriz = matriz.astype(np.int32) - 48
+    pesos1, pesos2 = (np.array(p, dtype=np.int32) for p in PESOS[tipo])
+
+    resto1 = (matriz[:, :tamanho - 2] @ pesos1) % 11
+    resto2 = (matriz[:, :tamanho - 1] @ pesos2) % 11
+    dv1 = np.where(resto1 < 2, 0, 11 - resto1)
+    dv2 = np.where(resto2 < 2, 0, 11 - resto2)
+
+    validos = (
+        (matriz[:, tamanho - 2] == dv1)
+        & (matriz[:, tamanho - 1] == dv2)
+        & (matriz != matriz[:, :1]).any(axis=1)     # Recusa 000..., 111..., etc.
+    )
+    return validos.tolist()
+
+
+def _normalizar_coluna(valores: List[Any], tipo: Optional[str]) -> List[str]:
+    """normalizar() na coluna inteira; só texto: um translate sobre tudo"""
+    try:
+        texto = '\n'.join(valores)
+    except TypeError:
+        return [normalizar(valor, tipo) for valor in valores]   # Células numéricas ou vazias
+    if not valores or texto.count('\n') != len(valores) - 1:
+        return [normalizar(valor, tipo) for valor in valores]
+
+    texto = texto.translate(_SEPARADORES)
+    digitos = texto.split('\n')
+    continuo = texto.replace('\n', '')
+    if not (continuo.isascii() and continuo.isdigit()):
+        digitos = [d if d.isascii() and d.isdigit() else '' for d in digitos]
+    return digitos
+
+
+def validar_lote(valores: Iterable[Any], tipo: Optional[str] = None,
+                 usar_numpy: Optional[bool] = None) -> LoteDocumentos:
+    """
+    Normaliza e valida uma coluna de documentos numa passada
+
+    tipo: 'cpf', 'cnpj' ou None (cada documento pelo seu tamanho).
+    usar_numpy: None usa NumPy quando instalado e o lote é grande o bastante.
+    """
+    if tipo is not None and tipo not in TAMANHOS:
+        raise ValueError(f"Tipo de documento inválido: {tipo!r}")
+    if usar_numpy and np is None:
+        raise ImportError('NumPy não está instalado')
+
+    digitos = _normalizar_coluna(list(valores), tipo)
+    if tipo is None:
+        tipos = [TIPOS_POR_TAMANHO.get(len(d)) for d in digitos]
+    else:
+        tamanho = TAMANHOS[tipo]
+        tipos = [tipo if len(d) == tamanho else None for d in digitos]
+    validos = [False] * len(digitos)
+
+    for tipo_grupo in TAMANHOS:
+        quantidade = tipos.count(tipo_grupo)
+        if not quantidade:
+            continue
+        # Coluna homogênea (o caso comum) dispensa separar e remontar as posições
+        posicoes = None if quantidade == len(tipos) else [i for i, t in enumerate(tipos) if t == tipo_grupo]
+        grupo = digitos if posicoes is None else [digitos[i] for i in posicoes]
+        vetorizar = usar_numpy if usar_numpy is not None else (np is not None and quantidade >= MINIMO_NUMPY)
+        if vetorizar:
+            resultado = _validar_numpy(grupo, tipo_grupo)
+        else:
+            resultado = [_digitos_verificadores_ok(d, tipo_grupo) for d in grupo]
+        if posicoes is None:
+            validos = resultado
+        else:
+            for i, valido in zip(posicoes, resultado):
+                validos[i] = valido
+
+    return LoteDocumentos(digitos=digitos, tipos=tipos, validos=validos)
@@ -1,8 +1,15 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.receita.batch import gerar_ndjson
+
+from .importacao import ArquivoInvalido, ImportadorClientes, ler_planilha
 
 # View temporária para teste - SEM autenticação
 @api_view(['GET'])
@@ -18,4 +25,75 @@ def test_view(request):
         'version': '2.1',
         'models_ready': False,  # Será True após implementar models
         'admin_ready': False    # Será True após configurar admin
-    })
\ No newline at end of file
+    })
+
+
+class ImportacaoClientesView(APIView):
+    """
+    Importação em lote de clientes por planilha, com relatório em streaming (NDJSON)
+    POST /api/v1/contadores/importar/
+    
+    multipart: arquivo (CSV ou XLSX), simular (true/false), usar_receita
+    (true/false), encoding (CSV)
+    Resposta: uma linha JSON por linha recusada ({linha, documento, email,
+    erros}) e, por último, {"resumo": {...}}
+    
+    Cada lote é gravado na sua própria transação: se o cliente desconectar
+    no meio do stream, os lotes já concluídos permanecem.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    
+    def post(self, request):
+        if not self._pode_importar(request.user):
+            return Response({
+                'success': False,
+                'error': True,
+                'message': 'Apenas a equipe do escritório pode importar clientes'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        arquivo = request.FILES.get('arquivo')
+        if arquivo is None:
+            return Response({
+                'success': False,
+                'error': True,
+                'message': 'Envie a planilha no campo "arquivo" (CSV ou XLSX)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            linhas = ler_planilha(arquivo.file, arquivo.name, request.data.get('encoding') or None)
+        except (ArquivoInvalido, LookupError, UnicodeDecodeError) as e:
+            return Response({
+                'success': False,
+                'error': True,
+                'message': f'Planilha inválida: {e}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        usar_receita = request.data.get('usar_receita')
+        importador = ImportadorClientes(
+            usar_receita=None if usar_receita is None else self._booleano(usar_receita),
+            simular=self._booleano(request.data.get('simular')),
+        )
+        
+        def relatorio():
+            try:
+                yield from importador.importar(linhas)
+            except UnicodeDecodeError as e:
+                # Encoding errado depois do início do arquivo: os lotes anteriores ficam
+                yield {'erro': f'Planilha inválida: {e}'}
+            yield {'resumo': importador.resumo}
+        
+        response = StreamingHttpResponse(gerar_ndjson(relatorio()), content_type='application/x-ndjson')
+        response['X-Accel-Buffering'] = 'no'  # nginx não deve bufferizar o stream
+        return response
+    
+    @staticmethod
+    def _pode_importar(user):
+        if user.is_staff:
+            return True
+        contador = getattr(user, 'contador', None)
+        return contador is not None and contador.cargo != 'cliente_bpo'
+    
+    @staticmethod
+    def _booleano(valor):
+        return str(valor).lower() in ('1', 'true', 'sim', 'on')
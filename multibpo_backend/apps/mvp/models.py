@@ -9,7 +9,7 @@ NÃO interfere com os models complexos existentes (Contador, Escritorio).
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
-from validate_docbr import CPF
+from apps.contadores.utils.documentos import cpf_valido
 
 
 class MVPUser(models.Model):
@@ -99,8 +99,7 @@ class MVPUser(models.Model):
             cpf_limpo = ''.join(filter(str.isdigit, self.cpf))
             
             # Validação com validate-docbr
-            cpf_validator = CPF()
-            if not cpf_validator.validate(cpf_limpo):
+            if not cpf_valido(cpf_limpo):
                 from django.core.exceptions import ValidationError
                 raise ValidationError({'cpf': 'CPF inválido'})
             
@@ -10,7 +10,8 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.db import transaction
-from validate_docbr import CPF
+from apps.authentication.usernames import base_do_email, criar_com_username_livre
+from apps.contadores.utils.documentos import cpf_valido
 import logging
 
 from .models import MVPUser
@@ -81,8 +82,7 @@ class MVPRegisterSerializer(serializers.Serializer):
         cpf_limpo = ''.join(filter(str.isdigit, value))
         
         # Validar com validate-docbr
-        cpf_validator = CPF()
-        if not cpf_validator.validate(cpf_limpo):
+        if not cpf_valido(cpf_limpo):
             raise serializers.ValidationError("CPF inválido. Verifique os números digitados.")
         
         # Verificar se CPF já existe
@@ -121,26 +121,20 @@ class MVPRegisterSerializer(serializers.Serializer):
             cpf = validated_data.pop('cpf')
             telefone = validated_data.pop('telefone', '')
             
-            # Criar username baseado no email
+            # Criar usuário MVP (username: parte local do email + primeiro sufixo N livre)
             email = validated_data['email']
-            username = email.split('@')[0]
-            
-            # Garantir username único
-            base_username = username
-            counter = 1
-            while User.objects.filter(username=username).exists():
-                username = f"{base_username}{counter}"
-                counter += 1
-            
-            # Criar usuário MVP
-            mvp_user = MVPUser.create_mvp_user(
-                username=username,
-                email=validated_data['email'],
-                password=validated_data['password'],
-                first_name=validated_data['first_name'],
-                last_name=validated_data['last_name'],
-                cpf=cpf,
-                telefone=telefone
+            mvp_user = criar_com_username_livre(
+                base_do_email(email),
+                lambda username: MVPUser.create_mvp_user(
+                    username=username,
+                    email=email,
+                    password=validated_data['password'],
+                    first_name=validated_data['first_name'],
+                    last_name=validated_data['last_name'],
+                    cpf=cpf,
+                    telefone=telefone
+                ),
+                separador=''
             )
             
             logger.info(f"Usuário MVP criado: {mvp_user.email} - CPF: {mvp_user.cpf}")
@@ -6,7 +6,10 @@ Testes unitários para views, serializers e models MVP.
 CORREÇÃO: CPFs válidos e outros ajustes.
 """
 
-from django.test import TestCase
+import asyncio
+import threading
+
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from rest_framework.test import APITestCase, APIClient
@@ -14,6 +17,8 @@ from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 import json
 
+from apps.authentication.login_pool import get_login_pool, reset_login_pool
+
 from .models import MVPUser
 from .serializers import MVPRegisterSerializer, MVPLoginSerializer, MVPProfileSerializer
 
@@ -182,7 +187,18 @@ class MVPSerializersTest(TestCase):
         serializer2 = MVPRegisterSerializer(data=data)
         self.assertFalse(serializer2.is_valid())
         self.assertIn('email', serializer2.errors)
-    
+
+    def test_register_serializer_username_com_sufixo(self):
+        """
+        Teste username: parte local do email e, se ocupada, primeiro sufixo livre
+        """
+        User.objects.create_user(username='joao', email='joao@outro.com')
+        User.objects.create_user(username='joao2', email='joao2@outro.com')
+
+        serializer = MVPRegisterSerializer(data=self.valid_register_data)
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.save().user.username, 'joao1')
+
     def test_login_serializer_valid(self):
         """
         Teste serializer de login com dados válidos
@@ -480,4 +496,52 @@ class MVPIntegrationTest(APITestCase):
         
         # 5. Verificar que não consegue mais acessar perfil com token antigo
         profile_response_after_logout = client.get(profile_url)
-        # Nota: token ainda pode funcionar até expirar, mas refresh foi invalidado
\ No newline at end of file
+        # Nota: token ainda pode funcionar até expirar, mas refresh foi invalidado
+
+@override_settings(PASSWORD_HASHING={'SCRYPT': {'WORK_FACTOR': 2 ** 10}})
+class MVPLoginAsyncTest(TransactionTestCase):
+    """
+    Testes do login MVP assíncrono (check_password no executor limitado)
+    """
+    
+    def setUp(self):
+        reset_login_pool()
+        MVPUser.create_mvp_user(
+            username='maria', email='maria@email.com', password='senha123456',
+            first_name='Maria', last_name='Souza', cpf='111.444.777-35'
+        )
+        self.client = AsyncClient()
+        self.url = reverse('mvp:mvp-login-async')
+    
+    def tearDown(self):
+        reset_login_pool()
+    
+    def _post(self, payload):
+        return asyncio.run(self.client.post(self.url, payload, content_type='application/json'))
+    
+    def test_login_async_success(self):
+        response = self._post({'email': 'maria@email.com', 'password': 'senha123456'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['success'])
+        self.assertIn('access', response.json()['tokens'])
+    
+    def test_login_async_invalid_credentials(self):
+        response = self._post({'email': 'maria@email.com', 'password': 'errada123'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', response.json()['errors'])
+    
+    @override_settings(AUTH_LOGIN_POOL={'MAX_WORKERS': 1, 'MAX_FILA': 0})
+    def test_login_async_pool_lotado(self):
+        reset_login_pool()
+        liberar = threading.Event()
+        ocupado = get_login_pool().submeter(liberar.wait, 5)
+        try:
+            response = self._post({'email': 'maria@email.com', 'password': 'senha123456'})
+        finally:
+            liberar.set()
+            ocupado.result(5)
+        
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
@@ -20,6 +20,9 @@ urlpatterns = [
     # Login MVP (email + senha)
     path('login/', views.MVPLoginView.as_view(), name='mvp-login'),
     
+    # Login MVP assíncrono (ASGI): check_password em executor limitado, 429 se lotado
+    path('async/login/', views.mvp_login_async, name='mvp-login-async'),
+    
     # Perfil do usuário MVP autenticado
     path('profile/', views.MVPProfileView.as_view(), name='mvp-profile'),
     
@@ -42,6 +45,7 @@ URLs disponíveis após implementação:
 PRINCIPAIS MVP:
 - POST /api/v1/mvp/register/         # MVPRegisterView (cadastro 5 campos)
 - POST /api/v1/mvp/login/            # MVPLoginView (email + senha)
+- POST /api/v1/mvp/async/login/      # mvp_login_async (mesmo login, ASGI)
 - GET  /api/v1/mvp/profile/          # MVPProfileView (perfil protegido)
 - POST /api/v1/mvp/logout/           # mvp_logout_view (logout seguro)
 
@@ -6,8 +6,13 @@ Views simplificadas para MVP com funcionalidades essenciais.
 NÃO interfere com views enterprise existentes.
 """
 
+import json
 import logging
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -15,6 +20,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from apps.authentication.login_pool import (
+    PoolLotado, corpo_erro_interno_login, corpo_login_invalido, get_login_pool, resposta_pool_lotado,
+)
+
 from .models import MVPUser
 from .serializers import (
     MVPRegisterSerializer,
@@ -172,52 +181,88 @@ class MVPLoginView(APIView):
         
         if not serializer.is_valid():
             logger.warning(f"Login MVP inválido: {serializer.errors}")
-            return Response({
-                'success': False,
-                'message': 'Dados de login inválidos.',
-                'errors': serializer.errors,
-                'error_code': 'VALIDATION_ERROR'
-            }, status=status.HTTP_400_BAD_REQUEST)
+            return Response(corpo_login_invalido(serializer), status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Serializer já validou credenciais
-            user_data = serializer.get_user_data()
-            
-            if not user_data:
-                return Response({
-                    'success': False,
-                    'message': 'Erro na autenticação.',
-                    'error_code': 'AUTH_ERROR'
-                }, status=status.HTTP_401_UNAUTHORIZED)
-            
-            # Gerar tokens JWT
-            tokens = MVPTokenUtils.create_tokens_for_user(serializer.validated_user)
-            
-            # Log de sucesso
-            logger.info(f"Login MVP realizado: {user_data['email']}")
-            
-            # Response com dados + tokens
-            response_data = {
-                'success': True,
-                'message': f'Login realizado com sucesso!',
-                'user': user_data,
-                'tokens': tokens,
-                'sistema': 'MultiBPO MVP',
-                'versao': '1.0',
-                'login_at': timezone.now().isoformat(),
-            }
-            
-            return Response(response_data, status=status.HTTP_200_OK)
+            response_data, status_code = _resultado_login(serializer)
+            return Response(response_data, status=status_code)
             
         except Exception as e:
-            # Erro inesperado
-            logger.error(f"Erro no login MVP: {e}", exc_info=True)
-            
-            return Response({
-                'success': False,
-                'message': 'Erro interno no servidor. Tente novamente.',
-                'error_code': 'INTERNAL_ERROR'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response(corpo_erro_interno_login(e), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _resultado_login(serializer):
+    """
+    (corpo, status) da resposta de login com credenciais já validadas
+    
+    Compartilhado por MVPLoginView e mvp_login_async.
+    """
+    # Serializer já validou credenciais
+    user_data = serializer.get_user_data()
+    
+    if not user_data:
+        return {
+            'success': False,
+            'message': 'Erro na autenticação.',
+            'error_code': 'AUTH_ERROR'
+        }, status.HTTP_401_UNAUTHORIZED
+    
+    # Gerar tokens JWT
+    tokens = MVPTokenUtils.create_tokens_for_user(serializer.validated_user)
+    
+    # Log de sucesso
+    logger.info(f"Login MVP realizado: {user_data['email']}")
+    
+    # Response com dados + tokens
+    response_data = {
+        'success': True,
+        'message': f'Login realizado com sucesso!',
+        'user': user_data,
+        'tokens': tokens,
+        'sistema': 'MultiBPO MVP',
+        'versao': '1.0',
+        'login_at': timezone.now().isoformat(),
+    }
+    
+    return response_data, status.HTTP_200_OK
+
+
+@csrf_exempt
+@require_POST
+async def mvp_login_async(request):
+    """
+    Versão assíncrona de MVPLoginView (ASGI)
+    POST /api/v1/mvp/async/login/
+    
+    check_password roda no executor limitado de
+    apps.authentication.login_pool; com o pool lotado responde 429 com
+    Retry-After.
+    """
+    try:
+        dados = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Corpo da requisição deve ser JSON.',
+            'error_code': 'VALIDATION_ERROR'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = MVPLoginSerializer(data=dados)
+    try:
+        valido = await get_login_pool().executar(serializer.is_valid)
+    except PoolLotado as e:
+        return resposta_pool_lotado(e)
+    
+    if not valido:
+        logger.warning(f"Login MVP inválido: {serializer.errors}")
+        return JsonResponse(corpo_login_invalido(serializer), status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        response_data, status_code = await sync_to_async(_resultado_login)(serializer)
+        return JsonResponse(response_data, status=status_code)
+    
+    except Exception as e:
+        return JsonResponse(corpo_erro_interno_login(e), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 class MVPProfileView(APIView):
@@ -0,0 +1,218 @@
+"""
+Serviço assíncrono (httpx/asyncio) para consultas à Receita Federal
+MultiBPO - Receita Federal
+
+Variante do ReceitaFederalService para views ASGI: a espera pelas APIs
+externas não ocupa uma thread, então um único worker sustenta milhares de
+consultas em andamento. Cache, circuit breaker, limite por provedor e o
+formato de saída são os mesmos do serviço síncrono.
+"""
+
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from .breaker import get_breaker, ordenar_por_saude
+from .latency import get_latency_tracker
+from .limits import get_provider_limiter, get_rate_limiter
+from .metrics import (
+    BREAKER_ABERTO, LIMITADO, NAO_ENCONTRADO, ORIGEM_BASE_LOCAL, ORIGEM_EXTERNA, SEM_COTA, SEM_VAGA, SUCESSO,
+    classificar_erro, get_metrics,
+)
+from .providers import get_provedores
+from .services import ReceitaFederalService, get_hedge_config
+from .singleflight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+
+# Operações de cache (possivelmente Redis) rodam fora do event loop
+_em_thread = partial(sync_to_async, thread_sensitive=False)
+
+
+class AsyncReceitaFederalService:
+    """
+    Consulta de CNPJ assíncrona
+
+    Usa os mesmos provedores (providers.py) pelo lado assíncrono e delega
+    ao ReceitaFederalService o cache e a revalidação em background de
+    entradas stale.
+    """
+
+    def __init__(self):
+        self._sync = ReceitaFederalService()
+
+    async def consultar_cnpj(self, cnpj: str, usar_cache: bool = True) -> Dict[str, Any]:
+        """
+        Consulta dados de CNPJ (mesmo contrato de ReceitaFederalService.consultar_cnpj)
+
+        Args:
+            cnpj: CNPJ formatado ou apenas números
+            usar_cache: se False, ignora o cache na leitura (ainda grava o resultado)
+
+        Returns:
+            Dict com dados da empresa ou erro
+        """
+        cnpj_clean = ''.join(filter(str.isdigit, cnpj))
+
+        if len(cnpj_clean) != 14:
+            return self._sync._error_response("CNPJ deve ter 14 dígitos")
+
+        inicio = time.perf_counter()
+        result, origem = await self._resolver(cnpj_clean, usar_cache)
+        get_metrics().registrar_consulta('cnpj', origem, time.perf_counter() - inicio)
+        return result
+
+    async def _resolver(self, cnpj_clean: str, usar_cache: bool) -> Tuple[Dict[str, Any], str]:
+        """Cache → base local → fontes externas; devolve (resultado, origem)"""
+        if usar_cache:
+            result, nivel = await _em_thread(self._sync._consultar_cache_nivel)(cnpj_clean)
+            if result is not None:
+                return result, nivel
+
+        result = await _em_thread(self._sync.consultar_base_local)(cnpj_clean)
+        if result is not None:
+            return result, ORIGEM_BASE_LOCAL
+
+        async def consultar():
+            result, nao_encontrado = await self._consultar_fontes(cnpj_clean)
+            await _em_thread(self._sync._armazenar)(cnpj_clean, result, nao_encontrado)
+            return result
+
+        result = await get_single_flight().aexecutar(
+            cnpj_clean, consultar, self._sync._resultado_de_outro_worker(cnpj_clean)
+        )
+        return result, ORIGEM_EXTERNA
+
+    def _provedores(self) -> List[Tuple[str, Callable[[str], Awaitable[Dict[str, Any]]]]]:
+        """Provedores externos ordenados pelo health score"""
+        provedores = {provedor.nome: provedor for provedor in get_provedores()}
+        return [(nome, provedores[nome].aconsultar) for nome in ordenar_por_saude(provedores)]
+
+    async def _consultar_fontes(self, cnpj_clean: str) -> Tuple[Dict[str, Any], bool]:
+        """Consulta as APIs externas conforme RECEITA_HEDGE['MODE']"""
+        provedores = await _em_thread(self._provedores)()
+        config = get_hedge_config()
+        modo = config['MODE']
+
+        if modo == 'sequencial' or len(provedores) < 2:
+            nao_encontrado = False
+            for profundidade, (api_name, api_method) in enumerate(provedores, start=1):
+                result, negativo = await self._executar_provedor(api_name, api_method, cnpj_clean)
+                if result.get('success'):
+                    get_metrics().registrar_fallback(profundidade, True)
+                    return result, False
+                nao_encontrado = nao_encontrado or negativo
+            get_metrics().registrar_fallback(len(provedores), False)
+            return self._sync._error_response("CNPJ não encontrado em nenhuma fonte"), nao_encontrado
+
+        delay = 0.0 if modo == 'paralelo' else self._sync._hedge_delay(provedores[0][0], config)
+        return await self._consultar_concorrente(cnpj_clean, provedores, delay)
+
+    async def _consultar_concorrente(self, cnpj_clean: str, provedores, delay: float) -> Tuple[Dict[str, Any], bool]:
+        """
+        Fan-out hedged: o primeiro resultado bem-sucedido vence
+
+        Diferente da versão com threads, os perdedores são de fato
+        cancelados (a requisição HTTP é interrompida).
+        """
+        fila = list(provedores)
+        pendentes = set()
+        nao_encontrado = False
+
+        def lancar():
+            api_name, api_method = fila.pop(0)
+            pendentes.add(asyncio.ensure_future(self._executar_provedor(api_name, api_method, cnpj_clean)))
+
+        lancar()
+        while fila and delay <= 0:
+            lancar()
+
+        try:
+            while pendentes:
+                feitos, _ = await asyncio.wait(pendentes, timeout=delay if fila else None,
+                                               return_when=asyncio.FIRST_COMPLETED)
+
+                if not feitos:
+                    logger.info(f"Hedge: acionando próximo provedor para CNPJ {cnpj_clean} após {delay:.3f}s")
+                    lancar()
+                    continue
+
+                for tarefa in feitos:
+                    pendentes.discard(tarefa)
+                    result, negativo = tarefa.result()
+                    if result.get('success'):
+                        get_metrics().registrar_fallback(len(provedores) - len(fila), True)
+                        return result, False
+                    nao_encontrado = nao_encontrado or negativo
+                    if fila:
+                        lancar()
+        finally:
+            for tarefa in pendentes:
+                tarefa.cancel()
+
+        get_metrics().registrar_fallback(len(provedores), False)
+        return self._sync._error_response("CNPJ não encontrado em nenhuma fonte"), nao_encontrado
+
+    async def _executar_provedor(self, api_name: str, api_method: Callable[[str], Awaitable[Dict[str, Any]]],
+                                 cnpj_clean: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Executa um provedor (breaker, rate limit, limite de concorrência e latência)
+
+        Returns:
+            (resultado, nao_encontrado) - só levanta CancelledError
+        """
+        metrics = get_metrics()
+        breaker = get_breaker(api_name)
+        if not await _em_thread(breaker.permite)():
+            logger.info(f"Circuit breaker aberto: pulando {api_name} para CNPJ {cnpj_clean}")
+            metrics.registrar_chamada(api_name, BREAKER_ABERTO)
+            return self._sync._error_response(f"{api_name} temporariamente indisponível"), False
+
+        # Ficha antes da vaga, como no serviço síncrono
+        if not await get_rate_limiter().aadquirir(api_name):
+            metrics.registrar_chamada(api_name, SEM_COTA)
+            return self._sync._error_response(f"{api_name} temporariamente indisponível"), False
+
+        async with get_provider_limiter().avaga(api_name) as liberado:
+            if not liberado:
+                metrics.registrar_chamada(api_name, SEM_VAGA)
+                return self._sync._error_response(f"{api_name} temporariamente indisponível"), False
+
+            logger.info(f"Consultando CNPJ {cnpj_clean} via {api_name} (async)")
+            inicio = time.perf_counter()
+            nao_encontrado = False
+
+            try:
+                result = await api_method(cnpj_clean)
+                if result.get('success'):
+                    logger.info(f"CNPJ {cnpj_clean} encontrado via {api_name}")
+                    resultado, http_status = SUCESSO, 200
+                else:
+                    nao_encontrado = True
+                    resultado, http_status = NAO_ENCONTRADO, 200
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 404:
+                    nao_encontrado = True
+                logger.warning(f"Erro ao consultar {api_name}: {e}")
+                result = self._sync._error_response(f"Erro ao consultar {api_name}")
+                resultado, http_status = classificar_erro(e)
+                if await _em_thread(self._sync._limitado)(api_name, e.response):
+                    metrics.registrar_chamada(api_name, LIMITADO, http_status, time.perf_counter() - inicio)
+                    return result, False
+            except Exception as e:
+                logger.warning(f"Erro ao consultar {api_name}: {e!r}")
+                result = self._sync._error_response(f"Erro ao consultar {api_name}")
+                resultado, http_status = classificar_erro(e)
+
+            latencia = time.perf_counter() - inicio
+            sucesso = result.get('success', False) or nao_encontrado
+            metrics.registrar_chamada(api_name, resultado, http_status, latencia)
+            get_latency_tracker().record(api_name, latencia, sucesso)
+            await _em_thread(breaker.registrar)(sucesso, latencia)
+            return result, nao_encontrado
@@ -0,0 +1,122 @@
+"""
+Consulta de CNPJs em lote
+MultiBPO - Receita Federal
+
+Usado no onboarding de escritórios (importação de centenas de clientes).
+Os CNPJs são normalizados e deduplicados; acertos de cache saem na hora e
+os misses são consultados por um pool limitado de threads. Cada consulta
+passa pelo ReceitaFederalService, então limite de concorrência por
+provedor, circuit breaker e cache continuam valendo.
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .limits import prioridade_lote
+from .services import ReceitaFederalService
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BATCH_CONFIG = {
+    'MAX_ITENS': 500,       # CNPJs distintos por requisição
+    'MAX_WORKERS': 8,       # Consultas simultâneas por lote
+}
+
+
+def get_batch_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_BATCH)"""
+    config = dict(DEFAULT_BATCH_CONFIG)
+    config.update(getattr(settings, 'RECEITA_BATCH', {}))
+    return config
+
+
+def normalizar_lote(cnpjs: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Normaliza e deduplica mantendo a ordem de entrada
+
+    Returns:
+        (cnpjs_validos, entradas_invalidas) - válidos apenas com dígitos
+    """
+    validos, invalidos, vistos = [], [], set()
+    for entrada in cnpjs:
+        cnpj_clean = ''.join(filter(str.isdigit, str(entrada)))
+        if len(cnpj_clean) != 14:
+            invalidos.append(str(entrada))
+            continue
+        if cnpj_clean not in vistos:
+            vistos.add(cnpj_clean)
+            validos.append(cnpj_clean)
+    return validos, invalidos
+
+
+def _linha(cnpj: str, origem: str, resultado: Dict[str, Any]) -> Dict[str, Any]:
+    return {'cnpj': cnpj, 'origem': origem, 'resultado': resultado}
+
+
+def _consultar_em_lote(service: ReceitaFederalService, cnpj_clean: str) -> Dict[str, Any]:
+    """Consulta de lote: espera mais pelo rate limit, sem gastar a reserva interativa"""
+    with prioridade_lote():
+        return service.consultar_cnpj(cnpj_clean, usar_cache=False)
+
+
+def consultar_lote(cnpjs: Iterable[str], service: Optional[ReceitaFederalService] = None,
+                   max_workers: Optional[int] = None, usar_cache: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Consulta um lote produzindo resultados conforme ficam prontos
+
+    Ordem de saída: entradas inválidas, acertos de cache e, por fim, os
+    misses na ordem em que terminam.
+
+    Cada item: {'cnpj', 'origem': 'invalido'|'cache'|'consulta', 'resultado'}
+    
+    Com usar_cache=False todos os CNPJs vão às fontes (o resultado ainda
+    é gravado no cache).
+    """
+    service = service or ReceitaFederalService()
+    max_workers = max_workers or get_batch_config()['MAX_WORKERS']
+    validos, invalidos = normalizar_lote(cnpjs)
+
+    for entrada in invalidos:
+        yield _linha(entrada, 'invalido', service._error_response("CNPJ deve ter 14 dígitos"))
+
+    misses = []
+    for cnpj_clean in validos:
+        result = service.consultar_cache(cnpj_clean) if usar_cache else None
+        if result is not None:
+            yield _linha(cnpj_clean, 'cache', result)
+        else:
+            misses.append(cnpj_clean)
+
+    if not misses:
+        return
+
+    logger.info(f"Lote CNPJ: {len(validos)} distintos, {len(misses)} consultas externas")
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(misses)),
+                                  thread_name_prefix='receita-lote')
+    try:
+        futuros = {
+            executor.submit(_consultar_em_lote, service, cnpj_clean): cnpj_clean
+            for cnpj_clean in misses
+        }
+        for futuro in as_completed(futuros):
+            cnpj_clean = futuros[futuro]
+            try:
+                result = futuro.result()
+            except Exception as e:
+                logger.error(f"Erro na consulta em lote do CNPJ {cnpj_clean}: {e}")
+                result = service._error_response("Erro interno na consulta")
+            yield _linha(cnpj_clean, 'consulta', result)
+    finally:
+        # Cliente desconectou no meio do stream: descarta o que não começou
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def gerar_ndjson(linhas: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Serializa cada item como uma linha JSON"""
+    for linha in linhas:
+        yield (json.dumps(linha, ensure_ascii=False, default=str) + '\n').encode('utf-8')
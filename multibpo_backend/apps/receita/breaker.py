@@ -0,0 +1,205 @@
+"""
+Circuit breaker por provedor de CNPJ
+MultiBPO - Receita Federal
+
+Estados:
+- fechado: chamadas liberadas; falhas e chamadas lentas são contadas
+- aberto: chamadas recusadas sem tocar a rede por OPEN_SECONDS
+- meio_aberto: uma única chamada de prova (entre todos os workers)
+  decide se o circuito fecha ou volta a abrir
+
+O estado e os contadores ficam no cache backend (apps.receita.shared),
+portanto são compartilhados entre workers quando há Redis configurado.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .latency import get_latency_tracker
+from .shared import get_shared_cache, incr
+
+logger = logging.getLogger(__name__)
+
+
+FECHADO = 'fechado'
+ABERTO = 'aberto'
+MEIO_ABERTO = 'meio_aberto'
+
+DEFAULT_BREAKER_CONFIG = {
+    'ENABLED': True,
+    'FAILURE_RATE': 0.5,            # Taxa de falha que abre o circuito
+    'SLOW_CALL_SECONDS': 5.0,       # Chamadas mais lentas que isso contam como falha
+    'MIN_CALLS': 10,                # Chamadas mínimas na janela antes de avaliar
+    'WINDOW_SECONDS': 60,           # Janela deslizante de contagem
+    'OPEN_SECONDS': 30,             # Tempo aberto antes de permitir a prova
+    'PROBE_TIMEOUT': 15,            # Validade da reserva da chamada de prova
+    'ADAPTIVE_ORDER': True,         # Ordenar provedores pelo health score
+    'KEY_PREFIX': 'receita:breaker',
+}
+
+
+def get_breaker_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_BREAKER)"""
+    config = dict(DEFAULT_BREAKER_CONFIG)
+    config.update(getattr(settings, 'RECEITA_BREAKER', {}))
+    return config
+
+
+class CircuitBreaker:
+    """Circuit breaker de um provedor com estado no cache compartilhado"""
+
+    def __init__(self, provider: str, config: Optional[Dict[str, Any]] = None):
+        self.provider = provider
+        self.config = config or get_breaker_config()
+
+    # ========== ESTADO ==========
+
+    def estado(self) -> str:
+        dados = get_shared_cache().get(self._chave('estado'))
+        if not dados:
+            return FECHADO
+        if time.time() >= dados['aberto_em'] + self.config['OPEN_SECONDS']:
+            return MEIO_ABERTO
+        return ABERTO
+
+    def permite(self) -> bool:
+        """Reserva a chamada; no meio-aberto só o primeiro worker passa"""
+        if not self.config['ENABLED']:
+            return True
+        estado = self.estado()
+        if estado == FECHADO:
+            return True
+        if estado == ABERTO:
+            return False
+        return get_shared_cache().add(self._chave('prova'), 1, timeout=self.config['PROBE_TIMEOUT'])
+
+    def registrar(self, sucesso: bool, latencia: float) -> None:
+        """Registra o resultado de uma chamada e transiciona o estado"""
+        falha = not sucesso or latencia >= self.config['SLOW_CALL_SECONDS']
+        estado = self.estado()
+
+        if estado == MEIO_ABERTO:
+            if falha:
+                self._abrir('chamada de prova falhou')
+            else:
+                self._fechar()
+            return
+
+        bucket = self._bucket_atual()
+        timeout = self.config['WINDOW_SECONDS'] * 3
+        incr(self._chave(f'chamadas:{bucket}'), timeout=timeout)
+        if falha:
+            incr(self._chave(f'falhas:{bucket}'), timeout=timeout)
+
+        if estado == FECHADO and self.config['ENABLED']:
+            chamadas, falhas = self.contagens()
+            if chamadas >= self.config['MIN_CALLS'] and falhas / chamadas >= self.config['FAILURE_RATE']:
+                self._abrir(f'taxa de falha {falhas / chamadas:.0%} em {chamadas:.0f} chamadas')
+
+    def contagens(self) -> Tuple[float, float]:
+        """
+        (chamadas, falhas) na janela deslizante
+
+        Contador de janela deslizante: bucket atual + bucket anterior
+        ponderado pela fração da janela que ainda o cobre.
+        """
+        janela = self.config['WINDOW_SECONDS']
+        agora = time.time()
+        bucket = int(agora // janela)
+        peso_anterior = 1 - (agora % janela) / janela
+
+        valores = get_shared_cache().get_many([
+            self._chave(f'chamadas:{bucket}'), self._chave(f'falhas:{bucket}'),
+            self._chave(f'chamadas:{bucket - 1}'), self._chave(f'falhas:{bucket - 1}'),
+        ])
+        chamadas = valores.get(self._chave(f'chamadas:{bucket}'), 0) + \
+            valores.get(self._chave(f'chamadas:{bucket - 1}'), 0) * peso_anterior
+        falhas = valores.get(self._chave(f'falhas:{bucket}'), 0) + \
+            valores.get(self._chave(f'falhas:{bucket - 1}'), 0) * peso_anterior
+        return chamadas, falhas
+
+    def p95(self) -> Optional[float]:
+        """p95 local do provedor (None abaixo de MIN_CALLS amostras)"""
+        tracker = get_latency_tracker()
+        if tracker.amostras(self.provider) < self.config['MIN_CALLS']:
+            return None
+        return tracker.percentile(self.provider, 0.95)
+
+    def health_score(self, p95_padrao: float = 0.0) -> float:
+        """
+        Score de 0 a 1: taxa de sucesso na janela penalizada pelo p95 local
+
+        Circuito aberto vale 0. Abaixo de MIN_CALLS não há evidência
+        suficiente: a taxa de sucesso vale 1 e o p95 assume p95_padrao.
+        """
+        if self.estado() == ABERTO:
+            return 0.0
+        chamadas, falhas = self.contagens()
+        taxa_sucesso = 1 - falhas / chamadas if chamadas >= self.config['MIN_CALLS'] else 1.0
+        p95 = self.p95()
+        return taxa_sucesso / (1 + (p95_padrao if p95 is None else p95))
+
+    def status(self) -> Dict[str, Any]:
+        chamadas, falhas = self.contagens()
+        return {
+            'estado': self.estado(),
+            'chamadas_janela': round(chamadas, 1),
+            'falhas_janela': round(falhas, 1),
+            'taxa_falha': round(falhas / chamadas, 4) if chamadas else 0.0,
+            'health_score': round(self.health_score(), 4),
+        }
+
+    def reset(self) -> None:
+        self._fechar()
+
+    # ========== INTERNOS ==========
+
+    def _chave(self, sufixo: str) -> str:
+        return f"{self.config['KEY_PREFIX']}:{self.provider}:{sufixo}"
+
+    def _bucket_atual(self) -> int:
+        return int(time.time() // self.config['WINDOW_SECONDS'])
+
+    def _abrir(self, motivo: str) -> None:
+        logger.warning(f"Circuit breaker ABERTO para {self.provider}: {motivo}")
+        cache = get_shared_cache()
+        cache.set(self._chave('estado'), {'aberto_em': time.time(), 'motivo': motivo},
+                  timeout=self.config['OPEN_SECONDS'] * 10)
+        cache.delete(self._chave('prova'))
+
+    def _fechar(self) -> None:
+        bucket = self._bucket_atual()
+        cache = get_shared_cache()
+        if cache.get(self._chave('estado')):
+            logger.info(f"Circuit breaker FECHADO para {self.provider}")
+        cache.delete_many([
+            self._chave('estado'), self._chave('prova'),
+            self._chave(f'chamadas:{bucket}'), self._chave(f'falhas:{bucket}'),
+            self._chave(f'chamadas:{bucket - 1}'), self._chave(f'falhas:{bucket - 1}'),
+        ])
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Breaker do provedor (stateless: o estado vive no cache)"""
+    return CircuitBreaker(provider)
+
+
+def ordenar_por_saude(providers: Iterable[str]) -> List[str]:
+    """
+    Ordena provedores pelo health score (maior primeiro)
+
+    A ordenação é estável: empates preservam a ordem configurada. Um
+    provedor ainda sem amostras herda o pior p95 conhecido, para não
+    passar à frente só por falta de medição.
+    """
+    providers = list(providers)
+    if not get_breaker_config()['ADAPTIVE_ORDER']:
+        return providers
+    breakers = {nome: get_breaker(nome) for nome in providers}
+    conhecidos = [p95 for p95 in (b.p95() for b in breakers.values()) if p95 is not None]
+    p95_padrao = max(conhecidos, default=0.0)
+    scores = {nome: breaker.health_score(p95_padrao) for nome, breaker in breakers.items()}
+    return sorted(providers, key=lambda nome: -scores[nome])
@@ -0,0 +1,248 @@
+"""
+Cache de consultas CNPJ em dois níveis
+MultiBPO - Receita Federal
+
+Nível 1: LRU em memória do processo (sem I/O, por worker)
+Nível 2: cache backend do Django (compartilhado entre workers)
+
+A chave é sempre o CNPJ normalizado com 14 dígitos. Cada entrada guarda
+o resultado normalizado do ReceitaFederalService e os instantes em que
+deixa de ser fresca e em que deixa de poder ser servida como "stale".
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CONFIG = {
+    'ALIAS': 'default',                 # Alias em settings.CACHES
+    'KEY_PREFIX': 'receita:cnpj',
+    'LRU_SIZE': 1024,                   # Entradas no LRU de cada processo
+    'TTL': 60 * 60 * 24,                # Resultado positivo: 24h
+    'NEGATIVE_TTL': 60 * 10,            # CNPJ inexistente: 10 min
+    'STALE_TTL': 60 * 60 * 24 * 6,      # Janela extra servida como stale
+}
+
+
+def get_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_CACHE)"""
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'RECEITA_CACHE', {}))
+    return config
+
+
+class CNPJCache:
+    """
+    Cache de resultados de consulta CNPJ
+
+    Semântica stale-while-revalidate: uma entrada positiva expirada, mas
+    ainda dentro de STALE_TTL, é devolvida imediatamente e a consulta
+    upstream é refeita em background (uma única vez por CNPJ).
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or get_config()
+        self._lru: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._revalidando = set()
+        self._stats = {
+            'hits_memoria': 0,
+            'hits_compartilhado': 0,
+            'hits_stale': 0,
+            'hits_negativos': 0,
+            'misses': 0,
+            'gravacoes': 0,
+            'revalidacoes': 0,
+        }
+
+    # ========== API PÚBLICA ==========
+
+    def get(self, cnpj: str,
+            revalidar: Optional[Callable[[str], None]] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Busca um CNPJ no cache
+
+        Args:
+            cnpj: CNPJ com 14 dígitos
+            revalidar: callable(cnpj) executado em background se a entrada estiver stale
+
+        Returns:
+            (resultado, nivel) onde nivel é 'memoria', 'compartilhado', 'stale'
+            ou None quando não há entrada utilizável
+        """
+        agora = time.time()
+        entrada, nivel = self._get_entrada(cnpj)
+
+        if entrada is None or agora >= entrada['stale_ate']:
+            self._incrementar('misses')
+            return None, None
+
+        if agora >= entrada['fresco_ate']:
+            self._incrementar('hits_stale')
+            if revalidar is not None:
+                self._agendar_revalidacao(cnpj, revalidar)
+            return copy.deepcopy(entrada['resultado']), 'stale'
+
+        self._incrementar('hits_memoria' if nivel == 'memoria' else 'hits_compartilhado')
+        if not entrada['resultado'].get('success'):
+            self._incrementar('hits_negativos')
+        return copy.deepcopy(entrada['resultado']), nivel
+
+    def set(self, cnpj: str, resultado: Dict[str, Any]) -> None:
+        """Armazena resultado positivo (TTL + janela stale)"""
+        agora = time.time()
+        fresco_ate = agora + self.config['TTL']
+        self._gravar(cnpj, {
+            'resultado': resultado,
+            'armazenado_em': agora,
+            'fresco_ate': fresco_ate,
+            'stale_ate': fresco_ate + self.config['STALE_TTL'],
+        })
+
+    def set_negativo(self, cnpj: str, resultado: Dict[str, Any]) -> None:
+        """Armazena "CNPJ não encontrado" por NEGATIVE_TTL (sem janela stale)"""
+        agora = time.time()
+        fresco_ate = agora + self.config['NEGATIVE_TTL']
+        self._gravar(cnpj, {
+            'resultado': resultado,
+            'armazenado_em': agora,
+            'fresco_ate': fresco_ate,
+            'stale_ate': fresco_ate,
+        })
+
+    def get_recente(self, cnpj: str, desde: float) -> Optional[Dict[str, Any]]:
+        """
+        Resultado gravado no cache compartilhado a partir de `desde` (epoch)
+
+        Usado por quem espera a consulta de outro worker: lê direto o nível
+        compartilhado e não conta hit/miss.
+        """
+        try:
+            entrada = self._backend.get(self._chave(cnpj))
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache compartilhado do CNPJ {cnpj}: {e}")
+            return None
+        if entrada is None or entrada['armazenado_em'] < desde:
+            return None
+        self._set_lru(cnpj, entrada)
+        return copy.deepcopy(entrada['resultado'])
+
+    def invalidate(self, cnpj: str) -> None:
+        """Remove o CNPJ dos dois níveis"""
+        with self._lock:
+            self._lru.pop(cnpj, None)
+        try:
+            self._backend.delete(self._chave(cnpj))
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar cache compartilhado do CNPJ {cnpj}: {e}")
+
+    def clear(self) -> None:
+        """Limpa apenas o LRU local (uso em testes/manutenção)"""
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de hit/miss e ocupação do LRU"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['lru_entradas'] = len(self._lru)
+        stats['lru_capacidade'] = self.config['LRU_SIZE']
+        total_hits = stats['hits_memoria'] + stats['hits_compartilhado'] + stats['hits_stale']
+        total = total_hits + stats['misses']
+        stats['hit_ratio'] = round(total_hits / total, 4) if total else 0.0
+        return stats
+
+    # ========== INTERNOS ==========
+
+    @property
+    def _backend(self):
+        return caches[self.config['ALIAS']]
+
+    def _chave(self, cnpj: str) -> str:
+        return f"{self.config['KEY_PREFIX']}:{cnpj}"
+
+    def _get_entrada(self, cnpj: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        with self._lock:
+            entrada = self._lru.get(cnpj)
+            if entrada is not None:
+                self._lru.move_to_end(cnpj)
+                return entrada, 'memoria'
+
+        try:
+            entrada = self._backend.get(self._chave(cnpj))
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache compartilhado do CNPJ {cnpj}: {e}")
+            entrada = None
+
+        if entrada is not None:
+            self._set_lru(cnpj, entrada)
+            return entrada, 'compartilhado'
+        return None, None
+
+    def _gravar(self, cnpj: str, entrada: Dict[str, Any]) -> None:
+        self._set_lru(cnpj, entrada)
+        self._incrementar('gravacoes')
+        timeout = max(1, int(entrada['stale_ate'] - entrada['armazenado_em']))
+        try:
+            self._backend.set(self._chave(cnpj), entrada, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Erro ao gravar cache compartilhado do CNPJ {cnpj}: {e}")
+
+    def _set_lru(self, cnpj: str, entrada: Dict[str, Any]) -> None:
+        with self._lock:
+            self._lru[cnpj] = entrada
+            self._lru.move_to_end(cnpj)
+            while len(self._lru) > self.config['LRU_SIZE']:
+                self._lru.popitem(last=False)
+
+    def _incrementar(self, contador: str) -> None:
+        with self._lock:
+            self._stats[contador] += 1
+
+    def _agendar_revalidacao(self, cnpj: str, revalidar: Callable[[str], None]) -> None:
+        with self._lock:
+            if cnpj in self._revalidando:
+                return
+            self._revalidando.add(cnpj)
+            self._stats['revalidacoes'] += 1
+
+        def _executar():
+            try:
+                revalidar(cnpj)
+            except Exception as e:
+                logger.warning(f"Erro na revalidação em background do CNPJ {cnpj}: {e}")
+            finally:
+                with self._lock:
+                    self._revalidando.discard(cnpj)
+
+        threading.Thread(target=_executar, name=f'receita-revalidar-{cnpj}', daemon=True).start()
+
+
+_cnpj_cache: Optional[CNPJCache] = None
+_cnpj_cache_lock = threading.Lock()
+
+
+def get_cnpj_cache() -> CNPJCache:
+    """Instância única do cache por processo"""
+    global _cnpj_cache
+    if _cnpj_cache is None:
+        with _cnpj_cache_lock:
+            if _cnpj_cache is None:
+                _cnpj_cache = CNPJCache()
+    return _cnpj_cache
+
+
+def reset_cnpj_cache() -> None:
+    """Descarta a instância atual (recarrega configuração; uso em testes)"""
+    global _cnpj_cache
+    with _cnpj_cache_lock:
+        _cnpj_cache = None
@@ -0,0 +1,338 @@
+"""
+Consulta de endereços por CEP
+MultiBPO - Receita Federal
+
+Mesma estrutura da consulta de CNPJ, com TTLs bem mais longos (CEP quase
+nunca muda):
+
+1. cache em dois níveis (CNPJCache com prefixo/TTL próprios)
+2. tabela local opcional (SQLite carregado por `importar_ceps`), que
+   permite resolução totalmente offline
+3. BrasilAPI (v2) e ViaCEP, pelo mesmo caminho dos provedores de CNPJ
+   (sessão keep-alive, limite de concorrência, rate limit e breaker)
+
+Usado no autopreenchimento de endereço do cadastro: cada consulta com
+debounce do front não deve custar uma ida à API externa.
+"""
+
+import csv
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .cache import CNPJCache, get_config as get_cache_config
+from .limits import prioridade_lote
+from .metrics import ORIGEM_BASE_LOCAL, ORIGEM_EXTERNA, get_metrics
+from .services import ReceitaFederalService
+from .sessions import get_session, get_timeout
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CEP_CONFIG = {
+    'BRASILAPI_URL': 'https://brasilapi.com.br/api/cep/v2',
+    'VIACEP_URL': 'https://viacep.com.br/ws',
+    'TTL': 60 * 60 * 24 * 30,           # 30 dias
+    'NEGATIVE_TTL': 60 * 60 * 24,       # CEP inexistente: 1 dia
+    'STALE_TTL': 60 * 60 * 24 * 335,    # Servido como stale até completar 1 ano
+    'LRU_SIZE': 4096,
+    'BASE_LOCAL': '',                   # SQLite de `importar_ceps` (vazio = desabilitado)
+    'MAX_ITENS': 100,                   # CEPs por consulta em lote
+    'MAX_WORKERS': 8,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ceps (
+    cep TEXT PRIMARY KEY,
+    logradouro TEXT,
+    complemento TEXT,
+    bairro TEXT,
+    municipio TEXT,
+    uf TEXT,
+    ibge TEXT
+) WITHOUT ROWID;
+"""
+
+COLUNAS = ('cep', 'logradouro', 'complemento', 'bairro', 'municipio', 'uf', 'ibge')
+
+
+def get_cep_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_CEP)"""
+    config = dict(DEFAULT_CEP_CONFIG)
+    config.update(getattr(settings, 'RECEITA_CEP', {}))
+    return config
+
+
+def limpar_cep(cep: Any) -> str:
+    return ''.join(filter(str.isdigit, str(cep)))
+
+
+def formatar_cep(cep: str) -> str:
+    return f"{cep[:5]}-{cep[5:]}" if len(cep) == 8 else cep
+
+
+# ========== CACHE ==========
+
+_cep_cache: Optional[CNPJCache] = None
+_cep_cache_lock = threading.Lock()
+
+
+def get_cep_cache() -> CNPJCache:
+    """Cache de CEPs: mesmo backend do cache de CNPJ, prefixo e TTLs próprios"""
+    global _cep_cache
+    if _cep_cache is None:
+        with _cep_cache_lock:
+            if _cep_cache is None:
+                config = get_cep_config()
+                _cep_cache = CNPJCache({
+                    'ALIAS': get_cache_config()['ALIAS'],
+                    'KEY_PREFIX': 'receita:cep',
+                    'LRU_SIZE': config['LRU_SIZE'],
+                    'TTL': config['TTL'],
+                    'NEGATIVE_TTL': config['NEGATIVE_TTL'],
+                    'STALE_TTL': config['STALE_TTL'],
+                })
+    return _cep_cache
+
+
+def reset_cep_cache() -> None:
+    """Descarta a instância atual (recarrega configuração; uso em testes)"""
+    global _cep_cache
+    with _cep_cache_lock:
+        _cep_cache = None
+
+
+# ========== TABELA LOCAL ==========
+
+def conectar_escrita(caminho: str) -> sqlite3.Connection:
+    """Abre (ou cria) a tabela local de CEPs para escrita"""
+    Path(caminho).parent.mkdir(parents=True, exist_ok=True)
+    conexao = sqlite3.connect(caminho)
+    conexao.execute('PRAGMA journal_mode=WAL')
+    conexao.executescript(SCHEMA)
+    return conexao
+
+
+def importar_csv(conexao: sqlite3.Connection, arquivo: io.TextIOBase, batch_size: int = 10_000) -> int:
+    """
+    Carrega um CSV (';' ou ',') com cabeçalho contendo ao menos `cep`
+
+    Colunas reconhecidas: cep, logradouro, complemento, bairro,
+    municipio (ou cidade/localidade), uf, ibge. Linhas com CEP inválido
+    são ignoradas.
+    """
+    amostra = arquivo.read(4096)
+    arquivo.seek(0)
+    leitor = csv.DictReader(arquivo, dialect=csv.Sniffer().sniff(amostra, delimiters=';,'))
+    sql = f"INSERT OR REPLACE INTO ceps ({', '.join(COLUNAS)}) VALUES ({', '.join('?' * len(COLUNAS))})"
+
+    total, lote = 0, []
+    for row in leitor:
+        row = {(chave or '').strip().lower(): (valor or '').strip() for chave, valor in row.items()}
+        row.setdefault('municipio', row.get('cidade') or row.get('localidade', ''))
+        cep = limpar_cep(row.get('cep', ''))
+        if len(cep) != 8:
+            continue
+        lote.append((cep, *(row.get(coluna, '') for coluna in COLUNAS[1:])))
+        if len(lote) >= batch_size:
+            with conexao:
+                conexao.executemany(sql, lote)
+            total, lote = total + len(lote), []
+    if lote:
+        with conexao:
+            conexao.executemany(sql, lote)
+        total += len(lote)
+    return total
+
+
+class CEPTable:
+    """Leitura da tabela local (somente leitura, uma conexão por thread)"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+
+    def disponivel(self) -> bool:
+        return bool(self.caminho) and os.path.exists(self.caminho)
+
+    def _conexao(self) -> sqlite3.Connection:
+        inode = os.stat(self.caminho).st_ino
+        if getattr(self._local, 'inode', None) != inode:
+            conexao = sqlite3.connect(f'file:{self.caminho}?mode=ro', uri=True)
+            conexao.row_factory = sqlite3.Row
+            self._local.conexao, self._local.inode = conexao, inode
+        return self._local.conexao
+
+    def buscar_varios(self, ceps: List[str]) -> Dict[str, Dict[str, Any]]:
+        """CEPs encontrados → linha (uma query por até 500 CEPs)"""
+        if not ceps or not self.disponivel():
+            return {}
+        encontrados = {}
+        for inicio in range(0, len(ceps), 500):
+            parte = ceps[inicio:inicio + 500]
+            cursor = self._conexao().execute(
+                f"SELECT * FROM ceps WHERE cep IN ({', '.join('?' * len(parte))})", parte
+            )
+            encontrados.update((row['cep'], dict(row)) for row in cursor)
+        return encontrados
+
+
+# ========== SERVIÇO ==========
+
+class CEPService:
+    """
+    Consulta de endereço por CEP
+
+    As chamadas externas reaproveitam ReceitaFederalService._executar_provedor
+    (limite de concorrência, rate limit, breaker e latência por provedor).
+    """
+
+    def __init__(self):
+        config = get_cep_config()
+        self.brasilapi_url = config['BRASILAPI_URL']
+        self.viacep_url = config['VIACEP_URL']
+        self.tabela = CEPTable(config['BASE_LOCAL'])
+        self._receita = ReceitaFederalService()
+
+    def consultar_cep(self, cep: str, usar_cache: bool = True) -> Dict[str, Any]:
+        """
+        Consulta um CEP
+
+        Returns:
+            {'success', 'fonte', 'cep', 'logradouro', 'complemento', 'bairro',
+             'municipio', 'uf', 'ibge'} ou resposta de erro
+        """
+        cep_clean = limpar_cep(cep)
+        if len(cep_clean) != 8:
+            return self._error_response("CEP deve ter 8 dígitos")
+
+        inicio = time.perf_counter()
+        result, origem = self._resolver(cep_clean, usar_cache)
+        get_metrics().registrar_consulta('cep', origem, time.perf_counter() - inicio)
+        return result
+
+    def consultar_lote(self, ceps: Iterable[str], max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve vários CEPs: cache, depois tabela local (uma query) e só
+        então as APIs, em paralelo e com prioridade de lote no rate limit
+
+        Returns:
+            {entrada_original: resultado}
+        """
+        entradas = {str(cep): limpar_cep(cep) for cep in ceps}
+        resultados: Dict[str, Dict[str, Any]] = {}
+        pendentes = []
+        for cep_clean in dict.fromkeys(entradas.values()):
+            if len(cep_clean) != 8:
+                resultados[cep_clean] = self._error_response("CEP deve ter 8 dígitos")
+                continue
+            result, _ = get_cep_cache().get(cep_clean, revalidar=self._consultar_e_armazenar)
+            if result is not None:
+                resultados[cep_clean] = result
+            else:
+                pendentes.append(cep_clean)
+
+        locais = self.tabela.buscar_varios(pendentes)
+        for cep_clean, row in locais.items():
+            resultados[cep_clean] = self._normalizar_local(row)
+        pendentes = [cep for cep in pendentes if cep not in locais]
+
+        if pendentes:
+            max_workers = max_workers or get_cep_config()['MAX_WORKERS']
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(pendentes)),
+                                    thread_name_prefix='receita-cep') as executor:
+                for cep_clean, result in zip(pendentes, executor.map(self._consultar_em_lote, pendentes)):
+                    resultados[cep_clean] = result
+
+        return {entrada: resultados[cep_clean] for entrada, cep_clean in entradas.items()}
+
+    # ========== INTERNOS ==========
+
+    def _resolver(self, cep_clean: str, usar_cache: bool) -> Tuple[Dict[str, Any], str]:
+        """Cache → tabela local → provedores; devolve (resultado, origem)"""
+        if usar_cache:
+            result, nivel = get_cep_cache().get(cep_clean, revalidar=self._consultar_e_armazenar)
+            if result is not None:
+                return result, nivel
+
+        local = self.tabela.buscar_varios([cep_clean]).get(cep_clean)
+        if local is not None:
+            return self._normalizar_local(local), ORIGEM_BASE_LOCAL
+
+        return self._consultar_e_armazenar(cep_clean), ORIGEM_EXTERNA
+
+    def _consultar_em_lote(self, cep_clean: str) -> Dict[str, Any]:
+        with prioridade_lote():
+            return self._consultar_e_armazenar(cep_clean)
+
+    def _consultar_e_armazenar(self, cep_clean: str) -> Dict[str, Any]:
+        """Consulta os provedores em sequência e grava o resultado no cache"""
+        nao_encontrado = False
+        for nome, metodo in self._provedores():
+            result, negativo = self._receita._executar_provedor(nome, metodo, cep_clean)
+            if result.get('success'):
+                get_cep_cache().set(cep_clean, result)
+                return result
+            nao_encontrado = nao_encontrado or negativo
+
+        result = self._error_response("CEP não encontrado")
+        if nao_encontrado:
+            get_cep_cache().set_negativo(cep_clean, result)
+        return result
+
+    def _provedores(self) -> List[Tuple[str, Any]]:
+        return [('BrasilAPI-CEP', self._consultar_brasilapi), ('ViaCEP', self._consultar_viacep)]
+
+    def _consultar_brasilapi(self, cep: str) -> Dict[str, Any]:
+        response = get_session('BrasilAPI-CEP').get(f"{self.brasilapi_url}/{cep}",
+                                                    timeout=get_timeout('BrasilAPI-CEP'))
+        response.raise_for_status()
+        data = response.json()
+        return {
+            'success': True,
+            'fonte': 'BrasilAPI',
+            'cep': formatar_cep(cep),
+            'logradouro': data.get('street') or '',
+            'complemento': '',
+            'bairro': data.get('neighborhood') or '',
+            'municipio': data.get('city') or '',
+            'uf': data.get('state') or '',
+            'ibge': '',
+        }
+
+    def _consultar_viacep(self, cep: str) -> Dict[str, Any]:
+        response = get_session('ViaCEP').get(f"{self.viacep_url}/{cep}/json/", timeout=get_timeout('ViaCEP'))
+        response.raise_for_status()
+        data = response.json()
+        if data.get('erro'):
+            return self._error_response("CEP não encontrado")
+        return {
+            'success': True,
+            'fonte': 'ViaCEP',
+            'cep': formatar_cep(cep),
+            'logradouro': data.get('logradouro', ''),
+            'complemento': data.get('complemento', ''),
+            'bairro': data.get('bairro', ''),
+            'municipio': data.get('localidade', ''),
+            'uf': data.get('uf', ''),
+            'ibge': data.get('ibge', ''),
+        }
+
+    def _normalizar_local(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'success': True,
+            'fonte': 'BaseLocal',
+            'cep': formatar_cep(row['cep']),
+            **{coluna: row.get(coluna) or '' for coluna in COLUNAS[1:]},
+        }
+
+    def _error_response(self, message: str) -> Dict[str, Any]:
+        return {'success': False, 'error': True, 'message': message}
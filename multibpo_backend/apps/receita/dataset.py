@@ -0,0 +1,365 @@
+"""
+Índice local de CNPJs a partir dos dados abertos da Receita Federal
+MultiBPO - Receita Federal
+
+Os arquivos públicos (Empresas, Estabelecimentos, Municípios, CNAEs) são
+CSVs sem cabeçalho, separados por ';', em latin-1, normalmente dentro de
+ZIPs. A ingestão lê em streaming e grava em lotes num SQLite compacto
+(tabelas WITHOUT ROWID chaveadas pelo CNPJ), então a memória usada não
+depende do tamanho do arquivo.
+
+Atualização mensal: as linhas são gravadas com upsert e cada arquivo já
+ingerido (nome + tamanho + mtime) é pulado numa nova execução. Com WAL,
+as consultas continuam servindo durante a atualização.
+
+LocalDatasetProvider consulta esse índice no mesmo formato normalizado
+das APIs externas e é usado por consultar_cnpj antes delas.
+"""
+
+import csv
+import io
+import logging
+import os
+import re
+import sqlite3
+import threading
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .providers import SITUACOES, Endereco, ResultadoCNPJ, formatar_cnpj
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DATASET_CONFIG = {
+    'ENABLED': True,
+    'PATH': None,               # None = BASE_DIR / 'data' / 'cnpj.sqlite3'
+    'BATCH_SIZE': 50_000,       # Linhas por transação na ingestão
+}
+
+ENCODING = 'latin-1'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS empresas (
+    cnpj_basico TEXT PRIMARY KEY,
+    razao_social TEXT,
+    natureza_juridica TEXT,
+    capital_social TEXT,
+    porte TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS estabelecimentos (
+    cnpj TEXT PRIMARY KEY,
+    matriz_filial TEXT,
+    nome_fantasia TEXT,
+    situacao TEXT,
+    data_situacao TEXT,
+    data_inicio TEXT,
+    cnae_principal TEXT,
+    tipo_logradouro TEXT,
+    logradouro TEXT,
+    numero TEXT,
+    complemento TEXT,
+    bairro TEXT,
+    cep TEXT,
+    uf TEXT,
+    municipio TEXT,
+    telefone TEXT,
+    email TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS municipios (codigo TEXT PRIMARY KEY, nome TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cnaes (codigo TEXT PRIMARY KEY, descricao TEXT) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS arquivos (
+    chave TEXT PRIMARY KEY,
+    tipo TEXT,
+    linhas INTEGER,
+    mes_referencia TEXT,
+    importado_em TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT) WITHOUT ROWID;
+"""
+
+
+def get_dataset_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_DATASET)"""
+    config = dict(DEFAULT_DATASET_CONFIG)
+    config.update(getattr(settings, 'RECEITA_DATASET', {}))
+    if not config['PATH']:
+        config['PATH'] = str(Path(settings.BASE_DIR) / 'data' / 'cnpj.sqlite3')
+    return config
+
+
+# ========== INGESTÃO ==========
+
+def _linha_empresa(campos: List[str]) -> Tuple:
+    # CNPJ BÁSICO; RAZÃO SOCIAL; NATUREZA JURÍDICA; QUALIFICAÇÃO; CAPITAL SOCIAL; PORTE; ENTE FEDERATIVO
+    return (campos[0], campos[1], campos[2], campos[4], campos[5])
+
+
+def _linha_estabelecimento(campos: List[str]) -> Tuple:
+    # Layout de 30 colunas; ver "Metadados CNPJ" da Receita Federal
+    return (
+        campos[0] + campos[1] + campos[2],  # básico + ordem + DV
+        campos[3], campos[4], campos[5], campos[6], campos[10], campos[11],
+        campos[13], campos[14], campos[15], campos[16], campos[17], campos[18],
+        campos[19], campos[20],
+        campos[21] + campos[22],            # DDD 1 + telefone 1
+        campos[27],
+    )
+
+
+def _linha_codigo(campos: List[str]) -> Tuple:
+    return (campos[0], campos[1])
+
+
+@dataclass(frozen=True)
+class TipoArquivo:
+    nome: str
+    marcadores: Tuple[str, ...]
+    tabela: str
+    colunas: int                # Colunas gravadas no índice
+    minimo: int                 # Colunas mínimas na linha de origem
+    converter: Any = field(compare=False)
+
+
+TIPOS = (
+    TipoArquivo('estabelecimentos', ('ESTABELE',), 'estabelecimentos', 17, 28, _linha_estabelecimento),
+    TipoArquivo('empresas', ('EMPRECSV', 'EMPRESAS'), 'empresas', 5, 6, _linha_empresa),
+    TipoArquivo('municipios', ('MUNICCSV', 'MUNICIPIOS'), 'municipios', 2, 2, _linha_codigo),
+    TipoArquivo('cnaes', ('CNAECSV', 'CNAES'), 'cnaes', 2, 2, _linha_codigo),
+)
+
+MES_REFERENCIA = re.compile(r'^\d{4}-\d{2}$')
+
+
+def identificar_tipo(nome: str) -> Optional[TipoArquivo]:
+    """Tipo do arquivo pelo nome (formatos antigo K3241...EMPRECSV e novo Empresas0.zip)"""
+    nome = os.path.basename(nome).upper()
+    for tipo in TIPOS:
+        if any(marcador in nome for marcador in tipo.marcadores):
+            return tipo
+    return None
+
+
+def _abrir_csv(caminho: Path) -> Iterator[Tuple[str, io.TextIOBase]]:
+    """Produz (nome, stream de texto) de um CSV solto ou de cada membro de um ZIP"""
+    if zipfile.is_zipfile(caminho):
+        with zipfile.ZipFile(caminho) as arquivo_zip:
+            for membro in arquivo_zip.namelist():
+                with arquivo_zip.open(membro) as binario:
+                    yield membro, io.TextIOWrapper(binario, encoding=ENCODING, newline='')
+    else:
+        with open(caminho, encoding=ENCODING, newline='') as texto:
+            yield caminho.name, texto
+
+
+def inferir_mes_referencia(caminho: Path) -> str:
+    """Mês de referência pelo diretório de download (.../dados_abertos_cnpj/2025-01/)"""
+    for parte in reversed(caminho.resolve().parent.parts):
+        if MES_REFERENCIA.match(parte):
+            return parte
+    return ''
+
+
+def _chave_arquivo(caminho: Path) -> str:
+    stat = caminho.stat()
+    return f'{caminho.name}:{stat.st_size}:{int(stat.st_mtime)}'
+
+
+def listar_arquivos(caminhos: Iterable[str]) -> List[Path]:
+    """Expande diretórios e ordena: tabelas de referência, empresas, estabelecimentos"""
+    arquivos = []
+    for caminho in map(Path, caminhos):
+        arquivos.extend(sorted(p for p in caminho.iterdir() if p.is_file()) if caminho.is_dir() else [caminho])
+
+    ordem = {'municipios': 0, 'cnaes': 1, 'empresas': 2, 'estabelecimentos': 3}
+    return sorted(
+        (p for p in arquivos if identificar_tipo(p.name)),
+        key=lambda p: ordem[identificar_tipo(p.name).nome],
+    )
+
+
+def conectar_escrita(caminho: str) -> sqlite3.Connection:
+    """Abre (ou cria) o índice para escrita com o schema aplicado"""
+    Path(caminho).parent.mkdir(parents=True, exist_ok=True)
+    conexao = sqlite3.connect(caminho)
+    conexao.execute('PRAGMA journal_mode=WAL')
+    conexao.execute('PRAGMA synchronous=NORMAL')
+    conexao.execute('PRAGMA cache_size=-65536')   # 64 MB de page cache
+    conexao.executescript(SCHEMA)
+    return conexao
+
+
+def importar_arquivo(conexao: sqlite3.Connection, caminho: Path, batch_size: int,
+                     mes_referencia: str = '', forcar: bool = False) -> Optional[int]:
+    """
+    Ingere um arquivo em lotes de batch_size linhas
+
+    Returns:
+        Linhas gravadas, ou None se o arquivo já havia sido importado
+    """
+    chave = _chave_arquivo(caminho)
+    if not forcar and conexao.execute('SELECT 1 FROM arquivos WHERE chave = ?', (chave,)).fetchone():
+        logger.info(f"Dataset CNPJ: {caminho.name} já importado, pulando")
+        return None
+
+    total = descartadas = 0
+    for membro, texto in _abrir_csv(caminho):
+        tipo = identificar_tipo(membro) or identificar_tipo(caminho.name)
+        marcadores = ', '.join(['?'] * tipo.colunas)
+        sql = f'INSERT OR REPLACE INTO {tipo.tabela} VALUES ({marcadores})'
+
+        lote = []
+        for campos in csv.reader(texto, delimiter=';', quotechar='"'):
+            if len(campos) < tipo.minimo:
+                descartadas += 1
+                continue
+            lote.append(tipo.converter([c.strip() for c in campos]))
+            if len(lote) >= batch_size:
+                with conexao:
+                    conexao.executemany(sql, lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            with conexao:
+                conexao.executemany(sql, lote)
+            total += len(lote)
+
+    with conexao:
+        conexao.execute(
+            'INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?, ?)',
+            (chave, identificar_tipo(caminho.name).nome, total, mes_referencia, datetime.now().isoformat()),
+        )
+        if mes_referencia:
+            conexao.execute("INSERT OR REPLACE INTO meta VALUES ('mes_referencia', ?)", (mes_referencia,))
+
+    if descartadas:
+        logger.warning(f"Dataset CNPJ: {descartadas} linhas malformadas descartadas em {caminho.name}")
+    logger.info(f"Dataset CNPJ: {caminho.name} importado ({total} linhas)")
+    return total
+
+
+# ========== CONSULTA ==========
+
+CONSULTA_SQL = """
+SELECT e.*, m.razao_social, m.natureza_juridica, m.capital_social, m.porte,
+       mun.nome AS municipio_nome, c.descricao AS cnae_descricao,
+       (SELECT valor FROM meta WHERE chave = 'mes_referencia') AS mes_referencia
+FROM estabelecimentos e
+LEFT JOIN empresas m ON m.cnpj_basico = substr(e.cnpj, 1, 8)
+LEFT JOIN municipios mun ON mun.codigo = e.municipio
+LEFT JOIN cnaes c ON c.codigo = e.cnae_principal
+WHERE e.cnpj = ?
+"""
+
+
+class CNPJDataset:
+    """
+    Leitura do índice SQLite (somente leitura, uma conexão por thread)
+
+    A conexão é reaberta se o arquivo for substituído (inode diferente),
+    por exemplo quando o índice é reconstruído do zero.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+
+    def disponivel(self) -> bool:
+        return os.path.exists(self.caminho)
+
+    def _conexao(self) -> sqlite3.Connection:
+        inode = os.stat(self.caminho).st_ino
+        if getattr(self._local, 'inode', None) != inode:
+            conexao = sqlite3.connect(f'file:{self.caminho}?mode=ro', uri=True)
+            conexao.row_factory = sqlite3.Row
+            self._local.conexao, self._local.inode = conexao, inode
+        return self._local.conexao
+
+    def buscar(self, cnpj_clean: str) -> Optional[Dict[str, Any]]:
+        """Linha do estabelecimento com empresa/município/CNAE (None se ausente)"""
+        if not self.disponivel():
+            return None
+        row = self._conexao().execute(CONSULTA_SQL, (cnpj_clean,)).fetchone()
+        return dict(row) if row else None
+
+    def meta(self) -> Dict[str, Any]:
+        if not self.disponivel():
+            return {'disponivel': False}
+        conexao = self._conexao()
+        valores = dict(conexao.execute('SELECT chave, valor FROM meta').fetchall())
+        arquivos = conexao.execute('SELECT COUNT(*) FROM arquivos').fetchone()[0]
+        return {
+            'disponivel': True,
+            'mes_referencia': valores.get('mes_referencia', ''),
+            'arquivos_importados': arquivos,
+        }
+
+
+class LocalDatasetProvider:
+    """Provedor de CNPJ sobre o índice local, no formato normalizado das APIs"""
+
+    nome = 'BaseLocal'
+
+    def __init__(self, dataset: Optional[CNPJDataset] = None):
+        self.dataset = dataset or CNPJDataset(get_dataset_config()['PATH'])
+
+    def consultar(self, cnpj_clean: str) -> Optional[Dict[str, Any]]:
+        """Resultado normalizado ou None (CNPJ fora do índice / índice ausente)"""
+        try:
+            row = self.dataset.buscar(cnpj_clean)
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao consultar base local de CNPJ: {e}")
+            return None
+        if row is None or not row.get('razao_social'):
+            return None
+        return self.normalizar(cnpj_clean, row)
+
+    def normalizar(self, cnpj: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        logradouro = ' '.join(filter(None, [row['tipo_logradouro'], row['logradouro']]))
+        return ResultadoCNPJ(
+            fonte=self.nome,
+            cnpj=formatar_cnpj(cnpj),
+            razao_social=row['razao_social'],
+            nome_fantasia=row['nome_fantasia'] or '',
+            situacao=SITUACOES.get(row['situacao'], row['situacao'] or ''),
+            endereco=Endereco(
+                logradouro=logradouro,
+                numero=row['numero'] or '',
+                complemento=row['complemento'] or '',
+                bairro=row['bairro'] or '',
+                municipio=row['municipio_nome'] or row['municipio'] or '',
+                uf=row['uf'] or '',
+                cep=row['cep'] or '',
+            ),
+            telefone=row['telefone'] or '',
+            email=(row['email'] or '').lower(),
+            atividade_principal=row['cnae_descricao'] or '',
+            data_consulta=row['mes_referencia'] or '',
+            raw_data=row,
+        ).to_dict()
+
+
+_provider: Optional[LocalDatasetProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_local_provider() -> Optional[LocalDatasetProvider]:
+    """Provedor local do processo (None se desabilitado em RECEITA_DATASET)"""
+    global _provider
+    config = get_dataset_config()
+    if not config['ENABLED']:
+        return None
+    if _provider is None or _provider.dataset.caminho != config['PATH']:
+        with _provider_lock:
+            if _provider is None or _provider.dataset.caminho != config['PATH']:
+                _provider = LocalDatasetProvider(CNPJDataset(config['PATH']))
+    return _provider
@@ -0,0 +1,82 @@
+"""
+Latências observadas por provedor de CNPJ
+MultiBPO - Receita Federal
+
+Janela deslizante (últimas N consultas) por provedor, em memória do
+processo. Alimenta o delay adaptativo do modo hedged (p95 do primário).
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+JANELA_PADRAO = 200
+
+
+def percentil(valores, q: float) -> Optional[float]:
+    """Percentil por nearest-rank (q entre 0 e 1)"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, math.ceil(q * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class LatencyTracker:
+    """Registra (latência, sucesso) das últimas consultas de cada provedor"""
+
+    def __init__(self, janela: int = JANELA_PADRAO):
+        self.janela = janela
+        self._amostras: Dict[str, Deque[Tuple[float, bool]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, segundos: float, sucesso: bool) -> None:
+        with self._lock:
+            amostras = self._amostras.get(provider)
+            if amostras is None:
+                amostras = self._amostras[provider] = deque(maxlen=self.janela)
+            amostras.append((segundos, sucesso))
+
+    def latencias(self, provider: str, apenas_sucesso: bool = True):
+        with self._lock:
+            amostras = list(self._amostras.get(provider, ()))
+        return [seg for seg, ok in amostras if ok or not apenas_sucesso]
+
+    def percentile(self, provider: str, q: float) -> Optional[float]:
+        """Percentil das consultas bem-sucedidas (None sem amostras)"""
+        return percentil(self.latencias(provider), q)
+
+    def amostras(self, provider: str) -> int:
+        with self._lock:
+            return len(self._amostras.get(provider, ()))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Resumo por provedor (latências em ms)"""
+        with self._lock:
+            providers = {nome: list(amostras) for nome, amostras in self._amostras.items()}
+
+        resumo = {}
+        for nome, amostras in providers.items():
+            ok = [seg for seg, sucesso in amostras if sucesso]
+            resumo[nome] = {
+                'amostras': len(amostras),
+                'taxa_sucesso': round(len(ok) / len(amostras), 4) if amostras else None,
+                'p50_ms': round(percentil(ok, 0.50) * 1000, 1) if ok else None,
+                'p95_ms': round(percentil(ok, 0.95) * 1000, 1) if ok else None,
+                'p99_ms': round(percentil(ok, 0.99) * 1000, 1) if ok else None,
+            }
+        return resumo
+
+    def reset(self) -> None:
+        with self._lock:
+            self._amostras.clear()
+
+
+_tracker = LatencyTracker()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """Tracker compartilhado do processo"""
+    return _tracker
@@ -0,0 +1,320 @@
+"""
+Limites de uso dos provedores de CNPJ
+MultiBPO - Receita Federal
+
+Dois mecanismos:
+
+- ProviderLimiter: quantas consultas simultâneas cada provedor recebe deste
+  processo (RECEITA_HTTP['MAX_CONCURRENT'], por padrão o POOL_SIZE da sessão)
+- RateLimiter: orçamento de chamadas por provedor (token bucket) no cache
+  compartilhado, ou seja, somado entre todos os workers. ReceitaWS aceita
+  poucas requisições por minuto; sem orçamento as rajadas viram 429.
+  O bucket respeita o Retry-After devolvido pelo provedor.
+
+Consultas em lote (prioridade_lote) esperam mais por uma ficha, mas não
+consomem a reserva deixada para o tráfego interativo.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .sessions import get_http_config
+from .shared import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_RATE_LIMIT_CONFIG = {
+    'ENABLED': True,
+    'MAX_WAIT': 2.0,                # Espera máxima por ficha (interativo) antes de pular o provedor
+    'MAX_WAIT_LOTE': 30.0,          # Espera máxima por ficha em consultas de lote
+    'RESERVA_INTERATIVA': 0.34,     # Fração do BURST que o lote não pode consumir
+    'RETRY_AFTER_PADRAO': 60,       # Pausa após 429 sem header Retry-After
+    'KEY_PREFIX': 'receita:ratelimit',
+    # Provedores sem entrada não têm limite de taxa
+    'PROVIDERS': {
+        'ReceitaWS': {'RATE': 3, 'PERIOD': 60, 'BURST': 3},
+    },
+}
+
+
+def get_rate_limit_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_RATE_LIMIT)"""
+    config = dict(DEFAULT_RATE_LIMIT_CONFIG)
+    config.update(getattr(settings, 'RECEITA_RATE_LIMIT', {}))
+    return config
+
+
+_prioridade_lote = contextvars.ContextVar('receita_prioridade_lote', default=False)
+
+
+class ProviderLimiter:
+    """Semáforo por provedor, recriado após fork (como o SessionRegistry)"""
+
+    def __init__(self):
+        self._semaforos: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _semaforo(self, provider: str) -> threading.BoundedSemaphore:
+        if os.getpid() != self._pid:
+            with self._lock:
+                if os.getpid() != self._pid:
+                    self._semaforos = {}
+                    self._pid = os.getpid()
+        semaforo = self._semaforos.get(provider)
+        if semaforo is None:
+            with self._lock:
+                semaforo = self._semaforos.get(provider)
+                if semaforo is None:
+                    config = get_http_config(provider)
+                    limite = config['MAX_CONCURRENT'] or config['POOL_SIZE']
+                    semaforo = self._semaforos[provider] = threading.BoundedSemaphore(limite)
+        return semaforo
+
+    @contextmanager
+    def vaga(self, provider: str) -> Iterator[bool]:
+        """
+        Reserva uma vaga do provedor
+
+        Produz False se não houver vaga dentro de ACQUIRE_TIMEOUT; quem
+        chama deve tratar como provedor indisponível e seguir para o próximo.
+        """
+        semaforo = self._semaforo(provider)
+        obtida = semaforo.acquire(timeout=get_http_config(provider)['ACQUIRE_TIMEOUT'])
+        if not obtida:
+            logger.warning(f"Limite de concorrência atingido para {provider}")
+        try:
+            yield obtida
+        finally:
+            if obtida:
+                semaforo.release()
+
+    @asynccontextmanager
+    async def avaga(self, provider: str) -> AsyncIterator[bool]:
+        """
+        Versão assíncrona de vaga(): compartilha o mesmo semáforo
+
+        O semáforo é de threads, então a espera é feita por tentativas
+        não bloqueantes com backoff curto para não travar o event loop.
+        """
+        semaforo = self._semaforo(provider)
+        prazo = time.monotonic() + get_http_config(provider)['ACQUIRE_TIMEOUT']
+        espera = 0.005
+        obtida = semaforo.acquire(blocking=False)
+        while not obtida and time.monotonic() < prazo:
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 0.1)
+            obtida = semaforo.acquire(blocking=False)
+        if not obtida:
+            logger.warning(f"Limite de concorrência atingido para {provider}")
+        try:
+            yield obtida
+        finally:
+            if obtida:
+                semaforo.release()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._semaforos = {}
+
+
+_limiter = ProviderLimiter()
+
+
+def get_provider_limiter() -> ProviderLimiter:
+    """Limiter compartilhado do processo"""
+    return _limiter
+
+
+# ========== ORÇAMENTO DE CHAMADAS (TOKEN BUCKET) ==========
+
+class TokenBucket:
+    """
+    Token bucket de um provedor com estado no cache compartilhado
+
+    O cache não tem compare-and-swap, então a leitura/atualização do bucket
+    é serializada por um lock curto via cache.add (como a prova do breaker).
+    """
+
+    def __init__(self, provider: str, limite: Dict[str, Any], config: Dict[str, Any]):
+        self.provider = provider
+        self.capacidade = float(limite.get('BURST') or limite['RATE'])
+        self.taxa = limite['RATE'] / limite['PERIOD']      # fichas por segundo
+        self.config = config
+
+    def tentar(self, reserva: float = 0.0) -> float:
+        """
+        Consome uma ficha se houver (deixando `reserva` fichas no bucket)
+
+        Returns:
+            0 se consumiu; senão segundos até haver ficha disponível
+        """
+        cache = get_shared_cache()
+        with self._travado(cache):
+            agora = time.time()
+            bloqueado_ate = cache.get(self._chave('bloqueado_ate')) or 0
+            if bloqueado_ate > agora:
+                return bloqueado_ate - agora
+
+            fichas = self._fichas(cache, agora)
+            if fichas - 1 >= reserva:
+                self._gravar(cache, fichas - 1, agora)
+                return 0.0
+            return (1 + reserva - fichas) / self.taxa
+
+    def penalizar(self, segundos: float) -> None:
+        """Provedor pediu para esperar (429/Retry-After): zera o bucket até lá"""
+        cache = get_shared_cache()
+        ate = time.time() + segundos
+        with self._travado(cache):
+            cache.set(self._chave('bloqueado_ate'), ate, timeout=int(segundos) + 1)
+            self._gravar(cache, 0.0, ate)
+        logger.warning(f"Rate limit de {self.provider}: pausado por {segundos:.0f}s (Retry-After)")
+
+    def status(self) -> Dict[str, Any]:
+        cache = get_shared_cache()
+        agora = time.time()
+        bloqueado_ate = cache.get(self._chave('bloqueado_ate')) or 0
+        return {
+            'fichas': round(max(0.0, self._fichas(cache, agora)), 2),
+            'capacidade': self.capacidade,
+            'por_minuto': round(self.taxa * 60, 2),
+            'bloqueado_por': round(max(0.0, bloqueado_ate - agora), 1),
+        }
+
+    def reset(self) -> None:
+        get_shared_cache().delete_many([self._chave('bucket'), self._chave('bloqueado_ate')])
+
+    # ========== INTERNOS ==========
+
+    def _chave(self, sufixo: str) -> str:
+        return f"{self.config['KEY_PREFIX']}:{self.provider}:{sufixo}"
+
+    def _fichas(self, cache, agora: float) -> float:
+        estado = cache.get(self._chave('bucket'))
+        if estado is None:
+            return self.capacidade
+        return min(self.capacidade, estado['fichas'] + (agora - estado['em']) * self.taxa)
+
+    def _gravar(self, cache, fichas: float, em: float) -> None:
+        # Expira quando o bucket estaria cheio de novo: ausência = cheio
+        timeout = int((self.capacidade - fichas) / self.taxa) + 1
+        cache.set(self._chave('bucket'), {'fichas': fichas, 'em': em}, timeout=timeout)
+
+    @contextmanager
+    def _travado(self, cache) -> Iterator[None]:
+        chave, token = self._chave('lock'), uuid.uuid4().hex
+        prazo = time.monotonic() + 0.5
+        obtido = cache.add(chave, token, timeout=1)
+        while not obtido and time.monotonic() < prazo:
+            time.sleep(0.002)
+            obtido = cache.add(chave, token, timeout=1)
+        if not obtido:
+            # Dono do lock morreu no meio: segue sem ele (expira em 1s)
+            logger.debug(f"Rate limit de {self.provider}: lock do bucket não obtido")
+        try:
+            yield
+        finally:
+            if obtido and cache.get(chave) == token:
+                cache.delete(chave)
+
+
+class RateLimiter:
+    """Orçamento de chamadas externas por provedor, compartilhado entre workers"""
+
+    def bucket(self, provider: str) -> Optional[TokenBucket]:
+        """Bucket do provedor (None se desabilitado ou sem limite configurado)"""
+        config = get_rate_limit_config()
+        limite = config['PROVIDERS'].get(provider)
+        if not config['ENABLED'] or not limite:
+            return None
+        return TokenBucket(provider, limite, config)
+
+    def adquirir(self, provider: str) -> bool:
+        """
+        Obtém uma ficha do provedor, esperando se couber no prazo
+
+        Returns:
+            False se a ficha não sai dentro de MAX_WAIT (MAX_WAIT_LOTE em lote);
+            quem chama trata como provedor indisponível e segue para o próximo
+        """
+        bucket = self.bucket(provider)
+        if bucket is None:
+            return True
+        reserva, prazo = self._politica(bucket)
+        while True:
+            espera = bucket.tentar(reserva)
+            if espera == 0:
+                return True
+            if time.monotonic() + espera > prazo:
+                logger.info(f"Rate limit de {provider}: sem ficha em {espera:.1f}s, pulando provedor")
+                return False
+            time.sleep(espera)
+
+    async def aadquirir(self, provider: str) -> bool:
+        """Versão assíncrona de adquirir()"""
+        bucket = self.bucket(provider)
+        if bucket is None:
+            return True
+        reserva, prazo = self._politica(bucket)
+        tentar = sync_to_async(bucket.tentar, thread_sensitive=False)
+        while True:
+            espera = await tentar(reserva)
+            if espera == 0:
+                return True
+            if time.monotonic() + espera > prazo:
+                logger.info(f"Rate limit de {provider}: sem ficha em {espera:.1f}s, pulando provedor")
+                return False
+            await asyncio.sleep(espera)
+
+    def penalizar(self, provider: str, segundos: Optional[float]) -> None:
+        """Aplica o Retry-After (ou RETRY_AFTER_PADRAO) recebido do provedor"""
+        bucket = self.bucket(provider)
+        if bucket is not None:
+            bucket.penalizar(segundos if segundos is not None else bucket.config['RETRY_AFTER_PADRAO'])
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Orçamento atual de cada provedor limitado (health check)"""
+        buckets = (self.bucket(nome) for nome in get_rate_limit_config()['PROVIDERS'])
+        return {bucket.provider: bucket.status() for bucket in buckets if bucket is not None}
+
+    def reset(self) -> None:
+        config = get_rate_limit_config()
+        for nome, limite in config['PROVIDERS'].items():
+            if limite:
+                TokenBucket(nome, limite, config).reset()
+
+    def _politica(self, bucket: TokenBucket):
+        if _prioridade_lote.get():
+            return bucket.capacidade * bucket.config['RESERVA_INTERATIVA'], \
+                time.monotonic() + bucket.config['MAX_WAIT_LOTE']
+        return 0.0, time.monotonic() + bucket.config['MAX_WAIT']
+
+
+@contextmanager
+def prioridade_lote() -> Iterator[None]:
+    """Marca as consultas do bloco como lote (não consomem a reserva interativa)"""
+    token = _prioridade_lote.set(True)
+    try:
+        yield
+    finally:
+        _prioridade_lote.reset(token)
+
+
+_rate_limiter = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Rate limiter do processo (o estado vive no cache compartilhado)"""
+    return _rate_limiter
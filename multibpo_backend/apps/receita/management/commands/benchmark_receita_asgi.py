@@ -0,0 +1,117 @@
+"""
+Django Management Command - Benchmark WSGI vs ASGI da consulta CNPJ
+MultiBPO - Receita Federal
+
+Dispara requisições concorrentes contra um stub lento da BrasilAPI:
+- wsgi: CNPJConsultaView (requests) com N threads, como gunicorn --threads N
+- asgi: cnpj_consulta_async (httpx) em um único event loop
+
+As requisições passam pelos handlers WSGI/ASGI do Django em processo
+(django.test.Client / AsyncClient), sem cache, todas com CNPJs distintos.
+O stub roda no mesmo processo e disputa CPU com o cliente; o teto do ASGI
+vem do custo por conexão do pool do httpcore, não da espera pela rede.
+
+Uso:
+    python manage.py benchmark_receita_asgi --requests 200 --threads 8 --delay-ms 200
+"""
+
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from apps.receita.cache import reset_cnpj_cache
+from apps.receita.latency import percentil
+from apps.receita.limits import get_provider_limiter
+from apps.receita.sessions import close_async_clients, close_sessions
+from apps.receita.stubs import StubCNPJServer
+
+
+class Command(BaseCommand):
+    help = 'Compara throughput de consultas CNPJ concorrentes em WSGI (threads) e ASGI (asyncio)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requisições por cenário')
+        parser.add_argument('--threads', type=int, default=8, help='Threads do cenário WSGI')
+        parser.add_argument('--concurrency', type=int, default=0,
+                            help='Requisições simultâneas no ASGI (0 = todas)')
+        parser.add_argument('--delay-ms', type=float, default=200.0, help='Latência artificial do stub (ms)')
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        threads = options['threads']
+        concurrency = options['concurrency'] or total
+        delay = options['delay_ms'] / 1000
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n⏱️  BENCHMARK WSGI x ASGI RECEITA - {total} requisições, stub com {options["delay_ms"]:.0f} ms\n'
+            + '=' * 60
+        ))
+
+        with StubCNPJServer(delays={'brasilapi': delay}) as stub:
+            with override_settings(
+                RECEITA_BRASILAPI_URL=stub.brasilapi_url,
+                RECEITA_RECEITAWS_URL=stub.receitaws_url,
+                RECEITA_HEDGE={'MODE': 'sequencial'},
+                # Limite por provedor não deve ser o gargalo de nenhum dos cenários
+                RECEITA_HTTP={'RETRIES': 0, 'MAX_CONCURRENT': total, 'ACQUIRE_TIMEOUT': 60},
+            ):
+                self._preparar()
+                wsgi = self._medir_wsgi(self._cnpjs(total, 1), threads)
+                self._reportar(f'wsgi ({threads} threads)', *wsgi)
+
+                self._preparar()
+                asgi = asyncio.run(self._medir_asgi(self._cnpjs(total, 2), concurrency))
+                self._reportar(f'asgi (1 loop, {concurrency} simult.)', *asgi)
+
+        self._preparar()
+        ganho = (total / asgi[1]) / (total / wsgi[1])
+        self.stdout.write(self.style.SUCCESS(f'\n🚀 ASGI: {ganho:.1f}x o throughput do WSGI'))
+
+    def _preparar(self):
+        reset_cnpj_cache()
+        close_sessions()
+        get_provider_limiter().reset()
+
+    def _cnpjs(self, total, rodada):
+        return [f'{rodada:02d}{i:08d}0001' for i in range(total)]
+
+    def _medir_wsgi(self, cnpjs, threads):
+        def consultar(cnpj):
+            inicio = time.perf_counter()
+            response = Client().get(reverse('receita:cnpj-consulta', args=[cnpj]))
+            return (time.perf_counter() - inicio) * 1000, response.status_code
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            resultados = list(executor.map(consultar, cnpjs))
+        return resultados, time.perf_counter() - inicio
+
+    async def _medir_asgi(self, cnpjs, concurrency):
+        client = AsyncClient()
+        semaforo = asyncio.Semaphore(concurrency)
+
+        async def consultar(cnpj):
+            async with semaforo:
+                inicio = time.perf_counter()
+                response = await client.get(reverse('receita:cnpj-consulta-async', args=[cnpj]))
+                return (time.perf_counter() - inicio) * 1000, response.status_code
+
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(consultar(cnpj) for cnpj in cnpjs))
+        duracao = time.perf_counter() - inicio
+        await close_async_clients()
+        return resultados, duracao
+
+    def _reportar(self, nome, resultados, duracao):
+        latencias = [ms for ms, _ in resultados]
+        erros = sum(1 for _, codigo in resultados if codigo != 200)
+        self.stdout.write(
+            f'{nome:<28} {len(resultados) / duracao:8.1f} req/s | total {duracao:6.2f} s | '
+            f'p50 {statistics.median(latencias):8.1f} ms | p95 {percentil(latencias, 0.95):8.1f} ms | '
+            f'erros {erros}'
+        )
@@ -0,0 +1,83 @@
+"""
+Django Management Command - Benchmark de conexões HTTP da Receita
+MultiBPO - Receita Federal
+
+Compara a latência de consultas CNPJ contra um stub local:
+- cold: requests.get() a cada chamada (novo TCP handshake por consulta)
+- warm: sessão compartilhada com pool keep-alive (apps.receita.sessions)
+- service: ReceitaFederalService.consultar_cnpj sem cache (caminho real)
+
+Uso:
+    python manage.py benchmark_receita_http --iterations 500 --delay-ms 0
+"""
+
+import statistics
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from apps.receita.latency import percentil
+from apps.receita.services import ReceitaFederalService
+from apps.receita.sessions import close_sessions, get_session
+from apps.receita.stubs import StubCNPJServer
+
+
+CNPJ = '11222333000181'
+
+
+class Command(BaseCommand):
+    help = 'Mede latência de conexão fria vs keep-alive contra um stub local da BrasilAPI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=300, help='Consultas por cenário')
+        parser.add_argument('--delay-ms', type=float, default=0.0, help='Latência artificial do stub (ms)')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        delay = options['delay_ms'] / 1000
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n⏱️  BENCHMARK HTTP RECEITA - {iterations} consultas por cenário\n' + '=' * 60
+        ))
+
+        with StubCNPJServer(delays={'brasilapi': delay}) as stub:
+            url = f'{stub.brasilapi_url}/{CNPJ}'
+
+            conexoes_antes = stub.conexoes
+            cold = self._medir(iterations, lambda: requests.get(url, timeout=(3.05, 10)).json())
+            self._reportar('cold (requests.get)', cold, stub.conexoes - conexoes_antes)
+
+            close_sessions()
+            session = get_session('BrasilAPI')
+            session.get(url, timeout=(3.05, 10)).json()   # aquece o pool
+            conexoes_antes = stub.conexoes
+            warm = self._medir(iterations, lambda: session.get(url, timeout=(3.05, 10)).json())
+            self._reportar('warm (sessão pool)', warm, stub.conexoes - conexoes_antes)
+
+            with override_settings(RECEITA_BRASILAPI_URL=stub.brasilapi_url):
+                service = ReceitaFederalService()
+                conexoes_antes = stub.conexoes
+                servico = self._medir(iterations, lambda: service.consultar_cnpj(CNPJ, usar_cache=False))
+                self._reportar('service (sem cache)', servico, stub.conexoes - conexoes_antes)
+
+        close_sessions()
+        ganho = statistics.mean(cold) / statistics.mean(warm) if warm else 0
+        self.stdout.write(self.style.SUCCESS(f'\n🚀 Keep-alive: {ganho:.1f}x mais rápido que conexão fria (média)'))
+
+    def _medir(self, iterations, func):
+        amostras = []
+        for _ in range(iterations):
+            inicio = time.perf_counter()
+            func()
+            amostras.append((time.perf_counter() - inicio) * 1000)
+        return amostras
+
+    def _reportar(self, nome, amostras, conexoes):
+        p95 = percentil(amostras, 0.95)
+        self.stdout.write(
+            f'{nome:<22} média {statistics.mean(amostras):7.3f} ms | '
+            f'p50 {statistics.median(amostras):7.3f} ms | p95 {p95:7.3f} ms | '
+            f'conexões TCP {conexoes}'
+        )
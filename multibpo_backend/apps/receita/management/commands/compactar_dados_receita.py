@@ -0,0 +1,74 @@
+"""
+Django Management Command - Compacta dados_receita_federal já gravados
+MultiBPO - Receita Federal
+
+Reaplica RECEITA_PROJECAO['PERSISTIR'] às linhas existentes de Escritorio e
+Contador, removendo raw_data e demais campos fora da projeção. Linhas já
+compactadas não são regravadas.
+
+Uso:
+    python manage.py compactar_dados_receita --dry-run
+    python manage.py compactar_dados_receita --batch-size 1000
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.contadores.models import Contador, Escritorio
+from apps.receita.projecao import projetar_dados_receita
+
+
+def _tamanho(dados) -> int:
+    return len(json.dumps(dados, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+class Command(BaseCommand):
+    help = 'Remove de dados_receita_federal os campos fora de RECEITA_PROJECAO (ex.: raw_data)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Linhas por transação')
+        parser.add_argument('--dry-run', action='store_true', help='Só calcula a economia, sem gravar')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            f'\n🗜️  COMPACTAÇÃO dados_receita_federal{" (dry-run)" if options["dry_run"] else ""}\n' + '=' * 60
+        ))
+
+        for model in (Escritorio, Contador):
+            alteradas, antes, depois = self._compactar(model, options['batch_size'], options['dry_run'])
+            economia = 1 - depois / antes if antes else 0
+            self.stdout.write(
+                f'✅ {model.__name__:<12} {alteradas:>7} linhas compactadas  '
+                f'{antes / 1024:>10.1f} KB → {depois / 1024:>10.1f} KB (-{economia:.0%})'
+            )
+
+    def _compactar(self, model, batch_size: int, dry_run: bool):
+        alteradas, antes, depois = 0, 0, 0
+        pendentes = []
+
+        def gravar():
+            if pendentes and not dry_run:
+                # bulk_update: não passa por save()/full_clean() nem mexe em updated_at
+                with transaction.atomic():
+                    model.objects.bulk_update(pendentes, ['dados_receita_federal'])
+            pendentes.clear()
+
+        linhas = model.objects.exclude(dados_receita_federal={}).only('pk', 'dados_receita_federal')
+        for obj in linhas.iterator(chunk_size=batch_size):
+            dados = obj.dados_receita_federal
+            if not isinstance(dados, dict):
+                continue
+            compactado = projetar_dados_receita(dados)
+            tamanho_antes, tamanho_depois = _tamanho(dados), _tamanho(compactado)
+            antes += tamanho_antes
+            depois += tamanho_depois
+            if compactado != dados:
+                obj.dados_receita_federal = compactado
+                pendentes.append(obj)
+                alteradas += 1
+                if len(pendentes) >= batch_size:
+                    gravar()
+        gravar()
+        return alteradas, antes, depois
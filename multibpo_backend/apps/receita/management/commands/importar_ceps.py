@@ -0,0 +1,50 @@
+"""
+Django Management Command - Carrega a tabela local de CEPs
+MultiBPO - Receita Federal
+
+Alimenta o SQLite de RECEITA_CEP['BASE_LOCAL'] a partir de CSVs com
+cabeçalho (cep;logradouro;complemento;bairro;municipio;uf;ibge). Com a
+tabela carregada, CEPs conhecidos são resolvidos sem rede.
+
+Uso:
+    python manage.py importar_ceps ceps_sp.csv ceps_rj.csv
+    python manage.py importar_ceps ceps.csv --db /tmp/cep.sqlite3 --encoding latin-1
+"""
+
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.receita.cep import conectar_escrita, get_cep_config, importar_csv
+
+
+class Command(BaseCommand):
+    help = 'Carrega CSVs de CEPs na tabela local usada pelo CEPService'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivos', nargs='+', help='CSVs com cabeçalho')
+        parser.add_argument('--db', help='Caminho do SQLite (padrão: RECEITA_CEP["BASE_LOCAL"])')
+        parser.add_argument('--encoding', default='utf-8')
+
+    def handle(self, *args, **options):
+        caminho_db = options['db'] or get_cep_config()['BASE_LOCAL']
+        if not caminho_db:
+            raise CommandError('Informe --db ou configure RECEITA_CEP["BASE_LOCAL"]')
+
+        faltando = [a for a in options['arquivos'] if not Path(a).is_file()]
+        if faltando:
+            raise CommandError(f'Arquivos inexistentes: {", ".join(faltando)}')
+
+        self.stdout.write(self.style.SUCCESS(f'\n📮 IMPORTAÇÃO CEPs → {caminho_db}\n' + '=' * 60))
+
+        conexao = conectar_escrita(caminho_db)
+        try:
+            for arquivo in options['arquivos']:
+                inicio = time.perf_counter()
+                with open(arquivo, encoding=options['encoding'], newline='') as f:
+                    linhas = importar_csv(conexao, f)
+                self.stdout.write(f'✅ {Path(arquivo).name:<40} {linhas:>9} CEPs '
+                                  f'({time.perf_counter() - inicio:.1f}s)')
+        finally:
+            conexao.close()
@@ -0,0 +1,76 @@
+"""
+Django Management Command - Importa os dados abertos de CNPJ da Receita
+MultiBPO - Receita Federal
+
+Constrói/atualiza o índice SQLite usado pelo LocalDatasetProvider a partir
+dos arquivos públicos (Empresas, Estabelecimentos, Municípios, CNAEs),
+soltos ou em ZIP. Arquivos de outros tipos (Sócios, Simples...) são ignorados.
+
+Uso:
+    python manage.py importar_dataset_cnpj /dados/dados_abertos_cnpj/2025-01/
+    python manage.py importar_dataset_cnpj Empresas0.zip --mes-referencia 2025-01 --db /tmp/cnpj.sqlite3
+"""
+
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.receita.dataset import (
+    conectar_escrita, get_dataset_config, identificar_tipo, importar_arquivo,
+    inferir_mes_referencia, listar_arquivos,
+)
+
+
+class Command(BaseCommand):
+    help = 'Importa (ou atualiza) o índice local de CNPJs a partir dos dados abertos da Receita Federal'
+
+    def add_arguments(self, parser):
+        parser.add_argument('caminhos', nargs='+', help='Arquivos (.zip/CSV) ou diretórios do dump')
+        parser.add_argument('--db', help='Caminho do índice SQLite (padrão: RECEITA_DATASET["PATH"])')
+        parser.add_argument('--batch-size', type=int, help='Linhas por transação')
+        parser.add_argument('--mes-referencia', default='',
+                            help='Mês do dump (AAAA-MM); inferido do diretório se omitido')
+        parser.add_argument('--forcar', action='store_true', help='Reimporta arquivos já importados')
+
+    def handle(self, *args, **options):
+        config = get_dataset_config()
+        caminho_db = options['db'] or config['PATH']
+        batch_size = options['batch_size'] or config['BATCH_SIZE']
+
+        faltando = [c for c in options['caminhos'] if not Path(c).exists()]
+        if faltando:
+            raise CommandError(f'Caminhos inexistentes: {", ".join(faltando)}')
+
+        arquivos = listar_arquivos(options['caminhos'])
+        if not arquivos:
+            raise CommandError('Nenhum arquivo de Empresas/Estabelecimentos/Municípios/CNAEs encontrado')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n📦 IMPORTAÇÃO DADOS ABERTOS CNPJ - {len(arquivos)} arquivos → {caminho_db}\n' + '=' * 60
+        ))
+
+        conexao = conectar_escrita(caminho_db)
+        inicio_total = time.perf_counter()
+        try:
+            for arquivo in arquivos:
+                mes = options['mes_referencia'] or inferir_mes_referencia(arquivo)
+                inicio = time.perf_counter()
+                linhas = importar_arquivo(conexao, arquivo, batch_size, mes, forcar=options['forcar'])
+                tipo = identificar_tipo(arquivo.name).nome
+
+                if linhas is None:
+                    self.stdout.write(f'⏭️  {arquivo.name:<45} {tipo:<17} já importado')
+                else:
+                    duracao = time.perf_counter() - inicio
+                    self.stdout.write(
+                        f'✅ {arquivo.name:<45} {tipo:<17} {linhas:>10} linhas '
+                        f'({linhas / duracao if duracao else 0:,.0f}/s)'
+                    )
+            conexao.execute('PRAGMA optimize')
+        finally:
+            conexao.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n🚀 Índice atualizado em {time.perf_counter() - inicio_total:.1f}s'
+        ))
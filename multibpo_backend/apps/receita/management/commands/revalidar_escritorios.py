@@ -0,0 +1,50 @@
+"""
+Django Management Command - Revalida a situação cadastral dos escritórios
+MultiBPO - Receita Federal
+
+Reconsulta na Receita os escritórios com verificação vencida (ativos e
+mais antigos primeiro) e atualiza situacao_cadastral, dados_receita_federal
+e verificado_em. Pensado para cron ou para rodar como processo dedicado
+com --loop.
+
+Uso:
+    python manage.py revalidar_escritorios
+    python manage.py revalidar_escritorios --limite 500 --dias 7
+    python manage.py revalidar_escritorios --loop
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.receita.revalidacao import get_revalidacao_config, revalidar_escritorios
+
+
+class Command(BaseCommand):
+    help = 'Reconsulta na Receita Federal os escritórios com situação cadastral vencida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, help='Máximo de escritórios por execução')
+        parser.add_argument('--dias', type=int, help='Idade máxima da última verificação')
+        parser.add_argument('--chunk', type=int, help='Escritórios por página')
+        parser.add_argument('--workers', type=int, help='Consultas simultâneas')
+        parser.add_argument('--loop', action='store_true', help='Repete a cada RECEITA_REVALIDACAO["INTERVAL"]')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('\n🔄 REVALIDAÇÃO SITUAÇÃO CADASTRAL\n' + '=' * 60))
+
+        while True:
+            inicio = time.perf_counter()
+            resumo = revalidar_escritorios(
+                limite=options['limite'],
+                idade_maxima_dias=options['dias'],
+                chunk=options['chunk'],
+                max_workers=options['workers'],
+            )
+            self.stdout.write(
+                f'✅ {resumo.verificados} verificados, {resumo.alterados} com situação alterada, '
+                f'{resumo.falhas} falhas em {time.perf_counter() - inicio:.1f}s'
+            )
+            if not options['loop']:
+                break
+            time.sleep(get_revalidacao_config()['INTERVAL'])
@@ -0,0 +1,41 @@
+"""
+Django Management Command - Sonda os provedores de CNPJ
+MultiBPO - Receita Federal
+
+Atualiza o snapshot lido pelos health checks (apps.receita.prober). Útil
+via cron/sidecar quando os workers web não devem fazer chamadas externas
+(RECEITA_PROBER['ENABLED'] = False nos workers).
+
+Uso:
+    python manage.py sondar_receita
+    python manage.py sondar_receita --loop
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.receita.prober import get_prober_config, sondar
+
+
+class Command(BaseCommand):
+    help = 'Sonda BrasilAPI/ReceitaWS e grava o snapshot usado pelos health checks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Repete a cada RECEITA_PROBER["INTERVAL"]')
+
+    def handle(self, *args, **options):
+        intervalo = get_prober_config()['INTERVAL']
+        self.stdout.write(self.style.SUCCESS('\n🩺 SONDAGEM PROVEDORES RECEITA\n' + '=' * 60))
+
+        while True:
+            snapshot = sondar()
+            for nome, status in snapshot['provedores'].items():
+                marcador = '✅' if status['ok'] else '❌'
+                erro = '' if status['ok'] else f"  {status['ultimo_erro']}"
+                self.stdout.write(
+                    f"{marcador} {nome:<10} {status['latencia_ms']:>8.1f} ms  breaker={status['breaker']}{erro}"
+                )
+            if not options['loop']:
+                break
+            time.sleep(intervalo)
@@ -0,0 +1,312 @@
+"""
+Métricas das consultas externas (CNPJ e CEP)
+MultiBPO - Receita Federal
+
+Cada chamada a um provedor registra provedor, resultado, status HTTP e
+latência; cada consulta registra a origem da resposta (nível do cache,
+base local ou fontes externas) e, quando foi às fontes, a profundidade do
+fallback (quantos provedores foram acionados até a resposta).
+
+Dois consumidores:
+
+- /api/v1/receita/metrics/: formato texto do Prometheus (0.0.4), contadores
+  e histogramas acumulados desde o início do processo
+- /api/v1/receita/metrics/resumo/: resumo em JSON da janela recente
+  (JANELA segundos), com percentis, para ajustar timeouts e hedge
+
+Os valores ficam em memória do processo, como o LatencyTracker: com vários
+workers cada um exporta a própria série (raspe cada worker ou agregue no
+Prometheus por instância).
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import requests
+from django.conf import settings
+
+from .latency import percentil
+
+
+DEFAULT_METRICS_CONFIG = {
+    'ENABLED': True,
+    'JANELA': 5 * 60,           # Segundos cobertos pelo resumo em JSON
+    'MAX_EVENTOS': 10000,       # Limite de eventos guardados para o resumo
+    'BUCKETS': [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],    # Histogramas (segundos)
+    'TOKEN': '',                # Se definido, exige "Authorization: Bearer <TOKEN>"
+}
+
+# Resultados de uma chamada a provedor
+SUCESSO = 'sucesso'
+NAO_ENCONTRADO = 'nao_encontrado'
+ERRO_HTTP = 'erro_http'
+TIMEOUT = 'timeout'
+ERRO = 'erro'
+LIMITADO = 'limitado'               # 429 / 503 com Retry-After
+BREAKER_ABERTO = 'breaker_aberto'   # Não chegou à rede
+SEM_COTA = 'sem_cota'               # Não chegou à rede (rate limit)
+SEM_VAGA = 'sem_vaga'               # Não chegou à rede (limite de concorrência)
+
+# Origens de uma consulta
+ORIGEM_EXTERNA = 'externa'
+ORIGEM_BASE_LOCAL = 'base_local'
+
+
+def get_metrics_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_METRICS)"""
+    config = dict(DEFAULT_METRICS_CONFIG)
+    config.update(getattr(settings, 'RECEITA_METRICS', {}))
+    return config
+
+
+def classificar_erro(erro: Exception) -> Tuple[str, Optional[int]]:
+    """Exceção de uma chamada (requests ou httpx) → (resultado, status HTTP)"""
+    response = getattr(erro, 'response', None)
+    http_status = getattr(response, 'status_code', None) if response is not None else None
+    if http_status == 404:
+        return NAO_ENCONTRADO, http_status
+    if http_status is not None:
+        return ERRO_HTTP, http_status
+    if isinstance(erro, (requests.Timeout, httpx.TimeoutException)):
+        return TIMEOUT, None
+    return ERRO, None
+
+
+def _escapar(valor: Any) -> str:
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _rotulos(nomes: Tuple[str, ...], valores: Tuple[Any, ...], extra: str = '') -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador com rótulos (tipo counter do Prometheus)"""
+
+    tipo = 'counter'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, valores: Tuple[str, ...], quantidade: float = 1) -> None:
+        self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def amostras(self) -> Iterable[str]:
+        for valores, total in sorted(self._valores.items()):
+            yield f'{self.nome}{_rotulos(self.rotulos, valores)} {_numero(total)}'
+
+    def valores(self) -> Dict[Tuple[str, ...], float]:
+        return dict(self._valores)
+
+
+class Histograma:
+    """Histograma com rótulos e buckets fixos (tipo histogram do Prometheus)"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...], buckets: List[float]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = sorted(float(b) for b in buckets)
+        # valores -> [contagem por bucket (não cumulativa, último = +Inf), soma]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observar(self, valores: Tuple[str, ...], segundos: float) -> None:
+        serie = self._series.get(valores)
+        if serie is None:
+            serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+        serie[0][bisect.bisect_left(self.buckets, segundos)] += 1
+        serie[1] += segundos
+
+    def amostras(self) -> Iterable[str]:
+        limites = [*self.buckets, float('inf')]
+        for valores, (contagens, soma) in sorted(self._series.items()):
+            acumulado = 0
+            for limite, contagem in zip(limites, contagens):
+                acumulado += contagem
+                rotulos = _rotulos(self.rotulos, valores, f'le="{_numero(limite)}"')
+                yield f'{self.nome}_bucket{rotulos} {acumulado}'
+            yield f'{self.nome}_sum{_rotulos(self.rotulos, valores)} {_numero(soma)}'
+            yield f'{self.nome}_count{_rotulos(self.rotulos, valores)} {acumulado}'
+
+
+class MetricsRegistry:
+    """
+    Registro das métricas do processo
+
+    Os contadores/histogramas alimentam a exposição Prometheus; uma fila
+    limitada de eventos recentes alimenta o resumo em JSON.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or get_metrics_config()
+        self._lock = threading.Lock()
+        self._iniciar()
+
+    def _iniciar(self) -> None:
+        buckets = self.config['BUCKETS']
+        self.chamadas = Contador(
+            'receita_provider_requests_total',
+            'Chamadas aos provedores externos por resultado e status HTTP',
+            ('provider', 'outcome', 'status'),
+        )
+        self.latencia = Histograma(
+            'receita_provider_latency_seconds',
+            'Latência das chamadas que chegaram ao provedor',
+            ('provider', 'outcome'), buckets,
+        )
+        self.consultas = Contador(
+            'receita_lookups_total',
+            'Consultas por origem da resposta (nível do cache, base local ou externa)',
+            ('kind', 'origin'),
+        )
+        self.duracao = Histograma(
+            'receita_lookup_duration_seconds',
+            'Duração total da consulta por origem da resposta',
+            ('kind', 'origin'), buckets,
+        )
+        self.fallback = Contador(
+            'receita_fallback_depth_total',
+            'Consultas externas por número de provedores acionados até a resposta',
+            ('depth', 'success'),
+        )
+        self._eventos: Deque[Tuple[Any, ...]] = deque(maxlen=self.config['MAX_EVENTOS'])
+
+    # ========== REGISTRO ==========
+
+    def registrar_chamada(self, provider: str, resultado: str, status: Optional[int] = None,
+                          segundos: Optional[float] = None) -> None:
+        """Uma chamada a provedor (segundos=None quando não chegou à rede)"""
+        if not self.config['ENABLED']:
+            return
+        with self._lock:
+            self.chamadas.inc((provider, resultado, str(status or '')))
+            if segundos is not None:
+                self.latencia.observar((provider, resultado), segundos)
+            self._eventos.append((time.time(), 'chamada', provider, resultado, status, segundos))
+
+    def registrar_consulta(self, tipo: str, origem: str, segundos: float) -> None:
+        """Uma consulta completa (tipo 'cnpj' ou 'cep')"""
+        if not self.config['ENABLED']:
+            return
+        with self._lock:
+            self.consultas.inc((tipo, origem))
+            self.duracao.observar((tipo, origem), segundos)
+            self._eventos.append((time.time(), 'consulta', tipo, origem, None, segundos))
+
+    def registrar_fallback(self, profundidade: int, sucesso: bool) -> None:
+        """Quantos provedores uma consulta externa acionou até a resposta"""
+        if not self.config['ENABLED']:
+            return
+        with self._lock:
+            self.fallback.inc((str(profundidade), 'true' if sucesso else 'false'))
+            self._eventos.append((time.time(), 'fallback', str(profundidade), sucesso, None, None))
+
+    # ========== EXPOSIÇÃO ==========
+
+    def render_prometheus(self) -> str:
+        """Métricas no formato texto do Prometheus (version=0.0.4)"""
+        linhas = []
+        with self._lock:
+            for metrica in (self.chamadas, self.latencia, self.consultas, self.duracao, self.fallback):
+                linhas.append(f'# HELP {metrica.nome} {metrica.ajuda}')
+                linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+                linhas.extend(metrica.amostras())
+        return '\n'.join(linhas) + '\n'
+
+    def resumo(self, janela: Optional[float] = None) -> Dict[str, Any]:
+        """Resumo dos eventos dos últimos `janela` segundos (latências em ms)"""
+        janela = self.config['JANELA'] if janela is None else janela
+        desde = time.time() - janela
+        with self._lock:
+            eventos = [evento for evento in self._eventos if evento[0] >= desde]
+
+        provedores: Dict[str, Dict[str, Any]] = {}
+        consultas: Dict[str, Dict[str, Any]] = {}
+        fallback: Dict[str, Dict[str, int]] = {}
+
+        for _, evento, chave, valor, http_status, segundos in eventos:
+            if evento == 'chamada':
+                item = provedores.setdefault(chave, {'chamadas': 0, 'resultados': {}, 'status': {}, '_lat': []})
+                item['chamadas'] += 1
+                item['resultados'][valor] = item['resultados'].get(valor, 0) + 1
+                if http_status:
+                    item['status'][str(http_status)] = item['status'].get(str(http_status), 0) + 1
+                if segundos is not None:
+                    item['_lat'].append(segundos)
+            elif evento == 'consulta':
+                item = consultas.setdefault(chave, {'total': 0, 'origens': {}, '_lat': {}})
+                item['total'] += 1
+                item['origens'][valor] = item['origens'].get(valor, 0) + 1
+                item['_lat'].setdefault(valor, []).append(segundos)
+            else:
+                item = fallback.setdefault(chave, {'sucesso': 0, 'falha': 0})
+                item['sucesso' if valor else 'falha'] += 1
+
+        for item in provedores.values():
+            latencias = item.pop('_lat')
+            respondidas = sum(n for r, n in item['resultados'].items() if r in (SUCESSO, NAO_ENCONTRADO))
+            na_rede = len(latencias)
+            item['taxa_sucesso'] = round(respondidas / na_rede, 4) if na_rede else None
+            item['latencia'] = _percentis(latencias)
+
+        for item in consultas.values():
+            item['latencia'] = {origem: _percentis(valores) for origem, valores in item.pop('_lat').items()}
+
+        return {
+            'janela_segundos': janela,
+            'eventos': len(eventos),
+            'provedores': provedores,
+            'consultas': consultas,
+            'fallback': dict(sorted(fallback.items())),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._iniciar()
+
+
+def _percentis(segundos: List[float]) -> Dict[str, Optional[float]]:
+    def ms(q):
+        valor = percentil(segundos, q)
+        return round(valor * 1000, 1) if valor is not None else None
+
+    return {'amostras': len(segundos), 'p50_ms': ms(0.50), 'p95_ms': ms(0.95), 'p99_ms': ms(0.99)}
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Registro compartilhado do processo"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+def reset_metrics() -> None:
+    """Descarta o registro (nova leitura de RECEITA_METRICS; usado em testes)"""
+    global _registry
+    with _registry_lock:
+        _registry = None
@@ -0,0 +1,180 @@
+"""
+Sondagem em background dos provedores de CNPJ
+MultiBPO - Receita Federal
+
+Os health checks não consultam mais as APIs externas a cada chamada: uma
+thread por worker sonda os provedores a cada INTERVAL segundos e grava o
+resultado (status, latência, último erro) no cache compartilhado, junto
+com o resumo dos CNPJs de exemplo do endpoint de teste. Um lock
+no cache garante uma única sondagem por intervalo entre todos os workers,
+então o custo em cota externa não cresce com o número de réplicas.
+
+As views de health e de teste só leem esse snapshot (tempo constante). A thread é
+iniciada na primeira chamada de health do worker; em ambientes sem tráfego
+de health use `python manage.py sondar_receita --loop`.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .breaker import get_breaker
+from .latency import get_latency_tracker
+from .limits import prioridade_lote
+from .shared import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PROBER_CONFIG = {
+    'ENABLED': True,
+    'INTERVAL': 60,                 # Segundos entre sondagens (somando todos os workers)
+    'CNPJ': '07526557000100',       # CNPJ conhecido usado na sondagem (Petrobras)
+    'EXEMPLOS': [                   # CNPJs do endpoint de teste (resolvidos a cada sondagem)
+        '07526557000100',           # Petrobras
+        '33000167000101',           # Coca-Cola
+        '60746948000112',           # Magazine Luiza
+    ],
+    'KEY_PREFIX': 'receita:prober',
+}
+
+
+def get_prober_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_PROBER)"""
+    config = dict(DEFAULT_PROBER_CONFIG)
+    config.update(getattr(settings, 'RECEITA_PROBER', {}))
+    return config
+
+
+def _chave(config: Dict[str, Any], sufixo: str) -> str:
+    return f"{config['KEY_PREFIX']}:{sufixo}"
+
+
+def resumo_exemplo(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'success': result.get('success', False),
+        'razao_social': result.get('razao_social', 'N/A'),
+        'fonte': result.get('fonte', 'N/A')
+    }
+
+
+def sondar() -> Dict[str, Any]:
+    """
+    Sonda cada provedor uma vez e grava o snapshot no cache compartilhado
+
+    A chamada passa pelo mesmo caminho das consultas reais (breaker,
+    limite de concorrência e rate limit com prioridade de lote, para não
+    gastar a reserva do tráfego interativo). Os CNPJs de exemplo saem do
+    cache quando possível; os demais são consultados como lote.
+    """
+    from .batch import consultar_lote
+    from .services import ReceitaFederalService
+
+    config = get_prober_config()
+    service = ReceitaFederalService()
+    anterior = obter_snapshot() or {}
+    provedores = {}
+
+    for nome, metodo in service._provedores():
+        inicio = time.perf_counter()
+        with prioridade_lote():
+            result, _ = service._executar_provedor(nome, metodo, config['CNPJ'])
+        latencia_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        ok = bool(result.get('success'))
+
+        status = anterior.get('provedores', {}).get(nome, {})
+        provedores[nome] = {
+            'ok': ok,
+            'latencia_ms': latencia_ms,
+            'breaker': get_breaker(nome).estado(),
+            'verificado_em': timezone.now().isoformat(),
+            'ultimo_erro': status.get('ultimo_erro') if ok else result.get('message'),
+            'ultimo_erro_em': status.get('ultimo_erro_em') if ok else timezone.now().isoformat(),
+        }
+        if not ok:
+            logger.warning(f"Sondagem {nome}: {result.get('message')}")
+
+    exemplos = {
+        linha['cnpj']: resumo_exemplo(linha['resultado'])
+        for linha in consultar_lote(config['EXEMPLOS'], service=service)
+    }
+
+    snapshot = {
+        'gerado_em': time.time(),
+        'test_cnpj': any(p['ok'] for p in provedores.values()),
+        'provedores': provedores,
+        'exemplos': exemplos,
+        'latencias': get_latency_tracker().snapshot(),
+    }
+    # Mantido por várias rodadas: um worker lento não deixa o health sem dados
+    get_shared_cache().set(_chave(config, 'snapshot'), snapshot, timeout=config['INTERVAL'] * 10)
+    return snapshot
+
+
+def obter_snapshot() -> Optional[Dict[str, Any]]:
+    """Último snapshot gravado (None antes da primeira sondagem)"""
+    snapshot = get_shared_cache().get(_chave(get_prober_config(), 'snapshot'))
+    if snapshot is not None:
+        snapshot = dict(snapshot, idade_segundos=round(time.time() - snapshot['gerado_em'], 1))
+    return snapshot
+
+
+def sondar_se_vencido() -> Optional[Dict[str, Any]]:
+    """Sonda se nenhum worker sondou neste intervalo; senão não faz nada"""
+    config = get_prober_config()
+    if not get_shared_cache().add(_chave(config, 'lock'), os.getpid(), timeout=config['INTERVAL']):
+        return None
+    return sondar()
+
+
+class Prober:
+    """Thread de sondagem do processo (recriada após fork)"""
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    def garantir(self) -> None:
+        """Inicia a thread deste processo se ainda não estiver rodando"""
+        if not get_prober_config()['ENABLED']:
+            return
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._parar = threading.Event()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, args=(self._parar,),
+                                            name='receita-prober', daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            self._parar.set()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def _loop(self, parar: threading.Event) -> None:
+        while not parar.is_set():
+            try:
+                sondar_se_vencido()
+            except Exception as e:
+                logger.error(f"Erro na sondagem dos provedores: {e!r}")
+            parar.wait(get_prober_config()['INTERVAL'])
+
+
+_prober = Prober()
+
+
+def get_prober() -> Prober:
+    """Prober do processo"""
+    return _prober
@@ -0,0 +1,95 @@
+"""
+Projeção de campos das respostas de CNPJ
+MultiBPO - Receita Federal
+
+O resultado normalizado carrega em `raw_data` o payload inteiro do
+provedor, o que dobra ou triplica o tamanho da resposta e da linha gravada
+em `dados_receita_federal`. Aqui ficam:
+
+- a seleção de campos da API (?fields=razao_social,endereco.uf e ?include=raw)
+- a projeção do que é persistido nos models (RECEITA_PROJECAO['PERSISTIR'])
+"""
+
+import copy
+from typing import Any, Dict, Iterable, Optional, Set
+
+from django.conf import settings
+
+
+RAW = 'raw_data'
+
+# Chaves que sempre acompanham a resposta (contrato de sucesso/erro)
+CAMPOS_OBRIGATORIOS = ('success', 'error', 'message')
+
+DEFAULT_PROJECAO_CONFIG = {
+    # Campos gravados em dados_receita_federal (aceita caminhos com ponto)
+    'PERSISTIR': [
+        'fonte', 'cnpj', 'razao_social', 'nome_fantasia', 'situacao', 'endereco',
+        'telefone', 'email', 'atividade_principal', 'data_consulta', 'processado_em',
+    ],
+    'INCLUIR_RAW_PADRAO': False,    # raw_data na resposta da API sem ?include=raw
+}
+
+
+def get_projecao_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_PROJECAO)"""
+    config = dict(DEFAULT_PROJECAO_CONFIG)
+    config.update(getattr(settings, 'RECEITA_PROJECAO', {}))
+    return config
+
+
+def projetar(dados: Dict[str, Any], campos: Iterable[str]) -> Dict[str, Any]:
+    """
+    Copia de `dados` apenas os campos pedidos
+
+    Caminhos com ponto selecionam subcampos (`endereco.uf`); campos
+    ausentes são ignorados.
+    """
+    resultado: Dict[str, Any] = {}
+    for campo in campos:
+        origem, destino = dados, resultado
+        partes = campo.split('.')
+        for parte in partes[:-1]:
+            origem = origem.get(parte) if isinstance(origem, dict) else None
+            if not isinstance(origem, dict):
+                break
+            destino = destino.setdefault(parte, {})
+        else:
+            if isinstance(origem, dict) and partes[-1] in origem:
+                destino[partes[-1]] = copy.deepcopy(origem[partes[-1]])
+    return resultado
+
+
+def parse_campos(query_params) -> Dict[str, Any]:
+    """
+    Lê ?fields= e ?include= da query string
+
+    Returns:
+        {'campos': set ou None (todos), 'incluir_raw': bool}
+    """
+    def lista(nome: str) -> Set[str]:
+        return {c.strip() for valor in query_params.getlist(nome) for c in valor.split(',') if c.strip()}
+
+    campos = lista('fields') or None
+    incluir_raw = 'raw' in lista('include') or (campos is not None and RAW in campos) \
+        or get_projecao_config()['INCLUIR_RAW_PADRAO']
+    return {'campos': campos, 'incluir_raw': incluir_raw}
+
+
+def selecionar_campos(result: Dict[str, Any], campos: Optional[Set[str]] = None,
+                      incluir_raw: bool = False) -> Dict[str, Any]:
+    """Aplica a seleção de campos a um resultado de consulta (para a resposta da API)"""
+    if campos is not None:
+        selecionado = projetar(result, [*CAMPOS_OBRIGATORIOS, *campos])
+    else:
+        selecionado = {chave: valor for chave, valor in result.items() if chave != RAW}
+    if incluir_raw and RAW in result:
+        selecionado[RAW] = result[RAW]
+    return selecionado
+
+
+def projetar_dados_receita(dados: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Recorte de um resultado de consulta a ser persistido em dados_receita_federal"""
+    if not dados:
+        return {}
+    return projetar(dados, get_projecao_config()['PERSISTIR'])
@@ -0,0 +1,378 @@
+"""
+Provedores externos de CNPJ e normalização das respostas
+MultiBPO - Receita Federal
+
+Cada provedor declara a URL e um mapeamento de campos (destino → origem no
+payload). O mapeamento é compilado uma vez, na definição da classe, em um
+Normalizador que preenche o resultado tipado (ResultadoCNPJ) sem montar
+dicts à mão. O serviço (síncrono e assíncrono) só conhece a interface:
+nome, consultar(cnpj) e aconsultar(cnpj).
+
+Os provedores ativos, e sua ordem base, vêm de RECEITA_PROVIDERS['CNPJ']:
+nomes registrados aqui (@registrar_provedor) ou caminhos 'pacote.modulo.Classe'.
+O circuit breaker reordena pela saúde e o modo hedged os dispara em
+paralelo, então adicionar um provedor não exige mexer no serviço nem nas views.
+
+FakeProvider responde localmente, sem rede, para testes e benchmarks.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .sessions import get_async, get_session, get_timeout
+
+
+DEFAULT_PROVIDERS_CONFIG = {
+    'CNPJ': ['BrasilAPI', 'ReceitaWS'],     # Ordem base (o breaker reordena pela saúde)
+    'FAKE_LATENCIA': 0.0,                   # Segundos de espera simulada do FakeProvider
+    'FAKE_NAO_ENCONTRADOS': [],             # CNPJs que o FakeProvider responde como inexistentes
+}
+
+
+def get_providers_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_PROVIDERS)"""
+    config = dict(DEFAULT_PROVIDERS_CONFIG)
+    config.update(getattr(settings, 'RECEITA_PROVIDERS', {}))
+    return config
+
+
+# Situação cadastral (código da Receita → texto, layout oficial dos dados abertos)
+SITUACOES = {
+    '01': 'NULA',
+    '02': 'ATIVA',
+    '03': 'SUSPENSA',
+    '04': 'INAPTA',
+    '08': 'BAIXADA',
+}
+
+
+def situacao_texto(valor: Any) -> str:
+    """Código numérico da situação (2, '02') → texto ('ATIVA'); texto passa direto"""
+    texto = str(valor).strip()
+    if texto.isdigit():
+        return SITUACOES.get(texto.zfill(2), texto)
+    return texto
+
+
+def formatar_cnpj(cnpj: str) -> str:
+    """Formata CNPJ para XX.XXX.XXX/XXXX-XX"""
+    if len(cnpj) == 14:
+        return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+    return cnpj
+
+
+def resposta_erro(message: str) -> Dict[str, Any]:
+    """Resposta padronizada de erro"""
+    return {
+        'success': False,
+        'error': True,
+        'message': message,
+        'fonte': 'local'
+    }
+
+
+# ========== RESULTADO TIPADO ==========
+
+@dataclass(slots=True)
+class Endereco:
+    logradouro: str = ''
+    numero: str = ''
+    complemento: str = ''
+    bairro: str = ''
+    municipio: str = ''
+    uf: str = ''
+    cep: str = ''
+
+
+CAMPOS_ENDERECO = tuple(f.name for f in fields(Endereco))
+
+
+@dataclass(slots=True)
+class ResultadoCNPJ:
+    """Resultado normalizado de uma consulta de CNPJ (qualquer provedor)"""
+    fonte: str
+    cnpj: str
+    razao_social: str = ''
+    nome_fantasia: str = ''
+    situacao: str = ''      # Texto da Receita ('ATIVA', 'BAIXADA'...)
+    endereco: Endereco = field(default_factory=Endereco)
+    telefone: str = ''
+    email: str = ''
+    atividade_principal: str = ''
+    data_consulta: str = ''
+    raw_data: Any = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Formato de resposta do serviço (contrato das views e do cache)"""
+        endereco = self.endereco
+        return {
+            'success': True,
+            'fonte': self.fonte,
+            'cnpj': self.cnpj,
+            'razao_social': self.razao_social,
+            'nome_fantasia': self.nome_fantasia,
+            'situacao': self.situacao,
+            'endereco': {nome: getattr(endereco, nome) for nome in CAMPOS_ENDERECO},
+            'telefone': self.telefone,
+            'email': self.email,
+            'atividade_principal': self.atividade_principal,
+            'data_consulta': self.data_consulta,
+            'raw_data': self.raw_data,
+        }
+
+
+# ========== MAPEAMENTO DE CAMPOS ==========
+
+class Campo:
+    """
+    Origem de um campo no payload do provedor
+
+    Cada origem é um caminho com ponto (`atividade_principal.0.texto`);
+    vale a primeira não vazia, senão `padrao`.
+    """
+
+    __slots__ = ('origens', 'padrao', 'converter')
+
+    def __init__(self, *origens: str, padrao: Any = '', converter: Optional[Callable[[Any], Any]] = None):
+        self.origens = origens
+        self.padrao = padrao
+        self.converter = converter
+
+
+def _compilar_caminho(caminho: str) -> Callable[[Any], Any]:
+    partes = tuple(int(parte) if parte.isdigit() else parte for parte in caminho.split('.'))
+    if len(partes) == 1:
+        chave = partes[0]
+        return lambda dados: dados.get(chave)
+
+    def obter(dados: Any) -> Any:
+        for parte in partes:
+            try:
+                dados = dados[parte]
+            except (KeyError, IndexError, TypeError):
+                return None
+        return dados
+    return obter
+
+
+def _compilar_campo(spec: Any) -> Callable[[Dict[str, Any]], Any]:
+    if isinstance(spec, str):
+        spec = Campo(spec)
+    elif isinstance(spec, tuple):
+        spec = Campo(*spec)
+
+    leitores = [_compilar_caminho(origem) for origem in spec.origens]
+    padrao, converter = spec.padrao, spec.converter
+
+    def resolver(dados: Dict[str, Any]) -> Any:
+        for ler in leitores:
+            valor = ler(dados)
+            if valor is not None and valor != '':
+                return converter(valor) if converter else valor
+        return padrao
+    return resolver
+
+
+class Normalizador:
+    """
+    Mapeamento compilado: payload do provedor → ResultadoCNPJ
+
+    Chaves do mapeamento são campos de ResultadoCNPJ (`endereco.<campo>`
+    para o endereço); valores são um caminho, uma tupla de caminhos
+    alternativos ou um Campo.
+    """
+
+    def __init__(self, mapeamento: Dict[str, Any]):
+        self._principal: List[Tuple[str, Callable]] = []
+        self._endereco: List[Tuple[str, Callable]] = []
+        for destino, spec in mapeamento.items():
+            grupo, _, nome = destino.rpartition('.')
+            if grupo not in ('', 'endereco') or (grupo and nome not in CAMPOS_ENDERECO):
+                raise ValueError(f"Campo de destino desconhecido no mapeamento: {destino}")
+            alvo = self._endereco if grupo else self._principal
+            alvo.append((nome, _compilar_campo(spec)))
+
+    def __call__(self, fonte: str, cnpj: str, dados: Dict[str, Any]) -> ResultadoCNPJ:
+        endereco = Endereco(**{nome: resolver(dados) for nome, resolver in self._endereco})
+        principal = {nome: resolver(dados) for nome, resolver in self._principal}
+        return ResultadoCNPJ(fonte=fonte, cnpj=formatar_cnpj(cnpj), endereco=endereco, raw_data=dados, **principal)
+
+
+# ========== PROVEDORES ==========
+
+class Provider:
+    """
+    Interface de um provedor de CNPJ
+
+    Subclasses definem `nome`, `mapeamento` e a URL (`url_setting` com
+    fallback em `url_padrao`); `erro()` identifica respostas 200 que
+    significam "não encontrado". consultar/aconsultar levantam as exceções
+    HTTP, tratadas pelo serviço (breaker, rate limit e métricas).
+    """
+
+    nome: str = ''
+    mapeamento: Dict[str, Any] = {}
+    url_setting: Optional[str] = None
+    url_padrao: str = ''
+    normalizador: Normalizador = Normalizador({})
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'mapeamento' in cls.__dict__:
+            cls.normalizador = Normalizador(cls.mapeamento)
+
+    def base_url(self) -> str:
+        return getattr(settings, self.url_setting, self.url_padrao) if self.url_setting else self.url_padrao
+
+    def url(self, cnpj: str) -> str:
+        return f"{self.base_url()}/{cnpj}"
+
+    def consultar(self, cnpj: str) -> Dict[str, Any]:
+        response = get_session(self.nome).get(self.url(cnpj), timeout=get_timeout(self.nome))
+        response.raise_for_status()
+        return self.resultado(cnpj, response.json())
+
+    async def aconsultar(self, cnpj: str) -> Dict[str, Any]:
+        response = await get_async(self.nome, self.url(cnpj))
+        response.raise_for_status()
+        return self.resultado(cnpj, response.json())
+
+    def resultado(self, cnpj: str, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """Payload do provedor → resposta do serviço (sucesso ou erro)"""
+        mensagem = self.erro(dados)
+        if mensagem is not None:
+            return resposta_erro(mensagem)
+        return self.normalizar(cnpj, dados).to_dict()
+
+    def normalizar(self, cnpj: str, dados: Dict[str, Any]) -> ResultadoCNPJ:
+        return self.normalizador(self.nome, cnpj, dados)
+
+    def erro(self, dados: Dict[str, Any]) -> Optional[str]:
+        """Mensagem se o payload indica CNPJ inexistente/erro; None se é um resultado"""
+        return None
+
+
+_registro: Dict[str, Type[Provider]] = {}
+
+
+def registrar_provedor(classe: Type[Provider]) -> Type[Provider]:
+    """Decorator: torna o provedor disponível pelo nome em RECEITA_PROVIDERS['CNPJ']"""
+    _registro[classe.nome] = classe
+    return classe
+
+
+@registrar_provedor
+class BrasilAPIProvider(Provider):
+    nome = 'BrasilAPI'
+    url_setting = 'RECEITA_BRASILAPI_URL'
+    url_padrao = 'https://brasilapi.com.br/api/cnpj/v1'
+    mapeamento = {
+        'razao_social': 'razao_social',
+        'nome_fantasia': 'nome_fantasia',
+        # situacao_cadastral é o código numérico (2); a descrição traz o texto
+        'situacao': Campo('descricao_situacao_cadastral', 'situacao_cadastral', padrao='ATIVA',
+                          converter=situacao_texto),
+        'endereco.logradouro': 'logradouro',
+        'endereco.numero': 'numero',
+        'endereco.complemento': 'complemento',
+        'endereco.bairro': 'bairro',
+        'endereco.municipio': 'municipio',
+        'endereco.uf': 'uf',
+        'endereco.cep': 'cep',
+        'telefone': ('telefone', 'ddd_telefone_1'),
+        'email': 'email',
+        'atividade_principal': 'atividade_principal.0.texto',
+        'data_consulta': 'ultima_atualizacao',
+    }
+
+
+@registrar_provedor
+class ReceitaWSProvider(Provider):
+    nome = 'ReceitaWS'
+    url_setting = 'RECEITA_RECEITAWS_URL'
+    url_padrao = 'https://www.receitaws.com.br/v1/cnpj'
+    mapeamento = {
+        'razao_social': 'nome',
+        'nome_fantasia': 'fantasia',
+        'situacao': Campo('situacao', padrao='ATIVA'),
+        'endereco.logradouro': 'logradouro',
+        'endereco.numero': 'numero',
+        'endereco.complemento': 'complemento',
+        'endereco.bairro': 'bairro',
+        'endereco.municipio': 'municipio',
+        'endereco.uf': 'uf',
+        'endereco.cep': 'cep',
+        'telefone': 'telefone',
+        'email': 'email',
+        'atividade_principal': 'atividade_principal.0.text',
+        'data_consulta': 'ultima_atualizacao',
+    }
+
+    def erro(self, dados: Dict[str, Any]) -> Optional[str]:
+        if dados.get('status') == 'ERROR':
+            return dados.get('message', 'Erro na consulta')
+        return None
+
+
+@registrar_provedor
+class FakeProvider(BrasilAPIProvider):
+    """
+    Provedor local, sem rede (testes e benchmarks)
+
+    Responde qualquer CNPJ com um payload no formato da BrasilAPI, após
+    FAKE_LATENCIA segundos; os de FAKE_NAO_ENCONTRADOS viram "não encontrado".
+    """
+
+    nome = 'Fake'
+
+    def consultar(self, cnpj: str) -> Dict[str, Any]:
+        config = get_providers_config()
+        if config['FAKE_LATENCIA']:
+            time.sleep(config['FAKE_LATENCIA'])
+        return self._responder(cnpj, config)
+
+    async def aconsultar(self, cnpj: str) -> Dict[str, Any]:
+        config = get_providers_config()
+        if config['FAKE_LATENCIA']:
+            await asyncio.sleep(config['FAKE_LATENCIA'])
+        return self._responder(cnpj, config)
+
+    def _responder(self, cnpj: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        from .stubs import payload_brasilapi
+
+        if cnpj in config['FAKE_NAO_ENCONTRADOS']:
+            return resposta_erro("CNPJ não encontrado")
+        return self.resultado(cnpj, payload_brasilapi(cnpj))
+
+
+# ========== REGISTRO ==========
+
+_instancias: Dict[Type[Provider], Provider] = {}
+_instancias_lock = threading.Lock()
+
+
+def _resolver_classe(referencia: str) -> Type[Provider]:
+    if referencia in _registro:
+        return _registro[referencia]
+    if '.' in referencia:
+        return import_string(referencia)
+    raise ValueError(f"Provedor de CNPJ desconhecido: {referencia}")
+
+
+def get_provedores() -> List[Provider]:
+    """Provedores ativos (RECEITA_PROVIDERS['CNPJ']) na ordem configurada"""
+    provedores = []
+    for referencia in get_providers_config()['CNPJ']:
+        classe = _resolver_classe(referencia)
+        instancia = _instancias.get(classe)
+        if instancia is None:
+            with _instancias_lock:
+                instancia = _instancias.setdefault(classe, classe())
+        provedores.append(instancia)
+    return provedores
@@ -0,0 +1,193 @@
+"""
+Revalidação periódica da situação cadastral dos escritórios
+MultiBPO - Receita Federal
+
+Escritorio.situacao_cadastral e dados_receita_federal só eram gravados na
+criação via CNPJ e ficavam desatualizados. Este pipeline reconsulta os
+escritórios em ordem de prioridade (ativos primeiro, verificação mais
+antiga primeiro) e grava o resultado com bulk_update.
+
+- paginação por keyset sobre (verificado_em, id): memória constante em
+  tabelas grandes, sem OFFSET
+- consultas em paralelo via consultar_lote (pool limitado, prioridade de
+  lote no rate limit dos provedores)
+- falhas de consulta não marcam verificado_em: entram de novo na próxima
+  execução
+- escritórios cadastrados com a Receita indisponível (razão social
+  provisória = CNPJ, ver BPORegistroSerializer) recebem razão social e nome
+  fantasia, assim como os contadores com o mesmo nome provisório
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .batch import consultar_lote
+from .projecao import projetar_dados_receita
+from .providers import situacao_texto
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_REVALIDACAO_CONFIG = {
+    'IDADE_MAXIMA_DIAS': 30,    # Reverifica escritórios verificados há mais que isso
+    'CHUNK': 200,               # Escritórios por página (consulta + bulk_update)
+    'MAX_WORKERS': 4,           # Consultas simultâneas
+    'INTERVAL': 60 * 60,        # Pausa entre execuções no modo --loop
+}
+
+CAMPOS_ATUALIZADOS = ['razao_social', 'nome_fantasia', 'situacao_cadastral', 'dados_receita_federal',
+                      'verificado_em', 'updated_at']
+
+
+def get_revalidacao_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_REVALIDACAO)"""
+    config = dict(DEFAULT_REVALIDACAO_CONFIG)
+    config.update(getattr(settings, 'RECEITA_REVALIDACAO', {}))
+    return config
+
+
+def normalizar_situacao(valor: Any) -> Optional[str]:
+    """
+    Situação do provedor → choice de Escritorio.situacao_cadastral
+
+    Os provedores devolvem o texto ('ATIVA'); o código numérico (2) ainda
+    é aceito para resultados em cache gravados antes da normalização.
+    Valores desconhecidos devolvem None.
+    """
+    from apps.contadores.models import Escritorio
+
+    texto = situacao_texto(valor if valor is not None else '').lower()
+    return texto if texto in dict(Escritorio.SITUACAO_CHOICES) else None
+
+
+@dataclass
+class ResumoRevalidacao:
+    verificados: int = 0
+    alterados: int = 0
+    falhas: int = 0
+
+    def somar(self, outro: 'ResumoRevalidacao') -> None:
+        self.verificados += outro.verificados
+        self.alterados += outro.alterados
+        self.falhas += outro.falhas
+
+
+def _paginas(queryset, tamanho: int) -> Iterator[List[Any]]:
+    """
+    Páginas por keyset: (verificado_em, id) crescente, nulos antes
+
+    Cada página filtra a partir da última linha da anterior, então o custo
+    não cresce com a posição e linhas atualizadas no meio não deslocam a
+    paginação. O cursor é lido antes do yield: quem consome a página grava
+    verificado_em nas próprias instâncias.
+    """
+    campos = ['id', 'cnpj', 'razao_social', 'nome_fantasia', 'situacao_cadastral', 'dados_receita_federal',
+              'verificado_em']
+
+    ultimo_id = 0
+    while True:
+        pagina = list(queryset.filter(verificado_em__isnull=True, id__gt=ultimo_id)
+                      .order_by('id').only(*campos)[:tamanho])
+        if not pagina:
+            break
+        ultimo_id = pagina[-1].id
+        yield pagina
+
+    cursor = None
+    while True:
+        pendentes = queryset.filter(verificado_em__isnull=False)
+        if cursor is not None:
+            verificado_em, ultimo_id = cursor
+            pendentes = pendentes.filter(
+                Q(verificado_em__gt=verificado_em) |
+                Q(verificado_em=verificado_em, id__gt=ultimo_id)
+            )
+        pagina = list(pendentes.order_by('verificado_em', 'id').only(*campos)[:tamanho])
+        if not pagina:
+            break
+        cursor = (pagina[-1].verificado_em, pagina[-1].id)
+        yield pagina
+
+
+def _revalidar_pagina(pagina: List[Any], max_workers: int) -> ResumoRevalidacao:
+    from apps.contadores.models import Contador, Escritorio
+
+    resumo = ResumoRevalidacao()
+    por_cnpj = {''.join(filter(str.isdigit, e.cnpj)): e for e in pagina}
+    agora = timezone.now()
+    atualizados = []
+    nomeados = []
+
+    for linha in consultar_lote(list(por_cnpj), max_workers=max_workers, usar_cache=False):
+        escritorio = por_cnpj.get(linha['cnpj'])
+        result = linha['resultado']
+        if escritorio is None or not result.get('success'):
+            resumo.falhas += 1
+            continue
+
+        situacao = normalizar_situacao(result.get('situacao')) or escritorio.situacao_cadastral
+        if situacao != escritorio.situacao_cadastral:
+            logger.info(f"Escritório {escritorio.cnpj}: situação {escritorio.situacao_cadastral} → {situacao}")
+            resumo.alterados += 1
+
+        if escritorio.razao_social == escritorio.cnpj and result.get('razao_social'):
+            escritorio.razao_social = result['razao_social']
+            escritorio.nome_fantasia = result.get('nome_fantasia') or result['razao_social']
+            nomeados.append(escritorio)
+
+        escritorio.situacao_cadastral = situacao
+        escritorio.dados_receita_federal = projetar_dados_receita(result)
+        escritorio.verificado_em = agora
+        escritorio.updated_at = agora
+        atualizados.append(escritorio)
+
+    if atualizados:
+        with transaction.atomic():
+            Escritorio.objects.bulk_update(atualizados, CAMPOS_ATUALIZADOS)
+            for escritorio in nomeados:
+                Contador.objects.filter(escritorio=escritorio, nome_completo=escritorio.cnpj).update(
+                    nome_completo=escritorio.razao_social)
+    resumo.verificados = len(atualizados)
+    return resumo
+
+
+def revalidar_escritorios(limite: Optional[int] = None, idade_maxima_dias: Optional[int] = None,
+                          chunk: Optional[int] = None, max_workers: Optional[int] = None) -> ResumoRevalidacao:
+    """
+    Reconsulta os escritórios com verificação vencida
+
+    Args:
+        limite: máximo de escritórios nesta execução (None = todos os vencidos)
+        idade_maxima_dias: verificações mais novas que isso são puladas
+        chunk: escritórios por página
+        max_workers: consultas simultâneas
+    """
+    from apps.contadores.models import Escritorio
+
+    config = get_revalidacao_config()
+    idade = config['IDADE_MAXIMA_DIAS'] if idade_maxima_dias is None else idade_maxima_dias
+    chunk = chunk or config['CHUNK']
+    max_workers = max_workers or config['MAX_WORKERS']
+    corte = timezone.now() - timedelta(days=idade)
+
+    vencidos = Escritorio.objects.filter(Q(verificado_em__isnull=True) | Q(verificado_em__lt=corte))
+    resumo = ResumoRevalidacao()
+    restantes = limite
+
+    for ativo in (True, False):
+        for pagina in _paginas(vencidos.filter(ativo=ativo), chunk):
+            if restantes is not None:
+                pagina = pagina[:restantes]
+            resumo.somar(_revalidar_pagina(pagina, max_workers))
+            if restantes is not None:
+                restantes -= len(pagina)
+                if restantes <= 0:
+                    return resumo
+    return resumo
@@ -4,38 +4,91 @@ MultiBPO Sub-Fase 2.2.3 - Receita Federal Integration
 """
 
 import requests
+import contextvars
 import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from django.conf import settings
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+from .breaker import get_breaker, ordenar_por_saude
+from .cache import get_cnpj_cache
+from .dataset import get_local_provider
+from .latency import get_latency_tracker
+from .limits import get_provider_limiter, get_rate_limiter
+from .metrics import (
+    BREAKER_ABERTO, LIMITADO, NAO_ENCONTRADO, ORIGEM_BASE_LOCAL, ORIGEM_EXTERNA, SEM_COTA, SEM_VAGA, SUCESSO,
+    classificar_erro, get_metrics,
+)
+from .providers import get_provedores, resposta_erro
+from .sessions import retry_after
+from .singleflight import get_single_flight
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_HEDGE_CONFIG = {
+    'MODE': 'sequencial',       # 'sequencial' | 'hedged' | 'paralelo'
+    'DELAY': 0.5,               # Delay fixo (s) antes de acionar o próximo provedor
+    'ADAPTIVE': True,           # Usar p95 observado do provedor primário como delay
+    'MIN_DELAY': 0.05,
+    'MAX_DELAY': 3.0,
+    'MIN_AMOSTRAS': 20,         # Amostras mínimas antes de confiar no p95
+    'MAX_WORKERS': 16,          # Threads do executor compartilhado
+}
+
+
+def get_hedge_config() -> Dict[str, Any]:
+    """Configuração efetiva do fan-out (defaults + settings.RECEITA_HEDGE)"""
+    config = dict(DEFAULT_HEDGE_CONFIG)
+    config.update(getattr(settings, 'RECEITA_HEDGE', {}))
+    return config
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Executor do processo para consultas concorrentes aos provedores"""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_hedge_config()['MAX_WORKERS'],
+                    thread_name_prefix='receita-provedor',
+                )
+                _executor_pid = os.getpid()
+    return _executor
+
+
 class ReceitaFederalService:
     """
     Serviço para consulta de dados na Receita Federal
     
     Implementa integração com APIs públicas e privadas
     para consulta de CNPJ, situação cadastral, etc.
-    """
     
-    # URLs das APIs (configuráveis via settings)
-    BRASILAPI_URL = "https://brasilapi.com.br/api/cnpj/v1"
-    RECEITAWS_URL = "https://www.receitaws.com.br/v1/cnpj"
-    
-    def __init__(self):
-        self.timeout = getattr(settings, 'RECEITA_TIMEOUT', 10)
-        self.headers = {
-            'User-Agent': 'MultiBPO/1.0 (Contabilidade)',
-            'Accept': 'application/json'
-        }
+    Os provedores externos (URL e normalização) ficam em providers.py,
+    configurados por RECEITA_PROVIDERS; sessões HTTP são do processo,
+    então instanciar o serviço por request é barato.
+    """
     
-    def consultar_cnpj(self, cnpj: str) -> Dict[str, Any]:
+    def consultar_cnpj(self, cnpj: str, usar_cache: bool = True) -> Dict[str, Any]:
         """
         Consulta dados de CNPJ na Receita Federal
         
+        Passa primeiro pelo cache de dois níveis (LRU local + cache
+        backend compartilhado) e depois pelo índice local dos dados abertos.
+        Só consulta as APIs externas se nenhum dos dois tiver o CNPJ.
+        
         Args:
             cnpj: CNPJ formatado ou apenas números
+            usar_cache: se False, ignora o cache na leitura (ainda grava o resultado)
             
         Returns:
             Dict com dados da empresa ou erro
@@ -45,115 +98,274 @@ class ReceitaFederalService:
         if len(cnpj_clean) != 14:
             return self._error_response("CNPJ deve ter 14 dígitos")
         
-        # Tentar múltiplas APIs para maior confiabilidade
-        for api_name, api_method in [
-            ('BrasilAPI', self._consultar_brasilapi),
-            ('ReceitaWS', self._consultar_receitaws),
-        ]:
-            try:
-                logger.info(f"Consultando CNPJ {cnpj_clean} via {api_name}")
-                result = api_method(cnpj_clean)
-                
-                if result.get('success'):
-                    logger.info(f"CNPJ {cnpj_clean} encontrado via {api_name}")
-                    return result
-                    
-            except Exception as e:
-                logger.warning(f"Erro ao consultar {api_name}: {e}")
+        inicio = time.perf_counter()
+        result, origem = self._resolver(cnpj_clean, usar_cache)
+        get_metrics().registrar_consulta('cnpj', origem, time.perf_counter() - inicio)
+        return result
+    
+    def _resolver(self, cnpj_clean: str, usar_cache: bool) -> Tuple[Dict[str, Any], str]:
+        """Cache → base local → fontes externas; devolve (resultado, origem)"""
+        if usar_cache:
+            result, nivel = self._consultar_cache_nivel(cnpj_clean)
+            if result is not None:
+                return result, nivel
+        
+        result = self.consultar_base_local(cnpj_clean)
+        if result is not None:
+            return result, ORIGEM_BASE_LOCAL
+        
+        return self._consultar_e_armazenar(cnpj_clean), ORIGEM_EXTERNA
+    
+    def consultar_base_local(self, cnpj_clean: str) -> Optional[Dict[str, Any]]:
+        """
+        Consulta o índice local dos dados abertos (RECEITA_DATASET)
+        
+        Returns:
+            Resultado normalizado ou None (índice ausente/desabilitado ou CNPJ fora dele)
+        """
+        provider = get_local_provider()
+        result = provider.consultar(cnpj_clean) if provider else None
+        if result is not None:
+            logger.debug(f"CNPJ {cnpj_clean} servido pela base local")
+        return result
+    
+    def consultar_cache(self, cnpj_clean: str) -> Optional[Dict[str, Any]]:
+        """
+        Consulta apenas o cache (sem rede)
+        
+        Entradas stale são devolvidas e revalidadas em background.
+        
+        Returns:
+            Resultado cacheado ou None em caso de miss
+        """
+        return self._consultar_cache_nivel(cnpj_clean)[0]
+    
+    def _consultar_cache_nivel(self, cnpj_clean: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Como consultar_cache, devolvendo também o nível ('memoria', 'compartilhado', 'stale')"""
+        result, nivel = get_cnpj_cache().get(cnpj_clean, revalidar=self._revalidar_cache)
+        if result is not None:
+            logger.debug(f"CNPJ {cnpj_clean} servido pelo cache ({nivel})")
+        return result, nivel
+    
+    def _consultar_e_armazenar(self, cnpj_clean: str) -> Dict[str, Any]:
+        """
+        Consulta as fontes externas e grava o resultado no cache
+        
+        Consultas simultâneas ao mesmo CNPJ (neste e em outros workers)
+        compartilham uma única chamada externa (RECEITA_SINGLEFLIGHT).
+        """
+        def consultar():
+            result, nao_encontrado = self._consultar_fontes(cnpj_clean)
+            self._armazenar(cnpj_clean, result, nao_encontrado)
+            return result
+        
+        return get_single_flight().executar(cnpj_clean, consultar, self._resultado_de_outro_worker(cnpj_clean))
+    
+    def _resultado_de_outro_worker(self, cnpj_clean: str) -> Callable[[float], Optional[Dict[str, Any]]]:
+        """Leitura do resultado que outro worker gravar no cache (sem contar miss)"""
+        return lambda desde: get_cnpj_cache().get_recente(cnpj_clean, desde)
+    
+    def _armazenar(self, cnpj_clean: str, result: Dict[str, Any], nao_encontrado: bool) -> None:
+        """Grava o resultado de uma consulta externa no cache"""
+        cache = get_cnpj_cache()
+        if result.get('success'):
+            cache.set(cnpj_clean, result)
+        elif nao_encontrado:
+            # Só cacheia negativo quando alguma fonte respondeu "não existe";
+            # falhas de rede/timeout não devem bloquear novas tentativas
+            cache.set_negativo(cnpj_clean, result)
+    
+    def _revalidar_cache(self, cnpj_clean: str) -> None:
+        """Revalidação em background de entradas stale"""
+        result, _ = self._consultar_fontes(cnpj_clean)
+        if result.get('success'):
+            get_cnpj_cache().set(cnpj_clean, result)
+    
+    def _provedores(self) -> List[Tuple[str, Callable[[str], Dict[str, Any]]]]:
+        """Provedores externos ordenados pelo health score (circuito aberto por último)"""
+        provedores = {provedor.nome: provedor for provedor in get_provedores()}
+        return [(nome, provedores[nome].consultar) for nome in ordenar_por_saude(provedores)]
+    
+    def _consultar_fontes(self, cnpj_clean: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Consulta as APIs externas conforme RECEITA_HEDGE['MODE']
+        
+        - sequencial: um provedor por vez, fallback após falha
+        - hedged: aciona o próximo provedor se o atual não responder em
+          DELAY (ou no p95 observado, se ADAPTIVE)
+        - paralelo: dispara todos os provedores ao mesmo tempo
+        
+        Returns:
+            (resultado, nao_encontrado) - nao_encontrado indica que alguma
+            fonte afirmou que o CNPJ não existe (resultado cacheável)
+        """
+        provedores = self._provedores()
+        config = get_hedge_config()
+        modo = config['MODE']
+        
+        if modo == 'sequencial' or len(provedores) < 2:
+            return self._consultar_sequencial(cnpj_clean, provedores)
+        
+        delay = 0.0 if modo == 'paralelo' else self._hedge_delay(provedores[0][0], config)
+        return self._consultar_concorrente(cnpj_clean, provedores, delay)
+    
+    def _consultar_sequencial(self, cnpj_clean: str, provedores) -> Tuple[Dict[str, Any], bool]:
+        """Tentar múltiplas APIs em sequência para maior confiabilidade"""
+        nao_encontrado = False
+        
+        for profundidade, (api_name, api_method) in enumerate(provedores, start=1):
+            result, negativo = self._executar_provedor(api_name, api_method, cnpj_clean)
+            if result.get('success'):
+                get_metrics().registrar_fallback(profundidade, True)
+                return result, False
+            nao_encontrado = nao_encontrado or negativo
+        
+        get_metrics().registrar_fallback(len(provedores), False)
+        return self._error_response("CNPJ não encontrado em nenhuma fonte"), nao_encontrado
+    
+    def _consultar_concorrente(self, cnpj_clean: str, provedores, delay: float) -> Tuple[Dict[str, Any], bool]:
+        """
+        Fan-out hedged: o primeiro resultado bem-sucedido vence
+        
+        Um provedor que falha aciona o próximo imediatamente, sem esperar
+        o delay. Perdedores ainda na fila são cancelados; os que já estão
+        em execução são abandonados (o resultado é descartado) e terminam
+        dentro do próprio read timeout. Cada tarefa roda numa cópia do
+        contexto de quem chamou: prioridade_lote (ContextVar) vale também
+        nas threads do executor.
+        """
+        executor = _get_executor()
+        fila = list(provedores)
+        pendentes = {}
+        nao_encontrado = False
+        
+        def lancar():
+            api_name, api_method = fila.pop(0)
+            contexto = contextvars.copy_context()   # Um por tarefa: um Context não roda em duas threads
+            futuro = executor.submit(contexto.run, self._executar_provedor, api_name, api_method, cnpj_clean)
+            pendentes[futuro] = api_name
+        
+        lancar()
+        while fila and delay <= 0:
+            lancar()
+        
+        while pendentes:
+            feitos, _ = wait(list(pendentes), timeout=delay if fila else None, return_when=FIRST_COMPLETED)
+            
+            if not feitos:
+                logger.info(f"Hedge: acionando próximo provedor para CNPJ {cnpj_clean} após {delay:.3f}s")
+                lancar()
                 continue
+            
+            for futuro in feitos:
+                pendentes.pop(futuro)
+                result, negativo = futuro.result()
+                if result.get('success'):
+                    for perdedor in pendentes:
+                        perdedor.cancel()
+                    get_metrics().registrar_fallback(len(provedores) - len(fila), True)
+                    return result, False
+                nao_encontrado = nao_encontrado or negativo
+                if fila:
+                    lancar()
+        
+        get_metrics().registrar_fallback(len(provedores), False)
+        return self._error_response("CNPJ não encontrado em nenhuma fonte"), nao_encontrado
+    
+    def _hedge_delay(self, primario: str, config: Dict[str, Any]) -> float:
+        """Delay antes do hedge: p95 do primário (se houver amostras) ou DELAY fixo"""
+        delay = config['DELAY']
+        if config['ADAPTIVE']:
+            tracker = get_latency_tracker()
+            if tracker.amostras(primario) >= config['MIN_AMOSTRAS']:
+                p95 = tracker.percentile(primario, 0.95)
+                if p95 is not None:
+                    delay = p95
+        return min(max(delay, config['MIN_DELAY']), config['MAX_DELAY'])
+    
+    def _executar_provedor(self, api_name: str, api_method: Callable[[str], Dict[str, Any]],
+                           cnpj_clean: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Executa um provedor respeitando circuit breaker, rate limit e limite
+        de concorrência, registrando latência e resultado no breaker
+        
+        A ficha do rate limit sai antes da vaga de concorrência: a espera
+        por ficha (até MAX_WAIT_LOTE em lote) não pode segurar uma das
+        poucas vagas do provedor enquanto consultas interativas aguardam.
+        
+        Returns:
+            (resultado, nao_encontrado) - nunca levanta exceção
+        """
+        metrics = get_metrics()
+        breaker = get_breaker(api_name)
+        if not breaker.permite():
+            logger.info(f"Circuit breaker aberto: pulando {api_name} para CNPJ {cnpj_clean}")
+            metrics.registrar_chamada(api_name, BREAKER_ABERTO)
+            return self._error_response(f"{api_name} temporariamente indisponível"), False
+        
+        if not get_rate_limiter().adquirir(api_name):
+            metrics.registrar_chamada(api_name, SEM_COTA)
+            return self._error_response(f"{api_name} temporariamente indisponível"), False
+        
+        with get_provider_limiter().vaga(api_name) as liberado:
+            if not liberado:
+                metrics.registrar_chamada(api_name, SEM_VAGA)
+                return self._error_response(f"{api_name} temporariamente indisponível"), False
+            return self._executar_com_breaker(api_name, api_method, cnpj_clean, breaker)
+    
+    def _executar_com_breaker(self, api_name: str, api_method: Callable[[str], Dict[str, Any]],
+                              cnpj_clean: str, breaker) -> Tuple[Dict[str, Any], bool]:
+        """Chamada ao provedor com o resultado registrado no circuit breaker"""
+        metrics = get_metrics()
+        logger.info(f"Consultando CNPJ {cnpj_clean} via {api_name}")
+        inicio = time.perf_counter()
+        nao_encontrado = False
+        
+        try:
+            result = api_method(cnpj_clean)
+            if result.get('success'):
+                logger.info(f"CNPJ {cnpj_clean} encontrado via {api_name}")
+                resultado, http_status = SUCESSO, 200
+            else:
+                nao_encontrado = True
+                resultado, http_status = NAO_ENCONTRADO, 200
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                nao_encontrado = True
+            logger.warning(f"Erro ao consultar {api_name}: {e}")
+            result = self._error_response(f"Erro ao consultar {api_name}")
+            resultado, http_status = classificar_erro(e)
+            if self._limitado(api_name, e.response):
+                metrics.registrar_chamada(api_name, LIMITADO, http_status, time.perf_counter() - inicio)
+                return result, False
+        except Exception as e:
+            logger.warning(f"Erro ao consultar {api_name}: {e}")
+            result = self._error_response(f"Erro ao consultar {api_name}")
+            resultado, http_status = classificar_erro(e)
         
-        return self._error_response("CNPJ não encontrado em nenhuma fonte")
-    
-    def _consultar_brasilapi(self, cnpj: str) -> Dict[str, Any]:
-        """Consulta via BrasilAPI"""
-        url = f"{self.BRASILAPI_URL}/{cnpj}"
-        
-        response = requests.get(url, headers=self.headers, timeout=self.timeout)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        return {
-            'success': True,
-            'fonte': 'BrasilAPI',
-            'cnpj': self._format_cnpj(cnpj),
-            'razao_social': data.get('razao_social', ''),
-            'nome_fantasia': data.get('nome_fantasia', ''),
-            'situacao': data.get('situacao_cadastral', 'ATIVA'),
-            'endereco': {
-                'logradouro': data.get('logradouro', ''),
-                'numero': data.get('numero', ''),
-                'complemento': data.get('complemento', ''),
-                'bairro': data.get('bairro', ''),
-                'municipio': data.get('municipio', ''),
-                'uf': data.get('uf', ''),
-                'cep': data.get('cep', '')
-            },
-            'telefone': self._extract_phone(data),
-            'email': self._extract_email(data),
-            'atividade_principal': data.get('atividade_principal', [{}])[0].get('texto', ''),
-            'data_consulta': data.get('ultima_atualizacao', ''),
-            'raw_data': data
-        }
-    
-    def _consultar_receitaws(self, cnpj: str) -> Dict[str, Any]:
-        """Consulta via ReceitaWS (backup)"""
-        url = f"{self.RECEITAWS_URL}/{cnpj}"
-        
-        response = requests.get(url, headers=self.headers, timeout=self.timeout)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if data.get('status') == 'ERROR':
-            return self._error_response(data.get('message', 'Erro na consulta'))
-        
-        return {
-            'success': True,
-            'fonte': 'ReceitaWS',
-            'cnpj': self._format_cnpj(cnpj),
-            'razao_social': data.get('nome', ''),
-            'nome_fantasia': data.get('fantasia', ''),
-            'situacao': data.get('situacao', 'ATIVA'),
-            'endereco': {
-                'logradouro': data.get('logradouro', ''),
-                'numero': data.get('numero', ''),
-                'complemento': data.get('complemento', ''),
-                'bairro': data.get('bairro', ''),
-                'municipio': data.get('municipio', ''),
-                'uf': data.get('uf', ''),
-                'cep': data.get('cep', '')
-            },
-            'telefone': data.get('telefone', ''),
-            'email': data.get('email', ''),
-            'atividade_principal': data.get('atividade_principal', [{}])[0].get('text', ''),
-            'data_consulta': data.get('ultima_atualizacao', ''),
-            'raw_data': data
-        }
-    
-    def _format_cnpj(self, cnpj: str) -> str:
-        """Formata CNPJ para XX.XXX.XXX/XXXX-XX"""
-        if len(cnpj) == 14:
-            return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
-        return cnpj
-    
-    def _extract_phone(self, data: Dict) -> str:
-        """Extrai telefone dos dados (diferentes formatos por API)"""
-        return (
-            data.get('telefone', '') or 
-            data.get('ddd_telefone_1', '') or
-            ''
-        )
-    
-    def _extract_email(self, data: Dict) -> str:
-        """Extrai email dos dados"""
-        return data.get('email', '')
+        # "Não encontrado" é resposta válida do provedor, não falha de disponibilidade
+        latencia = time.perf_counter() - inicio
+        sucesso = result.get('success', False) or nao_encontrado
+        metrics.registrar_chamada(api_name, resultado, http_status, latencia)
+        get_latency_tracker().record(api_name, latencia, sucesso)
+        breaker.registrar(sucesso, latencia)
+        return result, nao_encontrado
+    
+    def _limitado(self, api_name: str, response) -> bool:
+        """
+        Resposta de throttling (429, ou 503 com Retry-After)?
+        
+        Pausa o orçamento do provedor pelo Retry-After. Throttling não conta
+        como falha no circuit breaker: o rate limiter já segura as chamadas.
+        """
+        if response is None:
+            return False
+        espera = retry_after(response.headers)
+        if response.status_code != 429 and not (response.status_code == 503 and espera is not None):
+            return False
+        get_rate_limiter().penalizar(api_name, espera)
+        return True
     
     def _error_response(self, message: str) -> Dict[str, Any]:
         """Resposta padronizada de erro"""
-        return {
-            'success': False,
-            'error': True,
-            'message': message,
-            'fonte': 'local'
-        }
\ No newline at end of file
+        return resposta_erro(message)
@@ -0,0 +1,263 @@
+"""
+Sessões HTTP compartilhadas para as APIs da Receita Federal
+MultiBPO - Receita Federal
+
+Uma requests.Session por provedor e por processo, com pool de conexões
+keep-alive e retry com backoff. Evita pagar handshake TCP/TLS a cada
+consulta de CNPJ.
+
+O retry aqui é só para falhas rápidas (conexão recusada, 502/503/504):
+read timeout não é retentado (o hedge, o fallback e o breaker reagem) e
+respostas com Retry-After voltam na hora para o rate limiter do serviço,
+sem dormir dentro da requisição.
+
+Para as views ASGI há o equivalente assíncrono: um httpx.AsyncClient por
+provedor e por event loop, com a mesma configuração (RECEITA_HTTP).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_HTTP_CONFIG = {
+    'POOL_CONNECTIONS': 4,          # Hosts distintos mantidos no pool
+    'POOL_SIZE': 10,                # Conexões keep-alive por host
+    'POOL_BLOCK': False,            # Se True, espera conexão livre em vez de abrir extra
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': None,           # None = usa RECEITA_TIMEOUT
+    'RETRIES': 2,
+    'READ_RETRIES': 0,              # Read timeout custa READ_TIMEOUT inteiro a cada tentativa
+    'BACKOFF_FACTOR': 0.3,
+    'BACKOFF_MAX': 1.0,             # Teto da espera entre tentativas (segundos)
+    'RETRY_STATUS': (502, 503, 504),
+    'MAX_CONCURRENT': None,         # Consultas simultâneas por processo (None = POOL_SIZE)
+    'ACQUIRE_TIMEOUT': 5.0,         # Espera máxima por uma vaga antes de desistir do provedor
+    'PROVIDERS': {},                # Overrides por provedor: {'ReceitaWS': {'POOL_SIZE': 2}}
+}
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'MultiBPO/1.0 (Contabilidade)',
+    'Accept': 'application/json',
+    'Connection': 'keep-alive',
+}
+
+
+def get_http_config(provider: str) -> Dict[str, Any]:
+    """Configuração efetiva de um provedor (defaults + RECEITA_HTTP + override)"""
+    config = dict(DEFAULT_HTTP_CONFIG)
+    config.update(getattr(settings, 'RECEITA_HTTP', {}))
+    config.update(config.get('PROVIDERS', {}).get(provider, {}))
+    if config['READ_TIMEOUT'] is None:
+        config['READ_TIMEOUT'] = getattr(settings, 'RECEITA_TIMEOUT', 10)
+    return config
+
+
+def get_timeout(provider: str) -> Tuple[float, float]:
+    """Timeout (connect, read) para requests"""
+    config = get_http_config(provider)
+    return (config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'])
+
+
+class RetrySemThrottling(Retry):
+    """Retry do urllib3 que não retenta respostas com Retry-After (throttling)"""
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if has_retry_after:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def build_session(provider: str) -> requests.Session:
+    """Cria sessão com adapter de pool e retry configurados"""
+    config = get_http_config(provider)
+
+    retry = RetrySemThrottling(
+        total=config['RETRIES'],
+        connect=config['RETRIES'],
+        read=min(config['READ_RETRIES'], config['RETRIES']),
+        status=config['RETRIES'],
+        backoff_factor=config['BACKOFF_FACTOR'],
+        backoff_max=config['BACKOFF_MAX'],
+        status_forcelist=config['RETRY_STATUS'],
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config['POOL_CONNECTIONS'],
+        pool_maxsize=config['POOL_SIZE'],
+        pool_block=config['POOL_BLOCK'],
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class SessionRegistry:
+    """
+    Registro thread-safe de sessões por provedor
+
+    As sessões são recriadas se o PID mudar (fork do gunicorn com
+    --preload), já que sockets não devem ser compartilhados entre processos.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get(self, provider: str) -> requests.Session:
+        self._check_fork()
+        session = self._sessions.get(provider)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(provider)
+                if session is None:
+                    session = build_session(provider)
+                    self._sessions[provider] = session
+                    logger.debug(f"Sessão HTTP criada para {provider} (pid {self._pid})")
+        return session
+
+    def close_all(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def _check_fork(self) -> None:
+        pid = os.getpid()
+        if pid != self._pid:
+            with self._lock:
+                if pid != self._pid:
+                    # Não fechar: os sockets pertencem ao processo pai
+                    self._sessions = {}
+                    self._pid = pid
+
+
+_registry = SessionRegistry()
+
+
+def get_session(provider: str) -> requests.Session:
+    """Sessão compartilhada do processo para o provedor"""
+    return _registry.get(provider)
+
+
+def close_sessions() -> None:
+    """Fecha todas as sessões (recarrega configuração; uso em testes)"""
+    _registry.close_all()
+
+
+# ========== CLIENTES ASSÍNCRONOS (httpx) ==========
+
+def build_async_client(provider: str) -> httpx.AsyncClient:
+    """Cria AsyncClient com pool e timeouts equivalentes aos da sessão síncrona"""
+    config = get_http_config(provider)
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=httpx.Timeout(config['READ_TIMEOUT'], connect=config['CONNECT_TIMEOUT']),
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=config['POOL_SIZE']),
+        # Retry de conexão no transporte; retry por status fica em get_async()
+        transport=httpx.AsyncHTTPTransport(retries=config['RETRIES']),
+    )
+
+
+class AsyncClientRegistry:
+    """
+    Registro de AsyncClients por event loop e provedor
+
+    O pool de um AsyncClient pertence ao loop em que foi criado. Sob ASGI
+    há um loop por processo; com async_to_sync cada chamada pode ter o seu.
+    Clientes de loops já descartados saem do registro junto com o loop.
+    """
+
+    def __init__(self):
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.setdefault(loop, {})
+            client = clients.get(provider)
+            if client is None:
+                client = clients[provider] = build_async_client(provider)
+                logger.debug(f"AsyncClient criado para {provider} (pid {os.getpid()})")
+        return client
+
+    async def aclose_all(self) -> None:
+        """Fecha os clientes do loop atual"""
+        with self._lock:
+            clients = self._clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+
+_async_registry = AsyncClientRegistry()
+
+
+def get_async_client(provider: str) -> httpx.AsyncClient:
+    """AsyncClient do loop atual para o provedor"""
+    return _async_registry.get(provider)
+
+
+async def close_async_clients() -> None:
+    """Fecha os AsyncClients do loop atual (uso em testes/shutdown)"""
+    await _async_registry.aclose_all()
+
+
+def retry_after(headers) -> Optional[float]:
+    """Segundos pedidos no header Retry-After (número ou data HTTP), se houver"""
+    valor = (headers.get('Retry-After') or '').strip()
+    if not valor:
+        return None
+    if valor.isdigit():
+        return float(valor)
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _espera_retry(config: Dict[str, Any], tentativa: int) -> float:
+    """Backoff exponencial como o urllib3, limitado a BACKOFF_MAX"""
+    if tentativa == 0:
+        return 0.0
+    return min(config['BACKOFF_FACTOR'] * (2 ** tentativa), config['BACKOFF_MAX'])
+
+
+async def get_async(provider: str, url: str) -> httpx.Response:
+    """
+    GET assíncrono com retry nos status de RETRY_STATUS
+
+    Mesma política do Retry da sessão síncrona: RETRIES tentativas extras,
+    backoff exponencial limitado e nenhuma espera por Retry-After (a
+    resposta volta para o rate limiter do serviço).
+    """
+    config = get_http_config(provider)
+    client = get_async_client(provider)
+
+    for tentativa in range(config['RETRIES'] + 1):
+        response = await client.get(url)
+        if (response.status_code not in config['RETRY_STATUS'] or tentativa == config['RETRIES']
+                or retry_after(response.headers) is not None):
+            return response
+        await asyncio.sleep(_espera_retry(config, tentativa))
+    return response
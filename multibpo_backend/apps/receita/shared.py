@@ -0,0 +1,59 @@
+"""
+Estado compartilhado entre workers para o app Receita
+MultiBPO - Receita Federal
+
+Circuit breakers, locks e contadores usam o cache backend configurado em
+RECEITA_CACHE['ALIAS'] para serem vistos por todos os workers do gunicorn.
+
+Com DummyCache (configuração de desenvolvimento) nada seria guardado e
+esses mecanismos ficariam inertes; nesse caso usamos um LocMemCache do
+próprio processo, ou seja, o estado passa a ser por worker.
+"""
+
+import threading
+from typing import Optional
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .cache import get_config
+
+
+_local_cache: Optional[LocMemCache] = None
+_local_lock = threading.Lock()
+
+
+def _get_local_cache() -> LocMemCache:
+    global _local_cache
+    if _local_cache is None:
+        with _local_lock:
+            if _local_cache is None:
+                _local_cache = LocMemCache('receita-shared-local', {'OPTIONS': {'MAX_ENTRIES': 10000}})
+    return _local_cache
+
+
+def get_shared_cache() -> BaseCache:
+    """Cache backend para estado compartilhado (fallback local se DummyCache)"""
+    backend = caches[get_config()['ALIAS']]
+    if isinstance(backend, DummyCache):
+        return _get_local_cache()
+    return backend
+
+
+def is_shared() -> bool:
+    """True se o estado é de fato compartilhado entre processos"""
+    return not isinstance(caches[get_config()['ALIAS']], DummyCache)
+
+
+def incr(chave: str, delta: int = 1, timeout: Optional[float] = None) -> int:
+    """Incremento atômico criando a chave se necessário"""
+    cache = get_shared_cache()
+    cache.add(chave, 0, timeout=timeout)
+    try:
+        return cache.incr(chave, delta)
+    except ValueError:
+        # Chave expirou entre add() e incr()
+        cache.set(chave, delta, timeout=timeout)
+        return delta
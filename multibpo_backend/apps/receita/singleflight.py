@@ -0,0 +1,234 @@
+"""
+Single-flight para consultas de CNPJ
+MultiBPO - Receita Federal
+
+Consultas simultâneas ao mesmo CNPJ (ex.: vários usuários da mesma empresa
+se registrando durante uma campanha) viram uma única chamada externa:
+
+- no processo: a primeira thread (líder) consulta; as demais esperam e
+  recebem uma cópia do mesmo resultado
+- entre workers: o líder também reserva um lock no cache compartilhado;
+  o líder de outro worker que encontra o lock ocupado aguarda o resultado
+  aparecer no cache de CNPJs em vez de consultar de novo
+
+Se o lock expirar ou for liberado sem resultado (falha do outro worker),
+quem está esperando faz a própria consulta.
+"""
+
+import asyncio
+import copy
+import logging
+import threading
+import time
+import uuid
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .shared import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+DEFAULT_SINGLEFLIGHT_CONFIG = {
+    'ENABLED': True,
+    'LOCK_TTL': 30,             # Validade do lock entre workers (> pior consulta externa)
+    'WAIT_TIMEOUT': 15,         # Espera máxima pelo resultado de outro líder
+    'POLL_INTERVAL': 0.05,      # Intervalo de leitura do cache ao esperar outro worker
+    'KEY_PREFIX': 'receita:singleflight',
+}
+
+
+def get_singleflight_config() -> Dict[str, Any]:
+    """Configuração efetiva (defaults + settings.RECEITA_SINGLEFLIGHT)"""
+    config = dict(DEFAULT_SINGLEFLIGHT_CONFIG)
+    config.update(getattr(settings, 'RECEITA_SINGLEFLIGHT', {}))
+    return config
+
+
+class _Voo:
+    """Consulta em andamento no processo"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Deduplicação de chamadas concorrentes por chave"""
+
+    def __init__(self):
+        self._voos: Dict[str, _Voo] = {}
+        self._voos_async = weakref.WeakKeyDictionary()   # loop -> {chave: Future}
+        self._lock = threading.Lock()
+        self._stats = {'lideres': 0, 'seguidores': 0, 'espera_outro_worker': 0, 'timeouts': 0}
+
+    # ========== SÍNCRONO ==========
+
+    def executar(self, chave: str, funcao: Callable[[], T],
+                 aguardar_externo: Optional[Callable[[float], Optional[T]]] = None) -> T:
+        """
+        Executa funcao() uma vez por chave entre chamadas concorrentes
+
+        Args:
+            chave: identificador da consulta (CNPJ)
+            funcao: consulta externa
+            aguardar_externo: callable(desde) que devolve o resultado gravado
+                por outro worker a partir de `desde`, ou None
+        """
+        config = get_singleflight_config()
+        if not config['ENABLED']:
+            return funcao()
+
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+
+        if not lider:
+            self._contar('seguidores')
+            if voo.evento.wait(config['WAIT_TIMEOUT']):
+                if voo.erro is not None:
+                    raise voo.erro
+                return copy.deepcopy(voo.resultado)
+            self._contar('timeouts')
+            logger.warning(f"Single-flight: líder de {chave} excedeu {config['WAIT_TIMEOUT']}s")
+            return funcao()
+
+        self._contar('lideres')
+        try:
+            resultado = self._com_lock_compartilhado(chave, funcao, aguardar_externo, config)
+            voo.resultado = copy.deepcopy(resultado)
+            return resultado
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._voos.pop(chave, None)
+            voo.evento.set()
+
+    def _com_lock_compartilhado(self, chave, funcao, aguardar_externo, config):
+        cache = get_shared_cache()
+        chave_lock = f"{config['KEY_PREFIX']}:{chave}"
+        token = uuid.uuid4().hex
+        # Antes do add: o líder pode gravar entre o add falhar e o início da espera
+        desde = time.time()
+
+        if cache.add(chave_lock, token, timeout=config['LOCK_TTL']):
+            try:
+                return funcao()
+            finally:
+                # Só libera o próprio lock (pode ter expirado e sido retomado)
+                if cache.get(chave_lock) == token:
+                    cache.delete(chave_lock)
+
+        self._contar('espera_outro_worker')
+        logger.info(f"Single-flight: {chave} já em consulta em outro worker, aguardando")
+        prazo = time.monotonic() + config['WAIT_TIMEOUT']
+        while time.monotonic() < prazo:
+            time.sleep(config['POLL_INTERVAL'])
+            if aguardar_externo is not None:
+                resultado = aguardar_externo(desde)
+                if resultado is not None:
+                    return resultado
+            if cache.get(chave_lock) is None:
+                break
+        return funcao()
+
+    # ========== ASSÍNCRONO ==========
+
+    async def aexecutar(self, chave: str, funcao: Callable[[], Awaitable[T]],
+                        aguardar_externo: Optional[Callable[[float], Optional[T]]] = None) -> T:
+        """Versão async de executar(): seguidores aguardam um Future do mesmo loop"""
+        config = get_singleflight_config()
+        if not config['ENABLED']:
+            return await funcao()
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            voos = self._voos_async.setdefault(loop, {})
+            futuro = voos.get(chave)
+            lider = futuro is None
+            if lider:
+                futuro = voos[chave] = loop.create_future()
+
+        if not lider:
+            self._contar('seguidores')
+            try:
+                resultado = await asyncio.wait_for(asyncio.shield(futuro), config['WAIT_TIMEOUT'])
+            except asyncio.TimeoutError:
+                self._contar('timeouts')
+                return await funcao()
+            return copy.deepcopy(resultado)
+
+        self._contar('lideres')
+        try:
+            resultado = await self._acom_lock_compartilhado(chave, funcao, aguardar_externo, config)
+            futuro.set_result(copy.deepcopy(resultado))
+            return resultado
+        except BaseException as e:
+            futuro.set_exception(e)
+            futuro.exception()  # Evita "exception was never retrieved" sem seguidores
+            raise
+        finally:
+            with self._lock:
+                voos.pop(chave, None)
+
+    async def _acom_lock_compartilhado(self, chave, funcao, aguardar_externo, config):
+        cache = get_shared_cache()
+        chave_lock = f"{config['KEY_PREFIX']}:{chave}"
+        token = uuid.uuid4().hex
+        em_thread = lambda f: sync_to_async(f, thread_sensitive=False)  # noqa: E731
+        desde = time.time()
+
+        if await em_thread(cache.add)(chave_lock, token, timeout=config['LOCK_TTL']):
+            try:
+                return await funcao()
+            finally:
+                if await em_thread(cache.get)(chave_lock) == token:
+                    await em_thread(cache.delete)(chave_lock)
+
+        self._contar('espera_outro_worker')
+        prazo = time.monotonic() + config['WAIT_TIMEOUT']
+        while time.monotonic() < prazo:
+            await asyncio.sleep(config['POLL_INTERVAL'])
+            if aguardar_externo is not None:
+                resultado = await em_thread(aguardar_externo)(desde)
+                if resultado is not None:
+                    return resultado
+            if await em_thread(cache.get)(chave_lock) is None:
+                break
+        return await funcao()
+
+    # ========== MÉTRICAS ==========
+
+    def _contar(self, contador: str) -> None:
+        with self._lock:
+            self._stats[contador] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['em_andamento'] = len(self._voos)
+        return stats
+
+    def reset(self) -> None:
+        with self._lock:
+            self._voos.clear()
+            for chave in self._stats:
+                self._stats[chave] = 0
+
+
+_singleflight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Instância do processo"""
+    return _singleflight
@@ -0,0 +1,244 @@
+"""
+Servidor HTTP local que imita BrasilAPI, ReceitaWS e ViaCEP
+MultiBPO - Receita Federal
+
+Usado por testes e benchmarks para exercitar o caminho HTTP real
+(sessões, pool, timeouts) sem depender das APIs externas.
+
+Rotas:
+- GET /api/cnpj/v1/<cnpj>   (formato BrasilAPI)
+- GET /v1/cnpj/<cnpj>       (formato ReceitaWS)
+- GET /api/cep/v2/<cep>     (CEP, formato BrasilAPI)
+- GET /ws/<cep>/json/       (CEP, formato ViaCEP)
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set
+
+from .providers import SITUACOES
+
+
+BRASILAPI_PREFIX = '/api/cnpj/v1/'
+RECEITAWS_PREFIX = '/v1/cnpj/'
+BRASILAPI_CEP_PREFIX = '/api/cep/v2/'
+VIACEP_PREFIX = '/ws/'
+
+
+def payload_brasilapi(cnpj: str) -> Dict:
+    return {
+        'cnpj': cnpj,
+        'razao_social': f'EMPRESA STUB {cnpj[:8]} LTDA',
+        'nome_fantasia': 'STUB',
+        'situacao_cadastral': 2,
+        'descricao_situacao_cadastral': 'ATIVA',
+        'logradouro': 'RUA DOS TESTES',
+        'numero': '100',
+        'complemento': '',
+        'bairro': 'CENTRO',
+        'municipio': 'SAO PAULO',
+        'uf': 'SP',
+        'cep': '01001000',
+        'ddd_telefone_1': '1133334444',
+        'email': 'contato@stub.com.br',
+        'atividade_principal': [{'codigo': '69.20-6-01', 'texto': 'Atividades de contabilidade'}],
+        'ultima_atualizacao': '2025-01-01T00:00:00.000Z',
+    }
+
+
+def payload_brasilapi_cep(cep: str) -> Dict:
+    return {
+        'cep': cep,
+        'state': 'SP',
+        'city': 'São Paulo',
+        'neighborhood': 'Sé',
+        'street': 'Praça da Sé',
+        'service': 'stub',
+    }
+
+
+def payload_viacep(cep: str) -> Dict:
+    return {
+        'cep': f'{cep[:5]}-{cep[5:]}',
+        'logradouro': 'Praça da Sé',
+        'complemento': 'lado ímpar',
+        'bairro': 'Sé',
+        'localidade': 'São Paulo',
+        'uf': 'SP',
+        'ibge': '3550308',
+    }
+
+
+def payload_receitaws(cnpj: str) -> Dict:
+    return {
+        'status': 'OK',
+        'cnpj': cnpj,
+        'nome': f'EMPRESA STUB {cnpj[:8]} LTDA',
+        'fantasia': 'STUB',
+        'situacao': 'ATIVA',
+        'logradouro': 'RUA DOS TESTES',
+        'numero': '100',
+        'complemento': '',
+        'bairro': 'CENTRO',
+        'municipio': 'SAO PAULO',
+        'uf': 'SP',
+        'cep': '01.001-000',
+        'telefone': '(11) 3333-4444',
+        'email': 'contato@stub.com.br',
+        'atividade_principal': [{'code': '69.20-6-01', 'text': 'Atividades de contabilidade'}],
+        'ultima_atualizacao': '2025-01-01T00:00:00.000Z',
+    }
+
+
+PAYLOADS = {
+    'brasilapi': payload_brasilapi,
+    'receitaws': payload_receitaws,
+    'brasilapi_cep': payload_brasilapi_cep,
+    'viacep': payload_viacep,
+}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # Mantém conexões keep-alive
+    disable_nagle_algorithm = True  # Headers e corpo saem em writes separados
+
+    def setup(self):
+        super().setup()
+        self.server.stub.registrar_conexao()
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.registrar_request(self.path)
+
+        if self.path.startswith(BRASILAPI_PREFIX):
+            provider, cnpj = 'brasilapi', self.path[len(BRASILAPI_PREFIX):].strip('/')
+        elif self.path.startswith(RECEITAWS_PREFIX):
+            provider, cnpj = 'receitaws', self.path[len(RECEITAWS_PREFIX):].strip('/')
+        elif self.path.startswith(BRASILAPI_CEP_PREFIX):
+            provider, cnpj = 'brasilapi_cep', self.path[len(BRASILAPI_CEP_PREFIX):].strip('/')
+        elif self.path.startswith(VIACEP_PREFIX) and self.path.endswith('/json/'):
+            provider, cnpj = 'viacep', self.path[len(VIACEP_PREFIX):-len('/json/')]
+        else:
+            return self._responder(404, {'message': 'rota desconhecida'})
+
+        delay = stub.delays.get(provider, 0)
+        if delay:
+            time.sleep(delay)
+
+        status_forcado = stub.status.get(provider)
+        if status_forcado:
+            return self._responder(status_forcado, {'message': f'status forçado {status_forcado}'},
+                                   stub.headers.get(provider))
+
+        if cnpj in stub.nao_encontrados:
+            if provider == 'receitaws':
+                return self._responder(200, {'status': 'ERROR', 'message': 'CNPJ inválido'})
+            if provider == 'viacep':
+                return self._responder(200, {'erro': 'true'})
+            return self._responder(404, {'message': 'não encontrado'})
+
+        payload = PAYLOADS[provider](cnpj)
+        if cnpj in stub.situacoes:
+            codigo = stub.situacoes[cnpj]
+            if provider == 'brasilapi':
+                payload.update(situacao_cadastral=int(codigo), descricao_situacao_cadastral=SITUACOES[codigo])
+            else:
+                payload['situacao'] = SITUACOES[codigo]
+        self._responder(200, payload)
+
+    def _responder(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for nome, valor in (headers or {}).items():
+                self.send_header(nome, valor)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente desistiu (ex.: requisição perdedora do hedge cancelada)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024   # Backlog padrão (5) derruba SYNs em rajadas concorrentes
+
+
+class StubCNPJServer:
+    """
+    Servidor stub em thread própria
+
+    Uso:
+        with StubCNPJServer(delays={'brasilapi': 0.2}) as stub:
+            settings.RECEITA_BRASILAPI_URL = stub.brasilapi_url
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 delays: Optional[Dict[str, float]] = None,
+                 status: Optional[Dict[str, int]] = None,
+                 nao_encontrados: Optional[Set[str]] = None,
+                 headers: Optional[Dict[str, Dict[str, str]]] = None):
+        self.delays = delays or {}
+        self.status = status or {}
+        self.nao_encontrados = nao_encontrados or set()
+        self.headers = headers or {}    # Headers extras junto com o status forçado
+        self.situacoes: Dict[str, str] = {}     # Código da situação por CNPJ ('08'; padrão ATIVA)
+        self.conexoes = 0
+        self.requests = 0
+        self.paths = []
+        self._lock = threading.Lock()
+        self._server = _StubHTTPServer((host, port), _StubHandler)
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def brasilapi_url(self) -> str:
+        return self.url + BRASILAPI_PREFIX.rstrip('/')
+
+    @property
+    def receitaws_url(self) -> str:
+        return self.url + RECEITAWS_PREFIX.rstrip('/')
+
+    @property
+    def brasilapi_cep_url(self) -> str:
+        return self.url + BRASILAPI_CEP_PREFIX.rstrip('/')
+
+    @property
+    def viacep_url(self) -> str:
+        return self.url + VIACEP_PREFIX.rstrip('/')
+
+    def registrar_conexao(self):
+        with self._lock:
+            self.conexoes += 1
+
+    def registrar_request(self, path: str):
+        with self._lock:
+            self.requests += 1
+            self.paths.append(path)
+
+    def start(self) -> 'StubCNPJServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='receita-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StubCNPJServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
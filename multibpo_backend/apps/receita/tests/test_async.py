@@ -0,0 +1,103 @@
+"""
+Testes do serviço assíncrono e das views ASGI
+MultiBPO - Receita Federal
+"""
+
+import asyncio
+import time
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..async_services import AsyncReceitaFederalService
+from ..cache import get_cnpj_cache, reset_cnpj_cache
+from ..latency import get_latency_tracker
+from ..limits import get_provider_limiter
+from ..services import ReceitaFederalService
+from ..sessions import close_async_clients, close_sessions
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer
+
+
+CNPJ = '11222333000181'
+
+
+class TestAsyncReceitaFederalService(TestCase):
+    """Serviço async contra o stub local"""
+
+    def setUp(self):
+        self.stub = StubCNPJServer().start()
+        reset_cnpj_cache()
+        close_sessions()
+        get_provider_limiter().reset()
+        get_shared_cache().clear()
+        get_latency_tracker().reset()
+        self.settings_override = override_settings(
+            RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+            RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+            RECEITA_HEDGE={'MODE': 'sequencial'},
+            RECEITA_HTTP={'RETRIES': 0, 'MAX_CONCURRENT': 100},
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.stub.stop()
+        reset_cnpj_cache()
+        close_sessions()
+        get_provider_limiter().reset()
+
+    async def _consultar(self, *cnpjs, **kwargs):
+        service = AsyncReceitaFederalService()
+        try:
+            return await asyncio.gather(*(service.consultar_cnpj(c, **kwargs) for c in cnpjs))
+        finally:
+            await close_async_clients()
+
+    async def test_mesmo_formato_que_servico_sincrono(self):
+        [async_result] = await self._consultar(CNPJ, usar_cache=False)
+        self.assertEqual(async_result, ReceitaFederalService().consultar_cnpj(CNPJ, usar_cache=False))
+
+    async def test_fallback_receitaws_com_mesmo_formato(self):
+        self.stub.status['brasilapi'] = 500
+        [async_result] = await self._consultar(CNPJ, usar_cache=False)
+        self.assertEqual(async_result['fonte'], 'ReceitaWS')
+        self.assertEqual(async_result, ReceitaFederalService().consultar_cnpj(CNPJ, usar_cache=False))
+
+    async def test_nao_encontrado_vai_para_cache_negativo(self):
+        self.stub.nao_encontrados.add(CNPJ)
+        [result] = await self._consultar(CNPJ)
+        self.assertFalse(result['success'])
+        self.assertEqual(get_cnpj_cache().stats()['gravacoes'], 1)
+
+    async def test_consultas_concorrentes_nao_serializam(self):
+        """50 consultas de 0.2s terminam juntas, sem thread por consulta"""
+        self.stub.delays['brasilapi'] = 0.2
+        cnpjs = [f'{i:08d}000100' for i in range(50)]
+
+        inicio = time.perf_counter()
+        resultados = await self._consultar(*cnpjs)
+        duracao = time.perf_counter() - inicio
+
+        self.assertTrue(all(r['success'] for r in resultados))
+        self.assertLess(duracao, 2.0)
+
+    @override_settings(RECEITA_HEDGE={'MODE': 'hedged', 'DELAY': 0.05, 'ADAPTIVE': False})
+    async def test_hedge_cancela_perdedor(self):
+        self.stub.delays['brasilapi'] = 1.0
+        inicio = time.perf_counter()
+        [result] = await self._consultar(CNPJ, usar_cache=False)
+
+        self.assertEqual(result['fonte'], 'ReceitaWS')
+        self.assertLess(time.perf_counter() - inicio, 0.5)
+        # BrasilAPI cancelada: não entra na janela de latências
+        self.assertEqual(get_latency_tracker().amostras('BrasilAPI'), 0)
+
+    async def test_view_async(self):
+        response = await self.async_client.get(reverse('receita:cnpj-consulta-async', args=[CNPJ]))
+        await close_async_clients()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['fonte'], 'BrasilAPI')
+
+        response = await self.async_client.get(reverse('receita:cnpj-consulta-async', args=['123']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,129 @@
+"""
+Testes da consulta de CNPJs em lote
+MultiBPO - Receita Federal
+"""
+
+import json
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..batch import consultar_lote, normalizar_lote
+from ..cache import reset_cnpj_cache
+from ..latency import get_latency_tracker
+from ..limits import get_provider_limiter
+from ..sessions import close_sessions
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer
+
+
+CNPJS = ['11222333000181', '11.444.777/0001-61', '33000167000101']
+
+
+class TestNormalizarLote(TestCase):
+
+    def test_deduplica_mantendo_ordem(self):
+        validos, invalidos = normalizar_lote([
+            '11.222.333/0001-81', '11222333000181', '123', '33000167000101',
+        ])
+        self.assertEqual(validos, ['11222333000181', '33000167000101'])
+        self.assertEqual(invalidos, ['123'])
+
+
+class TestConsultaLote(TestCase):
+    """Lote contra o stub (apenas BrasilAPI, modo sequencial)"""
+
+    def setUp(self):
+        self.stub = StubCNPJServer(delays={'brasilapi': 0.2}).start()
+        reset_cnpj_cache()
+        close_sessions()
+        get_provider_limiter().reset()
+        get_shared_cache().clear()
+        get_latency_tracker().reset()
+        self.settings_override = override_settings(
+            RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+            RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+            RECEITA_HEDGE={'MODE': 'sequencial'},
+        )
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('joao.contador'))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.stub.stop()
+        reset_cnpj_cache()
+        close_sessions()
+        get_provider_limiter().reset()
+
+    def test_misses_em_paralelo_e_sem_duplicatas(self):
+        inicio = time.perf_counter()
+        linhas = list(consultar_lote(CNPJS + ['11222333000181'], max_workers=4))
+        duracao = time.perf_counter() - inicio
+
+        self.assertEqual(sorted(l['cnpj'] for l in linhas), sorted(['11222333000181', '11444777000161', '33000167000101']))
+        self.assertTrue(all(l['origem'] == 'consulta' and l['resultado']['success'] for l in linhas))
+        self.assertEqual(self.stub.requests, 3)
+        self.assertLess(duracao, 0.5)  # 3 x 0.2s em paralelo
+
+    def test_cache_hits_saem_primeiro(self):
+        list(consultar_lote(CNPJS[:1]))
+        linhas = list(consultar_lote(CNPJS))
+
+        self.assertEqual(linhas[0], {'cnpj': '11222333000181', 'origem': 'cache', 'resultado': linhas[0]['resultado']})
+        self.assertEqual([l['origem'] for l in linhas], ['cache', 'consulta', 'consulta'])
+        self.assertEqual(self.stub.requests, 3)
+
+    @override_settings(RECEITA_HTTP={'MAX_CONCURRENT': 1, 'RETRIES': 0})
+    def test_limite_de_concorrencia_por_provedor(self):
+        """Com MAX_CONCURRENT=1 o provedor nunca recebe duas consultas simultâneas"""
+        ativos, pico = [0], [0]
+        lock = threading.Lock()
+        original = self.stub._server.RequestHandlerClass.do_GET
+
+        def do_get_contando(handler):
+            with lock:
+                ativos[0] += 1
+                pico[0] = max(pico[0], ativos[0])
+            try:
+                original(handler)
+            finally:
+                with lock:
+                    ativos[0] -= 1
+
+        self.stub._server.RequestHandlerClass.do_GET = do_get_contando
+        try:
+            linhas = list(consultar_lote(CNPJS, max_workers=3))
+        finally:
+            self.stub._server.RequestHandlerClass.do_GET = original
+
+        self.assertTrue(all(l['resultado']['success'] for l in linhas))
+        self.assertEqual(pico[0], 1)
+
+    def test_endpoint_ndjson(self):
+        response = self.client.post(
+            reverse('receita:cnpj-batch'),
+            data={'cnpjs': CNPJS + ['123']},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        linhas = [json.loads(l) for l in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(linhas), 4)
+        self.assertEqual(linhas[0]['origem'], 'invalido')
+
+    def test_endpoint_exige_autenticacao(self):
+        response = APIClient().post(reverse('receita:cnpj-batch'), data={'cnpjs': CNPJS}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.stub.requests, 0)
+
+    @override_settings(RECEITA_BATCH={'MAX_ITENS': 2})
+    def test_endpoint_valida_entrada(self):
+        url = reverse('receita:cnpj-batch')
+        self.assertEqual(self.client.post(url, data={'cnpjs': []}, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(url, data={'cnpjs': CNPJS}, content_type='application/json').status_code, 400)
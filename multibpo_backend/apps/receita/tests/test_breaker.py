@@ -0,0 +1,127 @@
+"""
+Testes do circuit breaker e da ordenação por saúde
+MultiBPO - Receita Federal
+"""
+
+import time
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from ..breaker import ABERTO, FECHADO, MEIO_ABERTO, get_breaker, ordenar_por_saude
+from ..cache import reset_cnpj_cache
+from ..latency import get_latency_tracker
+from ..services import ReceitaFederalService
+from ..sessions import close_sessions
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer
+
+
+BREAKER = {'FAILURE_RATE': 0.5, 'MIN_CALLS': 4, 'WINDOW_SECONDS': 60, 'OPEN_SECONDS': 30,
+           'SLOW_CALL_SECONDS': 1.0}
+
+
+def _limpar():
+    get_shared_cache().clear()
+    get_latency_tracker().reset()
+    reset_cnpj_cache()
+
+
+@override_settings(RECEITA_BREAKER=BREAKER)
+class TestCircuitBreaker(TestCase):
+
+    def setUp(self):
+        _limpar()
+
+    def tearDown(self):
+        _limpar()
+
+    def test_abre_apos_taxa_de_falha(self):
+        breaker = get_breaker('BrasilAPI')
+        for sucesso in (True, False, False):
+            breaker.registrar(sucesso, 0.1)
+        self.assertEqual(breaker.estado(), FECHADO)  # abaixo de MIN_CALLS
+
+        breaker.registrar(False, 0.1)
+        self.assertEqual(breaker.estado(), ABERTO)
+        self.assertFalse(breaker.permite())
+
+    def test_chamada_lenta_conta_como_falha(self):
+        breaker = get_breaker('BrasilAPI')
+        for _ in range(4):
+            breaker.registrar(True, 2.0)
+        self.assertEqual(breaker.estado(), ABERTO)
+
+    def test_meio_aberto_permite_uma_unica_prova(self):
+        breaker = get_breaker('BrasilAPI')
+        for _ in range(4):
+            breaker.registrar(False, 0.1)
+
+        with mock.patch('apps.receita.breaker.time.time', return_value=time.time() + 31):
+            self.assertEqual(breaker.estado(), MEIO_ABERTO)
+            self.assertTrue(breaker.permite())
+            self.assertFalse(breaker.permite())
+
+            breaker.registrar(True, 0.1)
+            self.assertEqual(breaker.estado(), FECHADO)
+            self.assertTrue(breaker.permite())
+
+    def test_prova_com_falha_reabre(self):
+        breaker = get_breaker('BrasilAPI')
+        for _ in range(4):
+            breaker.registrar(False, 0.1)
+
+        agora = time.time() + 31
+        with mock.patch('apps.receita.breaker.time.time', return_value=agora):
+            self.assertTrue(breaker.permite())
+            breaker.registrar(False, 0.1)
+            self.assertEqual(breaker.estado(), ABERTO)
+
+    def test_ordenacao_por_saude(self):
+        self.assertEqual(ordenar_por_saude(['BrasilAPI', 'ReceitaWS']), ['BrasilAPI', 'ReceitaWS'])
+
+        for _ in range(4):
+            get_breaker('BrasilAPI').registrar(False, 0.1)
+        self.assertEqual(ordenar_por_saude(['BrasilAPI', 'ReceitaWS']), ['ReceitaWS', 'BrasilAPI'])
+
+    def test_ordenacao_penaliza_p95(self):
+        tracker = get_latency_tracker()
+        for _ in range(5):
+            tracker.record('BrasilAPI', 0.9, True)
+            tracker.record('ReceitaWS', 0.1, True)
+        self.assertEqual(ordenar_por_saude(['BrasilAPI', 'ReceitaWS']), ['ReceitaWS', 'BrasilAPI'])
+
+    def test_provedor_sem_amostras_nao_passa_a_frente(self):
+        tracker = get_latency_tracker()
+        for _ in range(5):
+            tracker.record('BrasilAPI', 0.9, True)
+        self.assertEqual(ordenar_por_saude(['BrasilAPI', 'ReceitaWS']), ['BrasilAPI', 'ReceitaWS'])
+
+
+@override_settings(RECEITA_BREAKER=BREAKER, RECEITA_HEDGE={'MODE': 'sequencial'},
+                   RECEITA_HTTP={'RETRIES': 0})
+class TestServiceComBreaker(TestCase):
+    """Provedor com circuito aberto não recebe requisições"""
+
+    def setUp(self):
+        _limpar()
+        close_sessions()
+        self.stub = StubCNPJServer(status={'brasilapi': 503}).start()
+
+    def tearDown(self):
+        self.stub.stop()
+        close_sessions()
+        _limpar()
+
+    def test_circuito_aberto_evita_rede(self):
+        with override_settings(RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+                               RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+                               RECEITA_RATE_LIMIT={'ENABLED': False}):
+            for _ in range(8):
+                result = ReceitaFederalService().consultar_cnpj('11222333000181', usar_cache=False)
+                self.assertTrue(result['success'])
+                self.assertEqual(result['fonte'], 'ReceitaWS')
+
+        self.assertEqual(get_breaker('BrasilAPI').estado(), ABERTO)
+        brasilapi_calls = [p for p in self.stub.paths if p.startswith('/api/cnpj/v1/')]
+        self.assertEqual(len(brasilapi_calls), 4)
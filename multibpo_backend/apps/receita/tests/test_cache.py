@@ -0,0 +1,192 @@
+"""
+Testes do cache de consultas CNPJ
+MultiBPO - Receita Federal
+"""
+
+import time
+from unittest import mock
+
+import requests
+from django.test import TestCase, override_settings
+
+from ..cache import CNPJCache, get_cnpj_cache, reset_cnpj_cache
+from ..providers import BrasilAPIProvider, ReceitaWSProvider
+from ..services import ReceitaFederalService
+
+
+CNPJ = '11222333000181'
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'receita-tests',
+    }
+}
+
+
+def resultado_ok(fonte='BrasilAPI'):
+    return {
+        'success': True,
+        'fonte': fonte,
+        'cnpj': '11.222.333/0001-81',
+        'razao_social': 'Empresa Teste LTDA',
+        'endereco': {'uf': 'SP'},
+        'raw_data': {},
+    }
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestCNPJCache(TestCase):
+    """Testes unitários do CNPJCache"""
+
+    def setUp(self):
+        self.cache = CNPJCache(config={
+            'ALIAS': 'default',
+            'KEY_PREFIX': 'teste:cnpj',
+            'LRU_SIZE': 2,
+            'TTL': 60,
+            'NEGATIVE_TTL': 5,
+            'STALE_TTL': 60,
+        })
+
+    def tearDown(self):
+        from django.core.cache import caches
+        caches['default'].clear()
+
+    def test_miss_e_hit_memoria(self):
+        """Primeira leitura é miss, depois hit no LRU"""
+        self.assertEqual(self.cache.get(CNPJ), (None, None))
+        self.cache.set(CNPJ, resultado_ok())
+
+        result, nivel = self.cache.get(CNPJ)
+        self.assertEqual(nivel, 'memoria')
+        self.assertEqual(result['razao_social'], 'Empresa Teste LTDA')
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits_memoria'], 1)
+
+    def test_hit_compartilhado_apos_limpar_lru(self):
+        """Outro worker (LRU vazio) encontra a entrada no cache backend"""
+        self.cache.set(CNPJ, resultado_ok())
+        self.cache.clear()
+
+        result, nivel = self.cache.get(CNPJ)
+        self.assertEqual(nivel, 'compartilhado')
+        self.assertTrue(result['success'])
+
+    def test_lru_respeita_capacidade(self):
+        """LRU descarta a entrada menos usada"""
+        self.cache.set('00000000000001', resultado_ok())
+        self.cache.set('00000000000002', resultado_ok())
+        self.cache.set('00000000000003', resultado_ok())
+        self.assertEqual(self.cache.stats()['lru_entradas'], 2)
+
+    def test_resultado_retornado_e_copia(self):
+        """Alterar o resultado retornado não corrompe o cache"""
+        self.cache.set(CNPJ, resultado_ok())
+        result, _ = self.cache.get(CNPJ)
+        result['razao_social'] = 'ALTERADO'
+        self.assertEqual(self.cache.get(CNPJ)[0]['razao_social'], 'Empresa Teste LTDA')
+
+    def test_stale_while_revalidate(self):
+        """Entrada expirada dentro da janela stale é servida e revalidada"""
+        self.cache.set(CNPJ, resultado_ok())
+        revalidados = []
+
+        with mock.patch('apps.receita.cache.time.time', return_value=time.time() + 90):
+            with mock.patch('apps.receita.cache.threading.Thread') as thread_cls:
+                result, nivel = self.cache.get(CNPJ, revalidar=revalidados.append)
+                target = thread_cls.call_args.kwargs['target']
+                target()
+
+        self.assertEqual(nivel, 'stale')
+        self.assertTrue(result['success'])
+        self.assertEqual(revalidados, [CNPJ])
+        self.assertEqual(self.cache.stats()['revalidacoes'], 1)
+
+    def test_fora_da_janela_stale_e_miss(self):
+        """Após TTL + STALE_TTL a entrada não é mais servida"""
+        self.cache.set(CNPJ, resultado_ok())
+        with mock.patch('apps.receita.cache.time.time', return_value=time.time() + 200):
+            self.assertEqual(self.cache.get(CNPJ), (None, None))
+
+    def test_negativo_usa_ttl_curto(self):
+        """Resultado negativo expira em NEGATIVE_TTL e não vira stale"""
+        self.cache.set_negativo(CNPJ, {'success': False, 'message': 'não encontrado'})
+        self.assertEqual(self.cache.get(CNPJ)[1], 'memoria')
+        self.assertEqual(self.cache.stats()['hits_negativos'], 1)
+
+        with mock.patch('apps.receita.cache.time.time', return_value=time.time() + 10):
+            self.assertEqual(self.cache.get(CNPJ), (None, None))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestReceitaFederalServiceCache(TestCase):
+    """Integração do cache com ReceitaFederalService.consultar_cnpj"""
+
+    def setUp(self):
+        reset_cnpj_cache()
+        self.service = ReceitaFederalService()
+
+    def tearDown(self):
+        from django.core.cache import caches
+        caches['default'].clear()
+        reset_cnpj_cache()
+
+    def test_segunda_consulta_nao_chama_upstream(self):
+        """CNPJ formatado e não formatado compartilham a mesma entrada"""
+        with mock.patch.object(BrasilAPIProvider, 'consultar',
+                               return_value=resultado_ok()) as brasilapi:
+            self.service.consultar_cnpj(CNPJ)
+            result = self.service.consultar_cnpj('11.222.333/0001-81')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(brasilapi.call_count, 1)
+
+    def test_usar_cache_false_forca_consulta(self):
+        with mock.patch.object(BrasilAPIProvider, 'consultar',
+                               return_value=resultado_ok()) as brasilapi:
+            self.service.consultar_cnpj(CNPJ)
+            self.service.consultar_cnpj(CNPJ, usar_cache=False)
+
+        self.assertEqual(brasilapi.call_count, 2)
+
+    def test_404_e_cacheado_como_negativo(self):
+        """404 das fontes gera entrada negativa"""
+        resposta = requests.Response()
+        resposta.status_code = 404
+        erro = requests.HTTPError(response=resposta)
+
+        with mock.patch.object(BrasilAPIProvider, 'consultar', side_effect=erro), \
+                mock.patch.object(ReceitaWSProvider, 'consultar', side_effect=erro) as receitaws:
+            self.assertFalse(self.service.consultar_cnpj(CNPJ)['success'])
+            self.assertFalse(self.service.consultar_cnpj(CNPJ)['success'])
+
+        self.assertEqual(receitaws.call_count, 1)
+
+    def test_falha_de_rede_nao_e_cacheada(self):
+        """Timeout não pode bloquear novas tentativas"""
+        erro = requests.Timeout('timeout')
+
+        with mock.patch.object(BrasilAPIProvider, 'consultar', side_effect=erro), \
+                mock.patch.object(ReceitaWSProvider, 'consultar', side_effect=erro) as receitaws:
+            self.service.consultar_cnpj(CNPJ)
+            self.service.consultar_cnpj(CNPJ)
+
+        self.assertEqual(receitaws.call_count, 2)
+        self.assertEqual(get_cnpj_cache().stats()['gravacoes'], 0)
+
+    def test_criar_via_cnpj_consulta_pelo_servico(self):
+        """Escritorio.criar_via_cnpj sem dados usa o serviço (e o cache)"""
+        from apps.contadores.models import Escritorio
+
+        with mock.patch.object(BrasilAPIProvider, 'consultar',
+                               return_value=resultado_ok()) as brasilapi:
+            self.service.consultar_cnpj(CNPJ)
+            escritorio = Escritorio.criar_via_cnpj('11.222.333/0001-81')
+
+        self.assertEqual(brasilapi.call_count, 1)
+        self.assertEqual(escritorio.razao_social, 'Empresa Teste LTDA')
+        self.assertEqual(escritorio.estado, 'SP')
+        self.assertTrue(escritorio.criado_automaticamente)
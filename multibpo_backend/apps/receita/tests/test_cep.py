@@ -0,0 +1,134 @@
+"""
+Testes da consulta de CEP
+MultiBPO - Receita Federal
+"""
+
+import io
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..cep import CEPService, conectar_escrita, get_cep_cache, importar_csv, reset_cep_cache
+from ..sessions import close_sessions
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer
+
+
+CEP = '01001000'
+
+CSV_CEPS = """cep;logradouro;bairro;cidade;uf;ibge
+01310-100;Avenida Paulista;Bela Vista;São Paulo;SP;3550308
+20040-020;Rua da Assembleia;Centro;Rio de Janeiro;RJ;3304557
+123;inválido;;;;
+"""
+
+
+class TestCEPService(TestCase):
+
+    def setUp(self):
+        self.stub = StubCNPJServer().start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_local = str(Path(self.tmp.name) / 'cep.sqlite3')
+        close_sessions()
+        get_shared_cache().clear()
+        self.settings_override = override_settings(
+            RECEITA_CEP={
+                'BRASILAPI_URL': self.stub.brasilapi_cep_url,
+                'VIACEP_URL': self.stub.viacep_url,
+                'BASE_LOCAL': self.base_local,
+            },
+            RECEITA_HTTP={'RETRIES': 0},
+        )
+        self.settings_override.enable()
+        reset_cep_cache()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.stub.stop()
+        self.tmp.cleanup()
+        reset_cep_cache()
+        close_sessions()
+
+    def _carregar_base_local(self):
+        conexao = conectar_escrita(self.base_local)
+        self.assertEqual(importar_csv(conexao, io.StringIO(CSV_CEPS)), 2)
+        conexao.close()
+
+    def test_consulta_brasilapi_e_cache(self):
+        result = CEPService().consultar_cep('01001-000')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['fonte'], 'BrasilAPI')
+        self.assertEqual(result['cep'], '01001-000')
+        self.assertEqual(result['municipio'], 'São Paulo')
+
+        CEPService().consultar_cep(CEP)
+        self.assertEqual(self.stub.requests, 1)
+        self.assertEqual(get_cep_cache().stats()['hits_memoria'], 1)
+
+    def test_fallback_viacep(self):
+        self.stub.status['brasilapi_cep'] = 500
+        result = CEPService().consultar_cep(CEP)
+        self.assertEqual(result['fonte'], 'ViaCEP')
+        self.assertEqual(result['ibge'], '3550308')
+
+    def test_cep_inexistente_cache_negativo(self):
+        self.stub.nao_encontrados.add('99999999')
+        result = CEPService().consultar_cep('99999-999')
+        self.assertFalse(result['success'])
+
+        CEPService().consultar_cep('99999-999')
+        self.assertEqual(self.stub.requests, 2)     # BrasilAPI (404) + ViaCEP (erro), uma vez
+
+    def test_cep_invalido(self):
+        self.assertFalse(CEPService().consultar_cep('123')['success'])
+        self.assertEqual(self.stub.requests, 0)
+
+    def test_base_local_resolve_offline(self):
+        self._carregar_base_local()
+        result = CEPService().consultar_cep('01310100')
+        self.assertEqual(result['fonte'], 'BaseLocal')
+        self.assertEqual(result['logradouro'], 'Avenida Paulista')
+        self.assertEqual(result['municipio'], 'São Paulo')
+        self.assertEqual(self.stub.requests, 0)
+
+    def test_lote_combina_cache_base_local_e_api(self):
+        self._carregar_base_local()
+        CEPService().consultar_cep(CEP)
+        requests_antes = self.stub.requests
+
+        resultados = CEPService().consultar_lote(['01001-000', '01310-100', '20040020', '04538-132', 'x'])
+
+        self.assertEqual(resultados['01001-000']['fonte'], 'BrasilAPI')
+        self.assertEqual(resultados['01310-100']['fonte'], 'BaseLocal')
+        self.assertEqual(resultados['20040020']['uf'], 'RJ')
+        self.assertTrue(resultados['04538-132']['success'])
+        self.assertFalse(resultados['x']['success'])
+        self.assertEqual(self.stub.requests - requests_antes, 1)
+
+    def test_views(self):
+        response = self.client.get(reverse('receita:cep-consulta', args=['01001-000']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['uf'], 'SP')
+
+        response = self.client.get(reverse('receita:cep-consulta', args=['123']))
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.post(reverse('receita:cep-batch'), {'ceps': ['01001000', '04538132']},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['resultados']), {'01001000', '04538132'})
+
+        response = self.client.post(reverse('receita:cep-batch'), {'ceps': []}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_comando_importar_ceps(self):
+        arquivo = Path(self.tmp.name) / 'ceps.csv'
+        arquivo.write_text(CSV_CEPS, encoding='utf-8')
+        saida = StringIO()
+        call_command('importar_ceps', str(arquivo), stdout=saida)
+        self.assertIn('2 CEPs', saida.getvalue())
+        self.assertEqual(CEPService().consultar_cep('20040-020')['fonte'], 'BaseLocal')
@@ -0,0 +1,119 @@
+"""
+Testes do índice local dos dados abertos de CNPJ
+MultiBPO - Receita Federal
+"""
+
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..cache import reset_cnpj_cache
+from ..dataset import CNPJDataset, LocalDatasetProvider, listar_arquivos
+from ..providers import BrasilAPIProvider
+from ..services import ReceitaFederalService
+
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'dados_abertos' / '2025-01'
+
+
+class TestImportacaoDataset(TestCase):
+    """Importação do dump de exemplo e consulta pelo LocalDatasetProvider"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.db = str(self.tmp / 'cnpj.sqlite3')
+        self.provider = LocalDatasetProvider(CNPJDataset(self.db))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _importar(self, *caminhos, **opcoes):
+        saida = StringIO()
+        call_command('importar_dataset_cnpj', *map(str, caminhos), db=self.db, stdout=saida, **opcoes)
+        return saida.getvalue()
+
+    def test_listar_ignora_arquivos_de_outros_tipos(self):
+        nomes = [p.name for p in listar_arquivos([str(FIXTURE)])]
+        self.assertEqual(len(nomes), 4)
+        self.assertFalse(any('SIMPLES' in nome for nome in nomes))
+        self.assertTrue(nomes[-1].endswith('ESTABELE'))
+
+    def test_consulta_no_formato_normalizado(self):
+        self._importar(FIXTURE)
+        result = self.provider.consultar('11222333000181')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['fonte'], 'BaseLocal')
+        self.assertEqual(result['cnpj'], '11.222.333/0001-81')
+        self.assertEqual(result['razao_social'], 'EMPRESA FICTÍCIA DE CONTABILIDADE LTDA')
+        self.assertEqual(result['situacao'], 'ATIVA')
+        self.assertEqual(result['endereco']['logradouro'], 'RUA DAS FLORES')
+        self.assertEqual(result['endereco']['municipio'], 'SAO PAULO')
+        self.assertEqual(result['telefone'], '1133334444')
+        self.assertEqual(result['atividade_principal'], 'Atividades de contabilidade')
+        self.assertEqual(result['data_consulta'], '2025-01')
+        self.assertEqual(set(result), set(BrasilAPIProvider().resultado('11222333000181', {})))
+
+        self.assertEqual(self.provider.consultar('33000167000101')['situacao'], 'BAIXADA')
+        self.assertIsNone(self.provider.consultar('99999999000199'))
+
+    def test_importa_zip(self):
+        zip_path = self.tmp / '2025-01' / 'Estabelecimentos0.zip'
+        zip_path.parent.mkdir()
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+            arquivo_zip.write(FIXTURE / 'K3241.K03200Y0.D50111.ESTABELE', 'K3241.K03200Y0.D50111.ESTABELE')
+        self._importar(FIXTURE / 'K3241.K03200Y0.D50111.EMPRECSV', zip_path)
+
+        self.assertEqual(self.provider.consultar('11222333000181')['nome_fantasia'], 'CONTÁBIL TESTE')
+
+    def test_atualizacao_mensal_incremental(self):
+        self._importar(FIXTURE)
+        self.assertIn('já importado', self._importar(FIXTURE))
+
+        # Dump do mês seguinte: estabelecimento suspenso e razão social alterada
+        proximo = self.tmp / '2025-02'
+        proximo.mkdir()
+        for nome in ('K3241.K03200Y0.D50111.EMPRECSV', 'K3241.K03200Y0.D50111.ESTABELE'):
+            conteudo = (FIXTURE / nome).read_text(encoding='latin-1')
+            conteudo = conteudo.replace('"CONTÁBIL TESTE";"02"', '"CONTÁBIL TESTE";"03"')
+            conteudo = conteudo.replace('FICTÍCIA DE CONTABILIDADE', 'FICTÍCIA CONTÁBIL')
+            (proximo / nome).write_text(conteudo, encoding='latin-1')
+        self._importar(proximo)
+
+        result = self.provider.consultar('11222333000181')
+        self.assertEqual(result['situacao'], 'SUSPENSA')
+        self.assertEqual(result['razao_social'], 'EMPRESA FICTÍCIA CONTÁBIL LTDA')
+        self.assertEqual(result['data_consulta'], '2025-02')
+        self.assertEqual(result['endereco']['municipio'], 'SAO PAULO')  # Referência do mês anterior
+
+    def test_importacao_em_lotes(self):
+        """Lotes menores que o arquivo produzem o mesmo índice"""
+        self._importar(FIXTURE, batch_size=1)
+        self.assertTrue(self.provider.consultar('33000167000101')['success'])
+
+    def test_servico_consulta_base_local_antes_das_apis(self):
+        self._importar(FIXTURE)
+        reset_cnpj_cache()
+        service = ReceitaFederalService()
+
+        with override_settings(RECEITA_DATASET={'PATH': self.db}), \
+                mock.patch.object(ReceitaFederalService, '_consultar_fontes') as fontes:
+            result = service.consultar_cnpj('11.222.333/0001-81')
+        self.assertEqual(result['fonte'], 'BaseLocal')
+        fontes.assert_not_called()
+
+        with override_settings(RECEITA_DATASET={'PATH': self.db}), \
+                mock.patch.object(ReceitaFederalService, '_consultar_fontes',
+                                  return_value=(service._error_response('x'), False)) as fontes:
+            service.consultar_cnpj('99999999000199')
+        fontes.assert_called_once()
+
+    def test_sem_indice_segue_para_apis(self):
+        with override_settings(RECEITA_DATASET={'PATH': str(self.tmp / 'inexistente.sqlite3')}):
+            self.assertIsNone(ReceitaFederalService().consultar_base_local('11222333000181'))
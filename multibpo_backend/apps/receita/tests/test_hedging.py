@@ -0,0 +1,142 @@
+"""
+Testes do fan-out hedged/paralelo entre provedores
+MultiBPO - Receita Federal
+"""
+
+import time
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from ..cache import reset_cnpj_cache
+from ..latency import LatencyTracker, get_latency_tracker, percentil
+from ..limits import _prioridade_lote, prioridade_lote
+from ..services import ReceitaFederalService, get_hedge_config
+from ..sessions import close_sessions
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer
+
+
+CNPJ = '11222333000181'
+
+
+class TestLatencyTracker(TestCase):
+
+    def test_percentil_nearest_rank(self):
+        valores = [i / 100 for i in range(1, 101)]
+        self.assertEqual(percentil(valores, 0.95), 0.95)
+        self.assertEqual(percentil(valores, 0.5), 0.5)
+        self.assertIsNone(percentil([], 0.95))
+
+    def test_janela_deslizante_e_snapshot(self):
+        tracker = LatencyTracker(janela=3)
+        for segundos in (0.1, 0.2, 0.3, 0.4):
+            tracker.record('BrasilAPI', segundos, True)
+        tracker.record('ReceitaWS', 1.0, False)
+
+        self.assertEqual(tracker.amostras('BrasilAPI'), 3)
+        self.assertEqual(tracker.percentile('BrasilAPI', 0.95), 0.4)
+        self.assertIsNone(tracker.percentile('ReceitaWS', 0.95))
+        self.assertEqual(tracker.snapshot()['ReceitaWS']['taxa_sucesso'], 0.0)
+
+
+class TestHedgeDelay(TestCase):
+
+    def setUp(self):
+        get_latency_tracker().reset()
+
+    def tearDown(self):
+        get_latency_tracker().reset()
+
+    @override_settings(RECEITA_HEDGE={'DELAY': 0.8, 'MIN_AMOSTRAS': 5})
+    def test_delay_fixo_sem_amostras(self):
+        service = ReceitaFederalService()
+        self.assertEqual(service._hedge_delay('BrasilAPI', get_hedge_config()), 0.8)
+
+    @override_settings(RECEITA_HEDGE={'DELAY': 0.8, 'MIN_AMOSTRAS': 5, 'MIN_DELAY': 0.05, 'MAX_DELAY': 1.0})
+    def test_delay_adaptativo_usa_p95_com_limites(self):
+        tracker = get_latency_tracker()
+        for _ in range(10):
+            tracker.record('BrasilAPI', 0.2, True)
+        service = ReceitaFederalService()
+        self.assertAlmostEqual(service._hedge_delay('BrasilAPI', get_hedge_config()), 0.2)
+
+        for _ in range(10):
+            tracker.record('BrasilAPI', 5.0, True)
+        self.assertEqual(service._hedge_delay('BrasilAPI', get_hedge_config()), 1.0)
+
+
+class TestFanOutProvedores(TestCase):
+    """BrasilAPI lenta no stub: hedge deve responder via ReceitaWS"""
+
+    def setUp(self):
+        self.stub = StubCNPJServer(delays={'brasilapi': 0.6}).start()
+        reset_cnpj_cache()
+        close_sessions()
+        get_shared_cache().clear()
+        get_latency_tracker().reset()
+        self.urls = {
+            'RECEITA_BRASILAPI_URL': self.stub.brasilapi_url,
+            'RECEITA_RECEITAWS_URL': self.stub.receitaws_url,
+        }
+
+    def tearDown(self):
+        self.stub.stop()
+        reset_cnpj_cache()
+        close_sessions()
+        get_latency_tracker().reset()
+
+    def _consultar(self, **hedge):
+        with override_settings(RECEITA_HEDGE=hedge, **self.urls):
+            inicio = time.perf_counter()
+            result = ReceitaFederalService().consultar_cnpj(CNPJ, usar_cache=False)
+            return result, time.perf_counter() - inicio
+
+    def test_sequencial_espera_primario(self):
+        result, duracao = self._consultar(MODE='sequencial')
+        self.assertEqual(result['fonte'], 'BrasilAPI')
+        self.assertGreaterEqual(duracao, 0.6)
+
+    def test_hedged_aciona_secundario_apos_delay(self):
+        result, duracao = self._consultar(MODE='hedged', DELAY=0.05, ADAPTIVE=False)
+        self.assertEqual(result['fonte'], 'ReceitaWS')
+        self.assertLess(duracao, 0.5)
+
+    def test_hedged_nao_aciona_secundario_se_primario_rapido(self):
+        self.stub.delays['brasilapi'] = 0
+        result, _ = self._consultar(MODE='hedged', DELAY=0.5, ADAPTIVE=False)
+        self.assertEqual(result['fonte'], 'BrasilAPI')
+        self.assertFalse(any(p.startswith('/v1/cnpj/') for p in self.stub.paths))
+
+    def test_paralelo_retorna_primeiro_sucesso(self):
+        result, duracao = self._consultar(MODE='paralelo')
+        self.assertEqual(result['fonte'], 'ReceitaWS')
+        self.assertLess(duracao, 0.5)
+
+    def test_falha_rapida_aciona_proximo_sem_esperar_delay(self):
+        self.stub.delays['brasilapi'] = 0
+        self.stub.status['brasilapi'] = 500
+        result, duracao = self._consultar(MODE='hedged', DELAY=2.0, ADAPTIVE=False)
+        self.assertEqual(result['fonte'], 'ReceitaWS')
+        self.assertLess(duracao, 1.0)
+
+    def test_latencia_registrada_por_provedor(self):
+        self.stub.delays['brasilapi'] = 0
+        self._consultar(MODE='sequencial')
+        self.assertEqual(get_latency_tracker().amostras('BrasilAPI'), 1)
+
+    def test_hedged_propaga_prioridade_de_lote_para_o_executor(self):
+        """As consultas no pool do hedge seguem a política de quem chamou"""
+        vistos = []
+        executar = ReceitaFederalService._executar_provedor
+
+        def registrar(service, *args):
+            vistos.append(_prioridade_lote.get())
+            return executar(service, *args)
+
+        with mock.patch.object(ReceitaFederalService, '_executar_provedor', registrar):
+            with prioridade_lote():
+                self._consultar(MODE='hedged', DELAY=0.05, ADAPTIVE=False)
+            self._consultar(MODE='hedged', DELAY=0.05, ADAPTIVE=False)
+
+        self.assertEqual(vistos, [True, True, False, False])
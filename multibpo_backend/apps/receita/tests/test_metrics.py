@@ -0,0 +1,149 @@
+"""
+Testes das métricas dos provedores (Prometheus e resumo em JSON)
+MultiBPO - Receita Federal
+"""
+
+import asyncio
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..async_services import AsyncReceitaFederalService
+from ..cache import reset_cnpj_cache
+from ..latency import get_latency_tracker
+from ..metrics import MetricsRegistry, get_metrics, reset_metrics
+from ..services import ReceitaFederalService
+from ..sessions import close_sessions
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer
+
+
+CNPJ = '11222333000181'
+
+
+class TestMetricsRegistry(TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry({
+            'ENABLED': True, 'JANELA': 60, 'MAX_EVENTOS': 100, 'BUCKETS': [0.1, 1], 'TOKEN': '',
+        })
+
+    def test_histograma_cumulativo_no_formato_prometheus(self):
+        for segundos in (0.05, 0.5, 3):
+            self.registry.registrar_chamada('BrasilAPI', 'sucesso', 200, segundos)
+
+        texto = self.registry.render_prometheus()
+        self.assertIn('# TYPE receita_provider_latency_seconds histogram', texto)
+        self.assertIn('receita_provider_requests_total{provider="BrasilAPI",outcome="sucesso",status="200"} 3', texto)
+        self.assertIn('receita_provider_latency_seconds_bucket{provider="BrasilAPI",outcome="sucesso",le="0.1"} 1', texto)
+        self.assertIn('receita_provider_latency_seconds_bucket{provider="BrasilAPI",outcome="sucesso",le="1.0"} 2', texto)
+        self.assertIn('receita_provider_latency_seconds_bucket{provider="BrasilAPI",outcome="sucesso",le="+Inf"} 3', texto)
+        self.assertIn('receita_provider_latency_seconds_count{provider="BrasilAPI",outcome="sucesso"} 3', texto)
+        self.assertTrue(texto.endswith('\n'))
+
+    def test_chamada_sem_rede_nao_entra_no_histograma(self):
+        self.registry.registrar_chamada('ReceitaWS', 'breaker_aberto')
+
+        texto = self.registry.render_prometheus()
+        self.assertIn('receita_provider_requests_total{provider="ReceitaWS",outcome="breaker_aberto",status=""} 1', texto)
+        self.assertNotIn('receita_provider_latency_seconds_count{provider="ReceitaWS"', texto)
+
+    def test_resumo_da_janela(self):
+        self.registry.registrar_chamada('BrasilAPI', 'sucesso', 200, 0.2)
+        self.registry.registrar_chamada('BrasilAPI', 'erro_http', 500, 0.4)
+        self.registry.registrar_chamada('BrasilAPI', 'sem_cota')
+        self.registry.registrar_consulta('cnpj', 'memoria', 0.001)
+        self.registry.registrar_consulta('cnpj', 'externa', 0.6)
+        self.registry.registrar_fallback(2, True)
+
+        resumo = self.registry.resumo()
+        brasilapi = resumo['provedores']['BrasilAPI']
+        self.assertEqual(brasilapi['chamadas'], 3)
+        self.assertEqual(brasilapi['resultados'], {'sucesso': 1, 'erro_http': 1, 'sem_cota': 1})
+        self.assertEqual(brasilapi['status'], {'200': 1, '500': 1})
+        self.assertEqual(brasilapi['taxa_sucesso'], 0.5)
+        self.assertEqual(brasilapi['latencia']['p95_ms'], 400.0)
+        self.assertEqual(resumo['consultas']['cnpj']['origens'], {'memoria': 1, 'externa': 1})
+        self.assertEqual(resumo['fallback'], {'2': {'sucesso': 1, 'falha': 0}})
+        self.assertEqual(self.registry.resumo(janela=0)['eventos'], 0)
+
+    def test_desabilitado_nao_registra(self):
+        registry = MetricsRegistry({**self.registry.config, 'ENABLED': False})
+        registry.registrar_chamada('BrasilAPI', 'sucesso', 200, 0.1)
+        self.assertEqual(registry.resumo()['eventos'], 0)
+
+
+class TestMetricsService(TestCase):
+    """Instrumentação de ReceitaFederalService contra o stub HTTP"""
+
+    def setUp(self):
+        get_shared_cache().clear()
+        get_latency_tracker().reset()
+        reset_cnpj_cache()
+        reset_metrics()
+        close_sessions()
+        self.stub = StubCNPJServer(status={'brasilapi': 500}).start()
+        self.settings_override = override_settings(
+            RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+            RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+            RECEITA_HEDGE={'MODE': 'sequencial'},
+            RECEITA_HTTP={'RETRIES': 0},
+            RECEITA_BREAKER={'ADAPTIVE_ORDER': False},
+            RECEITA_RATE_LIMIT={'ENABLED': False},
+            RECEITA_DATASET={'ENABLED': False},
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.stub.stop()
+        close_sessions()
+        reset_cnpj_cache()
+        reset_metrics()
+        get_shared_cache().clear()
+
+    def test_fallback_status_e_origem(self):
+        service = ReceitaFederalService()
+        self.assertTrue(service.consultar_cnpj(CNPJ)['success'])
+        self.assertTrue(service.consultar_cnpj(CNPJ)['success'])
+
+        resumo = get_metrics().resumo()
+        self.assertEqual(resumo['provedores']['BrasilAPI']['resultados'], {'erro_http': 1})
+        self.assertEqual(resumo['provedores']['BrasilAPI']['status'], {'500': 1})
+        self.assertEqual(resumo['provedores']['ReceitaWS']['resultados'], {'sucesso': 1})
+        self.assertEqual(resumo['fallback'], {'2': {'sucesso': 1, 'falha': 0}})
+        self.assertEqual(resumo['consultas']['cnpj']['origens'], {'externa': 1, 'memoria': 1})
+
+    def test_async_registra_as_mesmas_metricas(self):
+        self.assertTrue(asyncio.run(AsyncReceitaFederalService().consultar_cnpj(CNPJ))['success'])
+
+        resumo = get_metrics().resumo()
+        self.assertEqual(resumo['provedores']['BrasilAPI']['status'], {'500': 1})
+        self.assertEqual(resumo['provedores']['ReceitaWS']['resultados'], {'sucesso': 1})
+        self.assertEqual(resumo['consultas']['cnpj']['origens'], {'externa': 1})
+
+    def test_endpoints(self):
+        ReceitaFederalService().consultar_cnpj(CNPJ)
+        client = APIClient()
+
+        response = client.get(reverse('receita:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'receita_lookups_total{kind="cnpj",origin="externa"} 1', response.content)
+
+        response = client.get(reverse('receita:metrics-resumo'), {'janela': '60'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['janela_segundos'], 60)
+        self.assertEqual(client.get(reverse('receita:metrics-resumo'), {'janela': 'x'}).status_code, 400)
+
+    @override_settings(RECEITA_METRICS={'TOKEN': 'segredo'})
+    def test_token_obrigatorio_quando_configurado(self):
+        client = APIClient()
+        self.assertEqual(client.get(reverse('receita:metrics')).status_code, 401)
+        self.assertEqual(client.get(reverse('receita:metrics-resumo')).status_code, 401)
+        response = client.get(reverse('receita:metrics'), HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, 200)
+        response = client.get(reverse('receita:metrics-resumo'), HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('provedores', response.json())
@@ -0,0 +1,121 @@
+"""
+Testes da sondagem em background e dos health checks
+MultiBPO - Receita Federal
+"""
+
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..cache import reset_cnpj_cache
+from ..latency import get_latency_tracker
+from ..prober import get_prober, get_prober_config, obter_snapshot, sondar, sondar_se_vencido
+from ..sessions import close_sessions
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer
+
+
+class TestProber(TestCase):
+
+    def setUp(self):
+        self.stub = StubCNPJServer().start()
+        reset_cnpj_cache()
+        close_sessions()
+        get_shared_cache().clear()
+        get_latency_tracker().reset()
+        self.settings_override = override_settings(
+            RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+            RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+            RECEITA_HTTP={'RETRIES': 0},
+            RECEITA_PROBER={'INTERVAL': 60},
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        get_prober().parar(timeout=5)
+        self.settings_override.disable()
+        self.stub.stop()
+        close_sessions()
+        get_shared_cache().clear()
+
+    def test_sondagem_grava_snapshot_por_provedor(self):
+        self.stub.status['receitaws'] = 500
+        sondar()
+
+        snapshot = obter_snapshot()
+        self.assertTrue(snapshot['test_cnpj'])
+        self.assertTrue(snapshot['provedores']['BrasilAPI']['ok'])
+        self.assertFalse(snapshot['provedores']['ReceitaWS']['ok'])
+        self.assertIsNotNone(snapshot['provedores']['ReceitaWS']['ultimo_erro'])
+        self.assertIn('BrasilAPI', snapshot['latencias'])
+
+    def test_ultimo_erro_preservado_apos_recuperacao(self):
+        self.stub.status['receitaws'] = 500
+        sondar()
+        del self.stub.status['receitaws']
+        sondar()
+
+        status = obter_snapshot()['provedores']['ReceitaWS']
+        self.assertTrue(status['ok'])
+        self.assertIsNotNone(status['ultimo_erro_em'])
+
+    def test_uma_sondagem_por_intervalo_entre_workers(self):
+        self.assertIsNotNone(sondar_se_vencido())
+        self.assertIsNone(sondar_se_vencido())
+        self.assertEqual(self.stub.requests, 2 + len(get_prober_config()['EXEMPLOS']))
+
+    def test_health_nao_consulta_apis_externas(self):
+        sondar()
+        requests_antes = self.stub.requests
+
+        with override_settings(RECEITA_PROBER={'ENABLED': False}):
+            inicio = time.perf_counter()
+            response = self.client.get(reverse('receita:health-check'))
+            duracao = time.perf_counter() - inicio
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(duracao, 0.5)
+        self.assertEqual(self.stub.requests, requests_antes)
+        self.assertTrue(response.json()['test_cnpj'])
+        self.assertIn('ReceitaWS', response.json()['sondagem']['provedores'])
+
+    def test_exemplos_servidos_do_snapshot(self):
+        sondar()
+        requests_antes = self.stub.requests
+
+        with override_settings(RECEITA_PROBER={'ENABLED': False}):
+            response = self.client.get(reverse('receita:test-cnpjs'))
+            response_async = self.client.get(reverse('receita:test-cnpjs-async'))
+
+        self.assertEqual(self.stub.requests, requests_antes)
+        for resposta in (response, response_async):
+            self.assertEqual(resposta.status_code, 200)
+            self.assertEqual(set(resposta.json()['test_results']), set(get_prober_config()['EXEMPLOS']))
+            self.assertEqual(resposta.json()['working_apis'], 3)
+
+    def test_exemplos_sem_sondagem_nao_consultam_apis(self):
+        with override_settings(RECEITA_PROBER={'ENABLED': False}):
+            response = self.client.get(reverse('receita:test-cnpjs'))
+
+        self.assertEqual(self.stub.requests, 0)
+        self.assertEqual(response.json()['test_results'], {})
+        self.assertFalse(response.json()['sondagem']['disponivel'])
+
+    def test_health_inicia_prober_em_background(self):
+        response = self.client.get(reverse('receita:health-check'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['sondagem'].get('disponivel', True))
+
+        prazo = time.monotonic() + 5
+        while obter_snapshot() is None and time.monotonic() < prazo:
+            time.sleep(0.05)
+        self.assertIsNotNone(obter_snapshot())
+
+    def test_comando_sondar_receita(self):
+        saida = StringIO()
+        call_command('sondar_receita', stdout=saida)
+        self.assertIn('BrasilAPI', saida.getvalue())
+        self.assertIsNotNone(obter_snapshot())
@@ -0,0 +1,118 @@
+"""
+Testes da seleção/projeção de campos das consultas de CNPJ
+MultiBPO - Receita Federal
+"""
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..cache import reset_cnpj_cache
+from ..projecao import parse_campos, projetar, projetar_dados_receita, selecionar_campos
+from ..providers import BrasilAPIProvider
+from ..sessions import close_sessions
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer, payload_brasilapi
+
+
+CNPJ = '11222333000181'
+
+
+def resultado_completo():
+    return BrasilAPIProvider().resultado(CNPJ, payload_brasilapi(CNPJ))
+
+
+class TestProjecao(TestCase):
+
+    def test_projetar_campos_e_subcampos(self):
+        dados = {'a': 1, 'b': {'x': 1, 'y': 2}, 'c': 3}
+        self.assertEqual(projetar(dados, ['a', 'b.y', 'inexistente', 'c.z']), {'a': 1, 'b': {'y': 2}})
+
+    def test_parse_campos(self):
+        self.assertEqual(parse_campos(QueryDict('')), {'campos': None, 'incluir_raw': False})
+        self.assertEqual(parse_campos(QueryDict('fields=razao_social, endereco.uf&include=raw')),
+                         {'campos': {'razao_social', 'endereco.uf'}, 'incluir_raw': True})
+        self.assertTrue(parse_campos(QueryDict('fields=cnpj,raw_data'))['incluir_raw'])
+
+    def test_padrao_remove_raw_data(self):
+        result = resultado_completo()
+        slim = selecionar_campos(result)
+        self.assertNotIn('raw_data', slim)
+        self.assertEqual(slim['razao_social'], result['razao_social'])
+        self.assertIn('raw_data', selecionar_campos(result, incluir_raw=True))
+
+    def test_campos_obrigatorios_sempre_presentes(self):
+        slim = selecionar_campos(resultado_completo(), {'endereco.uf'})
+        self.assertEqual(slim, {'success': True, 'endereco': {'uf': 'SP'}})
+
+    def test_projecao_persistida_configuravel(self):
+        dados = projetar_dados_receita(resultado_completo())
+        self.assertNotIn('raw_data', dados)
+        self.assertEqual(dados['endereco']['uf'], 'SP')
+
+        with override_settings(RECEITA_PROJECAO={'PERSISTIR': ['cnpj', 'situacao']}):
+            self.assertEqual(set(projetar_dados_receita(resultado_completo())), {'cnpj', 'situacao'})
+
+
+class TestProjecaoEndpoints(TestCase):
+    """Views e persistência contra o stub local"""
+
+    def setUp(self):
+        self.stub = StubCNPJServer().start()
+        reset_cnpj_cache()
+        close_sessions()
+        get_shared_cache().clear()
+        self.settings_override = override_settings(
+            RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+            RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+            RECEITA_HEDGE={'MODE': 'sequencial'},
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.stub.stop()
+        reset_cnpj_cache()
+        close_sessions()
+
+    def test_view_sem_raw_data_por_padrao(self):
+        url = reverse('receita:cnpj-consulta', args=[CNPJ])
+        self.assertNotIn('raw_data', self.client.get(url).json())
+        self.assertIn('raw_data', self.client.get(url, {'include': 'raw'}).json())
+
+        response = self.client.get(url, {'fields': 'razao_social,endereco.municipio'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'success', 'razao_social', 'endereco'})
+
+    def test_view_erro_mantem_mensagem(self):
+        response = self.client.get(reverse('receita:cnpj-consulta', args=['123']), {'fields': 'razao_social'})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('message', response.json())
+
+    def test_criar_via_cnpj_grava_projecao(self):
+        from apps.contadores.models import Escritorio
+
+        escritorio = Escritorio.criar_via_cnpj('11.222.333/0001-81')
+        escritorio.refresh_from_db()
+        self.assertNotIn('raw_data', escritorio.dados_receita_federal)
+        self.assertEqual(escritorio.dados_receita_federal['razao_social'], escritorio.razao_social)
+
+    def test_comando_compacta_linhas_existentes(self):
+        from apps.contadores.models import Escritorio
+
+        escritorio = Escritorio.criar_via_cnpj('11.222.333/0001-81')
+        Escritorio.objects.filter(pk=escritorio.pk).update(dados_receita_federal=resultado_completo())
+
+        call_command('compactar_dados_receita', '--dry-run', stdout=StringIO())
+        escritorio.refresh_from_db()
+        self.assertIn('raw_data', escritorio.dados_receita_federal)
+
+        saida = StringIO()
+        call_command('compactar_dados_receita', stdout=saida)
+        escritorio.refresh_from_db()
+        self.assertNotIn('raw_data', escritorio.dados_receita_federal)
+        self.assertEqual(escritorio.dados_receita_federal, projetar_dados_receita(resultado_completo()))
+        self.assertIn('Escritorio', saida.getvalue())
@@ -0,0 +1,143 @@
+"""
+Testes do registro de provedores e da normalização compilada
+MultiBPO - Receita Federal
+"""
+
+import asyncio
+
+from django.test import TestCase, override_settings
+
+from ..async_services import AsyncReceitaFederalService
+from ..cache import reset_cnpj_cache
+from ..providers import (
+    BrasilAPIProvider, Campo, FakeProvider, Normalizador, ReceitaWSProvider, ResultadoCNPJ, get_provedores,
+)
+from ..services import ReceitaFederalService
+from ..shared import get_shared_cache
+from ..stubs import payload_brasilapi, payload_receitaws
+
+
+CNPJ = '11222333000181'
+
+
+class TestNormalizador(TestCase):
+
+    def test_caminhos_alternativas_e_padrao(self):
+        normalizar = Normalizador({
+            'razao_social': 'empresa.nome',
+            'telefone': ('telefone', 'contatos.0.numero'),
+            'situacao': Campo('situacao', padrao='ATIVA'),
+            'email': Campo('email', converter=str.lower),
+            'endereco.uf': 'uf',
+        })
+        result = normalizar('Teste', CNPJ, {
+            'empresa': {'nome': 'ACME'},
+            'telefone': '',
+            'contatos': [{'numero': '1133334444'}],
+            'email': 'CONTATO@ACME.COM',
+            'uf': 'SP',
+        })
+
+        self.assertIsInstance(result, ResultadoCNPJ)
+        self.assertEqual(result.cnpj, '11.222.333/0001-81')
+        self.assertEqual(result.razao_social, 'ACME')
+        self.assertEqual(result.telefone, '1133334444')
+        self.assertEqual(result.situacao, 'ATIVA')
+        self.assertEqual(result.email, 'contato@acme.com')
+        self.assertEqual(result.endereco.uf, 'SP')
+        self.assertEqual(result.endereco.cep, '')
+
+    def test_destino_desconhecido(self):
+        with self.assertRaises(ValueError):
+            Normalizador({'endereco.pais': 'pais'})
+        with self.assertRaises(ValueError):
+            Normalizador({'contato.email': 'email'})
+
+    def test_resultado_usa_slots(self):
+        with self.assertRaises(AttributeError):
+            ResultadoCNPJ(fonte='x', cnpj=CNPJ).extra = 1
+
+    def test_provedores_no_mesmo_formato(self):
+        brasilapi = BrasilAPIProvider().resultado(CNPJ, payload_brasilapi(CNPJ))
+        receitaws = ReceitaWSProvider().resultado(CNPJ, payload_receitaws(CNPJ))
+
+        self.assertEqual(set(brasilapi), set(receitaws))
+        self.assertEqual(brasilapi['fonte'], 'BrasilAPI')
+        self.assertEqual(receitaws['razao_social'], brasilapi['razao_social'])
+        self.assertEqual(brasilapi['telefone'], '1133334444')
+        self.assertEqual(receitaws['atividade_principal'], 'Atividades de contabilidade')
+
+    def test_brasilapi_situacao_numerica(self):
+        """situacao_cadastral da BrasilAPI é o código (2); o resultado traz o texto"""
+        self.assertEqual(BrasilAPIProvider().resultado(CNPJ, payload_brasilapi(CNPJ))['situacao'], 'ATIVA')
+        payload = payload_brasilapi(CNPJ)
+        del payload['descricao_situacao_cadastral']
+        payload['situacao_cadastral'] = 8
+        self.assertEqual(BrasilAPIProvider().resultado(CNPJ, payload)['situacao'], 'BAIXADA')
+
+    def test_criar_escritorio_com_resultado_da_brasilapi(self):
+        from apps.contadores.models import Escritorio
+
+        payload = dict(payload_brasilapi(CNPJ), situacao_cadastral=4, descricao_situacao_cadastral='INAPTA')
+        escritorio = Escritorio.criar_via_cnpj('11.222.333/0001-81', BrasilAPIProvider().resultado(CNPJ, payload))
+        self.assertEqual(escritorio.situacao_cadastral, 'inapta')
+
+        # Resultado em cache anterior à normalização (código numérico)
+        escritorio = Escritorio.criar_via_cnpj('67.640.779/6872-08', {'razao_social': 'ACME', 'situacao': 2})
+        self.assertEqual(escritorio.situacao_cadastral, 'ativa')
+
+    def test_campos_ausentes_nao_quebram(self):
+        """atividade_principal vazia ou ausente não levanta IndexError"""
+        result = BrasilAPIProvider().resultado(CNPJ, {'atividade_principal': []})
+        self.assertTrue(result['success'])
+        self.assertEqual(result['atividade_principal'], '')
+
+    def test_receitaws_status_error(self):
+        result = ReceitaWSProvider().resultado(CNPJ, {'status': 'ERROR', 'message': 'CNPJ inválido'})
+        self.assertFalse(result['success'])
+        self.assertEqual(result['message'], 'CNPJ inválido')
+
+
+class TestRegistro(TestCase):
+
+    def test_padrao(self):
+        self.assertEqual([p.nome for p in get_provedores()], ['BrasilAPI', 'ReceitaWS'])
+
+    @override_settings(RECEITA_PROVIDERS={'CNPJ': ['ReceitaWS', 'apps.receita.providers.FakeProvider']})
+    def test_nome_e_caminho(self):
+        provedores = get_provedores()
+        self.assertEqual([p.nome for p in provedores], ['ReceitaWS', 'Fake'])
+        self.assertIsInstance(provedores[1], FakeProvider)
+
+    @override_settings(RECEITA_PROVIDERS={'CNPJ': ['Inexistente']})
+    def test_provedor_desconhecido(self):
+        with self.assertRaises(ValueError):
+            get_provedores()
+
+
+@override_settings(
+    RECEITA_PROVIDERS={'CNPJ': ['Fake'], 'FAKE_NAO_ENCONTRADOS': ['99999999000191']},
+    RECEITA_HEDGE={'MODE': 'sequencial'},
+    RECEITA_DATASET={'ENABLED': False},
+)
+class TestFakeProvider(TestCase):
+    """O serviço inteiro roda sobre o provedor fake, sem rede"""
+
+    def setUp(self):
+        get_shared_cache().clear()
+        reset_cnpj_cache()
+
+    def tearDown(self):
+        reset_cnpj_cache()
+        get_shared_cache().clear()
+
+    def test_consulta_sincrona(self):
+        result = ReceitaFederalService().consultar_cnpj(CNPJ)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['fonte'], 'Fake')
+        self.assertFalse(ReceitaFederalService().consultar_cnpj('99999999000191')['success'])
+
+    def test_consulta_assincrona(self):
+        result = asyncio.run(AsyncReceitaFederalService().consultar_cnpj(CNPJ))
+        self.assertTrue(result['success'])
+        self.assertEqual(result['fonte'], 'Fake')
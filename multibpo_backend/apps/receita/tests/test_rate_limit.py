@@ -0,0 +1,169 @@
+"""
+Testes do orçamento de chamadas (token bucket) por provedor
+MultiBPO - Receita Federal
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from ..async_services import AsyncReceitaFederalService
+from ..breaker import FECHADO, get_breaker
+from ..cache import reset_cnpj_cache
+from ..latency import get_latency_tracker
+from ..limits import get_provider_limiter, get_rate_limiter, prioridade_lote
+from ..services import ReceitaFederalService
+from ..sessions import close_sessions, retry_after
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer
+
+
+CNPJ = '11222333000181'
+
+
+def _limite(rate, period, burst, **extra):
+    return {'PROVIDERS': {'ReceitaWS': {'RATE': rate, 'PERIOD': period, 'BURST': burst}}, **extra}
+
+
+class TestTokenBucket(TestCase):
+
+    def setUp(self):
+        get_shared_cache().clear()
+
+    @override_settings(RECEITA_RATE_LIMIT=_limite(1, 60, 3, MAX_WAIT=0.1))
+    def test_burst_consumido_e_depois_pula_provedor(self):
+        limiter = get_rate_limiter()
+        self.assertEqual([limiter.adquirir('ReceitaWS') for _ in range(3)], [True] * 3)
+
+        inicio = time.perf_counter()
+        self.assertFalse(limiter.adquirir('ReceitaWS'))
+        # Ficha só sai em ~60s: desiste na hora em vez de esperar MAX_WAIT
+        self.assertLess(time.perf_counter() - inicio, 0.05)
+        self.assertLess(limiter.status()['ReceitaWS']['fichas'], 1)
+
+    @override_settings(RECEITA_RATE_LIMIT=_limite(20, 1, 1, MAX_WAIT=1.0))
+    def test_espera_reposicao_dentro_do_prazo(self):
+        limiter = get_rate_limiter()
+        inicio = time.perf_counter()
+        for _ in range(3):
+            self.assertTrue(limiter.adquirir('ReceitaWS'))
+        # 1 ficha de burst + 2 repostas a 20/s
+        self.assertGreaterEqual(time.perf_counter() - inicio, 0.09)
+
+    @override_settings(RECEITA_RATE_LIMIT=_limite(1, 60, 3, MAX_WAIT=0.1))
+    def test_orcamento_compartilhado_entre_threads(self):
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            obtidas = list(pool.map(lambda _: get_rate_limiter().adquirir('ReceitaWS'), range(10)))
+        self.assertEqual(sum(obtidas), 3)
+
+    @override_settings(RECEITA_RATE_LIMIT=_limite(1, 60, 3, MAX_WAIT=0.1, MAX_WAIT_LOTE=0.1))
+    def test_lote_nao_consome_reserva_interativa(self):
+        limiter = get_rate_limiter()
+        with prioridade_lote():
+            obtidas = [limiter.adquirir('ReceitaWS') for _ in range(3)]
+        self.assertEqual(obtidas, [True, False, False])
+        self.assertTrue(limiter.adquirir('ReceitaWS'))
+
+    def test_provedor_sem_limite_configurado(self):
+        self.assertTrue(all(get_rate_limiter().adquirir('BrasilAPI') for _ in range(100)))
+        self.assertNotIn('BrasilAPI', get_rate_limiter().status())
+
+    @override_settings(RECEITA_RATE_LIMIT=_limite(100, 1, 5))
+    def test_penalizar_bloqueia_ate_retry_after(self):
+        limiter = get_rate_limiter()
+        limiter.penalizar('ReceitaWS', 30)
+        self.assertFalse(limiter.adquirir('ReceitaWS'))
+        self.assertGreater(limiter.status()['ReceitaWS']['bloqueado_por'], 29)
+
+    @override_settings(RECEITA_RATE_LIMIT=_limite(1, 60, 2, MAX_WAIT=0.1))
+    def test_async_compartilha_orcamento(self):
+        async def rodar():
+            return await asyncio.gather(*(get_rate_limiter().aadquirir('ReceitaWS') for _ in range(4)))
+
+        self.assertEqual(sum(asyncio.run(rodar())), 2)
+
+    def test_retry_after_numero_e_data(self):
+        self.assertEqual(retry_after({'Retry-After': '120'}), 120.0)
+        self.assertIsNone(retry_after({}))
+        self.assertIsNone(retry_after({'Retry-After': 'amanhã'}))
+        data = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 60))
+        self.assertAlmostEqual(retry_after({'Retry-After': data}), 60, delta=2)
+
+
+class TestServiceComRateLimit(TestCase):
+    """429 do provedor pausa o bucket e não abre o circuito"""
+
+    def setUp(self):
+        get_shared_cache().clear()
+        get_latency_tracker().reset()
+        reset_cnpj_cache()
+        close_sessions()
+        self.stub = StubCNPJServer(
+            status={'brasilapi': 500, 'receitaws': 429},
+            headers={'receitaws': {'Retry-After': '45'}},
+        ).start()
+        self.settings_override = override_settings(
+            RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+            RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+            RECEITA_HEDGE={'MODE': 'sequencial'},
+            RECEITA_HTTP={'RETRIES': 0},
+            RECEITA_BREAKER={'MIN_CALLS': 2, 'ADAPTIVE_ORDER': False},
+            RECEITA_RATE_LIMIT=_limite(100, 60, 10),
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.stub.stop()
+        close_sessions()
+        reset_cnpj_cache()
+        get_shared_cache().clear()
+
+    def test_429_respeita_retry_after(self):
+        for _ in range(3):
+            self.assertFalse(ReceitaFederalService().consultar_cnpj(CNPJ, usar_cache=False)['success'])
+
+        receitaws_calls = [p for p in self.stub.paths if p.startswith('/v1/cnpj/')]
+        self.assertEqual(len(receitaws_calls), 1)
+        self.assertGreater(get_rate_limiter().status()['ReceitaWS']['bloqueado_por'], 40)
+        self.assertEqual(get_breaker('ReceitaWS').estado(), FECHADO)
+        self.assertEqual(get_breaker('ReceitaWS').contagens(), (0, 0))
+
+
+@override_settings(RECEITA_HTTP={'RETRIES': 0, 'PROVIDERS': {'ReceitaWS': {'POOL_SIZE': 1, 'ACQUIRE_TIMEOUT': 0}}})
+class TestFichaAntesDaVaga(TestCase):
+    """Quem espera ficha do rate limit não segura a vaga de concorrência do provedor"""
+
+    def setUp(self):
+        get_shared_cache().clear()
+        get_provider_limiter().reset()
+        self.vagas = []
+
+    def tearDown(self):
+        get_provider_limiter().reset()
+
+    def _vaga_livre(self, provider):
+        with get_provider_limiter().vaga(provider) as liberado:
+            self.vagas.append(liberado)
+        return True
+
+    def test_sincrono(self):
+        with mock.patch.object(get_rate_limiter(), 'adquirir', side_effect=self._vaga_livre):
+            result, _ = ReceitaFederalService()._executar_provedor('ReceitaWS', lambda cnpj: {'success': True}, CNPJ)
+        self.assertTrue(result['success'])
+        self.assertEqual(self.vagas, [True])
+
+    def test_assincrono(self):
+        async def aadquirir(provider):
+            return self._vaga_livre(provider)
+
+        async def consultar(cnpj):
+            return {'success': True}
+
+        with mock.patch.object(get_rate_limiter(), 'aadquirir', side_effect=aadquirir):
+            result, _ = asyncio.run(AsyncReceitaFederalService()._executar_provedor('ReceitaWS', consultar, CNPJ))
+        self.assertTrue(result['success'])
+        self.assertEqual(self.vagas, [True])
@@ -0,0 +1,144 @@
+"""
+Testes da revalidação da situação cadastral dos escritórios
+MultiBPO - Receita Federal
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.authentication.serializers.bpo import BPORegistroSerializer
+from apps.contadores.models import Contador, Escritorio
+
+from ..cache import reset_cnpj_cache
+from ..revalidacao import _paginas, normalizar_situacao, revalidar_escritorios
+from ..sessions import close_sessions
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer
+
+
+CNPJS = ['67640779687208', '99269486658074', '71866493406221', '11222333000181']
+
+
+def _formatar(cnpj):
+    return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+
+
+class TestNormalizarSituacao(TestCase):
+
+    def test_codigo_e_texto(self):
+        self.assertEqual(normalizar_situacao('ATIVA'), 'ativa')
+        self.assertEqual(normalizar_situacao(2), 'ativa')
+        self.assertEqual(normalizar_situacao('08'), 'baixada')
+        self.assertIsNone(normalizar_situacao('desconhecida'))
+        self.assertIsNone(normalizar_situacao(None))
+
+
+class TestRevalidarEscritorios(TestCase):
+
+    def setUp(self):
+        self.stub = StubCNPJServer().start()
+        reset_cnpj_cache()
+        close_sessions()
+        get_shared_cache().clear()
+        self.settings_override = override_settings(
+            RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+            RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+            RECEITA_HEDGE={'MODE': 'sequencial'},
+            RECEITA_HTTP={'RETRIES': 0},
+            RECEITA_RATE_LIMIT={'ENABLED': False},
+        )
+        self.settings_override.enable()
+
+        agora = timezone.now()
+        self.escritorios = {}
+        for i, cnpj in enumerate(CNPJS):
+            escritorio = Escritorio.criar_via_cnpj(_formatar(cnpj), {'razao_social': f'Escritório {i}'})
+            self.escritorios[cnpj] = escritorio
+        # 0: nunca verificado | 1: verificado há 90 dias | 2: verificado ontem | 3: inativo, nunca verificado
+        Escritorio.objects.filter(pk=self.escritorios[CNPJS[1]].pk).update(verificado_em=agora - timedelta(days=90))
+        Escritorio.objects.filter(pk=self.escritorios[CNPJS[2]].pk).update(verificado_em=agora - timedelta(days=1))
+        Escritorio.objects.filter(pk=self.escritorios[CNPJS[3]].pk).update(ativo=False)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.stub.stop()
+        reset_cnpj_cache()
+        close_sessions()
+
+    def _recarregar(self, cnpj):
+        return Escritorio.objects.get(pk=self.escritorios[cnpj].pk)
+
+    def test_revalida_somente_vencidos_e_atualiza_situacao(self):
+        self.stub.situacoes[CNPJS[1]] = '08'
+
+        resumo = revalidar_escritorios(idade_maxima_dias=30)
+
+        self.assertEqual((resumo.verificados, resumo.alterados, resumo.falhas), (3, 1, 0))
+        self.assertEqual(self._recarregar(CNPJS[1]).situacao_cadastral, 'baixada')
+        self.assertIsNotNone(self._recarregar(CNPJS[0]).verificado_em)
+        self.assertNotIn('raw_data', self._recarregar(CNPJS[0]).dados_receita_federal)
+        # Verificado ontem: fora da fila
+        self.assertLess(self._recarregar(CNPJS[2]).verificado_em, timezone.now() - timedelta(hours=12))
+
+    def test_prioridade_ativos_e_mais_antigos_primeiro(self):
+        revalidar_escritorios(limite=2, idade_maxima_dias=30, chunk=1)
+
+        self.assertIsNotNone(self._recarregar(CNPJS[0]).verificado_em)
+        self.assertGreater(self._recarregar(CNPJS[1]).verificado_em, timezone.now() - timedelta(minutes=1))
+        self.assertIsNone(self._recarregar(CNPJS[3]).verificado_em)
+
+    def test_falha_de_consulta_nao_marca_verificado(self):
+        self.stub.status.update({'brasilapi': 500, 'receitaws': 500})
+
+        resumo = revalidar_escritorios(idade_maxima_dias=30)
+
+        self.assertEqual(resumo.verificados, 0)
+        self.assertEqual(resumo.falhas, 3)
+        self.assertIsNone(self._recarregar(CNPJS[0]).verificado_em)
+
+    def test_paginacao_keyset_percorre_todos_uma_vez(self):
+        vistos = [e.id for pagina in _paginas(Escritorio.objects.all(), 1) for e in pagina]
+        self.assertEqual(sorted(vistos), sorted(e.pk for e in self.escritorios.values()))
+
+    def test_varias_paginas_de_verificados_vencidos(self):
+        """O cursor não pode vir das instâncias já marcadas com verificado_em = agora"""
+        agora = timezone.now()
+        for dias, cnpj in zip((90, 80, 70, 60), CNPJS):
+            Escritorio.objects.filter(pk=self.escritorios[cnpj].pk).update(
+                verificado_em=agora - timedelta(days=dias), ativo=True)
+
+        resumo = revalidar_escritorios(idade_maxima_dias=30, chunk=1)
+
+        self.assertEqual(resumo.verificados, 4)
+        for cnpj in CNPJS:
+            self.assertGreater(self._recarregar(cnpj).verificado_em, agora - timedelta(minutes=1))
+
+    def test_cadastro_com_receita_fora_e_completado_na_revalidacao(self):
+        """Falha na consulta não recusa o cadastro PJ; a revalidação completa os nomes"""
+        self.stub.status.update({'brasilapi': 500, 'receitaws': 500})
+        serializer = BPORegistroSerializer(data={
+            'email': 'financeiro@empresa.com.br', 'password': 'SenhaForte#2025',
+            'password_confirm': 'SenhaForte#2025', 'documento': '33000167000101', 'telefone': '+5511999998888',
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        contador = serializer.save()
+        self.assertEqual(contador.nome_completo, '33.000.167/0001-01')
+        self.assertIsNone(contador.escritorio.verificado_em)
+
+        self.stub.status.clear()
+        revalidar_escritorios(idade_maxima_dias=30)
+
+        contador = Contador.objects.select_related('escritorio').get(pk=contador.pk)
+        self.assertEqual(contador.escritorio.razao_social, 'EMPRESA STUB 33000167 LTDA')
+        self.assertEqual(contador.escritorio.nome_fantasia, 'STUB')
+        self.assertEqual(contador.nome_completo, 'EMPRESA STUB 33000167 LTDA')
+        self.assertIsNotNone(contador.escritorio.verificado_em)
+
+    def test_comando(self):
+        saida = StringIO()
+        call_command('revalidar_escritorios', '--dias', '30', stdout=saida)
+        self.assertIn('3 verificados', saida.getvalue())
@@ -0,0 +1,135 @@
+"""
+Testes das sessões HTTP compartilhadas
+MultiBPO - Receita Federal
+"""
+
+import asyncio
+import threading
+import time
+
+from django.test import TestCase, override_settings
+
+from ..cache import reset_cnpj_cache
+from ..services import ReceitaFederalService
+from ..sessions import close_async_clients, close_sessions, get_async, get_http_config, get_session, get_timeout
+from ..shared import get_shared_cache
+from ..stubs import StubCNPJServer
+
+
+class TestSessionRegistry(TestCase):
+    """Configuração e compartilhamento das sessões"""
+
+    def setUp(self):
+        close_sessions()
+
+    def tearDown(self):
+        close_sessions()
+
+    def test_mesma_sessao_por_provedor(self):
+        self.assertIs(get_session('BrasilAPI'), get_session('BrasilAPI'))
+        self.assertIsNot(get_session('BrasilAPI'), get_session('ReceitaWS'))
+
+    def test_sessao_unica_entre_threads(self):
+        """Criação concorrente devolve a mesma instância"""
+        sessoes = []
+        threads = [threading.Thread(target=lambda: sessoes.append(get_session('BrasilAPI'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(s) for s in sessoes}), 1)
+
+    @override_settings(RECEITA_TIMEOUT=7, RECEITA_HTTP={
+        'POOL_SIZE': 5,
+        'CONNECT_TIMEOUT': 1.5,
+        'PROVIDERS': {'ReceitaWS': {'POOL_SIZE': 1, 'RETRIES': 0}},
+    })
+    def test_configuracao_por_provedor(self):
+        self.assertEqual(get_timeout('BrasilAPI'), (1.5, 7))
+        self.assertEqual(get_http_config('BrasilAPI')['POOL_SIZE'], 5)
+        self.assertEqual(get_http_config('ReceitaWS')['POOL_SIZE'], 1)
+
+        adapter = get_session('ReceitaWS').get_adapter('https://www.receitaws.com.br')
+        self.assertEqual(adapter._pool_maxsize, 1)
+        self.assertEqual(adapter.max_retries.total, 0)
+
+    def test_retry_sem_read_e_sem_retry_after(self):
+        retry = get_session('BrasilAPI').get_adapter('https://brasilapi.com.br').max_retries
+        self.assertEqual(retry.read, 0)
+        self.assertFalse(retry.respect_retry_after_header)
+        self.assertFalse(retry.is_retry('GET', 503, has_retry_after=True))
+        self.assertTrue(retry.is_retry('GET', 503))
+
+
+class TestReceitaFederalServiceHTTP(TestCase):
+    """Consultas reais contra o stub local"""
+
+    def setUp(self):
+        self.stub = StubCNPJServer().start()
+        reset_cnpj_cache()
+        close_sessions()
+        get_shared_cache().clear()
+
+    def tearDown(self):
+        self.stub.stop()
+        reset_cnpj_cache()
+        close_sessions()
+
+    def test_conexao_reutilizada_entre_consultas(self):
+        """Várias consultas (e instâncias do serviço) usam uma única conexão TCP"""
+        with override_settings(RECEITA_BRASILAPI_URL=self.stub.brasilapi_url):
+            for _ in range(5):
+                result = ReceitaFederalService().consultar_cnpj('11222333000181', usar_cache=False)
+                self.assertTrue(result['success'])
+
+        self.assertEqual(self.stub.requests, 5)
+        self.assertEqual(self.stub.conexoes, 1)
+
+    def test_fallback_para_receitaws_em_503(self):
+        """503 é retentado pelo adapter e depois cai para o provedor seguinte"""
+        self.stub.status['brasilapi'] = 503
+        with override_settings(RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+                               RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+                               RECEITA_HTTP={'RETRIES': 1, 'BACKOFF_FACTOR': 0}):
+            result = ReceitaFederalService().consultar_cnpj('11222333000181', usar_cache=False)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['fonte'], 'ReceitaWS')
+        brasilapi_calls = [p for p in self.stub.paths if p.startswith('/api/cnpj/v1/')]
+        self.assertEqual(len(brasilapi_calls), 2)
+
+    def test_read_timeout_nao_e_retentado(self):
+        """Provedor travado custa um READ_TIMEOUT, não RETRIES + 1"""
+        self.stub.delays['brasilapi'] = 0.5
+        with override_settings(RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+                               RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+                               RECEITA_HEDGE={'MODE': 'sequencial'},
+                               RECEITA_HTTP={'RETRIES': 2, 'READ_TIMEOUT': 0.2}):
+            result = ReceitaFederalService().consultar_cnpj('11222333000181', usar_cache=False)
+
+        self.assertEqual(result['fonte'], 'ReceitaWS')
+        brasilapi_calls = [p for p in self.stub.paths if p.startswith('/api/cnpj/v1/')]
+        self.assertEqual(len(brasilapi_calls), 1)
+
+    def test_retry_after_volta_sem_dormir(self):
+        """503 com Retry-After não é retentado nem espera dentro da requisição"""
+        self.stub.status['brasilapi'] = 503
+        self.stub.headers['brasilapi'] = {'Retry-After': '30'}
+        url = f'{self.stub.brasilapi_url}/11222333000181'
+
+        async def consultar_async():
+            try:
+                return await get_async('BrasilAPI', url)
+            finally:
+                await close_async_clients()
+
+        with override_settings(RECEITA_HTTP={'RETRIES': 2}):
+            inicio = time.perf_counter()
+            response = get_session('BrasilAPI').get(url, timeout=get_timeout('BrasilAPI'))
+            response_async = asyncio.run(consultar_async())
+            duracao = time.perf_counter() - inicio
+
+        self.assertEqual((response.status_code, response_async.status_code), (503, 503))
+        self.assertEqual(response.headers['Retry-After'], '30')
+        self.assertEqual(self.stub.requests, 2)
+        self.assertLess(duracao, 1.0)
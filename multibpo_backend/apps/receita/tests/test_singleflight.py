@@ -0,0 +1,230 @@
+"""
+Testes do single-flight de consultas de CNPJ
+MultiBPO - Receita Federal
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from ..async_services import AsyncReceitaFederalService
+from ..cache import get_cnpj_cache, reset_cnpj_cache
+from ..latency import get_latency_tracker
+from ..limits import get_provider_limiter
+from ..providers import BrasilAPIProvider
+from ..services import ReceitaFederalService
+from ..sessions import close_async_clients, close_sessions
+from ..shared import get_shared_cache
+from ..singleflight import SingleFlight, get_single_flight
+from ..stubs import StubCNPJServer, payload_brasilapi
+
+
+CNPJ = '11222333000181'
+
+# LocMemCache no alias default faz o papel do Redis compartilhado entre workers
+CACHE_COMPARTILHADO = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'singleflight'},
+}
+
+
+class TestSingleFlight(TestCase):
+    """Comportamento da primitiva isolada"""
+
+    def setUp(self):
+        get_shared_cache().clear()
+
+    def test_chamadas_concorrentes_executam_uma_vez(self):
+        sf = SingleFlight()
+        chamadas = []
+
+        def funcao():
+            chamadas.append(1)
+            time.sleep(0.2)
+            return {'valor': 42}
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            resultados = list(pool.map(lambda _: sf.executar('x', funcao), range(10)))
+
+        self.assertEqual(len(chamadas), 1)
+        self.assertTrue(all(r == {'valor': 42} for r in resultados))
+        # Cada chamador recebe sua própria cópia
+        self.assertEqual(len({id(r) for r in resultados}), 10)
+        self.assertEqual(sf.stats()['lideres'], 1)
+        self.assertEqual(sf.stats()['seguidores'], 9)
+
+    def test_erro_do_lider_propaga_aos_seguidores(self):
+        sf = SingleFlight()
+        iniciou = threading.Event()
+
+        def funcao():
+            iniciou.set()
+            time.sleep(0.2)
+            raise RuntimeError('falhou')
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            lider = pool.submit(sf.executar, 'x', funcao)
+            iniciou.wait(1)
+            seguidor = pool.submit(sf.executar, 'x', lambda: 'não deveria executar')
+            with self.assertRaises(RuntimeError):
+                lider.result()
+            with self.assertRaises(RuntimeError):
+                seguidor.result()
+
+    def test_chave_liberada_apos_execucao(self):
+        sf = SingleFlight()
+        self.assertEqual(sf.executar('x', lambda: 1), 1)
+        self.assertEqual(sf.executar('x', lambda: 2), 2)
+        self.assertEqual(sf.stats()['em_andamento'], 0)
+
+    @override_settings(RECEITA_SINGLEFLIGHT={'ENABLED': False})
+    def test_desabilitado_executa_sempre(self):
+        sf = SingleFlight()
+        chamadas = []
+
+        def funcao():
+            chamadas.append(1)
+            time.sleep(0.1)
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            list(pool.map(lambda _: sf.executar('x', funcao), range(5)))
+        self.assertEqual(len(chamadas), 5)
+
+    @override_settings(RECEITA_SINGLEFLIGHT={'WAIT_TIMEOUT': 2, 'POLL_INTERVAL': 0.01})
+    def test_lock_de_outro_worker_liberado_sem_resultado(self):
+        """Outro worker falhou: quem esperava faz a própria consulta"""
+        sf = SingleFlight()
+        chave_lock = 'receita:singleflight:x'
+        get_shared_cache().add(chave_lock, 'outro-worker', timeout=30)
+        threading.Timer(0.1, get_shared_cache().delete, args=[chave_lock]).start()
+
+        inicio = time.perf_counter()
+        self.assertEqual(sf.executar('x', lambda: 'proprio', lambda desde: None), 'proprio')
+        self.assertLess(time.perf_counter() - inicio, 1.0)
+        self.assertEqual(sf.stats()['espera_outro_worker'], 1)
+
+    def _lider_termina_logo_apos_o_add(self):
+        """
+        Lock ocupado por outro worker que grava o resultado e libera o lock
+        logo depois do add deste worker falhar
+        """
+        cache = get_shared_cache()
+        chave_lock = 'receita:singleflight:x'
+        cache.add(chave_lock, 'outro-worker', timeout=30)
+        gravado = {}
+        add = cache.add
+
+        def add_e_lider_termina(*args, **kwargs):
+            adquirido = add(*args, **kwargs)
+            gravado['em'] = time.time()
+            cache.delete(chave_lock)
+            return adquirido
+
+        def aguardar_externo(desde):
+            return 'do-outro-worker' if gravado.get('em', 0) >= desde else None
+
+        return mock.patch.object(cache, 'add', side_effect=add_e_lider_termina), aguardar_externo
+
+    @override_settings(RECEITA_SINGLEFLIGHT={'WAIT_TIMEOUT': 2, 'POLL_INTERVAL': 0.01})
+    def test_resultado_gravado_logo_apos_o_add_e_aproveitado(self):
+        sf = SingleFlight()
+        patch, aguardar_externo = self._lider_termina_logo_apos_o_add()
+        with patch:
+            self.assertEqual(sf.executar('x', lambda: 'proprio', aguardar_externo), 'do-outro-worker')
+
+    @override_settings(RECEITA_SINGLEFLIGHT={'WAIT_TIMEOUT': 2, 'POLL_INTERVAL': 0.01})
+    def test_async_resultado_gravado_logo_apos_o_add_e_aproveitado(self):
+        sf = SingleFlight()
+        patch, aguardar_externo = self._lider_termina_logo_apos_o_add()
+
+        async def funcao():
+            return 'proprio'
+
+        with patch:
+            self.assertEqual(asyncio.run(sf.aexecutar('x', funcao, aguardar_externo)), 'do-outro-worker')
+
+    def test_async_chamadas_concorrentes_executam_uma_vez(self):
+        sf = SingleFlight()
+        chamadas = []
+
+        async def funcao():
+            chamadas.append(1)
+            await asyncio.sleep(0.1)
+            return {'valor': 42}
+
+        async def rodar():
+            return await asyncio.gather(*(sf.aexecutar('x', funcao) for _ in range(20)))
+
+        resultados = asyncio.run(rodar())
+        self.assertEqual(len(chamadas), 1)
+        self.assertTrue(all(r == {'valor': 42} for r in resultados))
+
+
+@override_settings(CACHES=CACHE_COMPARTILHADO)
+class TestSingleFlightConsultaCNPJ(TestCase):
+    """Serviços de CNPJ contra o stub local"""
+
+    def setUp(self):
+        self.stub = StubCNPJServer(delays={'brasilapi': 0.3}).start()
+        reset_cnpj_cache()
+        close_sessions()
+        get_provider_limiter().reset()
+        get_shared_cache().clear()
+        get_latency_tracker().reset()
+        get_single_flight().reset()
+        self.settings_override = override_settings(
+            RECEITA_BRASILAPI_URL=self.stub.brasilapi_url,
+            RECEITA_RECEITAWS_URL=self.stub.receitaws_url,
+            RECEITA_HEDGE={'MODE': 'sequencial'},
+            RECEITA_HTTP={'RETRIES': 0, 'MAX_CONCURRENT': 100},
+            RECEITA_SINGLEFLIGHT={'WAIT_TIMEOUT': 5, 'POLL_INTERVAL': 0.01},
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.stub.stop()
+        reset_cnpj_cache()
+        close_sessions()
+        get_provider_limiter().reset()
+        get_single_flight().reset()
+
+    def test_rajada_do_mesmo_cnpj_faz_uma_chamada_externa(self):
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            resultados = list(pool.map(lambda _: ReceitaFederalService().consultar_cnpj(CNPJ), range(20)))
+
+        self.assertTrue(all(r['success'] for r in resultados))
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_cnpjs_distintos_nao_sao_agrupados(self):
+        cnpjs = [f'{i:08d}000100' for i in range(5)]
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            list(pool.map(ReceitaFederalService().consultar_cnpj, cnpjs))
+        self.assertEqual(self.stub.requests, 5)
+
+    def test_aguarda_resultado_de_outro_worker(self):
+        """Lock ocupado por outro worker: o resultado dele vem do cache compartilhado"""
+        get_shared_cache().add(f'receita:singleflight:{CNPJ}', 'outro-worker', timeout=30)
+        resultado_outro = BrasilAPIProvider().resultado(CNPJ, payload_brasilapi(CNPJ))
+        threading.Timer(0.1, get_cnpj_cache().set, args=[CNPJ, resultado_outro]).start()
+
+        result = ReceitaFederalService().consultar_cnpj(CNPJ)
+
+        self.assertEqual(result, resultado_outro)
+        self.assertEqual(self.stub.requests, 0)
+
+    def test_async_rajada_do_mesmo_cnpj_faz_uma_chamada_externa(self):
+        async def rodar():
+            service = AsyncReceitaFederalService()
+            try:
+                return await asyncio.gather(*(service.consultar_cnpj(CNPJ) for _ in range(20)))
+            finally:
+                await close_async_clients()
+
+        resultados = asyncio.run(rodar())
+        self.assertTrue(all(r['success'] for r in resultados))
+        self.assertEqual(self.stub.requests, 1)
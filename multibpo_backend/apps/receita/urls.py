@@ -8,12 +8,26 @@ from . import views
 app_name = 'receita'
 
 urlpatterns = [
-    # Consulta de CNPJ
+    # Consulta de CNPJ (lote antes da rota com parâmetro)
+    path('cnpj/batch/', views.CNPJBatchView.as_view(), name='cnpj-batch'),
     path('cnpj/<str:cnpj>/', views.CNPJConsultaView.as_view(), name='cnpj-consulta'),
     
+    # Consulta de CEP
+    path('cep/batch/', views.CEPBatchView.as_view(), name='cep-batch'),
+    path('cep/<str:cep>/', views.CEPConsultaView.as_view(), name='cep-consulta'),
+    
     # Health check
     path('health/', views.health_check_receita, name='health-check'),
     
+    # Métricas dos provedores
+    path('metrics/', views.metrics_receita, name='metrics'),
+    path('metrics/resumo/', views.metrics_resumo, name='metrics-resumo'),
+    
     # Testes
     path('test/', views.test_cnpj_examples, name='test-cnpjs'),
+    
+    # Versões assíncronas (servir via ASGI: config.asgi)
+    path('async/cnpj/<str:cnpj>/', views.cnpj_consulta_async, name='cnpj-consulta-async'),
+    path('async/health/', views.health_check_receita_async, name='health-check-async'),
+    path('async/test/', views.test_cnpj_examples_async, name='test-cnpjs-async'),
 ]
\ No newline at end of file
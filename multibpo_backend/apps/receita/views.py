@@ -2,21 +2,97 @@
 Views para consulta de dados da Receita Federal
 """
 
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 import logging
 
+from .async_services import AsyncReceitaFederalService
+from .batch import consultar_lote, gerar_ndjson, get_batch_config, normalizar_lote
+from .breaker import ABERTO, FECHADO, MEIO_ABERTO, get_breaker
+from .cache import get_cnpj_cache
+from .cep import CEPService, get_cep_config
+from .dataset import get_local_provider
+from .latency import get_latency_tracker
+from .limits import get_rate_limiter
+from .metrics import get_metrics, get_metrics_config
+from .prober import get_prober, obter_snapshot
+from .projecao import parse_campos, selecionar_campos
+from .providers import get_provedores
 from .services import ReceitaFederalService
+from .singleflight import get_single_flight
 
 logger = logging.getLogger(__name__)
 
 
+def _erro_consulta(cnpj: str) -> dict:
+    return {
+        'success': False,
+        'error': True,
+        'message': 'Erro interno na consulta',
+        'cnpj': cnpj
+    }
+
+
+def _health_payload() -> dict:
+    """
+    Corpo do health check (sondagem em background, breakers, cache e latências)
+    
+    Só lê estado já calculado: nenhuma chamada às APIs externas.
+    """
+    breakers = {provedor.nome: get_breaker(provedor.nome).status() for provedor in get_provedores()}
+    disponibilidade = {FECHADO: 'available', MEIO_ABERTO: 'degraded', ABERTO: 'unavailable'}
+    provider = get_local_provider()
+    sondagem = obter_snapshot()
+    
+    return {
+        'status': 'healthy',
+        'app': 'receita',
+        'version': '1.0.0',
+        'services': {nome.lower(): disponibilidade[breaker['estado']] for nome, breaker in breakers.items()},
+        'circuit_breakers': breakers,
+        'rate_limits': get_rate_limiter().status(),
+        'test_cnpj': sondagem['test_cnpj'] if sondagem else None,
+        'sondagem': sondagem or {'disponivel': False},
+        'cache': get_cnpj_cache().stats(),
+        'single_flight': get_single_flight().stats(),
+        'base_local': provider.dataset.meta() if provider else {'disponivel': False},
+        'latencias': get_latency_tracker().snapshot()
+    }
+
+
+def _exemplos_payload() -> dict:
+    """
+    Corpo do endpoint de teste (CNPJs de exemplo resolvidos pela sondagem)
+    
+    Só lê o snapshot: nenhuma chamada às APIs externas.
+    """
+    sondagem = obter_snapshot()
+    results = sondagem.get('exemplos', {}) if sondagem else {}
+    
+    return {
+        'app': 'receita',
+        'test_results': results,
+        'working_apis': sum(1 for r in results.values() if r.get('success')),
+        'sondagem': {
+            'gerado_em': sondagem['gerado_em'],
+            'idade_segundos': sondagem['idade_segundos'],
+        } if sondagem else {'disponivel': False},
+    }
+
+
 class CNPJConsultaView(APIView):
     """
     View para consulta de CNPJ na Receita Federal
     GET /api/v1/receita/cnpj/{cnpj}/
+    
+    Query params:
+        fields: campos da resposta (ex.: razao_social,endereco.uf)
+        include=raw: inclui o payload original do provedor (raw_data)
     """
     permission_classes = [permissions.AllowAny]
     
@@ -24,44 +100,132 @@ class CNPJConsultaView(APIView):
         try:
             service = ReceitaFederalService()
             result = service.consultar_cnpj(cnpj)
+            success = result.get('success')
+            result = selecionar_campos(result, **parse_campos(request.query_params))
             
-            if result.get('success'):
+            if success:
                 return Response(result, status=status.HTTP_200_OK)
             else:
                 return Response(result, status=status.HTTP_404_NOT_FOUND)
                 
         except Exception as e:
             logger.error(f"Erro na consulta CNPJ {cnpj}: {e}")
+            return Response(_erro_consulta(cnpj), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CNPJBatchView(APIView):
+    """
+    Consulta de CNPJs em lote com resposta em streaming (NDJSON)
+    POST /api/v1/receita/cnpj/batch/
+    
+    Body: {"cnpjs": ["11.222.333/0001-81", ...]}
+    Resposta: uma linha JSON por CNPJ distinto, na ordem em que ficam prontos
+    
+    Aceita os mesmos ?fields= e ?include=raw da consulta individual.
+    Exige autenticação: um lote dispara até MAX_ITENS consultas externas e
+    consome o orçamento de rate limit dos provedores de todos os usuários.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        cnpjs = request.data.get('cnpjs')
+        
+        if not isinstance(cnpjs, list) or not cnpjs:
+            return Response({
+                'success': False,
+                'error': True,
+                'message': 'Informe "cnpjs" como uma lista não vazia'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        max_itens = get_batch_config()['MAX_ITENS']
+        validos, invalidos = normalizar_lote(cnpjs)
+        if len(validos) + len(invalidos) > max_itens:
+            return Response({
+                'success': False,
+                'error': True,
+                'message': f'Máximo de {max_itens} CNPJs por lote'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        selecao = parse_campos(request.query_params)
+        linhas = (
+            {**linha, 'resultado': selecionar_campos(linha['resultado'], **selecao)}
+            for linha in consultar_lote(cnpjs)
+        )
+        response = StreamingHttpResponse(
+            gerar_ndjson(linhas),
+            content_type='application/x-ndjson'
+        )
+        response['X-Accel-Buffering'] = 'no'  # nginx não deve bufferizar o stream
+        return response
+
+
+class CEPConsultaView(APIView):
+    """
+    Consulta de endereço por CEP (autopreenchimento do cadastro)
+    GET /api/v1/receita/cep/{cep}/
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, cep):
+        try:
+            result = CEPService().consultar_cep(cep)
+            status_code = status.HTTP_200_OK if result.get('success') else status.HTTP_404_NOT_FOUND
+            return Response(result, status=status_code)
+        
+        except Exception as e:
+            logger.error(f"Erro na consulta CEP {cep}: {e}")
             return Response({
                 'success': False,
                 'error': True,
                 'message': 'Erro interno na consulta',
-                'cnpj': cnpj
+                'cep': cep
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class CEPBatchView(APIView):
+    """
+    Consulta de CEPs em lote
+    POST /api/v1/receita/cep/batch/
+    
+    Body: {"ceps": ["01001-000", ...]}
+    Resposta: {"resultados": {"01001-000": {...}, ...}} (chave = entrada original)
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    def post(self, request):
+        ceps = request.data.get('ceps')
+        max_itens = get_cep_config()['MAX_ITENS']
+        
+        if not isinstance(ceps, list) or not ceps:
+            return Response({
+                'success': False,
+                'error': True,
+                'message': 'Informe "ceps" como uma lista não vazia'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(ceps) > max_itens:
+            return Response({
+                'success': False,
+                'error': True,
+                'message': f'Máximo de {max_itens} CEPs por lote'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'resultados': CEPService().consultar_lote(ceps)}, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def health_check_receita(request):
     """
     Health check do app receita
     GET /api/v1/receita/health/
+    
+    Responde com o último snapshot do prober (apps.receita.prober), sem
+    consultar as APIs externas; a primeira chamada do worker inicia o prober.
     """
     try:
-        # Testar consulta com CNPJ conhecido (Petrobras)
-        service = ReceitaFederalService()
-        test_result = service.consultar_cnpj('07526557000100')
-        
-        return Response({
-            'status': 'healthy',
-            'app': 'receita',
-            'version': '1.0.0',
-            'services': {
-                'brasilapi': 'available',
-                'receitaws': 'available'
-            },
-            'test_cnpj': test_result.get('success', False)
-        }, status=status.HTTP_200_OK)
+        get_prober().garantir()
+        return Response(_health_payload(), status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response({
@@ -71,39 +235,114 @@ def health_check_receita(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _metrics_autorizado(request) -> bool:
+    """Com RECEITA_METRICS['TOKEN'] definido, exige Authorization: Bearer <TOKEN>"""
+    token = get_metrics_config()['TOKEN']
+    return not token or request.META.get('HTTP_AUTHORIZATION', '') == f'Bearer {token}'
+
+
+@require_GET
+def metrics_receita(request):
+    """
+    Métricas dos provedores no formato texto do Prometheus
+    GET /api/v1/receita/metrics/
+    """
+    if not _metrics_autorizado(request):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(get_metrics().render_prometheus(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@api_view(['GET'])
+@authentication_classes([])     # O Bearer é o token de métricas, não um JWT
+@permission_classes([permissions.AllowAny])
+def metrics_resumo(request):
+    """
+    Resumo da janela recente (chamadas por provedor, percentis, origem das
+    consultas e profundidade do fallback)
+    GET /api/v1/receita/metrics/resumo/?janela=<segundos>
+    """
+    if not _metrics_autorizado(request):
+        return Response({'detail': 'Token de métricas inválido'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    janela = request.query_params.get('janela')
+    try:
+        janela = float(janela) if janela else None
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': True,
+            'message': 'janela deve ser um número de segundos'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(get_metrics().resumo(janela), status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def test_cnpj_examples(request):
     """
     Testa consulta com CNPJs de exemplo
     GET /api/v1/receita/test/
-    """
-    service = ReceitaFederalService()
     
-    test_cnpjs = [
-        '07526557000100',  # Petrobras
-        '33000167000101',  # Coca-Cola
-        '60746948000112',  # Magazine Luiza
-    ]
+    Os resultados vêm do snapshot da sondagem em background (RECEITA_PROBER
+    ['EXEMPLOS']); o endpoint é público e não consulta as APIs externas.
+    """
+    get_prober().garantir()
+    return Response(_exemplos_payload(), status=status.HTTP_200_OK)
+
+
+
+# ========== VIEWS ASSÍNCRONAS (ASGI) ==========
+# Mesmos contratos das views acima, sem DRF (que não suporta views async).
+# Sob ASGI a espera pelas APIs externas não ocupa thread do worker.
+
+_JSON_PARAMS = {'ensure_ascii': False}
+
+
+@require_GET
+async def cnpj_consulta_async(request, cnpj):
+    """
+    Versão assíncrona de CNPJConsultaView
+    GET /api/v1/receita/async/cnpj/{cnpj}/
+    """
+    try:
+        result = await AsyncReceitaFederalService().consultar_cnpj(cnpj)
+        status_code = status.HTTP_200_OK if result.get('success') else status.HTTP_404_NOT_FOUND
+        result = selecionar_campos(result, **parse_campos(request.GET))
+        return JsonResponse(result, status=status_code, json_dumps_params=_JSON_PARAMS)
     
-    results = {}
-    for cnpj in test_cnpjs:
-        try:
-            result = service.consultar_cnpj(cnpj)
-            results[cnpj] = {
-                'success': result.get('success', False),
-                'razao_social': result.get('razao_social', 'N/A'),
-                'fonte': result.get('fonte', 'N/A')
-            }
-        except Exception as e:
-            results[cnpj] = {
-                'success': False,
-                'error': str(e)
-            }
+    except Exception as e:
+        logger.error(f"Erro na consulta CNPJ {cnpj}: {e}")
+        return JsonResponse(_erro_consulta(cnpj), status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            json_dumps_params=_JSON_PARAMS)
+
+
+@require_GET
+async def health_check_receita_async(request):
+    """
+    Versão assíncrona do health check
+    GET /api/v1/receita/async/health/
+    """
+    try:
+        get_prober().garantir()
+        payload = await sync_to_async(_health_payload, thread_sensitive=False)()
+        return JsonResponse(payload, json_dumps_params=_JSON_PARAMS)
     
-    return Response({
-        'app': 'receita',
-        'test_results': results,
-        'working_apis': sum(1 for r in results.values() if r.get('success'))
-    }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'app': 'receita',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+@require_GET
+async def test_cnpj_examples_async(request):
+    """
+    Versão assíncrona de test_cnpj_examples (também só lê o snapshot)
+    GET /api/v1/receita/async/test/
+    """
+    get_prober().garantir()
+    payload = await sync_to_async(_exemplos_payload, thread_sensitive=False)()
+    return JsonResponse(payload, json_dumps_params=_JSON_PARAMS)
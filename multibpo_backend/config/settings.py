@@ -120,6 +120,36 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Hash de senhas (apps.authentication.hashers): o algoritmo preferido grava
+# os novos hashes; os demais continuam verificando hashes antigos, que são
+# regravados com o preferido no próximo login. Padrão PBKDF2 (o do Django);
+# scrypt/argon2/bcrypt são opt-in
+PASSWORD_HASHING = {
+    'ALGORITHM': os.environ.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2'),
+}
+
+_PASSWORD_HASHERS = {
+    'scrypt': 'apps.authentication.hashers.ScryptPasswordHasher',
+    'argon2': 'apps.authentication.hashers.Argon2PasswordHasher',
+    'bcrypt': 'apps.authentication.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'apps.authentication.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS.get(PASSWORD_HASHING['ALGORITHM'], _PASSWORD_HASHERS['pbkdf2']),
+    *_PASSWORD_HASHERS.values(),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+PASSWORD_HASHERS = list(dict.fromkeys(PASSWORD_HASHERS))
+
+# Executor das views de login assíncronas (apps.authentication.login_pool):
+# MAX_WORKERS verificações de senha simultâneas + MAX_FILA aguardando; acima disso 429
+AUTH_LOGIN_POOL = {
+    'MAX_WORKERS': int(os.environ.get('AUTH_LOGIN_MAX_WORKERS', '0')) or None,     # 0 = núcleos do processo
+    'RETRY_AFTER': int(os.environ.get('AUTH_LOGIN_RETRY_AFTER', '1')),
+}
+if os.environ.get('AUTH_LOGIN_MAX_FILA'):
+    AUTH_LOGIN_POOL['MAX_FILA'] = int(os.environ['AUTH_LOGIN_MAX_FILA'])
+
 # Internationalization
 LANGUAGE_CODE = 'pt-br'
 TIME_ZONE = 'America/Sao_Paulo'
@@ -173,6 +203,43 @@ SIMPLE_JWT = {
     
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    
+    # Refresh reaplica as claims do contador (cache em AUTH_JWT_CLAIMS)
+    'TOKEN_REFRESH_SERIALIZER': 'apps.authentication.serializers.tokens.MultiBPOTokenRefreshSerializer',
+}
+
+# Cache das claims JWT por usuário (apps.authentication.claims), invalidado
+# pelos post_save de Contador/Escritorio; use um alias compartilhado (Redis)
+# com vários workers
+AUTH_JWT_CLAIMS = {
+    'CACHE_ALIAS': os.environ.get('AUTH_JWT_CLAIMS_CACHE_ALIAS', 'default'),
+    'TTL': int(os.environ.get('AUTH_JWT_CLAIMS_TTL', str(60 * 60))),
+}
+
+# Filtro de revogação dos refresh tokens (apps.authentication.revocation):
+# Bloom em memória na frente do BlacklistedToken; revogações propagadas aos
+# workers por um log no cache. Só liga com CACHE_ALIAS compartilhado (Redis);
+# com o DummyCache acima a blacklist é consultada no banco a cada refresh.
+# Tabelas limpas por `manage.py purgar_tokens`
+AUTH_REVOCATION = {
+    'ENABLED': os.environ.get('AUTH_REVOCATION_ENABLED', 'True').lower() == 'true',
+    'CACHE_ALIAS': os.environ.get('AUTH_REVOCATION_CACHE_ALIAS', 'default'),
+    'CAPACIDADE': int(os.environ.get('AUTH_REVOCATION_CAPACIDADE', '100000')),
+}
+
+# Disponibilidade de CPF/CNPJ em tempo real (apps.authentication.documentos):
+# Bloom por processo com os documentos cadastrados, reconstruído do banco
+# a cada RECONSTRUCAO segundos
+AUTH_DOCUMENTO_FILTER = {
+    'ENABLED': os.environ.get('AUTH_DOCUMENTO_FILTER_ENABLED', 'True').lower() == 'true',
+    'RECONSTRUCAO': int(os.environ.get('AUTH_DOCUMENTO_FILTER_RECONSTRUCAO', '300')),
+}
+
+# Importação de clientes em lote (apps.contadores.importacao):
+# LOTE linhas por transação e por query de duplicidade
+CONTADORES_IMPORTACAO = {
+    'LOTE': int(os.environ.get('CONTADORES_IMPORTACAO_LOTE', '500')),
+    'USAR_RECEITA': os.environ.get('CONTADORES_IMPORTACAO_USAR_RECEITA', 'True').lower() == 'true',
 }
 
 # Phone Number Configuration
@@ -300,4 +367,144 @@ if DEBUG and 'test' not in sys.argv:
     }
 
 # Factory Boy Configuration
-FACTORY_FOR_DJANGO_SILENCE_ROOT_WARNING = True
\ No newline at end of file
+FACTORY_FOR_DJANGO_SILENCE_ROOT_WARNING = True
+
+# ========== CONFIGURAÇÕES RECEITA FEDERAL ==========
+
+# Timeout (segundos) das consultas às APIs externas de CNPJ
+# Usado como READ_TIMEOUT padrão de RECEITA_HTTP
+RECEITA_TIMEOUT = int(os.environ.get('RECEITA_TIMEOUT', '10'))
+
+# URLs das APIs (sobrescrever para apontar para stubs/mirrors)
+RECEITA_BRASILAPI_URL = os.environ.get('RECEITA_BRASILAPI_URL', 'https://brasilapi.com.br/api/cnpj/v1')
+RECEITA_RECEITAWS_URL = os.environ.get('RECEITA_RECEITAWS_URL', 'https://www.receitaws.com.br/v1/cnpj')
+
+# Provedores externos de CNPJ (apps.receita.providers), na ordem base;
+# nome registrado ou caminho 'pacote.modulo.Classe'. 'Fake' responde sem rede.
+RECEITA_PROVIDERS = {
+    'CNPJ': [p.strip() for p in os.environ.get('RECEITA_PROVIDERS', 'BrasilAPI,ReceitaWS').split(',') if p.strip()],
+}
+
+# Sessões HTTP por provedor (pool keep-alive + retry com backoff)
+RECEITA_HTTP = {
+    'POOL_SIZE': int(os.environ.get('RECEITA_HTTP_POOL_SIZE', '10')),
+    'CONNECT_TIMEOUT': float(os.environ.get('RECEITA_CONNECT_TIMEOUT', '3.05')),
+    'READ_TIMEOUT': float(os.environ.get('RECEITA_READ_TIMEOUT', str(RECEITA_TIMEOUT))),
+    'RETRIES': int(os.environ.get('RECEITA_HTTP_RETRIES', '2')),
+    'BACKOFF_FACTOR': 0.3,
+    # Consultas simultâneas por provedor e processo (0 = POOL_SIZE)
+    'MAX_CONCURRENT': int(os.environ.get('RECEITA_HTTP_MAX_CONCURRENT', '0')) or None,
+    'PROVIDERS': {
+        # ReceitaWS (plano gratuito) aceita poucas requisições por minuto
+        'ReceitaWS': {'POOL_SIZE': 2, 'RETRIES': 1},
+    },
+}
+
+# Cache de consultas CNPJ (LRU local + cache backend compartilhado)
+# Com DummyCache o nível compartilhado é inócuo; apontar ALIAS para Redis em produção
+RECEITA_CACHE = {
+    'ALIAS': os.environ.get('RECEITA_CACHE_ALIAS', 'default'),
+    'KEY_PREFIX': 'receita:cnpj',
+    'LRU_SIZE': int(os.environ.get('RECEITA_CACHE_LRU_SIZE', '1024')),
+    'TTL': int(os.environ.get('RECEITA_CACHE_TTL', str(60 * 60 * 24))),                   # 24h
+    'NEGATIVE_TTL': int(os.environ.get('RECEITA_CACHE_NEGATIVE_TTL', str(60 * 10))),      # 10 min
+    'STALE_TTL': int(os.environ.get('RECEITA_CACHE_STALE_TTL', str(60 * 60 * 24 * 6))),   # +6 dias stale
+}
+
+# Fan-out entre provedores: 'sequencial', 'hedged' (aciona o próximo após o
+# p95 observado do primário) ou 'paralelo' (todos ao mesmo tempo)
+RECEITA_HEDGE = {
+    'MODE': os.environ.get('RECEITA_HEDGE_MODE', 'hedged'),
+    'DELAY': float(os.environ.get('RECEITA_HEDGE_DELAY', '0.5')),
+    'ADAPTIVE': True,
+    'MIN_DELAY': 0.05,
+    'MAX_DELAY': 3.0,
+}
+
+# Orçamento de chamadas externas por provedor (token bucket compartilhado
+# entre workers via cache; respeita Retry-After). Provedor sem entrada = sem limite
+RECEITA_RATE_LIMIT = {
+    'ENABLED': os.environ.get('RECEITA_RATE_LIMIT_ENABLED', 'True').lower() == 'true',
+    'MAX_WAIT': 2.0,
+    'MAX_WAIT_LOTE': 30.0,
+    'PROVIDERS': {
+        'ReceitaWS': {
+            'RATE': int(os.environ.get('RECEITA_RECEITAWS_POR_MINUTO', '3')),
+            'PERIOD': 60,
+            'BURST': 3,
+        },
+    },
+}
+
+# Consulta de CEP (BrasilAPI/ViaCEP); BASE_LOCAL via python manage.py importar_ceps
+RECEITA_CEP = {
+    'TTL': 60 * 60 * 24 * 30,           # 30 dias
+    'BASE_LOCAL': os.environ.get('RECEITA_CEP_BASE_LOCAL', str(BASE_DIR / 'data' / 'cep.sqlite3')),
+}
+
+# Revalidação da situação cadastral dos escritórios
+# (python manage.py revalidar_escritorios [--loop])
+RECEITA_REVALIDACAO = {
+    'IDADE_MAXIMA_DIAS': int(os.environ.get('RECEITA_REVALIDACAO_DIAS', '30')),
+    'CHUNK': 200,
+    'MAX_WORKERS': 4,
+}
+
+# Sondagem em background dos provedores (health checks leem o snapshot)
+# Uma sondagem por INTERVAL somando todos os workers (lock no cache)
+RECEITA_PROBER = {
+    'ENABLED': os.environ.get('RECEITA_PROBER_ENABLED', 'True').lower() == 'true',
+    'INTERVAL': int(os.environ.get('RECEITA_PROBER_INTERVAL', '60')),
+}
+
+# Métricas dos provedores externos (em memória do processo)
+# GET /api/v1/receita/metrics/ (Prometheus) e /api/v1/receita/metrics/resumo/ (JSON)
+RECEITA_METRICS = {
+    'ENABLED': os.environ.get('RECEITA_METRICS_ENABLED', 'True').lower() == 'true',
+    'JANELA': int(os.environ.get('RECEITA_METRICS_JANELA', '300')),
+    'TOKEN': os.environ.get('RECEITA_METRICS_TOKEN', ''),
+}
+
+# Circuit breaker por provedor (estado no cache de RECEITA_CACHE['ALIAS'],
+# compartilhado entre workers quando o alias aponta para Redis)
+RECEITA_BREAKER = {
+    'FAILURE_RATE': float(os.environ.get('RECEITA_BREAKER_FAILURE_RATE', '0.5')),
+    'SLOW_CALL_SECONDS': float(os.environ.get('RECEITA_BREAKER_SLOW_CALL', '5')),
+    'MIN_CALLS': int(os.environ.get('RECEITA_BREAKER_MIN_CALLS', '10')),
+    'WINDOW_SECONDS': 60,
+    'OPEN_SECONDS': int(os.environ.get('RECEITA_BREAKER_OPEN_SECONDS', '30')),
+    'ADAPTIVE_ORDER': True,
+}
+
+# Consulta de CNPJs em lote (POST /api/v1/receita/cnpj/batch/, autenticado)
+# A concorrência por provedor é limitada por RECEITA_HTTP['MAX_CONCURRENT']
+RECEITA_BATCH = {
+    'MAX_ITENS': int(os.environ.get('RECEITA_BATCH_MAX_ITENS', '500')),
+    'MAX_WORKERS': int(os.environ.get('RECEITA_BATCH_MAX_WORKERS', '8')),
+}
+
+# Campos das consultas de CNPJ gravados em dados_receita_federal (sem raw_data)
+# Após mudar a lista: python manage.py compactar_dados_receita
+RECEITA_PROJECAO = {
+    'PERSISTIR': [
+        'fonte', 'cnpj', 'razao_social', 'nome_fantasia', 'situacao', 'endereco',
+        'telefone', 'email', 'atividade_principal', 'data_consulta', 'processado_em',
+    ],
+    'INCLUIR_RAW_PADRAO': False,
+}
+
+# Single-flight: consultas simultâneas ao mesmo CNPJ viram uma chamada externa
+# (entre workers o lock fica no cache compartilhado; exige Redis para valer)
+RECEITA_SINGLEFLIGHT = {
+    'ENABLED': os.environ.get('RECEITA_SINGLEFLIGHT_ENABLED', 'True').lower() == 'true',
+    'LOCK_TTL': 30,
+    'WAIT_TIMEOUT': 15,
+}
+
+# Índice local dos dados abertos de CNPJ (python manage.py importar_dataset_cnpj)
+# Consultado antes das APIs externas; sem o arquivo, o passo é ignorado
+RECEITA_DATASET = {
+    'ENABLED': os.environ.get('RECEITA_DATASET_ENABLED', 'True').lower() == 'true',
+    'PATH': os.environ.get('RECEITA_DATASET_PATH', str(BASE_DIR / 'data' / 'cnpj.sqlite3')),
+    'BATCH_SIZE': 50_000,
+}
@@ -65,15 +65,27 @@ AUTENTICAÇÃO:
 - POST /api/v1/auth/register/              # Registro completo original
 - POST /api/v1/auth/register-service/      # Registro BPO simplificado
 - POST /api/v1/auth/login/                 # Login flexível
+- POST /api/v1/auth/async/login/           # Login (ASGI, executor limitado, 429 se lotado)
 - GET  /api/v1/auth/profile/               # Perfil contador
 - POST /api/v1/auth/logout/                # Logout seguro
 - POST /api/v1/auth/validate/document/     # Validação CPF/CNPJ
 
 RECEITA FEDERAL:
-- GET  /api/v1/receita/health/             # Health check serviços RF
-- GET  /api/v1/receita/cnpj/{cnpj}/        # Consulta CNPJ na RF
+- GET  /api/v1/receita/health/             # Health check serviços RF (snapshot do prober)
+- GET  /api/v1/receita/cnpj/{cnpj}/        # Consulta CNPJ na RF (?fields=, ?include=raw)
+- POST /api/v1/receita/cnpj/batch/         # Consulta CNPJs em lote (NDJSON)
+- GET  /api/v1/receita/cep/{cep}/          # Endereço por CEP (cache + base local)
+- POST /api/v1/receita/cep/batch/          # Endereços de vários CEPs
+- GET  /api/v1/receita/async/cnpj/{cnpj}/  # Consulta CNPJ (ASGI, httpx)
+- GET  /api/v1/receita/metrics/            # Métricas dos provedores (Prometheus)
+- GET  /api/v1/receita/metrics/resumo/     # Resumo da janela recente (JSON)
+
+MVP:
+- POST /api/v1/mvp/login/                  # Login MVP (email + senha)
+- POST /api/v1/mvp/async/login/            # Login MVP (ASGI, executor limitado, 429 se lotado)
 
 CONTADORES:
+- POST /api/v1/contadores/importar/        # Importação de clientes CSV/XLSX (relatório NDJSON)
 - GET  /api/v1/contadores/test/            # Teste (placeholder)
 
 JWT TOKENS: